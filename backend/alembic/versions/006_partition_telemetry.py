@@ -0,0 +1,90 @@
+"""range-partition telemetry_records and violations by timestamp
+
+The existing table is renamed to <table>_legacy and attached as the partition
+covering everything before the next period boundary, so no rows are copied.
+Attaching still builds the (id, timestamp) primary key and validates the range
+check on the legacy table; on large installs run `alembic upgrade head` by hand
+before deploying rather than relying on the 30s startup migration.
+
+Revision ID: 006_partition_telemetry
+Revises: 005_users_scope
+Create Date: 2026-10-18
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.services.partition_manager import period_start, next_period, create_partition_sql
+
+revision = '006_partition_telemetry'
+down_revision = '005_users_scope'
+branch_labels = None
+depends_on = None
+
+TABLES = ('telemetry_records', 'violations')
+LEGACY_INDEXES = ('id', 'session_id', 'timestamp')
+
+
+def _partition_table(table, interval, premake):
+    bind = op.get_bind()
+    legacy = f'{table}_legacy'
+
+    op.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+    for col in LEGACY_INDEXES:
+        op.execute(f'ALTER INDEX IF EXISTS ix_{table}_{col} RENAME TO ix_{legacy}_{col}')
+    op.execute(f'ALTER TABLE {legacy} DROP CONSTRAINT IF EXISTS {table}_pkey')
+    op.execute(f"UPDATE {legacy} SET timestamp = '1970-01-01' WHERE timestamp IS NULL")
+    op.execute(f'ALTER TABLE {legacy} ALTER COLUMN timestamp SET NOT NULL')
+
+    max_ts = bind.execute(sa.text(f'SELECT max(timestamp) FROM {legacy}')).scalar()
+    now = datetime.utcnow()
+    cutoff = next_period(period_start(max(max_ts or now, now), interval), interval)
+
+    op.execute(f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)')
+    op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, timestamp)')
+    op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_session_id_fkey FOREIGN KEY (session_id) REFERENCES envelo_sessions(id)')
+    for col in LEGACY_INDEXES:
+        op.execute(f'CREATE INDEX ix_{table}_{col} ON {table} ({col})')
+    op.execute(f'CREATE INDEX ix_{table}_session_ts ON {table} (session_id, timestamp)')
+    op.execute(f'ALTER SEQUENCE IF EXISTS {table}_id_seq OWNED BY {table}.id')
+
+    # A validated CHECK lets ATTACH skip its own full-table scan
+    op.execute(f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_range CHECK (timestamp < '{cutoff.isoformat(sep=' ')}') NOT VALID")
+    op.execute(f'ALTER TABLE {legacy} VALIDATE CONSTRAINT {legacy}_range')
+    op.execute(f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{cutoff.isoformat(sep=' ')}')")
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+    start = cutoff
+    for _ in range(premake + 1):
+        end = next_period(start, interval)
+        op.execute(create_partition_sql(table, start, end, interval))
+        start = end
+
+
+def _flatten_table(table):
+    flat = f'{table}_flat'
+    op.execute(f'CREATE TABLE {flat} (LIKE {table} INCLUDING DEFAULTS)')
+    op.execute(f'INSERT INTO {flat} SELECT * FROM {table}')
+    op.execute(f'ALTER SEQUENCE IF EXISTS {table}_id_seq OWNED BY {flat}.id')
+    op.execute(f'DROP TABLE {table} CASCADE')
+    op.execute(f'ALTER TABLE {flat} RENAME TO {table}')
+    op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id)')
+    op.execute(f'ALTER TABLE {table} ALTER COLUMN timestamp DROP NOT NULL')
+    op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_session_id_fkey FOREIGN KEY (session_id) REFERENCES envelo_sessions(id)')
+    for col in LEGACY_INDEXES:
+        op.execute(f'CREATE INDEX ix_{table}_{col} ON {table} ({col})')
+
+
+def upgrade():
+    # violations.telemetry_id cannot reference a partitioned table without the partition key
+    op.execute('ALTER TABLE violations DROP CONSTRAINT IF EXISTS violations_telemetry_id_fkey')
+    for table in TABLES:
+        _partition_table(table, settings.TELEMETRY_PARTITION_INTERVAL, settings.TELEMETRY_PARTITION_PREMAKE)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        _flatten_table(table)
+    op.execute('ALTER TABLE violations ADD CONSTRAINT violations_telemetry_id_fkey FOREIGN KEY (telemetry_id) REFERENCES telemetry_records(id)')
@@ -0,0 +1,55 @@
+"""add telemetry_rollups and violation_rollups, backfilled from raw telemetry
+
+Hourly buckets are backfilled for all history; minute buckets only for the
+window the compactor keeps.
+
+Revision ID: 007_telemetry_rollups
+Revises: 006_partition_telemetry
+Create Date: 2026-10-18
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.telemetry_rollup import rebuild_rollups_sql, MINUTE_ROLLUP_RETENTION_HOURS
+
+revision = '007_telemetry_rollups'
+down_revision = '006_partition_telemetry'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('telemetry_rollups',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('session_id', sa.Integer(), sa.ForeignKey('envelo_sessions.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('granularity', sa.String(10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('pass_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('block_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.UniqueConstraint('session_id', 'granularity', 'bucket_start', name='uq_telemetry_rollups_bucket'),
+    )
+    op.create_table('violation_rollups',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('session_id', sa.Integer(), sa.ForeignKey('envelo_sessions.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('granularity', sa.String(10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('boundary_name', sa.String(100), nullable=False, server_default=''),
+        sa.Column('violation_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.UniqueConstraint('session_id', 'granularity', 'bucket_start', 'boundary_name', name='uq_violation_rollups_bucket'),
+    )
+
+    bind = op.get_bind()
+    windows = {
+        'hour': datetime(1970, 1, 1),
+        'minute': datetime.utcnow() - timedelta(hours=MINUTE_ROLLUP_RETENTION_HOURS),
+    }
+    for granularity, since in windows.items():
+        for stmt in rebuild_rollups_sql(granularity):
+            bind.execute(sa.text(stmt), {'since': since})
+
+
+def downgrade():
+    op.drop_table('violation_rollups')
+    op.drop_table('telemetry_rollups')
@@ -0,0 +1,51 @@
+"""convert telemetry JSON text columns to JSONB, online, with GIN indexes
+
+telemetry_records.parameters / boundary_evaluations / system_state and
+violations.parameters. Shadow columns are backfilled in committed batches while
+a trigger keeps new writes current; the swap's lock covers only rows written
+after a last batched catch-up and the catalog-only rename. Every step is
+resumable, and running scripts/backfill_telemetry_jsonb.py ahead of the deploy
+leaves only the catch-up, swap and index builds for this migration.
+
+Revision ID: 008_telemetry_jsonb
+Revises: 007_telemetry_rollups
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+from app.services.telemetry_jsonb import (
+    JSONB_COLUMNS, GIN_INDEXES, needs_conversion, expand, backfill, catch_up, swap, create_gin_indexes,
+)
+
+revision = '008_telemetry_jsonb'
+down_revision = '007_telemetry_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    tables = [t for t in JSONB_COLUMNS if needs_conversion(bind, t)]
+
+    for table in tables:
+        expand(bind, table)
+    with op.get_context().autocommit_block():
+        for table in tables:
+            backfill(bind, table)
+        # second pass: picks up rows that committed behind the first, so the
+        # swap's locked section only reads ids written since
+        covered = {table: catch_up(bind, table) for table in tables}
+    for table in tables:
+        swap(bind, table, covered[table])
+    op.execute("DROP FUNCTION IF EXISTS telemetry_try_jsonb(text)")
+
+    with op.get_context().autocommit_block():
+        create_gin_indexes(bind)
+
+
+def downgrade():
+    for name in GIN_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    for table, columns in JSONB_COLUMNS.items():
+        for column in columns:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE TEXT USING {column}::text")
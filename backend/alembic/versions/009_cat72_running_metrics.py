@@ -0,0 +1,41 @@
+"""running CAT-72 margin accumulator and (test_id, timestamp) telemetry index
+
+cat72_tests.envelope_distance_sum lets envelope_margin be maintained per
+sample; it is backfilled for tests still in progress. The composite index
+serves the bounded newest-first reads (final drift/stability window, window
+state rebuilds) without sorting a test's whole history.
+
+Revision ID: 009_cat72_running_metrics
+Revises: 008_telemetry_jsonb
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '009_cat72_running_metrics'
+down_revision = '008_telemetry_jsonb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('cat72_tests', sa.Column('envelope_distance_sum', sa.Float(), server_default='0'))
+    op.execute("""
+        UPDATE cat72_tests t
+        SET envelope_distance_sum = s.total,
+            envelope_margin = CASE WHEN t.total_samples > 0 THEN s.total / t.total_samples END
+        FROM (
+            SELECT test_id, coalesce(sum(envelope_distance), 0) AS total
+            FROM telemetry
+            WHERE test_id IN (SELECT id FROM cat72_tests WHERE state IN ('running', 'learning'))
+            GROUP BY test_id
+        ) s
+        WHERE s.test_id = t.id
+    """)
+    with op.get_context().autocommit_block():
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_telemetry_test_ts ON telemetry (test_id, timestamp)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_telemetry_test_ts')
+    op.drop_column('cat72_tests', 'envelope_distance_sum')
@@ -0,0 +1,41 @@
+"""add cat72_learning_profiles for the streaming learning-mode profile
+
+Learning profiles move out of cat72_tests.envelope_definition so a sample no
+longer rewrites the whole envelope JSON. Profiles of tests still in learning
+are copied over in their legacy shape, which the store converts on first read.
+
+Revision ID: 010_cat72_learning_profiles
+Revises: 009_cat72_running_metrics
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '010_cat72_learning_profiles'
+down_revision = '009_cat72_running_metrics'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cat72_learning_profiles',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('test_id', sa.Integer(), sa.ForeignKey('cat72_tests.id', ondelete='CASCADE'), nullable=False, unique=True),
+        sa.Column('sample_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('profile', postgresql.JSONB()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    op.execute("""
+        INSERT INTO cat72_learning_profiles (test_id, sample_count, profile, updated_at)
+        SELECT id,
+               coalesce((envelope_definition::jsonb -> '_learning_profile' ->> 'sample_count')::int, 0),
+               envelope_definition::jsonb -> '_learning_profile',
+               now()
+        FROM cat72_tests
+        WHERE state = 'learning' AND envelope_definition::jsonb ? '_learning_profile'
+    """)
+
+
+def downgrade():
+    op.drop_table('cat72_learning_profiles')
@@ -0,0 +1,81 @@
+"""add append-only cat72_evidence_blocks and Merkle cat72_evidence_checkpoints
+
+Existing evidence_chain arrays are copied into the block table; the column is
+left in place (and still read for tests that have no blocks).
+
+Revision ID: 011_cat72_evidence_blocks
+Revises: 010_cat72_learning_profiles
+Create Date: 2026-10-18
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.evidence_chain import compute_hash
+
+revision = '011_cat72_evidence_blocks'
+down_revision = '010_cat72_learning_profiles'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cat72_evidence_blocks',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('test_id', sa.Integer(), sa.ForeignKey('cat72_tests.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('block_index', sa.Integer(), nullable=False),
+        sa.Column('block_type', sa.String(50), nullable=False),
+        sa.Column('hash', sa.String(64), nullable=False),
+        sa.Column('prev_hash', sa.String(64), nullable=False, server_default=''),
+        sa.Column('data', sa.JSON()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.UniqueConstraint('test_id', 'block_index', name='uq_cat72_evidence_blocks_index'),
+    )
+    op.create_table('cat72_evidence_checkpoints',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('test_id', sa.Integer(), sa.ForeignKey('cat72_tests.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('first_sample', sa.Integer(), nullable=False),
+        sa.Column('last_sample', sa.Integer(), nullable=False),
+        sa.Column('first_telemetry_id', sa.Integer(), nullable=False),
+        sa.Column('last_telemetry_id', sa.Integer(), nullable=False),
+        sa.Column('first_prev_hash', sa.String(64), nullable=False, server_default=''),
+        sa.Column('last_hash', sa.String(64), nullable=False),
+        sa.Column('merkle_root', sa.String(64), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+        sa.UniqueConstraint('test_id', 'seq', name='uq_cat72_evidence_checkpoints_seq'),
+    )
+    # The old column didn't record what each block was chained to: genesis starts
+    # at "", spec confirmation follows the previous block, the final block follows
+    # the last sample. Recover it by rehashing against those candidates.
+    bind = op.get_bind()
+    tests = bind.execute(sa.text(
+        "SELECT id, evidence_chain FROM cat72_tests WHERE evidence_chain IS NOT NULL"
+    )).all()
+    for test_pk, chain in tests:
+        if isinstance(chain, str):
+            chain = json.loads(chain)
+        if not isinstance(chain, list):
+            continue
+        last_sample = bind.execute(sa.text(
+            "SELECT sample_hash FROM telemetry WHERE test_id = :t AND prev_hash IS NOT NULL ORDER BY id DESC LIMIT 1"
+        ), {"t": test_pk}).scalar()
+        prev_block = ""
+        for index, block in enumerate(chain):
+            if not isinstance(block, dict) or not block.get("hash"):
+                continue
+            data = block.get("data") or {}
+            prev = next((c for c in (prev_block, "", last_sample) if c is not None
+                         and compute_hash(data, c) == block["hash"]), prev_block)
+            bind.execute(sa.text(
+                "INSERT INTO cat72_evidence_blocks (test_id, block_index, block_type, hash, prev_hash, data, created_at) "
+                "VALUES (:t, :i, :type, :hash, :prev, CAST(:data AS json), now())"
+            ), {"t": test_pk, "i": index, "type": data.get("type", "legacy"), "hash": block["hash"],
+                "prev": prev, "data": json.dumps(data)})
+            prev_block = block["hash"]
+
+
+def downgrade():
+    op.drop_table('cat72_evidence_checkpoints')
+    op.drop_table('cat72_evidence_blocks')
@@ -0,0 +1,36 @@
+"""add surveillance_workers and surveillance_shard_leases for multi-worker surveillance
+
+Also indexes envelo_sessions.last_heartbeat_at, which shard owners poll for
+heartbeats served by other workers.
+
+Revision ID: 012_surveillance_shards
+Revises: 011_cat72_evidence_blocks
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '012_surveillance_shards'
+down_revision = '011_cat72_evidence_blocks'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('surveillance_workers',
+        sa.Column('worker_id', sa.String(100), primary_key=True),
+        sa.Column('started_at', sa.DateTime()),
+        sa.Column('last_seen', sa.DateTime(), nullable=False),
+    )
+    op.create_table('surveillance_shard_leases',
+        sa.Column('shard', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('owner', sa.String(100), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_envelo_sessions_last_heartbeat_at', 'envelo_sessions', ['last_heartbeat_at'])
+
+
+def downgrade():
+    op.drop_index('ix_envelo_sessions_last_heartbeat_at', table_name='envelo_sessions')
+    op.drop_table('surveillance_shard_leases')
+    op.drop_table('surveillance_workers')
@@ -0,0 +1,32 @@
+"""add scheduled_jobs: cluster-wide schedule and lease of each background job
+
+Revision ID: 013_scheduled_jobs
+Revises: 012_surveillance_shards
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '013_scheduled_jobs'
+down_revision = '012_surveillance_shards'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scheduled_jobs',
+        sa.Column('name', sa.String(100), primary_key=True),
+        sa.Column('owner', sa.String(100), nullable=True),
+        sa.Column('next_run_at', sa.DateTime(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('last_started_at', sa.DateTime(), nullable=True),
+        sa.Column('last_finished_at', sa.DateTime(), nullable=True),
+        sa.Column('last_status', sa.String(20), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('last_duration_ms', sa.Integer(), nullable=True),
+        sa.Column('run_count', sa.Integer(), server_default='0'),
+    )
+
+
+def downgrade():
+    op.drop_table('scheduled_jobs')
@@ -0,0 +1,34 @@
+"""audit_log request columns and keyset indexes
+
+user_role, ip_address and user_agent were added at runtime by the audit
+router's own sync engine; they are now part of the schema (IF NOT EXISTS,
+as deployed databases already have them). The composite indexes serve the
+newest-first (timestamp, id) keyset pages, overall and per user.
+
+Revision ID: 014_audit_log_keyset
+Revises: 013_scheduled_jobs
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = '014_audit_log_keyset'
+down_revision = '013_scheduled_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE audit_log ADD COLUMN IF NOT EXISTS user_role VARCHAR(64)")
+    op.execute("ALTER TABLE audit_log ADD COLUMN IF NOT EXISTS ip_address VARCHAR(45)")
+    op.execute("ALTER TABLE audit_log ADD COLUMN IF NOT EXISTS user_agent VARCHAR(500)")
+    with op.get_context().autocommit_block():
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_audit_log_ts_id ON audit_log ("timestamp", id)')
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_audit_log_email_ts_id ON audit_log (user_email, "timestamp", id)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_audit_log_email_ts_id')
+    op.execute('DROP INDEX IF EXISTS ix_audit_log_ts_id')
+    op.execute("ALTER TABLE audit_log DROP COLUMN IF EXISTS user_agent")
+    op.execute("ALTER TABLE audit_log DROP COLUMN IF EXISTS ip_address")
+    op.execute("ALTER TABLE audit_log DROP COLUMN IF EXISTS user_role")
@@ -0,0 +1,24 @@
+"""certificates.certificate_pdf_hash
+
+Content hash of the fields the stored certificate PDF was rendered from.
+Downloads serve the stored bytes while it matches (and use it as the ETag);
+existing PDFs have no hash and are re-rendered once by the certificate_pdfs job.
+
+Revision ID: 015_certificate_pdf_hash
+Revises: 014_audit_log_keyset
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = '015_certificate_pdf_hash'
+down_revision = '014_audit_log_keyset'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE certificates ADD COLUMN IF NOT EXISTS certificate_pdf_hash VARCHAR(64)")
+
+
+def downgrade():
+    op.execute("ALTER TABLE certificates DROP COLUMN IF EXISTS certificate_pdf_hash")
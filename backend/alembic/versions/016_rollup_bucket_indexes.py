@@ -0,0 +1,29 @@
+"""rollup (granularity, bucket_start) indexes
+
+Fleet totals sum only the recent hourly buckets and fold settled hours into a
+running total an hour at a time; both reads, and the minute-bucket compactor,
+are ranges over (granularity, bucket_start).
+
+Revision ID: 016_rollup_bucket_indexes
+Revises: 015_certificate_pdf_hash
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = '016_rollup_bucket_indexes'
+down_revision = '015_certificate_pdf_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_telemetry_rollups_granularity_bucket '
+                   'ON telemetry_rollups (granularity, bucket_start)')
+        op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_violation_rollups_granularity_bucket '
+                   'ON violation_rollups (granularity, bucket_start)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_violation_rollups_granularity_bucket')
+    op.execute('DROP INDEX IF EXISTS ix_telemetry_rollups_granularity_bucket')
@@ -0,0 +1,24 @@
+"""cat72_tests.envelope_version
+
+Bumped on every envelope_definition assignment. Workers key their compiled
+envelope cache on (test id, version) instead of fingerprinting the boundary
+definitions on every sample.
+
+Revision ID: 017_cat72_envelope_version
+Revises: 016_rollup_bucket_indexes
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = '017_cat72_envelope_version'
+down_revision = '016_rollup_bucket_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE cat72_tests ADD COLUMN IF NOT EXISTS envelope_version INTEGER NOT NULL DEFAULT 0")
+
+
+def downgrade():
+    op.execute("ALTER TABLE cat72_tests DROP COLUMN IF EXISTS envelope_version")
@@ -0,0 +1,41 @@
+"""telemetry.sample_number and checkpoint Merkle nodes
+
+Evidence checkpoints were cut in telemetry id order, so a row that took its id
+before a later sample but committed after a checkpoint was sealed fell behind
+it. Samples now carry their position in the test's chain (unique per test, so
+two requests can't claim the same number) and checkpoints cover a contiguous
+run of sample numbers. Existing rows are numbered in id order, which is the
+order existing checkpoints were built in.
+
+cat72_evidence_checkpoints.merkle_nodes keeps the upper levels of each
+checkpoint's tree so an inclusion proof reads one small chunk of samples.
+
+Revision ID: 018_telemetry_sample_number
+Revises: 017_cat72_envelope_version
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = '018_telemetry_sample_number'
+down_revision = '017_cat72_envelope_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE telemetry ADD COLUMN IF NOT EXISTS sample_number INTEGER")
+    op.execute("ALTER TABLE cat72_evidence_checkpoints ADD COLUMN IF NOT EXISTS merkle_nodes BYTEA")
+    op.execute("""
+        UPDATE telemetry t SET sample_number = n.num
+        FROM (SELECT id, row_number() OVER (PARTITION BY test_id ORDER BY id) AS num FROM telemetry) n
+        WHERE t.id = n.id AND t.sample_number IS NULL
+    """)
+    with op.get_context().autocommit_block():
+        op.execute('CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_telemetry_test_sample '
+                   'ON telemetry (test_id, sample_number)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS uq_telemetry_test_sample')
+    op.execute("ALTER TABLE cat72_evidence_checkpoints DROP COLUMN IF EXISTS merkle_nodes")
+    op.execute("ALTER TABLE telemetry DROP COLUMN IF EXISTS sample_number")
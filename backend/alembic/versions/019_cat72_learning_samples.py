@@ -0,0 +1,30 @@
+"""cat72_tests.learning_samples
+
+learn-complete resets total_samples for the enforcement phase, so telemetry
+sample numbers continue from the learning samples it counted, kept here.
+Existing tests past learning get the count of their unchained (learning)
+samples, matching the id-order numbering migration 018 gave their rows.
+
+Revision ID: 019_cat72_learning_samples
+Revises: 018_telemetry_sample_number
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = '019_cat72_learning_samples'
+down_revision = '018_telemetry_sample_number'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE cat72_tests ADD COLUMN IF NOT EXISTS learning_samples INTEGER NOT NULL DEFAULT 0")
+    op.execute("""
+        UPDATE cat72_tests t SET learning_samples = l.n
+        FROM (SELECT test_id, count(*) AS n FROM telemetry WHERE prev_hash IS NULL GROUP BY test_id) l
+        WHERE t.id = l.test_id AND t.state <> 'learning'
+    """)
+
+
+def downgrade():
+    op.execute("ALTER TABLE cat72_tests DROP COLUMN IF EXISTS learning_samples")
@@ -0,0 +1,27 @@
+"""scheduled_jobs.run_request and last_result
+
+On-demand runs of a cluster job (admin-started certificate PDF regeneration)
+are requested through the job's row, so the replica that claims the lease runs
+them and a run can't be started twice. The row keeps the run's result, so any
+replica can report it.
+
+Revision ID: 020_scheduled_job_requests
+Revises: 019_cat72_learning_samples
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = '020_scheduled_job_requests'
+down_revision = '019_cat72_learning_samples'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE scheduled_jobs ADD COLUMN IF NOT EXISTS run_request JSON")
+    op.execute("ALTER TABLE scheduled_jobs ADD COLUMN IF NOT EXISTS last_result JSON")
+
+
+def downgrade():
+    op.execute("ALTER TABLE scheduled_jobs DROP COLUMN IF EXISTS last_result")
+    op.execute("ALTER TABLE scheduled_jobs DROP COLUMN IF EXISTS run_request")
@@ -0,0 +1,31 @@
+"""cat72_tests.last_sample_number
+
+Telemetry sample numbers were derived from total_samples, which the CAT-72
+auto-evaluator overwrites with session counts: a lower value made the next
+sample reuse a number (unique violation), a higher one left gaps that evidence
+checkpoints never get past. Numbering now has a counter of its own, advanced
+only by ingest; existing tests start from their highest stored number.
+
+Revision ID: 021_cat72_last_sample_number
+Revises: 020_scheduled_job_requests
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = '021_cat72_last_sample_number'
+down_revision = '020_scheduled_job_requests'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE cat72_tests ADD COLUMN IF NOT EXISTS last_sample_number INTEGER NOT NULL DEFAULT 0")
+    op.execute("""
+        UPDATE cat72_tests t SET last_sample_number = m.n
+        FROM (SELECT test_id, max(sample_number) AS n FROM telemetry GROUP BY test_id) m
+        WHERE t.id = m.test_id AND m.n IS NOT NULL
+    """)
+
+
+def downgrade():
+    op.execute("ALTER TABLE cat72_tests DROP COLUMN IF EXISTS last_sample_number")
@@ -0,0 +1,40 @@
+"""fleet_rollup_totals
+
+Fleet totals summed settled hourly buckets once per process and cached them,
+so samples landing late (or backfilled) in a settled hour were never counted
+and each worker reported its own numbers. The totals now live in a table kept
+by a trigger on the hourly rollups; it is filled from the existing rollups
+with writes to them held off, then the triggers take over.
+
+Revision ID: 022_fleet_rollup_totals
+Revises: 021_cat72_last_sample_number
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+from app.services.telemetry_rollup import FLEET_TOTALS_RECOUNT_SQL, FLEET_TOTALS_SQL
+
+revision = '022_fleet_rollup_totals'
+down_revision = '021_cat72_last_sample_number'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS fleet_rollup_totals (
+            slot INTEGER PRIMARY KEY,
+            telemetry_count BIGINT NOT NULL DEFAULT 0,
+            violation_count BIGINT NOT NULL DEFAULT 0
+        )
+    """)
+    op.execute("LOCK TABLE telemetry_rollups, violation_rollups IN SHARE ROW EXCLUSIVE MODE")
+    for stmt in FLEET_TOTALS_RECOUNT_SQL + FLEET_TOTALS_SQL:
+        op.execute(stmt)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS violation_rollups_fleet_totals ON violation_rollups")
+    op.execute("DROP TRIGGER IF EXISTS telemetry_rollups_fleet_totals ON telemetry_rollups")
+    op.execute("DROP FUNCTION IF EXISTS fleet_rollup_totals_sync()")
+    op.execute("DROP TABLE IF EXISTS fleet_rollup_totals")
@@ -1304,16 +1304,9 @@ async def acknowledge_boundaries(
 
     app.boundaries_acknowledged = True
     app.boundaries_acknowledged_at = datetime.now(timezone.utc)
+    await write_audit_log(db, action="boundaries_acknowledged", resource_type="application", resource_id=app.id,
+                          user_id=current_user.get("sub") or current_user.get("id"), user_email=current_user.get("email"),
+                          details={"system_name": app.system_name})
     await db.commit()
 
-    # Log it
-    try:
-        from app.services.audit_service import write_audit_log
-        await write_audit_log(db, current_user.get("sub") or current_user.get("id"), "boundaries_acknowledged", {
-            "application_id": application_id,
-            "system_name": app.system_name,
-        })
-    except:
-        pass
-
     return {"status": "acknowledged", "acknowledged_at": app.boundaries_acknowledged_at.isoformat()}
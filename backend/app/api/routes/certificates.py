@@ -10,7 +10,7 @@ from app.core.database import get_db
 from app.core.security import get_current_user, require_role
 from app.core.config import settings
 from app.models.models import Certificate, CAT72Test, Application, CertificationState, TestState, EnveloSession, APIKey
-from app.services.certificate_pdf import generate_certificate_pdf
+from app.services.certificate_artifacts import certificate_pdf, load_certificate, regeneration_status, render_certificate_pdf, start_regeneration
 from app.services.compliance_log_service import generate_compliance_log, get_public_key_pem
 from typing import Optional
 
@@ -66,26 +66,9 @@ async def issue_certificate(test_id: str, db: AsyncSession = Depends(get_db), us
                  "convergence_score": test.convergence_score,
                  "evidence_hash": test.evidence_hash})
     await db.commit()
-    # Generate and store PDF
+    # Render and store the PDF (off the event loop)
     try:
-        odd_spec = certificate.odd_specification or {}
-        odd_string = odd_spec.get("environment_type", "General") if isinstance(odd_spec, dict) else str(odd_spec)
-        pdf_bytes = generate_certificate_pdf(
-            certificate_id=certificate.certificate_number,
-            organization_name=certificate.organization_name,
-            system_name=certificate.system_name,
-            odd_specification=odd_string,
-            issued_date=certificate.issued_at,
-            expiry_date=certificate.expires_at,
-            test_id=test.test_id if test else "N/A",
-            convergence_score=certificate.convergence_score or 0.95,
-            stability_index=0.95,
-            drift_rate=0.01,
-            evidence_hash=certificate.evidence_hash or "N/A"
-        )
-        certificate.certificate_pdf = pdf_bytes
-        await db.commit()
-        await db.refresh(certificate)
+        await render_certificate_pdf(db, certificate, test.test_id)
     except Exception as e:
         print(f"[CERT] PDF generation failed for {certificate.certificate_number}: {e}")
     # Send notification email
@@ -179,92 +162,51 @@ async def get_certificate(certificate_number: str, db: AsyncSession = Depends(ge
         "last_heartbeat": last_heartbeat.isoformat() if last_heartbeat else None,
     }
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
 @router.get("/{certificate_number}/pdf", summary="Download certificate PDF")
-async def download_pdf(certificate_number: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Certificate).where(Certificate.certificate_number == certificate_number))
-    cert = result.scalar_one_or_none()
-    if not cert: raise HTTPException(status_code=404, detail="Certificate not found")
+async def download_pdf(certificate_number: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Serves the stored PDF, rendering it only when the certificate changed since.
+    The ETag is the content hash, so a revalidation is answered with 304."""
+    loaded = await load_certificate(db, certificate_number)
+    if not loaded: raise HTTPException(status_code=404, detail="Certificate not found")
+    cert, inputs, digest = loaded
     if cert.state == "revoked": raise HTTPException(status_code=400, detail="Cannot download revoked certificate")
-    test_result = await db.execute(select(CAT72Test).where(CAT72Test.id == cert.test_id))
-    test = test_result.scalar_one_or_none()
-    odd_spec = cert.odd_specification or {}
-    odd_string = odd_spec.get("environment_type", "General") if isinstance(odd_spec, dict) else str(odd_spec)
-    pdf_bytes = generate_certificate_pdf(
-        certificate_id=cert.certificate_number,
-        organization_name=cert.organization_name,
-        system_name=cert.system_name,
-        odd_specification=odd_string,
-        issued_date=cert.issued_at,
-        expiry_date=cert.expires_at,
-        test_id=test.test_id if test else "N/A",
-        convergence_score=cert.convergence_score or 0.95,
-        stability_index=0.95,
-        drift_rate=0.01,
-        evidence_hash=cert.evidence_hash or "N/A"
-    )
-    return Response(content=pdf_bytes, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename=ODDC-{cert.certificate_number}.pdf"})
+    # no-cache: clients may keep the file but must revalidate, as a certificate can be revoked
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "public, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    pdf_bytes = await certificate_pdf(db, cert, inputs, digest)
+    headers["Content-Disposition"] = f"attachment; filename=ODDC-{cert.certificate_number}.pdf"
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
 
 
 @router.post("/{certificate_number}/regenerate-pdf", summary="Regenerate certificate PDF")
 async def regenerate_pdf(certificate_number: str, db: AsyncSession = Depends(get_db), user: dict = Depends(require_role(["admin"]))):
     """Regenerate PDF for an existing certificate (admin only)"""
-    result = await db.execute(select(Certificate).where(Certificate.certificate_number == certificate_number))
-    cert = result.scalar_one_or_none()
-    if not cert: raise HTTPException(status_code=404, detail="Certificate not found")
-    test_result = await db.execute(select(CAT72Test).where(CAT72Test.id == cert.test_id))
-    test = test_result.scalar_one_or_none()
-    odd_spec = cert.odd_specification or {}
-    odd_string = odd_spec.get("environment_type", "General") if isinstance(odd_spec, dict) else str(odd_spec)
-    pdf_bytes = generate_certificate_pdf(
-        certificate_id=cert.certificate_number,
-        organization_name=cert.organization_name,
-        system_name=cert.system_name,
-        odd_specification=odd_string,
-        issued_date=cert.issued_at,
-        expiry_date=cert.expires_at,
-        test_id=test.test_id if test else "N/A",
-        convergence_score=cert.convergence_score or 0.95,
-        stability_index=0.95,
-        drift_rate=0.01,
-        evidence_hash=cert.evidence_hash or "N/A"
-    )
-    cert.certificate_pdf = pdf_bytes
-    await db.commit()
+    loaded = await load_certificate(db, certificate_number)
+    if not loaded: raise HTTPException(status_code=404, detail="Certificate not found")
+    cert, inputs, _ = loaded
+    pdf_bytes = await render_certificate_pdf(db, cert, inputs["test_id"])
     return {"message": f"PDF regenerated for {cert.certificate_number}", "size_bytes": len(pdf_bytes)}
 
-@router.post("/regenerate-all-pdfs", summary="Regenerate all certificate PDFs")
-async def regenerate_all_pdfs(db: AsyncSession = Depends(get_db), user: dict = Depends(require_role(["admin"]))):
-    """Regenerate PDFs for all certificates missing them (admin only)"""
-    result = await db.execute(select(Certificate).where(Certificate.certificate_pdf == None))
-    certs = result.scalars().all()
-    regenerated = 0
-    errors = []
-    for cert in certs:
-        try:
-            test_result = await db.execute(select(CAT72Test).where(CAT72Test.id == cert.test_id))
-            test = test_result.scalar_one_or_none()
-            odd_spec = cert.odd_specification or {}
-            odd_string = odd_spec.get("environment_type", "General") if isinstance(odd_spec, dict) else str(odd_spec)
-            pdf_bytes = generate_certificate_pdf(
-                certificate_id=cert.certificate_number,
-                organization_name=cert.organization_name,
-                system_name=cert.system_name,
-                odd_specification=odd_string,
-                issued_date=cert.issued_at,
-                expiry_date=cert.expires_at,
-                test_id=test.test_id if test else "N/A",
-                convergence_score=cert.convergence_score or 0.95,
-                stability_index=0.95,
-                drift_rate=0.01,
-                evidence_hash=cert.evidence_hash or "N/A"
-            )
-            cert.certificate_pdf = pdf_bytes
-            regenerated += 1
-        except Exception as e:
-            errors.append({"cert": cert.certificate_number, "error": str(e)})
-    await db.commit()
-    return {"regenerated": regenerated, "errors": errors, "total_missing": len(certs)}
+@router.post("/regenerate-all-pdfs", status_code=202, summary="Regenerate all certificate PDFs")
+async def regenerate_all_pdfs(force: bool = Query(False), user: dict = Depends(require_role(["admin"]))):
+    """Request a background regeneration of missing or stale PDFs (every PDF with
+    force=true), a few renders at a time (admin only). It is a run of the hourly
+    certificate_pdfs job on whichever replica claims it; `started` is false if a
+    run is already in progress or requested. Status at GET /regenerate-all-pdfs/status."""
+    return await start_regeneration(force=force)
+
+@router.get("/regenerate-all-pdfs/status", summary="Bulk PDF regeneration status")
+async def regenerate_all_pdfs_status(user: dict = Depends(require_role(["admin"]))):
+    return await regeneration_status()
 
 @router.patch("/{certificate_number}/suspend", summary="Suspend certificate")
 async def suspend_certificate(certificate_number: str, reason: str, db: AsyncSession = Depends(get_db), user: dict = Depends(require_role(["admin"]))):
@@ -7,16 +7,24 @@ import json
 from datetime import datetime, timezone
 from app.services.audit_service import write_audit_log
 from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm.attributes import flag_modified
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
 
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
 from app.models.models import EnveloSession, TelemetryRecord, Violation, APIKey, Certificate
 from app.api.routes.apikeys import validate_api_key, hash_key
 from app.core.security import get_current_user
+from app.services.telemetry_rollup import record_rollups, read_timeline, rollup_totals, session_totals
+from app.services.telemetry_export import (
+    keyset_page, count_rows, iter_export, serialize_row, EXPORT_KINDS, EXPORT_FORMATS,
+)
+from app.services.telemetry_jsonb import (
+    parameter_filter, failed_boundary_filter, parameter_stats, boundary_stats,
+)
 
 router = APIRouter()
 
@@ -77,6 +85,94 @@ def require_scope(api_key: APIKey, required: str):
     raise HTTPException(status_code=403, detail=f"API key scope '{scope}' insufficient — requires '{required}'")
 
 
+async def _get_session_by_uuid(db: AsyncSession, session_id: str) -> EnveloSession:
+    result = await db.execute(select(EnveloSession).where(EnveloSession.session_id == session_id))
+    session = result.scalar_one_or_none()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+async def _get_key_session(db: AsyncSession, api_key: APIKey, session_id: str) -> EnveloSession:
+    """Session reported under this API key or another key of its organization, else 404"""
+    session = await _get_session_by_uuid(db, session_id)
+    if session.api_key_id == api_key.id:
+        return session
+    if api_key.organization_id is not None and session.api_key_id is not None:
+        owner_org = (await db.execute(
+            select(APIKey.organization_id).where(APIKey.id == session.api_key_id)
+        )).scalar_one_or_none()
+        if owner_org == api_key.organization_id:
+            return session
+    raise HTTPException(status_code=404, detail="Session not found")
+
+
+async def _get_my_session(db: AsyncSession, current_user: dict, session_id: str) -> EnveloSession:
+    """Session owned by the caller's organization (or the caller), else 404"""
+    key_result = await db.execute(
+        select(APIKey.id).where(
+            (APIKey.organization_id == current_user.get("organization_id")) if current_user.get("organization_id") else (APIKey.user_id == int(current_user["sub"]))
+        )
+    )
+    my_keys = set(key_result.scalars().all())
+    session = await _get_session_by_uuid(db, session_id)
+    if session.api_key_id not in my_keys:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+def telemetry_filters(
+    param: Optional[str] = None,
+    op: str = "eq",
+    value: Optional[str] = None,
+    boundary: Optional[str] = None,
+    result: Optional[str] = None,
+) -> list:
+    """Query-string filters for telemetry listings, evaluated in SQL:
+    ?param=speed&op=gt&value=10, ?boundary=speed (failed evaluations), ?result=BLOCK"""
+    filters = []
+    if param is not None:
+        if value is None:
+            raise HTTPException(status_code=400, detail="param filter requires value")
+        try:
+            filters.append(parameter_filter(TelemetryRecord, param, op, value))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if boundary:
+        filters.append(failed_boundary_filter(boundary))
+    if result:
+        filters.append(TelemetryRecord.result == result.upper())
+    return filters
+
+
+async def _page_or_400(db: AsyncSession, kind: str, session_pk: int, limit: int, cursor: Optional[str], filters: list = ()):
+    try:
+        return await keyset_page(db, kind, session_pk, limit, cursor, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _export_response(session: EnveloSession, kind: str, fmt: str) -> StreamingResponse:
+    """Stream on a dedicated DB session: the request-scoped one is closed before the body is sent."""
+    if kind not in EXPORT_KINDS:
+        raise HTTPException(status_code=400, detail="kind must be 'telemetry' or 'violations'")
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    session_pk = session.id
+
+    async def body():
+        async with AsyncSessionLocal() as export_db:
+            async for chunk in iter_export(export_db, kind, session_pk, fmt):
+                yield chunk
+
+    filename = f"{kind}-{session.session_id}.{fmt}"
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.post("/sessions", summary="Start new agent session")
 async def register_session(
     data: SessionCreate,
@@ -174,6 +270,8 @@ async def receive_telemetry(
 
     
     # Store telemetry records
+    rollup_results = []
+    rollup_violations = []
     for record in data.records:
         telemetry = TelemetryRecord(
             session_id=session.id,
@@ -182,11 +280,12 @@ async def receive_telemetry(
             action_type=record.get('action_type', record.get('parameter', '')),
             result=record.get('result', record.get('decision', '')).upper(),
             execution_time_ms=record.get('execution_time_ms', 0),
-            parameters=json.dumps(record.get('parameters', {k: record.get(k) for k in ('parameter','value','boundary') if record.get(k) is not None})),
-            boundary_evaluations=json.dumps(record.get('boundary_evaluations', [])),
-            system_state=json.dumps(record.get('system_state', {}))
+            parameters=record.get('parameters', {k: record.get(k) for k in ('parameter','value','boundary') if record.get(k) is not None}),
+            boundary_evaluations=record.get('boundary_evaluations', []),
+            system_state=record.get('system_state', {})
         )
         db.add(telemetry)
+        rollup_results.append((telemetry.timestamp, telemetry.result))
         
         # If violation, also add to violations table
         result_val = record.get('result', record.get('decision', '')).upper()
@@ -200,9 +299,10 @@ async def receive_telemetry(
                             timestamp=telemetry.timestamp,
                             boundary_name=ev.get('boundary', ev.get('parameter', '')),
                             violation_message=ev.get('message', f"{record.get('parameter','')}: {record.get('value','')} exceeded boundary"),
-                            parameters=json.dumps(record.get('parameters', {}))
+                            parameters=record.get('parameters', {})
                         )
                         db.add(violation)
+                        rollup_violations.append((violation.timestamp, violation.boundary_name))
             else:
                 # No boundary_evaluations but still a block — record it
                 violation = Violation(
@@ -210,9 +310,10 @@ async def receive_telemetry(
                     timestamp=telemetry.timestamp,
                     boundary_name=record.get('parameter', record.get('action', '')),
                     violation_message=f"{record.get('parameter','')}: value={record.get('value','')} exceeded boundary={record.get('boundary','')}",
-                    parameters=json.dumps({k: record.get(k) for k in ('parameter','value','boundary','action') if record.get(k) is not None})
+                    parameters={k: record.get(k) for k in ('parameter','value','boundary','action') if record.get(k) is not None}
                 )
                 db.add(violation)
+                rollup_violations.append((violation.timestamp, violation.boundary_name))
     
     # Update session stats
     session.last_telemetry_at = datetime.utcnow()
@@ -228,6 +329,7 @@ async def receive_telemetry(
                 stat_block += 1
     session.pass_count = (session.pass_count or 0) + stat_pass
     session.block_count = (session.block_count or 0) + stat_block
+    await record_rollups(db, session.id, rollup_results, rollup_violations)
     
     await db.commit()
 
@@ -363,92 +465,69 @@ async def get_session(
 async def get_session_telemetry(
     session_id: str,
     limit: int = 100,
-    offset: int = 0,
+    cursor: Optional[str] = None,
+    filters: list = Depends(telemetry_filters),
     db: AsyncSession = Depends(get_db),
     api_key: APIKey = Depends(get_api_key_from_header)
 ):
-    """Get telemetry records for a session"""
+    """Get telemetry records for a session, newest first.
+    Pass the returned next_cursor back as `cursor` to fetch the next page."""
     
-    # Find session
-    sess_result = await db.execute(
-        select(EnveloSession).where(EnveloSession.session_id == session_id)
-    )
-    session = sess_result.scalar_one_or_none()
-    
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Get telemetry
-    result = await db.execute(
-        select(TelemetryRecord).where(
-            TelemetryRecord.session_id == session.id
-        ).order_by(TelemetryRecord.timestamp.desc()).limit(limit).offset(offset)
-    )
-    records = result.scalars().all()
-    
-    # Get total count
-    count_result = await db.execute(
-        select(func.count(TelemetryRecord.id)).where(TelemetryRecord.session_id == session.id)
-    )
-    total = count_result.scalar()
+    session = await _get_key_session(db, api_key, session_id)
+    rows, next_cursor = await _page_or_400(db, "telemetry", session.id, limit, cursor, filters)
+    if filters:
+        total = await count_rows(db, "telemetry", session.id, filters)
+    else:
+        total, _ = await session_totals(db, session.id)
     
     return {
         "records": [
-            {
-                "timestamp": r.timestamp.isoformat(),
-                "action_id": r.action_id,
-                "action_type": r.action_type,
-                "result": r.result,
-                "execution_time_ms": r.execution_time_ms,
-                "parameters": json.loads(r.parameters) if r.parameters else {},
-                "boundary_evaluations": json.loads(r.boundary_evaluations) if r.boundary_evaluations else []
-            }
-            for r in records
+            {k: v for k, v in serialize_row(r).items() if k != "id"}
+            for r in rows
         ],
         "total": total,
         "limit": limit,
-        "offset": offset
+        "next_cursor": next_cursor
     }
 
 
 @router.get("/sessions/{session_id}/violations", summary="Get session violations")
 async def get_session_violations(
     session_id: str,
+    limit: int = 1000,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     api_key: APIKey = Depends(get_api_key_from_header)
 ):
-    """Get all violations for a session"""
-    
-    # Find session
-    sess_result = await db.execute(
-        select(EnveloSession).where(EnveloSession.session_id == session_id)
-    )
-    session = sess_result.scalar_one_or_none()
+    """Get violations for a session, newest first, keyset-paginated"""
     
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    result = await db.execute(
-        select(Violation).where(
-            Violation.session_id == session.id
-        ).order_by(Violation.timestamp.desc())
-    )
-    violations = result.scalars().all()
+    session = await _get_key_session(db, api_key, session_id)
+    rows, next_cursor = await _page_or_400(db, "violations", session.id, limit, cursor)
+    _, total = await session_totals(db, session.id)
     
     return {
         "violations": [
-            {
-                "timestamp": v.timestamp.isoformat(),
-                "boundary_name": v.boundary_name,
-                "violation_message": v.violation_message,
-                "parameters": json.loads(v.parameters) if v.parameters else {}
-            }
-            for v in violations
+            {k: v for k, v in serialize_row(r).items() if k != "id"}
+            for r in rows
         ],
-        "total": len(violations)
+        "total": total,
+        "next_cursor": next_cursor
     }
 
 
+@router.get("/sessions/{session_id}/export", summary="Stream full session telemetry or violations")
+async def export_session(
+    session_id: str,
+    kind: str = "telemetry",
+    format: str = "ndjson",
+    db: AsyncSession = Depends(get_db),
+    api_key: APIKey = Depends(get_api_key_from_header)
+):
+    """Stream every telemetry record (or violation) of a session as NDJSON or CSV"""
+    session = await _get_key_session(db, api_key, session_id)
+    return _export_response(session, kind, format)
+
+
 @router.get("/live", summary="Live telemetry feed")
 async def get_live_sessions(
     db: AsyncSession = Depends(get_db),
@@ -493,13 +572,8 @@ async def get_global_stats(db: AsyncSession = Depends(get_db)):
     )
     active_sessions = active_sess.scalar()
     
-    # Total telemetry
-    total_tel = await db.execute(select(func.count(TelemetryRecord.id)))
-    total_telemetry = total_tel.scalar()
-    
-    # Total violations
-    total_viol = await db.execute(select(func.count(Violation.id)))
-    total_violations = total_viol.scalar()
+    # Total telemetry and violations, from the hourly rollups
+    total_telemetry, total_violations = await rollup_totals(db)
     
     return {
         "total_sessions": total_sessions or 0,
@@ -618,6 +692,9 @@ async def list_all_sessions(
 @router.get("/admin/sessions/{session_id}/telemetry")
 async def get_session_telemetry_admin(
     session_id: str,
+    limit: int = 1000,
+    cursor: Optional[str] = None,
+    filters: list = Depends(telemetry_filters),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -626,39 +703,20 @@ async def get_session_telemetry_admin(
     if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    # Look up session by string ID
-    sess_result = await db.execute(select(EnveloSession).where(EnveloSession.session_id == session_id))
-    sess = sess_result.scalar_one_or_none()
-    if not sess:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    result = await db.execute(
-        select(TelemetryRecord).where(
-            TelemetryRecord.session_id == sess.id
-        ).order_by(TelemetryRecord.timestamp.desc()).limit(1000)
-    )
-    records = result.scalars().all()
+    sess = await _get_session_by_uuid(db, session_id)
+    rows, next_cursor = await _page_or_400(db, "telemetry", sess.id, limit, cursor, filters)
     
     return {
-        "records": [
-            {
-                "id": r.id,
-                "timestamp": r.timestamp.isoformat() if r.timestamp else None,
-                "action_id": r.action_id,
-                "action_type": r.action_type,
-                "result": r.result,
-                "execution_time_ms": r.execution_time_ms,
-                "parameters": r.parameters,
-                "boundary_evaluations": r.boundary_evaluations
-            }
-            for r in records
-        ]
+        "records": [serialize_row(r) for r in rows],
+        "next_cursor": next_cursor
     }
 
 
 @router.get("/admin/sessions/{session_id}/violations")
 async def get_session_violations_admin(
     session_id: str,
+    limit: int = 1000,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -667,33 +725,59 @@ async def get_session_violations_admin(
     if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    # Look up session by string UUID
-    sess_result = await db.execute(select(EnveloSession).where(EnveloSession.session_id == session_id))
-    sess = sess_result.scalar_one_or_none()
-    if not sess:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    result = await db.execute(
-        select(Violation).where(
-            Violation.session_id == sess.id
-        ).order_by(Violation.timestamp.desc())
-    )
-    violations = result.scalars().all()
+    sess = await _get_session_by_uuid(db, session_id)
+    rows, next_cursor = await _page_or_400(db, "violations", sess.id, limit, cursor)
     
     return {
-        "violations": [
-            {
-                "id": v.id,
-                "timestamp": v.timestamp.isoformat() if v.timestamp else None,
-                "boundary_name": v.boundary_name,
-                "violation_message": v.violation_message,
-                "parameters": v.parameters
-            }
-            for v in violations
-        ]
+        "violations": [serialize_row(r) for r in rows],
+        "next_cursor": next_cursor
     }
 
 
+@router.get("/admin/sessions/{session_id}/export")
+async def export_session_admin(
+    session_id: str,
+    kind: str = "telemetry",
+    format: str = "ndjson",
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream a full session export (admin view)"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    sess = await _get_session_by_uuid(db, session_id)
+    return _export_response(sess, kind, format)
+
+@router.get("/admin/sessions/{session_id}/parameters/{key}/stats")
+async def get_parameter_stats_admin(
+    session_id: str,
+    key: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Distribution of one numeric telemetry parameter (admin view)"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    sess = await _get_session_by_uuid(db, session_id)
+    return await parameter_stats(db, sess.id, key)
+
+
+@router.get("/admin/sessions/{session_id}/boundaries/stats")
+async def get_boundary_stats_admin(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Evaluations and failures per boundary (admin view)"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    sess = await _get_session_by_uuid(db, session_id)
+    return {"session_id": session_id, "boundaries": await boundary_stats(db, sess.id)}
+
+
 @router.get("/admin/sessions/{session_id}/report")
 async def download_session_report(
     session_id: str,
@@ -771,97 +855,74 @@ async def download_session_report(
 async def get_my_session_telemetry(
     session_id: str,
     limit: int = 1000,
+    cursor: Optional[str] = None,
+    filters: list = Depends(telemetry_filters),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Get telemetry for own session"""
-    # Verify ownership
-    key_result = await db.execute(
-        select(APIKey).where(
-            (APIKey.organization_id == current_user.get("organization_id")) if current_user.get("organization_id") else (APIKey.user_id == int(current_user["sub"]))
-        )
-    )
-    my_keys = [k.id for k in key_result.scalars().all()]
-    
-    sess_result = await db.execute(
-        select(EnveloSession).where(EnveloSession.id == session_id)
-    )
-    session = sess_result.scalar_one_or_none()
-    if not session or session.api_key_id not in my_keys:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    result = await db.execute(
-        select(TelemetryRecord).where(
-            TelemetryRecord.session_id == session_id
-        ).order_by(TelemetryRecord.timestamp.desc()).limit(limit)
-    )
-    records = result.scalars().all()
+    session = await _get_my_session(db, current_user, session_id)
+    rows, next_cursor = await _page_or_400(db, "telemetry", session.id, limit, cursor, filters)
     
     return {
-        "records": [
-            {
-                "id": r.id,
-                "timestamp": r.timestamp.isoformat() if r.timestamp else None,
-                "action_id": r.action_id,
-                "action_type": r.action_type,
-                "result": r.result,
-                "execution_time_ms": r.execution_time_ms,
-                "parameters": r.parameters,
-                "boundary_evaluations": r.boundary_evaluations
-            }
-            for r in records
-        ]
+        "records": [serialize_row(r) for r in rows],
+        "next_cursor": next_cursor
     }
 
 
 @router.get("/my/sessions/{session_id}/violations")
 async def get_my_session_violations(
     session_id: str,
+    limit: int = 1000,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Get violations for own session"""
-    key_result = await db.execute(
-        select(APIKey).where(
-            (APIKey.organization_id == current_user.get("organization_id")) if current_user.get("organization_id") else (APIKey.user_id == int(current_user["sub"]))
-        )
-    )
-    my_keys = [k.id for k in key_result.scalars().all()]
-    
-    sess_result = await db.execute(
-        select(EnveloSession).where(EnveloSession.id == session_id)
-    )
-    session = sess_result.scalar_one_or_none()
-    if not session or session.api_key_id not in my_keys:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Look up session by string UUID
-    sess_result = await db.execute(select(EnveloSession).where(EnveloSession.session_id == session_id))
-    sess = sess_result.scalar_one_or_none()
-    if not sess:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    result = await db.execute(
-        select(Violation).where(
-            Violation.session_id == sess.id
-        ).order_by(Violation.timestamp.desc())
-    )
-    violations = result.scalars().all()
+    session = await _get_my_session(db, current_user, session_id)
+    rows, next_cursor = await _page_or_400(db, "violations", session.id, limit, cursor)
     
     return {
-        "violations": [
-            {
-                "id": v.id,
-                "timestamp": v.timestamp.isoformat() if v.timestamp else None,
-                "boundary_name": v.boundary_name,
-                "violation_message": v.violation_message,
-                "parameters": v.parameters
-            }
-            for v in violations
-        ]
+        "violations": [serialize_row(r) for r in rows],
+        "next_cursor": next_cursor
     }
 
 
+@router.get("/my/sessions/{session_id}/export")
+async def export_my_session(
+    session_id: str,
+    kind: str = "telemetry",
+    format: str = "ndjson",
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream a full export of own session"""
+    session = await _get_my_session(db, current_user, session_id)
+    return _export_response(session, kind, format)
+
+@router.get("/my/sessions/{session_id}/parameters/{key}/stats")
+async def get_my_parameter_stats(
+    session_id: str,
+    key: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Distribution of one numeric telemetry parameter for own session"""
+    session = await _get_my_session(db, current_user, session_id)
+    return await parameter_stats(db, session.id, key)
+
+
+@router.get("/my/sessions/{session_id}/boundaries/stats")
+async def get_my_boundary_stats(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Evaluations and failures per boundary for own session"""
+    session = await _get_my_session(db, current_user, session_id)
+    return {"session_id": session_id, "boundaries": await boundary_stats(db, session.id)}
+
+
 @router.get("/my/sessions/{session_id}/report")
 async def download_my_session_report(
     session_id: str,
@@ -1111,10 +1172,7 @@ async def receive_heartbeat(
     if sessions:
         try:
             from app.models.models import CAT72Test, Application
-            import hashlib, json
-            def compute_hash(data, prev_hash=""):
-                raw = json.dumps(data, sort_keys=True, default=str) + prev_hash
-                return hashlib.sha256(raw.encode()).hexdigest()
+            from app.services.evidence_chain import append_evidence_block
             for session in sessions:
                 cat_result = await db.execute(
                     select(CAT72Test).join(Application, CAT72Test.application_id == Application.id).where(
@@ -1137,9 +1195,7 @@ async def receive_heartbeat(
                         "trigger": "interlock_heartbeat",
                         "envelope_definition": pending_test.envelope_definition,
                     }
-                    genesis_hash = compute_hash(genesis)
-                    pending_test.evidence_chain = [{"block": 0, "hash": genesis_hash, "data": genesis}]
-                    pending_test.evidence_hash = genesis_hash
+                    await append_evidence_block(db, pending_test, "genesis", genesis, prev_hash="")
                     await db.commit()
                     import logging
                     logging.getLogger("main").info(f"CAT-72 test {pending_test.test_id} AUTO-STARTED — interlock connected for {session.organization_name} / {session.system_name}")
@@ -1364,12 +1420,15 @@ async def get_monitoring_overview(
 async def get_session_timeline(
     session_id: str,
     hours: int = 24,
+    resolution: str = "hour",
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get hourly aggregated data for a session"""
+    """Get hourly (or per-minute) aggregated data for a session from the rollup tables"""
     from datetime import timedelta
-    from sqlalchemy import and_
+    
+    if resolution not in ("hour", "minute"):
+        raise HTTPException(status_code=400, detail="resolution must be 'hour' or 'minute'")
     
     # Get session
     result = await db.execute(select(EnveloSession).where(EnveloSession.session_id == session_id))
@@ -1378,39 +1437,14 @@ async def get_session_timeline(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    now = datetime.utcnow()
-    start_time = now - timedelta(hours=hours)
-    
-    # Get telemetry records in time range
-    result = await db.execute(
-        select(TelemetryRecord).where(
-            and_(
-                TelemetryRecord.session_id == session.id,
-                TelemetryRecord.timestamp >= start_time
-            )
-        ).order_by(TelemetryRecord.timestamp)
-    )
-    records = result.scalars().all()
-    
-    # Aggregate by hour
-    hourly_data = {}
-    for r in records:
-        hour_key = r.timestamp.replace(minute=0, second=0, microsecond=0).isoformat()
-        if hour_key not in hourly_data:
-            hourly_data[hour_key] = {"pass": 0, "block": 0, "total": 0}
-        hourly_data[hour_key]["total"] += 1
-        if r.result == "PASS":
-            hourly_data[hour_key]["pass"] += 1
-        else:
-            hourly_data[hour_key]["block"] += 1
+    start_time = datetime.utcnow() - timedelta(hours=hours)
+    timeline = await read_timeline(db, session.id, start_time, resolution)
     
     return {
         "session_id": session_id,
         "hours": hours,
-        "timeline": [
-            {"hour": k, "pass": v["pass"], "block": v["block"], "total": v["total"]}
-            for k, v in sorted(hourly_data.items())
-        ]
+        "resolution": resolution,
+        "timeline": timeline
     }
 
 
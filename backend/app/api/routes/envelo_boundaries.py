@@ -390,7 +390,7 @@ async def upload_discovered_boundaries(
     # Promote discovered boundaries into active CAT-72 test learning profile
     if session.application_id:
         from app.models.models import CAT72Test
-        from sqlalchemy.orm.attributes import flag_modified as fm2
+        from app.services.learning_profile import load_learning_profile, save_learning_profile
         test_result = await db.execute(
             select(CAT72Test).where(
                 CAT72Test.application_id == session.application_id,
@@ -399,39 +399,30 @@ async def upload_discovered_boundaries(
         )
         test = test_result.scalar_one_or_none()
         if test:
-            env = dict(test.envelope_definition or {})
-            profile = env.get("_learning_profile") or {"variables": {}, "sample_count": 0}
+            profile = await load_learning_profile(db, test)
             discovered = data.envelope_definition
             # Merge discovered numeric boundaries into profile
             for b in discovered.get("boundaries", {}).get("numeric", []):
                 key = b.get("parameter") or b.get("name")
                 if not key:
                     continue
-                if key not in profile["variables"]:
-                    profile["variables"][key] = {"count": 0}
-                v = profile["variables"][key]
-                v["type"] = "numeric"
-                v["min"] = b.get("min_value", v.get("min", 0))
-                v["max"] = b.get("max_value", v.get("max", 0))
-                v["count"] = max(v.get("count", 0), 10)  # meet minimum threshold
-                v["sum"] = v["min"] + v["max"]
-                v["sum_sq"] = v["min"]**2 + v["max"]**2
+                existing = profile.variables.get(key)
+                observed = existing is not None and existing.n > 0
+                lo, hi = b.get("min_value"), b.get("max_value")
+                profile.seed_range(  # count raised to meet minimum threshold
+                    key,
+                    lo if lo is not None else (existing.min if observed else 0),
+                    hi if hi is not None else (existing.max if observed else 0),
+                )
             # Merge categorical/state boundaries
             for b in discovered.get("boundaries", {}).get("categorical", []):
                 key = b.get("parameter") or b.get("name")
                 if not key:
                     continue
-                if key not in profile["variables"]:
-                    profile["variables"][key] = {"count": 0}
-                v = profile["variables"][key]
-                v["type"] = "categorical"
-                v["unique_values"] = b.get("allowed_values", [])
-                v["count"] = max(v.get("count", 0), 10)
+                profile.seed_categorical(key, b.get("allowed_values", []))
             # Update sample count to meet minimum
-            profile["sample_count"] = max(profile.get("sample_count", 0), 10)
-            env["_learning_profile"] = profile
-            test.envelope_definition = env
-            fm2(test, "envelope_definition")
+            profile.sample_count = max(profile.sample_count, 10)
+            await save_learning_profile(db, test, profile)
 
     await db.commit()
 
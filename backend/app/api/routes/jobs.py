@@ -0,0 +1,38 @@
+"""Background Jobs API - schedule, leases and run metrics of the job scheduler"""
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.core.security import require_role
+from app.models.models import ScheduledJob
+from app.services.job_scheduler import get_scheduler
+
+router = APIRouter()
+
+
+def _iso(dt):
+    return dt.isoformat() if dt else None
+
+
+@router.get("", summary="Background job schedule and run metrics")
+async def list_jobs(db: AsyncSession = Depends(get_db), user: dict = Depends(require_role(["admin"]))):
+    """This process's per-job run counts and duration/lag histograms, plus the
+    cluster-wide schedule and lease of each job (whichever replica ran it)."""
+    snapshot = get_scheduler().snapshot()
+    rows = (await db.execute(select(ScheduledJob).order_by(ScheduledJob.name))).scalars().all()
+    snapshot["cluster"] = {
+        row.name: {
+            "owner": row.owner,
+            "leased_until": _iso(row.lease_expires_at),
+            "next_run_at": _iso(row.next_run_at),
+            "last_started_at": _iso(row.last_started_at),
+            "last_finished_at": _iso(row.last_finished_at),
+            "last_status": row.last_status,
+            "last_error": row.last_error,
+            "last_duration_ms": row.last_duration_ms,
+            "run_count": row.run_count,
+        }
+        for row in rows
+    }
+    return snapshot
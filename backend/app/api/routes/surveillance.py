@@ -92,10 +92,8 @@ async def get_alerts(
     - Score degradation
     """
     state = get_surveillance_state()
-    alerts = state.get_alerts(limit=limit, severity=severity, certificate_id=certificate_id)
-
-    if unacknowledged_only:
-        alerts = [a for a in alerts if not a.get("acknowledged")]
+    alerts = state.get_alerts(limit=limit, severity=severity, certificate_id=certificate_id,
+                              unacknowledged_only=unacknowledged_only)
 
     # Enrich alerts with org/system names from certificates
     cert_ids = list(set(a.get("certificate_id") for a in alerts if a.get("certificate_id")))
@@ -205,12 +203,13 @@ async def engine_status():
     offline = sum(1 for s in state.scores.values() if s.status == "offline")
     suspended = len(state.suspended_certs)
 
-    unacked_alerts = sum(1 for a in state.alerts if not a.acknowledged)
+    unacked_alerts = state.alerts.unacknowledged
 
     return {
         "engine": "running",
         "scan_interval_seconds": config.SCAN_INTERVAL_SECONDS,
         "monitored_sessions": total_sessions,
+        "shards_owned": None if state.owned_shards is None else len(state.owned_shards),
         "status_breakdown": {
             "healthy": healthy,
             "degraded": degraded,
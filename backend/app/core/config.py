@@ -28,6 +28,18 @@ class Settings(BaseSettings):
     CAT72_DRIFT_THRESHOLD: float = 0.02
     CAT72_STABILITY_THRESHOLD: float = 0.90
     CERTIFICATE_PREFIX: str = "ODDC"
+    TELEMETRY_PARTITION_INTERVAL: str = "monthly"  # monthly or daily
+    TELEMETRY_PARTITION_PREMAKE: int = 3  # future partitions kept ready
+    TELEMETRY_RETENTION_DAYS: int = 0  # 0 keeps telemetry forever
+    ENVELOPE_WORKERS: int = 0  # CAT-72 envelope evaluation processes; 0 evaluates inline
+    ENVELOPE_OFFLOAD_COST: int = 200  # compiled envelope cost at which evaluation leaves the event loop
+    AUDIT_ANCHOR_INTERVAL: int = 1000  # audit entries per signed anchor
+    AUDIT_VERIFY_WORKERS: int = 0  # full-audit verification processes; 0 verifies inline
+    PDF_RENDER_WORKERS: int = 2  # PDF rendering processes; 0 renders in a thread
+    COMPLIANCE_LOG_CACHE_SIZE: int = 64  # signed compliance logs (payload + PDF) kept per process
+    CERTIFICATE_PDF_CACHE_SIZE: int = 128  # certificate PDFs kept per process for downloads
+    RATE_LIMIT_BACKEND: str = "memory"  # memory (per process) or redis (shared across workers)
+    RATE_LIMIT_MAX_KEYS: int = 100_000  # in-process counters kept before the least recent are dropped
 
     @field_validator("SECRET_KEY")
     @classmethod
@@ -37,6 +49,22 @@ class Settings(BaseSettings):
             raise ValueError("SECRET_KEY must be at least 32 characters")
         return value
 
+    @field_validator("TELEMETRY_PARTITION_INTERVAL")
+    @classmethod
+    def validate_partition_interval(cls, value: str) -> str:
+        value = (value or "").strip().lower()
+        if value not in ("monthly", "daily"):
+            raise ValueError("TELEMETRY_PARTITION_INTERVAL must be 'monthly' or 'daily'")
+        return value
+
+    @field_validator("RATE_LIMIT_BACKEND")
+    @classmethod
+    def validate_rate_limit_backend(cls, value: str) -> str:
+        value = (value or "").strip().lower()
+        if value not in ("memory", "redis"):
+            raise ValueError("RATE_LIMIT_BACKEND must be 'memory' or 'redis'")
+        return value
+
     @field_validator("CORS_ORIGINS", mode="before")
     @classmethod
     def normalize_cors_origins(cls, value):
@@ -2,7 +2,9 @@
 
 import enum
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, Enum, JSON, LargeBinary
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Float, Boolean, ForeignKey, Enum, JSON, LargeBinary, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import event
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -136,12 +138,15 @@ class CAT72Test(Base):
     application_id = Column(Integer, ForeignKey("applications.id"))
     duration_hours = Column(Integer, default=72)
     envelope_definition = Column(JSON)
+    envelope_version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped on each envelope_definition assignment
     state = Column(String, default="scheduled")
     started_at = Column(DateTime)
     ended_at = Column(DateTime)
     elapsed_seconds = Column(Integer, default=0)
     operator_id = Column(Integer, ForeignKey("users.id"))
     total_samples = Column(Integer, default=0)
+    learning_samples = Column(Integer, nullable=False, default=0, server_default="0")  # samples before learn-complete reset the counters
+    last_sample_number = Column(Integer, nullable=False, default=0, server_default="0")  # highest telemetry sample_number; only ingest advances it
     conformant_samples = Column(Integer, default=0)
     interlock_activations = Column(Integer, default=0)
     max_drift_observed = Column(Float, default=0.0)
@@ -149,6 +154,7 @@ class CAT72Test(Base):
     drift_rate = Column(Float)
     stability_index = Column(Float)
     envelope_margin = Column(Float)
+    envelope_distance_sum = Column(Float, default=0.0)  # running sum for envelope_margin
     evidence_hash = Column(String(64))
     evidence_chain = Column(JSON)
     result = Column(String(50))
@@ -173,8 +179,20 @@ class Telemetry(Base):
     stability_index = Column(Float)
     sample_hash = Column(String(64))
     prev_hash = Column(String(64))
+    sample_number = Column(Integer)  # 1-based position in the test's chain
     test = relationship("CAT72Test", back_populates="telemetry")
 
+    __table_args__ = (
+        Index("ix_telemetry_test_ts", "test_id", "timestamp"),
+        Index("uq_telemetry_test_sample", "test_id", "sample_number", unique=True),
+    )
+
+
+@event.listens_for(CAT72Test.envelope_definition, "set")
+def _bump_envelope_version(target, value, oldvalue, initiator):
+    # keys the compiled-envelope cache of every worker (envelope_evaluator.get_compiled_envelope)
+    target.envelope_version = (target.envelope_version or 0) + 1
+
 
 class InterlockEvent(Base):
     __tablename__ = "interlock_events"
@@ -194,6 +212,54 @@ class InterlockEvent(Base):
     test = relationship("CAT72Test", back_populates="interlock_events")
 
 
+# CAT-72 evidence chain blocks (append-only; genesis, spec confirmation, final)
+class CAT72EvidenceBlock(Base):
+    __tablename__ = "cat72_evidence_blocks"
+    __table_args__ = (
+        UniqueConstraint("test_id", "block_index", name="uq_cat72_evidence_blocks_index"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    test_id = Column(Integer, ForeignKey("cat72_tests.id", ondelete="CASCADE"), nullable=False)
+    block_index = Column(Integer, nullable=False)
+    block_type = Column(String(50), nullable=False)
+    hash = Column(String(64), nullable=False)
+    prev_hash = Column(String(64), nullable=False, default="")
+    data = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# Merkle checkpoint over a run of a test's sample hashes (ingest order)
+class CAT72EvidenceCheckpoint(Base):
+    __tablename__ = "cat72_evidence_checkpoints"
+    __table_args__ = (
+        UniqueConstraint("test_id", "seq", name="uq_cat72_evidence_checkpoints_seq"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    test_id = Column(Integer, ForeignKey("cat72_tests.id", ondelete="CASCADE"), nullable=False)
+    seq = Column(Integer, nullable=False)
+    first_sample = Column(Integer, nullable=False)
+    last_sample = Column(Integer, nullable=False)
+    first_telemetry_id = Column(Integer, nullable=False)
+    last_telemetry_id = Column(Integer, nullable=False)
+    first_prev_hash = Column(String(64), nullable=False, default="")
+    last_hash = Column(String(64), nullable=False)
+    merkle_root = Column(String(64), nullable=False)
+    merkle_nodes = Column(LargeBinary)  # tree levels above the proof chunks (evidence_chain.sample_proof)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# CAT-72 learning-mode profile (streaming statistics, flushed periodically)
+class CAT72LearningProfile(Base):
+    __tablename__ = "cat72_learning_profiles"
+    id = Column(Integer, primary_key=True)
+    test_id = Column(Integer, ForeignKey("cat72_tests.id", ondelete="CASCADE"), nullable=False, unique=True)
+    sample_count = Column(Integer, nullable=False, default=0)
+    profile = Column(JSONB)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
 class Certificate(Base):
     __tablename__ = "certificates"
     id = Column(Integer, primary_key=True, index=True)
@@ -217,6 +283,7 @@ class Certificate(Base):
     signature = Column(String(50))  # Authority signature e.g., SA-SIG-1
     audit_log_ref = Column(String(50))  # Audit trail reference e.g., SA-LOG-2026-0001
     certificate_pdf = Column(LargeBinary)
+    certificate_pdf_hash = Column(String(64), nullable=True)  # content hash the stored PDF was rendered from
     verification_url = Column(String(255))
     suspended_at = Column(DateTime, nullable=True)
     suspension_reason = Column(Text, nullable=True)
@@ -258,6 +325,14 @@ class AuditLog(Base):
     details = Column(JSON)
     log_hash = Column(String(64))
     prev_hash = Column(String(64))
+    user_role = Column(String(64))
+    ip_address = Column(String(45))
+    user_agent = Column(String(500))
+
+    __table_args__ = (
+        Index("ix_audit_log_ts_id", "timestamp", "id"),
+        Index("ix_audit_log_email_ts_id", "user_email", "timestamp", "id"),
+    )
 
 
 
@@ -341,7 +416,7 @@ class EnveloSession(Base):
     status = Column(String(20), default="active")  # active, ended, disconnected
     last_telemetry_at = Column(DateTime, nullable=True)
     offline_reason = Column(String, nullable=True)
-    last_heartbeat_at = Column(DateTime, nullable=True)
+    last_heartbeat_at = Column(DateTime, nullable=True, index=True)
     last_violation_alert_at = Column(DateTime, nullable=True)
     last_offline_alert_at = Column(DateTime, nullable=True)
     pass_count = Column(Integer, default=0)
@@ -356,20 +431,65 @@ class EnveloSession(Base):
     api_key = relationship("APIKey", backref="sessions")
 
 
+# Surveillance workers: one row per running engine, refreshed while it is alive
+class SurveillanceWorker(Base):
+    __tablename__ = "surveillance_workers"
+
+    worker_id = Column(String(100), primary_key=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    last_seen = Column(DateTime, nullable=False)
+
+
+# Surveillance shard leases: which worker currently watches each shard of sessions
+class SurveillanceShardLease(Base):
+    __tablename__ = "surveillance_shard_leases"
+
+    shard = Column(Integer, primary_key=True, autoincrement=False)
+    owner = Column(String(100), nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+
+
+# Scheduled background jobs: the cluster-wide schedule and lease of each job
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_jobs"
+
+    name = Column(String(100), primary_key=True)
+    owner = Column(String(100), nullable=True)
+    next_run_at = Column(DateTime, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    last_started_at = Column(DateTime, nullable=True)
+    last_finished_at = Column(DateTime, nullable=True)
+    last_status = Column(String(20), nullable=True)
+    last_error = Column(Text, nullable=True)
+    last_duration_ms = Column(Integer, nullable=True)
+    run_count = Column(Integer, default=0)
+    run_request = Column(JSON, nullable=True)   # keyword arguments of an on-demand run not yet claimed
+    last_result = Column(JSON, nullable=True)
+
+
 # ENVELO Telemetry Records
+# Range-partitioned by timestamp in Postgres (see alembic 006 and
+# app/services/partition_manager.py), so timestamp is part of the primary key.
 class TelemetryRecord(Base):
     __tablename__ = "telemetry_records"
+    __table_args__ = (
+        Index("ix_telemetry_records_session_ts", "session_id", "timestamp"),
+        Index("ix_telemetry_records_parameters", "parameters",
+              postgresql_using="gin", postgresql_ops={"parameters": "jsonb_path_ops"}),
+        Index("ix_telemetry_records_boundary_evaluations", "boundary_evaluations",
+              postgresql_using="gin", postgresql_ops={"boundary_evaluations": "jsonb_path_ops"}),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     session_id = Column(Integer, ForeignKey("envelo_sessions.id"), index=True)
-    timestamp = Column(DateTime, index=True)
+    timestamp = Column(DateTime, primary_key=True, index=True)
     action_id = Column(String(50))
     action_type = Column(String(100))
     result = Column(String(10))  # PASS or BLOCK
     execution_time_ms = Column(Float)
-    parameters = Column(Text)  # JSON
-    boundary_evaluations = Column(Text)  # JSON
-    system_state = Column(Text)  # JSON
+    parameters = Column(JSONB)
+    boundary_evaluations = Column(JSONB)
+    system_state = Column(JSONB)
     
     session = relationship("EnveloSession", backref="telemetry_records")
 
@@ -377,16 +497,61 @@ class TelemetryRecord(Base):
 # ENVELO Violations (for quick access to blocks)
 class Violation(Base):
     __tablename__ = "violations"
+    __table_args__ = (
+        Index("ix_violations_session_ts", "session_id", "timestamp"),
+        Index("ix_violations_parameters", "parameters",
+              postgresql_using="gin", postgresql_ops={"parameters": "jsonb_path_ops"}),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     session_id = Column(Integer, ForeignKey("envelo_sessions.id"), index=True)
-    telemetry_id = Column(Integer, ForeignKey("telemetry_records.id"))
-    timestamp = Column(DateTime, index=True)
+    telemetry_id = Column(Integer)  # no FK: telemetry_records is partitioned
+    timestamp = Column(DateTime, primary_key=True, index=True)
     boundary_name = Column(String(100))
     violation_message = Column(Text)
-    parameters = Column(Text)  # JSON
+    parameters = Column(JSONB)
     
     session = relationship("EnveloSession", backref="violations")
+
+
+# ENVELO Telemetry Rollups (per session per minute/hour, maintained at ingest)
+class TelemetryRollup(Base):
+    __tablename__ = "telemetry_rollups"
+    __table_args__ = (
+        UniqueConstraint("session_id", "granularity", "bucket_start", name="uq_telemetry_rollups_bucket"),
+        Index("ix_telemetry_rollups_granularity_bucket", "granularity", "bucket_start"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey("envelo_sessions.id", ondelete="CASCADE"), nullable=False)
+    granularity = Column(String(10), nullable=False)  # minute or hour
+    bucket_start = Column(DateTime, nullable=False)
+    pass_count = Column(Integer, nullable=False, default=0)
+    block_count = Column(Integer, nullable=False, default=0)
+
+
+class ViolationRollup(Base):
+    __tablename__ = "violation_rollups"
+    __table_args__ = (
+        UniqueConstraint("session_id", "granularity", "bucket_start", "boundary_name", name="uq_violation_rollups_bucket"),
+        Index("ix_violation_rollups_granularity_bucket", "granularity", "bucket_start"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey("envelo_sessions.id", ondelete="CASCADE"), nullable=False)
+    granularity = Column(String(10), nullable=False)  # minute or hour
+    bucket_start = Column(DateTime, nullable=False)
+    boundary_name = Column(String(100), nullable=False, default="")
+    violation_count = Column(Integer, nullable=False, default=0)
+
+
+# Fleet-wide sums of the hourly rollups, kept by a trigger (app/services/telemetry_rollup.py)
+class FleetRollupTotal(Base):
+    __tablename__ = "fleet_rollup_totals"
+
+    slot = Column(Integer, primary_key=True, autoincrement=False)  # session_id % FLEET_TOTAL_SLOTS
+    telemetry_count = Column(BigInteger, nullable=False, default=0)
+    violation_count = Column(BigInteger, nullable=False, default=0)
 # ═══════════════════════════════════════════════════════════════════
 # APPEND TO: app/models/models.py
 # Add these classes at the bottom of the file, after existing models
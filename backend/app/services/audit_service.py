@@ -1,9 +1,234 @@
-"""Audit log service — write and query audit entries"""
+"""
+Audit log service — write, page and verify audit entries
+- write_audit_log() stages an entry on the caller's session; it is queued for
+  the chain writer when that session commits and dropped if it rolls back;
+  a rolled-back savepoint drops the entries staged inside it
+- One writer task per process drains the queue in batches: it holds the chain
+  head in memory, hashes each batch sequentially and inserts it in one statement
+- Batches from every process serialize on a pg advisory xact lock and the head
+  is re-read under it (one indexed row per batch), so the chain stays linear
+  across replicas
+- Entries are durable once their batch commits; stop() drains the queue on
+  shutdown, a crash loses at most the queued entries
+- Entries are coerced to the column types when staged. A batch the database
+  rejects is written entry by entry, and an entry still rejected after
+  AUDIT_ENTRY_ATTEMPTS is dead-lettered (logged in full) instead of blocking
+  the queue; batches are only retried indefinitely while the DB is unreachable
+- Reads are keyset pages over (timestamp, id) on the shared async engine
+"""
+import asyncio
 import hashlib, json
+import logging
+from collections import deque
 from datetime import datetime
-from sqlalchemy import select, desc
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import desc, event, exc as sa_exc, func, insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.database import AsyncSessionLocal
 from app.models.models import AuditLog
+from app.services.telemetry_export import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+GENESIS_HASH = "0" * 16
+AUDIT_CHAIN_LOCK_KEY = 720046    # pg advisory lock: one chain writer appends at a time
+AUDIT_BATCH_MAX = 500
+AUDIT_BATCH_LINGER_S = 0.02      # wait this long for more entries before writing a batch
+AUDIT_RETRY_MAX_S = 30.0
+AUDIT_ENTRY_ATTEMPTS = 3         # writes of one entry from a rejected batch before it is dead-lettered
+AUDIT_DEAD_LETTER_MAX = 1000
+PENDING_KEY = "audit_pending"
+INT4_MAX = 2**31 - 1
+
+
+def chain_hash(prev_hash: str, entry: dict) -> str:
+    """Hash of an entry chained to its predecessor's hash."""
+    content = json.dumps({
+        "prev_hash": prev_hash,
+        "action": entry["action"],
+        "resource_type": entry.get("resource_type"),
+        "resource_id": entry.get("resource_id"),
+        "user_id": entry.get("user_id"),
+        "user_email": entry.get("user_email"),
+        "details": entry.get("details"),
+        "timestamp": entry["timestamp"].isoformat(),
+    }, sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+class AuditChainWriter:
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.head: Optional[Tuple[int, str]] = None   # (id, log_hash) of the last entry written
+        self.stats = {"written": 0, "batches": 0, "head_reloads": 0, "failed_batches": 0, "dead_lettered": 0}
+        self.dead_letters: deque = deque(maxlen=AUDIT_DEAD_LETTER_MAX)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(self, entries: List[dict]):
+        """Queue entries (in order) for the chain. Starts the writer on first use."""
+        if self._task is None or self._task.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        for entry in entries:
+            self._queue.put_nowait(entry)
+
+    async def start(self):
+        """Recover the chain head from the DB and start the writer task."""
+        async with self.session_factory() as db:
+            self.head = await self._read_head(db)
+        if self.head:
+            logger.info(f"Audit chain head recovered at entry #{self.head[0]}")
+        self.submit([])
+
+    async def flush(self):
+        """Wait until everything queued so far is written."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self, timeout: float = 10.0):
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Audit writer stopped with {self._queue.qsize()} entries unwritten")
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + AUDIT_BATCH_LINGER_S
+            while len(batch) < AUDIT_BATCH_MAX:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._write_with_retry(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _write_with_retry(self, batch: List[dict]):
+        """Write a batch; if the database rejects it, write its entries one at a
+        time so one bad entry can't hold up the rest, and dead-letter an entry
+        rejected AUDIT_ENTRY_ATTEMPTS times."""
+        try:
+            await self._write_while_unreachable(batch)
+            return
+        except Exception as e:
+            self.stats["failed_batches"] += 1
+            logger.error(f"Audit batch of {len(batch)} rejected, writing its entries one at a time: {e}")
+        for entry in batch:
+            for _ in range(AUDIT_ENTRY_ATTEMPTS):
+                try:
+                    await self._write_while_unreachable([entry])
+                    break
+                except Exception as e:
+                    error = e
+            else:
+                self._dead_letter(entry, error)
+
+    async def _write_while_unreachable(self, batch: List[dict]):
+        """write_batch, retried with backoff for as long as the database can't be reached."""
+        delay = 0.5
+        while True:
+            try:
+                return await self.write_batch(batch)
+            except Exception as e:
+                if not _unreachable(e):
+                    raise
+                self.stats["failed_batches"] += 1
+                logger.error(f"Audit batch of {len(batch)} failed, retrying in {delay:g}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, AUDIT_RETRY_MAX_S)
+
+    def _dead_letter(self, entry: dict, error: Exception):
+        self.stats["dead_lettered"] += 1
+        self.dead_letters.append({"entry": entry, "error": str(error), "at": datetime.utcnow()})
+        logger.error(f"Audit entry dead-lettered after {AUDIT_ENTRY_ATTEMPTS} attempts: "
+                     f"{json.dumps(entry, default=str, sort_keys=True)}: {error}")
+
+    @staticmethod
+    async def _read_head(db: AsyncSession) -> Optional[Tuple[int, str]]:
+        row = (await db.execute(
+            select(AuditLog.id, AuditLog.log_hash).order_by(desc(AuditLog.id)).limit(1)
+        )).first()
+        return (row.id, row.log_hash) if row else None
+
+    async def write_batch(self, batch: List[dict]) -> List[int]:
+        """Append entries to the chain in one transaction; returns their ids."""
+        async with self.session_factory() as db:
+            await db.execute(select(func.pg_advisory_xact_lock(AUDIT_CHAIN_LOCK_KEY)))
+            head = await self._read_head(db)
+            if head != self.head:
+                # another process appended since our last batch (or first batch here)
+                self.stats["head_reloads"] += 1
+            prev = head[1] if head and head[1] else GENESIS_HASH
+            rows = []
+            for entry in batch:
+                log_hash = chain_hash(prev, entry)
+                rows.append({**entry, "prev_hash": prev, "log_hash": log_hash})
+                prev = log_hash
+            ids = (await db.execute(
+                insert(AuditLog).returning(AuditLog.id, sort_by_parameter_order=True), rows
+            )).scalars().all()
+            await db.commit()
+        self.head = (ids[-1], prev)
+        self.stats["written"] += len(rows)
+        self.stats["batches"] += 1
+        return ids
+
+
+def _unreachable(e: Exception) -> bool:
+    """The database (not the entry) is the problem: worth retrying as is."""
+    return (isinstance(e, (sa_exc.OperationalError, sa_exc.InterfaceError, sa_exc.TimeoutError,
+                           OSError, asyncio.TimeoutError))
+            or getattr(e, "connection_invalidated", False))
+
+
+audit_writer = AuditChainWriter()
+
+
+def _within(transaction, ancestor) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_committed_audit_entries(session):
+    if session.in_nested_transaction():
+        return  # a released savepoint; its entries wait for the outer commit
+    staged = session.info.pop(PENDING_KEY, None)
+    if staged:
+        audit_writer.submit([entry for _, entry in staged])
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_rolled_back_audit_entries(session, previous_transaction):
+    """Entries staged in the transaction or savepoint a rollback undid (or in a
+    savepoint inside it) go with it."""
+    if not previous_transaction.nested:
+        session.info.pop(PENDING_KEY, None)
+        return
+    staged = session.info.get(PENDING_KEY)
+    if staged:
+        staged[:] = [(t, entry) for t, entry in staged if not _within(t, previous_transaction)]
 
 
 async def write_audit_log(
@@ -15,66 +240,90 @@ async def write_audit_log(
     user_email: str = None,
     details: dict = None,
 ):
-    """Write an entry to the audit log with tamper-evident hash chain."""
-    # Get previous entry's hash to form chain
-    prev_result = await db.execute(
-        select(AuditLog.log_hash).order_by(desc(AuditLog.id)).limit(1)
-    )
-    prev_row = prev_result.scalar_one_or_none()
-    prev_hash = prev_row if prev_row else "0" * 16
+    """Record an entry in the tamper-evident audit chain once the caller's
+    transaction commits. Don't commit here — let the caller's transaction handle it.
 
-    ts = datetime.utcnow()
-    content = json.dumps({
-        "prev_hash": prev_hash,
-        "action": action,
-        "resource_type": resource_type,
-        "resource_id": resource_id,
-        "user_id": user_id,
-        "user_email": user_email,
-        "details": details,
-        "timestamp": ts.isoformat(),
-    }, sort_keys=True)
-    log_hash = hashlib.sha256(content.encode()).hexdigest()[:16]
-
-    entry_kwargs = dict(
-        timestamp=ts,
-        user_id=user_id,
-        user_email=user_email,
-        action=action,
-        resource_type=resource_type,
-        resource_id=resource_id,
-        details=details or {},
-        log_hash=log_hash,
+    The entry is coerced to what the audit_log columns hold, so a bad argument
+    can't make the batch it lands in fail: an id that isn't an integer is kept
+    in details (resource_ref / user_ref) instead, strings are cut to their
+    column length and details are made JSON-safe."""
+    details = json.loads(json.dumps(details, default=str)) if details is not None else None
+    refs = {}
+    resource_pk, user_pk = _as_id(resource_id), _as_id(user_id)
+    if resource_id is not None and resource_pk is None:
+        refs["resource_ref"] = resource_id
+    if user_id is not None and user_pk is None:
+        refs["user_ref"] = user_id
+    if refs:
+        logger.warning(f"Audit entry {action!r}: non-integer ids moved to details: {refs!r}")
+        refs = json.loads(json.dumps(refs, default=str))
+        details = {**details, **refs} if isinstance(details, dict) else {"details": details, **refs}
+    entry = dict(
+        timestamp=datetime.utcnow(),
+        user_id=user_pk,
+        user_email=_clip(user_email, 255),
+        action=_clip(action, 100),
+        resource_type=_clip(resource_type, 50),
+        resource_id=resource_pk,
+        details=details,
     )
-    if hasattr(AuditLog, 'prev_hash'):
-        entry_kwargs['prev_hash'] = prev_hash
-    entry = AuditLog(**entry_kwargs)
-    db.add(entry)
-    # Don't commit here — let the caller's transaction handle it
+    await db.connection()  # begin the transaction whose commit/rollback decides the entry's fate
+    session = db.sync_session
+    transaction = session.get_nested_transaction() or session.get_transaction()
+    session.info.setdefault(PENDING_KEY, []).append((transaction, entry))
     return entry
 
 
-async def query_audit_logs(
+def _as_id(value: Any) -> Optional[int]:
+    """An integer column value, or None for anything that isn't one."""
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, int) and not isinstance(value, bool) and -INT4_MAX <= value <= INT4_MAX:
+        return value
+    return None
+
+
+def _clip(value: Any, length: int) -> Optional[str]:
+    return None if value is None else str(value)[:length]
+
+
+AUDIT_PAGE_MAX = 500
+LOG_COLUMNS = (
+    AuditLog.id, AuditLog.timestamp, AuditLog.user_id, AuditLog.user_email, AuditLog.user_role,
+    AuditLog.action, AuditLog.resource_type, AuditLog.resource_id, AuditLog.details,
+    AuditLog.ip_address, AuditLog.log_hash, AuditLog.prev_hash,
+)
+
+
+async def audit_log_page(
     db: AsyncSession,
-    action: str = None,
-    resource_type: str = None,
-    resource_id: int = None,
-    user_email: str = None,
-    limit: int = 100,
+    filters: Sequence = (),
+    limit: int = 50,
+    cursor: Optional[str] = None,
     offset: int = 0,
-):
-    """Query audit logs with optional filters."""
-    query = select(AuditLog)
-    
-    if action:
-        query = query.where(AuditLog.action == action)
-    if resource_type:
-        query = query.where(AuditLog.resource_type == resource_type)
-    if resource_id:
-        query = query.where(AuditLog.resource_id == resource_id)
-    if user_email:
-        query = query.where(AuditLog.user_email == user_email)
-    
-    query = query.order_by(desc(AuditLog.timestamp)).offset(offset).limit(limit)
-    result = await db.execute(query)
-    return result.scalars().all()
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of audit entries, newest first, plus the cursor for the next page.
+
+    With a cursor the query seeks straight to it through the (timestamp, id)
+    index; `offset` is only honoured for cursor-less requests from older clients.
+    Raises ValueError on a malformed cursor.
+    """
+    limit = max(1, min(limit, AUDIT_PAGE_MAX))
+    stmt = select(*LOG_COLUMNS).where(*filters)
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(AuditLog.timestamp, AuditLog.id) < tuple_(ts, row_id))
+    elif offset:
+        stmt = stmt.offset(offset)
+    stmt = stmt.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+    return [dict(r) for r in rows], next_cursor
+
+
+async def count_audit_logs(db: AsyncSession, filters: Sequence = ()) -> int:
+    return (await db.execute(select(func.count(AuditLog.id)).where(*filters))).scalar() or 0
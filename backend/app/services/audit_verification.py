@@ -0,0 +1,222 @@
+"""
+Audit Chain Verification
+- Signed anchors: every AUDIT_ANCHOR_INTERVAL entries, a checkpoint of (last
+  entry id, its chain hash, entries so far) HMAC-signed with SECRET_KEY. The
+  audit_anchors job writes one only after the range up to it has verified
+- Routine checks start at the last trusted anchor (signature valid, its entry
+  still carries the anchored hash), so they re-hash about one anchor interval
+  of entries whatever the size of the log
+- Anchors never extend past a tampered entry: an anchor would make routine
+  checks start after it and stop reporting it. Until the chain is repaired,
+  routine checks fall back to re-hashing everything after the last anchor
+  before the break (from the first entry if there is none), reporting it on
+  every run
+- Full audits re-hash the whole chain in segments of AUDIT_VERIFY_SEGMENT
+  entries, each seeded with its predecessor's stored hash, so segments verify
+  independently — in a process pool when AUDIT_VERIFY_WORKERS > 0 — and every
+  anchor is checked against the entry it signs
+- Reports stream: one item per tampered entry or bad anchor, then a summary
+- Entries from before the chain writer stored details as given were stored
+  with details {} but hashed with details None; that form re-hashes too
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.models import AuditAnchor, AuditLog
+from app.services.audit_service import GENESIS_HASH, chain_hash
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ANCHOR_SWEEP_SECONDS = 300
+AUDIT_VERIFY_SEGMENT = 5000
+ANCHOR_SCAN_BATCH = 50
+
+VERIFY_COLUMNS = (
+    AuditLog.id, AuditLog.timestamp, AuditLog.user_id, AuditLog.user_email, AuditLog.action,
+    AuditLog.resource_type, AuditLog.resource_id, AuditLog.details, AuditLog.log_hash, AuditLog.prev_hash,
+)
+
+
+def sign_anchor(last_audit_id: int, anchor_hash: str, entry_count: int) -> str:
+    secret = (settings.SECRET_KEY or "").strip()
+    if not secret:
+        raise RuntimeError("SECRET_KEY is not configured — cannot sign audit anchors")
+    payload = f"{last_audit_id}:{anchor_hash}:{entry_count}"
+    return hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+def anchor_signature_valid(anchor) -> bool:
+    try:
+        expected = sign_anchor(anchor.last_audit_id, anchor.chain_hash, anchor.entry_count)
+    except RuntimeError:
+        return False
+    return hmac.compare_digest(expected, anchor.anchor_signature or "")
+
+
+def _rehashes(prev_hash: str, entry: dict, log_hash: str) -> bool:
+    if log_hash == chain_hash(prev_hash, entry):
+        return True
+    # legacy writer: `details or {}` stored, `details` (None) hashed
+    return entry["details"] == {} and log_hash == chain_hash(prev_hash, {**entry, "details": None})
+
+
+def verify_segment(prev_hash: str, rows: List[tuple]) -> List[dict]:
+    """Tampered entries in a run of consecutive rows (VERIFY_COLUMNS tuples).
+    Each row must link to the stored hash of the row before it and re-hash to
+    its own stored hash. Runs in pool workers, so it only touches its arguments."""
+    tampered = []
+    for id_, ts, user_id, user_email, action, resource_type, resource_id, details, log_hash, row_prev in rows:
+        entry = {"timestamp": ts, "user_id": user_id, "user_email": user_email, "action": action,
+                 "resource_type": resource_type, "resource_id": resource_id, "details": details}
+        if row_prev != prev_hash:
+            tampered.append({"id": id_, "action": action, "reason": "broken link"})
+        elif not _rehashes(row_prev, entry, log_hash):
+            tampered.append({"id": id_, "action": action, "reason": "hash mismatch"})
+        prev_hash = log_hash
+    return tampered
+
+
+async def _rows_after(db: AsyncSession, after_id: int, limit: int) -> List[tuple]:
+    stmt = select(*VERIFY_COLUMNS).where(AuditLog.id > after_id).order_by(AuditLog.id).limit(limit)
+    return [tuple(r) for r in (await db.execute(stmt)).all()]
+
+
+async def last_trusted_anchor(db: AsyncSession) -> Optional[AuditAnchor]:
+    """Newest anchor whose signature verifies and whose entry still carries the anchored hash."""
+    before = None
+    while True:
+        stmt = (select(AuditAnchor, AuditLog.log_hash)
+                .outerjoin(AuditLog, AuditLog.id == AuditAnchor.last_audit_id)
+                .order_by(AuditAnchor.id.desc()).limit(ANCHOR_SCAN_BATCH))
+        if before is not None:
+            stmt = stmt.where(AuditAnchor.id < before)
+        batch = (await db.execute(stmt)).all()
+        for anchor, entry_hash in batch:
+            if entry_hash == anchor.chain_hash and anchor_signature_valid(anchor):
+                return anchor
+        if len(batch) < ANCHOR_SCAN_BATCH:
+            return None
+        before = batch[-1][0].id
+
+
+async def anchor_audit_chain(interval: Optional[int] = None) -> int:
+    """Extend the anchors over every full interval of entries past the last
+    trusted anchor, verifying each interval first. Returns anchors written.
+    Stops at an interval holding a tampered entry (see the module docstring)."""
+    interval = interval or settings.AUDIT_ANCHOR_INTERVAL
+    written = 0
+    async with AsyncSessionLocal() as db:
+        anchor = await last_trusted_anchor(db)
+        after_id, prev_hash, count = ((anchor.last_audit_id, anchor.chain_hash, anchor.entry_count)
+                                      if anchor else (0, GENESIS_HASH, 0))
+        while True:
+            rows = await _rows_after(db, after_id, interval)
+            if len(rows) < interval:
+                break
+            tampered = verify_segment(prev_hash, rows)
+            if tampered:
+                logger.error(f"Audit chain: {len(tampered)} tampered entries after #{after_id} "
+                             f"(first #{tampered[0]['id']}); not anchoring past it, so routine checks "
+                             f"re-hash every entry after #{after_id} until the chain is repaired")
+                break
+            after_id, prev_hash, count = rows[-1][0], rows[-1][8], count + len(rows)
+            db.add(AuditAnchor(created_at=datetime.utcnow(), last_audit_id=after_id, chain_hash=prev_hash,
+                               entry_count=count, anchor_signature=sign_anchor(after_id, prev_hash, count)))
+            await db.commit()
+            written += 1
+    if written:
+        logger.info(f"Audit chain anchored through entry #{after_id} ({written} new anchors)")
+    return written
+
+
+async def verify_incremental(db: AsyncSession) -> AsyncIterator[dict]:
+    """Verify the entries after the last trusted anchor. Yields tampered
+    entries, then a summary."""
+    anchor = await last_trusted_anchor(db)
+    after_id, prev_hash = (anchor.last_audit_id, anchor.chain_hash) if anchor else (0, GENESIS_HASH)
+    checked = invalid = 0
+    while True:
+        rows = await _rows_after(db, after_id, AUDIT_VERIFY_SEGMENT)
+        if not rows:
+            break
+        for item in verify_segment(prev_hash, rows):
+            invalid += 1
+            yield {"type": "tampered", **item}
+        checked += len(rows)
+        after_id, prev_hash = rows[-1][0], rows[-1][8]
+    yield {"type": "summary", "mode": "incremental", "checked": checked, "invalid": invalid,
+           "anchor_id": anchor.id if anchor else None, "from_entry": anchor.last_audit_id if anchor else None,
+           "anchored_entries": anchor.entry_count if anchor else 0}
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    # forkserver: workers don't inherit the API process's threads, sockets or event loop
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+async def verify_full(db: AsyncSession, workers: Optional[int] = None,
+                      segment: int = AUDIT_VERIFY_SEGMENT) -> AsyncIterator[dict]:
+    """Verify the whole chain and every anchor. Yields bad anchors, tampered
+    entries in chain order, then a summary."""
+    workers = settings.AUDIT_VERIFY_WORKERS if workers is None else workers
+    bad_anchors = 0
+    anchors = (await db.execute(
+        select(AuditAnchor, AuditLog.log_hash)
+        .outerjoin(AuditLog, AuditLog.id == AuditAnchor.last_audit_id).order_by(AuditAnchor.id)
+    )).all()
+    for anchor, entry_hash in anchors:
+        reason = ("bad signature" if not anchor_signature_valid(anchor)
+                  else "entry missing" if entry_hash is None
+                  else "hash mismatch" if entry_hash != anchor.chain_hash else None)
+        if reason:
+            bad_anchors += 1
+            yield {"type": "anchor", "id": anchor.id, "last_audit_id": anchor.last_audit_id, "reason": reason}
+
+    loop = asyncio.get_running_loop()
+    checked = invalid = 0
+    with (_pool(workers) if workers > 0 else nullcontext()) as pool:
+        pending: List[Tuple[asyncio.Future, int]] = []
+        after_id, prev_hash, done = 0, GENESIS_HASH, False
+        while not done or pending:
+            # keep every worker busy while this side reads the next segments
+            while not done and len(pending) < max(workers, 1) * 2:
+                rows = await _rows_after(db, after_id, segment)
+                if not rows:
+                    done = True
+                    break
+                future = (loop.run_in_executor(pool, verify_segment, prev_hash, rows) if pool
+                          else loop.create_future())
+                if pool is None:
+                    future.set_result(verify_segment(prev_hash, rows))
+                pending.append((future, len(rows)))
+                after_id, prev_hash = rows[-1][0], rows[-1][8]
+            if pending:
+                future, size = pending.pop(0)
+                for item in await future:
+                    invalid += 1
+                    yield {"type": "tampered", **item}
+                checked += size
+    yield {"type": "summary", "mode": "full", "checked": checked, "invalid": invalid,
+           "anchors": len(anchors), "bad_anchors": bad_anchors, "workers": workers}
+
+
+async def verification_report(mode: str = "incremental", workers: Optional[int] = None) -> AsyncIterator[dict]:
+    """verify_incremental / verify_full on a session of its own (for streamed responses)."""
+    async with AsyncSessionLocal() as db:
+        items = verify_full(db, workers) if mode == "full" else verify_incremental(db)
+        async for item in items:
+            yield item
@@ -7,7 +7,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, update
 from app.models.models import Application, Certificate, EnveloSession, CAT72Test, APIKey
-from app.services.certificate_pdf import generate_certificate_pdf
+from app.services.certificate_artifacts import render_certificate_pdf
 from app.services import email_service
 import hashlib
 import logging
@@ -203,25 +203,9 @@ async def complete_test_and_issue_certificate(
         except Exception as e:
             logger.warning(f"Session promotion note: {e}")
 
-        # Generate PDF
+        # Render and store the PDF (off the event loop)
         try:
-            odd_spec = certificate.odd_specification or {}
-            pdf_bytes = generate_certificate_pdf({
-                "certificate_number": certificate.certificate_number,
-                "organization_name": certificate.organization_name,
-                "system_name": certificate.system_name,
-                "system_version": getattr(certificate, "system_version", ""),
-                "odd_specification": certificate.odd_specification,
-                "issued_at": certificate.issued_at,
-                "expires_at": certificate.expires_at,
-                "convergence_score": certificate.convergence_score or 0.95,
-                "evidence_hash": certificate.evidence_hash or "N/A",
-                "signature": certificate.evidence_hash[:16] if certificate.evidence_hash else "N/A",
-                "audit_log_ref": test.test_id if test else "N/A",
-                "verification_url": f"https://app.sentinelauthority.org/verify?cert={certificate.certificate_number}",
-            })
-            certificate.certificate_pdf = pdf_bytes
-            await db.commit()
+            await render_certificate_pdf(db, certificate, test.test_id)
         except Exception as e:
             logger.warning(f"PDF generation failed for {cert_number}: {e}")
 
@@ -0,0 +1,425 @@
+"""
+CAT-72 Offline Replay
+- Re-evaluates a test's stored telemetry against its envelope or a candidate
+  replacement, for disputed or revised envelopes
+- Rows stream off a server-side cursor REPLAY_CHUNK_SIZE at a time, in
+  (timestamp, id) order, the order a window-state rebuild uses
+- Numeric, categorical, radius/polygon geofence, rate-of-change and statistical
+  boundaries are evaluated column-wise with NumPy over each chunk; rolling windows
+  and the previous sample carry over between chunks
+- Boundary types without a columnar path are evaluated per sample by the compiled
+  evaluator, with the same running state the ingest path passes it
+- Diff report against the verdicts recorded at ingest: flips in each direction,
+  violations per boundary and example flipped samples
+"""
+
+import asyncio
+import copy
+import logging
+import time
+import warnings
+from collections import Counter, deque
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import CAT72Test, Telemetry
+from app.services.envelope_evaluator import (
+    BOUNDARY_GROUPS, CompiledEnvelope, compile_envelope, envelope_hash, window_value,
+)
+from app.services.cat72_window_state import VIOLATION_WINDOW_S, WINDOW_MAX_SAMPLES
+
+logger = logging.getLogger(__name__)
+
+REPLAY_CHUNK_SIZE = 5000
+REPLAY_MAX_EXAMPLES = 50
+
+_EARTH_RADIUS_M = 6371000
+# BOUNDARY_GROUPS entries evaluated column-wise; the other groups go through
+# CompiledEnvelope.evaluate. Bounds, geofences and polygons sit outside
+# BOUNDARY_GROUPS and are column-wise too, except dict-form bounds left raw.
+_COLUMNAR_GROUPS = ("rate", "statistical")
+
+
+def _as_float(v) -> float:
+    try:
+        return float(v)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _window_float(v) -> float:
+    v = window_value(v)
+    return np.nan if v is None else v
+
+
+def _column(values: list, words: bool = False) -> np.ndarray:
+    """Floats for a column of state-vector values; NaN where absent or not numeric
+    (words=True also reads true/false words, as rolling windows do)."""
+    try:
+        return np.array(values, dtype=float)  # None -> NaN; fails on any non-numeric string
+    except (ValueError, TypeError):
+        return np.fromiter(map(_window_float if words else _as_float, values), float, len(values))
+
+
+def _aggregate(ext: np.ndarray, size: int, aggregation: str) -> np.ndarray:
+    """RollingWindow.aggregate for every window position of ext (NaN = empty slot);
+    NaN where a window holds no values."""
+    valid = ~np.isnan(ext)
+    values = np.where(valid, ext, 0.0)
+    windows = lambda arr: sliding_window_view(arr, size)  # noqa: E731
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-empty windows
+        n = windows(valid).sum(axis=1)
+        if aggregation == "median":
+            return np.nanmedian(windows(ext), axis=1)
+        if aggregation == "sum":
+            return np.where(n > 0, windows(values).sum(axis=1), np.nan)
+        if aggregation == "min":
+            return np.where(n > 0, windows(np.where(valid, ext, np.inf)).min(axis=1), np.nan)
+        if aggregation == "max":
+            return np.where(n > 0, windows(np.where(valid, ext, -np.inf)).max(axis=1), np.nan)
+        if aggregation == "ratio_true":
+            return windows(valid & (ext > 0)).sum(axis=1) / n
+        mean = windows(values).sum(axis=1) / n
+        if aggregation == "stddev":
+            return np.sqrt(np.maximum(windows(values * values).sum(axis=1) / n - mean * mean, 0.0))
+        return mean  # mean, and the fallback for unknown aggregations
+
+
+class _Chunk:
+    """One chunk of rows with its state-vector columns extracted on first use."""
+
+    def __init__(self, rows: Sequence[Any]):
+        self.n = len(rows)
+        self.svs = [r.state_vector or {} for r in rows]
+        self.nonempty = np.fromiter(map(bool, self.svs), bool, self.n)
+        self.ts = np.array([r.timestamp for r in rows], dtype="datetime64[us]").astype(np.int64) / 1e6
+        self._raw: Dict[str, list] = {}
+        self._floats: Dict[str, np.ndarray] = {}
+        self._window: Dict[str, np.ndarray] = {}
+
+    def keys(self) -> set:
+        return set().union(*self.svs)
+
+    def raw(self, key: str) -> list:
+        # ingest strips None values, so None here means the key is absent
+        if key not in self._raw:
+            self._raw[key] = [sv.get(key) for sv in self.svs]
+        return self._raw[key]
+
+    def present(self, key: str) -> np.ndarray:
+        return np.fromiter((v is not None for v in self.raw(key)), bool, self.n)
+
+    def floats(self, key: str) -> np.ndarray:
+        if key not in self._floats:
+            self._floats[key] = _column(self.raw(key))
+        return self._floats[key]
+
+    def window_floats(self, key: str) -> np.ndarray:
+        if key not in self._window:
+            self._window[key] = _column(self.raw(key), words=True)
+        return self._window[key]
+
+
+class ReplayEngine:
+    """Feeds chunks of telemetry rows through a compiled envelope and accumulates the diff."""
+
+    def __init__(self, compiled: CompiledEnvelope, cumulative_state: Optional[Dict[str, Any]] = None,
+                 baseline_metrics: Optional[Dict[str, Any]] = None, max_examples: int = REPLAY_MAX_EXAMPLES):
+        self.compiled = compiled
+        self.cumulative_state = cumulative_state or {}
+        self.baseline_metrics = baseline_metrics or {}
+        self.max_examples = max_examples
+
+        self.rate = []
+        for rname, rb in compiled.rate:
+            variable, max_rate = rb.get("variable", ""), rb.get("max_rate")
+            if not variable or max_rate is None:
+                continue
+            try:
+                self.rate.append((rname, variable, float(max_rate)))
+            except (ValueError, TypeError):
+                continue  # the per-sample path skips these too
+
+        self.statistical = []
+        for sname, sb in compiled.statistical:
+            spec = (sb.get("variable", ""), sb.get("window_size", 100))
+            if spec not in compiled.window_specs:
+                continue
+            try:
+                limits = tuple(None if sb.get(k) is None else float(sb[k]) for k in ("min_value", "max_value"))
+            except (ValueError, TypeError):
+                continue
+            self.statistical.append((sname, spec, sb.get("aggregation", "mean"), *limits))
+        self._tails = {spec: np.full(max(1, min(spec[1], WINDOW_MAX_SAMPLES)), np.nan)
+                       for spec in compiled.window_specs}
+
+        # boundaries left to the per-sample evaluator: dict-form bounds that couldn't
+        # be precompiled, and every group without a columnar path
+        raw = {k: b for k, b in compiled.bounds.items() if b[0] == "raw"}
+        residual_groups = [g for g, _, _ in BOUNDARY_GROUPS
+                           if g not in _COLUMNAR_GROUPS and getattr(compiled, g)]
+        self.residual = None
+        if raw or residual_groups:
+            self.residual = copy.copy(compiled)
+            self.residual.bounds, self.residual._resolved = raw, {}
+            self.residual.geo, self.residual.polygon, self.residual.rate, self.residual.statistical = [], [], [], []
+            self.residual.window_specs = ()
+        self._resolved: Dict[str, Any] = {}
+
+        self._prev_sv: Optional[dict] = None
+        self._prev_ts = None
+        self._prev_dt = None
+        self._violation_times: deque = deque()
+        self.samples = 0
+        self.learning_samples = 0
+        self.original_conformant = 0
+        self.replayed_conformant = 0
+        self.violated_samples = 0
+        self.newly_violating = 0
+        self.newly_conformant = 0
+        self.violations_by_boundary: Counter = Counter()
+        self.examples: List[dict] = []
+
+    # ── columnar checks ─────────────────────────────────────
+
+    def _bounds_checks(self, chunk: "_Chunk", checks: list):
+        for key in chunk.keys():
+            try:
+                bounds = self._resolved[key]
+            except KeyError:
+                bounds = self._resolved[key] = self.compiled._resolve(key)
+            if not bounds or bounds[0] == "raw":
+                continue
+            present = chunk.present(key)
+            if bounds[0] == "categorical":
+                allowed = bounds[2]
+                ok = np.fromiter((v is not None and str(v).lower() in allowed for v in chunk.raw(key)), bool, chunk.n)
+                checks.append((key, present & ~ok, np.where(present, np.where(ok, 0.0, 1.0), np.inf)))
+                continue
+            values = chunk.floats(key)
+            type_error = present & np.isnan(values)
+            lo, hi = bounds[1], bounds[2]
+            below, above = values < lo, values > hi
+            distance = np.where(below, lo - values, np.where(above, values - hi, np.minimum(values - lo, hi - values)))
+            checks.append((key, type_error | below | above, np.where(present & ~type_error, distance, np.inf)))
+
+    def _geo_checks(self, chunk: "_Chunk", checks: list):
+        if not self.compiled.geo and not self.compiled.polygon:
+            return
+        lat, lng = chunk.floats("latitude"), chunk.floats("longitude")
+        located = ~np.isnan(lat) & ~np.isnan(lng)
+        for clat, clng, lat1, radius_m in self.compiled.geo:
+            dlat = np.radians(lat - clat)
+            dlng = np.radians(lng - clng)
+            a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(np.radians(lat)) * np.sin(dlng / 2) ** 2
+            dist_m = _EARTH_RADIUS_M * (2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a)))
+            outside = located & (dist_m > radius_m)
+            checks.append(("geofence", outside, np.where(located, np.abs(dist_m - radius_m), np.inf)))
+        for pname, ring in self.compiled.polygon:
+            inside = np.zeros(chunk.n, bool)
+            yj, xj = ring[-1]
+            for yi, xi in ring:
+                inside ^= ((yi > lat) != (yj > lat)) & (lng < (xj - xi) * (lat - yi) / (yj - yi + 1e-12) + xi)
+                yj, xj = yi, xi
+            outside = located & ~inside
+            checks.append((pname, outside, np.where(outside, 1.0, np.inf)))
+
+    def _rate_checks(self, chunk: "_Chunk", checks: list):
+        if not self.rate:
+            return
+        # the previous sample of row 0 is the last row of the previous chunk
+        has_prev = np.concatenate(([bool(self._prev_sv)], chunk.nonempty[:-1]))
+        prev_ts = np.concatenate(([np.nan if self._prev_ts is None else self._prev_ts], chunk.ts[:-1]))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            interval = chunk.ts - prev_ts
+            for rname, variable, max_rate in self.rate:
+                curr = chunk.floats(variable)
+                prev = np.concatenate(([_as_float((self._prev_sv or {}).get(variable))], curr[:-1]))
+                rate = np.abs(curr - prev) / interval
+                violated = has_prev & (interval > 0) & (rate > max_rate)
+                checks.append((rname, violated, np.where(violated, rate - max_rate, np.inf)))
+
+    def _statistical_checks(self, chunk: "_Chunk", checks: list):
+        if not self._tails:
+            return
+        pushed = chunk.nonempty  # empty vectors never enter windows
+        # row i sees the `size` values pushed before it: ext[pos[i]:pos[i] + size]
+        pos = np.cumsum(pushed) - pushed
+        columns = {}
+        for spec, tail in self._tails.items():
+            ext = np.concatenate((tail, chunk.window_floats(spec[0])[pushed]))
+            self._tails[spec] = ext[len(ext) - len(tail):]
+            columns[spec] = (ext, len(tail), {})
+
+        for sname, spec, aggregation, min_value, max_value in self.statistical:
+            ext, size, done = columns[spec]
+            if aggregation not in done:
+                done[aggregation] = _aggregate(ext, size, aggregation)[pos]
+            if "count" not in done:
+                done["count"] = sliding_window_view(~np.isnan(ext), size).sum(axis=1)[pos]
+            agg, has = done[aggregation], done["count"] > 0
+            if min_value is not None:
+                low = has & (agg < min_value)
+                checks.append((sname, low, np.where(low, min_value - agg, np.inf)))
+            if max_value is not None:
+                high = has & (agg > max_value)
+                checks.append((sname, high, np.where(high, agg - max_value, np.inf)))
+
+    # ── per chunk ───────────────────────────────────────────
+
+    def feed(self, rows: Sequence[Any]):
+        """Evaluate one chunk of rows (id, timestamp, elapsed_seconds, state_vector,
+        in_envelope, prev_hash[, sample_number]), in order, continuing from the
+        previous chunk."""
+        if not rows:
+            return
+        chunk = _Chunk(rows)
+        checks: list = []
+        self._bounds_checks(chunk, checks)
+        self._geo_checks(chunk, checks)
+        self._rate_checks(chunk, checks)
+        self._statistical_checks(chunk, checks)
+
+        violated = np.zeros(chunk.n, bool)
+        distance = np.full(chunk.n, np.inf)
+        for _, mask, dist in checks:
+            violated |= mask
+            distance = np.minimum(distance, dist)
+        in_envelope = ~violated
+        # learning-mode samples feed the windows and the previous sample but have no verdict
+        scored = np.fromiter((r.prev_hash is not None for r in rows), bool, chunk.n)
+        residual_names: Dict[int, List[str]] = {}
+        if self.residual is not None:
+            self._residual_pass(rows, chunk, scored, in_envelope, violated, distance, residual_names)
+
+        original = np.fromiter((bool(r.in_envelope) for r in rows), bool, chunk.n)
+        changed = scored & (original != in_envelope)
+        # numbered like ingest: learning samples included (the stored number when there is one)
+        first = self.samples + self.learning_samples
+        self.samples += int(scored.sum())
+        self.learning_samples += chunk.n - int(scored.sum())
+        self.violated_samples += int((violated & scored).sum())
+        self.original_conformant += int((original & scored).sum())
+        self.replayed_conformant += int((in_envelope & scored).sum())
+        self.newly_conformant += int((changed & in_envelope).sum())
+        self.newly_violating += int((changed & ~in_envelope).sum())
+        for name, mask, _ in checks:
+            hits = int(np.count_nonzero(mask & scored))
+            if hits:
+                self.violations_by_boundary[name] += hits
+        for i in np.flatnonzero(changed)[:max(0, self.max_examples - len(self.examples))]:
+            row = rows[i]
+            self.examples.append({
+                "sample_number": getattr(row, "sample_number", None) or first + int(i) + 1,
+                "telemetry_id": row.id,
+                "timestamp": row.timestamp.isoformat(),
+                "original_in_envelope": bool(original[i]),
+                "replayed_in_envelope": bool(in_envelope[i]),
+                "envelope_distance": None if np.isinf(distance[i]) else round(float(distance[i]), 4),
+                "violated": [name for name, mask, _ in checks if mask[i]] + residual_names.get(i, []),
+            })
+        self._prev_sv, self._prev_ts, self._prev_dt = chunk.svs[-1], chunk.ts[-1], rows[-1].timestamp
+
+    def _residual_pass(self, rows, chunk: "_Chunk", scored, in_envelope, violated, distance, residual_names):
+        """Per-sample evaluation of the boundaries without a columnar path, in order,
+        with the running counts and recent-interlock ring the ingest path keeps.
+        Ingest counts learning samples into total_samples until learn-complete
+        resets the counters for enforcement, so every scored sample sees only
+        the scored samples before it."""
+        samples, conformant, interlocks = self.samples, self.replayed_conformant, self.violated_samples
+        for i in np.flatnonzero(scored):
+            row = rows[i]
+            prev_sv, prev_dt = (chunk.svs[i - 1], rows[i - 1].timestamp) if i else (self._prev_sv, self._prev_dt)
+            r_in, r_dist, r_violations = self._evaluate_residual(
+                row, chunk.svs[i], prev_sv, prev_dt, samples, conformant, interlocks)
+            in_envelope[i] &= r_in
+            distance[i] = min(distance[i], r_dist)
+            if r_violations:
+                violated[i] = True
+                residual_names[i] = [v.get("var", "") for v in r_violations]
+                self.violations_by_boundary.update(residual_names[i])
+            if violated[i]:
+                self._violation_times.append(row.timestamp)
+            samples += 1
+            conformant += bool(in_envelope[i])
+            interlocks += bool(violated[i])
+
+    def _evaluate_residual(self, row, sv: dict, prev_sv: Optional[dict], prev_dt,
+                           samples: int, conformant: int, interlocks: int) -> tuple:
+        cutoff = row.timestamp - timedelta(seconds=VIOLATION_WINDOW_S)
+        while self._violation_times and self._violation_times[0] < cutoff:
+            self._violation_times.popleft()
+        return self.residual.evaluate(
+            sv,
+            prev_state_vector=prev_sv,
+            sample_interval_s=(row.timestamp - prev_dt).total_seconds() if prev_dt is not None else None,
+            current_timestamp=row.timestamp,
+            test_stats={
+                "total_samples": samples,
+                "conformant_samples": conformant,
+                "interlock_activations": interlocks,
+                "elapsed_seconds": row.elapsed_seconds or 0,
+            },
+            recent_violations_count=len(self._violation_times),
+            recent_violations_window=VIOLATION_WINDOW_S,
+            cumulative_state=self.cumulative_state,
+            baseline_metrics=self.baseline_metrics,
+        )
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "learning_samples_skipped": self.learning_samples,
+            "original": {"conformant": self.original_conformant,
+                         "nonconformant": self.samples - self.original_conformant},
+            "replayed": {"conformant": self.replayed_conformant,
+                         "nonconformant": self.samples - self.replayed_conformant,
+                         "convergence": round(self.replayed_conformant / self.samples, 6) if self.samples else 0},
+            "changed": {"total": self.newly_violating + self.newly_conformant,
+                        "newly_violating": self.newly_violating,
+                        "newly_conformant": self.newly_conformant},
+            "violations_by_boundary": dict(self.violations_by_boundary.most_common()),
+            "per_sample_boundaries": self.residual is not None,
+            "examples": self.examples,
+        }
+
+
+async def replay_test(db: AsyncSession, test: CAT72Test, envelope: Optional[Dict[str, Any]] = None,
+                      chunk_size: int = REPLAY_CHUNK_SIZE, max_examples: int = REPLAY_MAX_EXAMPLES) -> Dict[str, Any]:
+    """Replay every stored sample of `test` against `envelope` (default: the test's
+    own envelope) and diff the verdicts with those recorded at ingest."""
+    original = test.envelope_definition or {}
+    envelope = original if envelope is None else envelope
+    # neither is a CAT72Test column today; the ingest path reads them the same way
+    engine = ReplayEngine(compile_envelope(envelope), getattr(test, "cumulative_state", None),
+                          getattr(test, "baseline_metrics", None), max_examples)
+    stmt = (
+        select(Telemetry.id, Telemetry.timestamp, Telemetry.elapsed_seconds, Telemetry.state_vector,
+               Telemetry.in_envelope, Telemetry.prev_hash, Telemetry.sample_number)
+        .where(Telemetry.test_id == test.id)
+        .order_by(Telemetry.timestamp, Telemetry.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    started = time.perf_counter()
+    result = await db.stream(stmt)
+    async for rows in result.partitions():
+        # column math and any per-sample boundaries run off the event loop
+        await asyncio.to_thread(engine.feed, rows)
+    duration = time.perf_counter() - started
+    report = engine.report()
+    logger.info(f"Replayed {report['samples']} samples of {test.test_id} in {duration:.2f}s: "
+                f"{report['changed']['total']} verdicts changed")
+    return {
+        "test_id": test.test_id,
+        "envelope_hash": envelope_hash(envelope),
+        "original_envelope_hash": envelope_hash(original),
+        **report,
+        "duration_s": round(duration, 3),
+        "samples_per_s": round(report["samples"] / duration) if duration > 0 else None,
+    }
@@ -0,0 +1,184 @@
+"""
+CAT-72 Sliding Window State
+- Per-test, in-process state for the stateful boundary checks
+- Last sample (rate-of-change, connectivity), per-variable rolling windows with
+  incrementally maintained sum / sum-of-squares / sorted order statistics
+  (statistical), and a ring of recent interlock timestamps (frequency)
+- Rebuilt from the DB on a miss; a state whose sample count no longer matches
+  the test row (another worker ingested, a commit failed, learning reset the
+  counters) counts as a miss
+"""
+
+import itertools
+import logging
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Telemetry, InterlockEvent
+from app.services.envelope_evaluator import CompiledEnvelope, window_value
+
+logger = logging.getLogger(__name__)
+
+VIOLATION_WINDOW_S = 3600     # frequency checks count interlocks over the last hour
+WINDOW_MAX_SAMPLES = 1000     # cap on a statistical boundary's window_size
+WINDOW_STATE_MAX_TESTS = 1024
+
+_states: "OrderedDict[str, WindowState]" = OrderedDict()
+_generations = itertools.count(1)
+
+
+class RollingWindow:
+    """The last `size` samples of one variable.
+
+    Samples where the variable was absent or non-numeric hold a slot but no
+    value, as in the from-scratch aggregation. Each push is O(1) for the
+    running sums plus a bisect into the sorted values for median/min/max.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, min(size, WINDOW_MAX_SAMPLES))
+        self._ring: Deque[Optional[float]] = deque()
+        self._sorted = []
+        self.count = 0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.positive = 0
+        self._pushes = 0
+
+    def push(self, value: Optional[float]):
+        self._ring.append(value)
+        if value is not None:
+            self._add(value)
+        if len(self._ring) > self.size:
+            old = self._ring.popleft()
+            if old is not None:
+                self._remove(old)
+        # re-sum from the ring once per window length so float drift can't accumulate
+        self._pushes += 1
+        if self._pushes >= self.size:
+            self._pushes = 0
+            self.sum = sum(self._sorted)
+            self.sumsq = sum(v * v for v in self._sorted)
+
+    def _add(self, v: float):
+        self.count += 1
+        self.sum += v
+        self.sumsq += v * v
+        self.positive += v > 0
+        insort(self._sorted, v)
+
+    def _remove(self, v: float):
+        self.count -= 1
+        self.sum -= v
+        self.sumsq -= v * v
+        self.positive -= v > 0
+        del self._sorted[bisect_left(self._sorted, v)]
+
+    def aggregate(self, aggregation: str) -> float:
+        n = self.count
+        if aggregation == "median":
+            mid = n // 2
+            return self._sorted[mid] if n % 2 else (self._sorted[mid-1] + self._sorted[mid]) / 2
+        if aggregation == "sum":
+            return self.sum
+        if aggregation == "min":
+            return self._sorted[0]
+        if aggregation == "max":
+            return self._sorted[-1]
+        if aggregation == "ratio_true":
+            return self.positive / n
+        if aggregation == "stddev":
+            mean = self.sum / n
+            return max(self.sumsq / n - mean * mean, 0.0) ** 0.5
+        return self.sum / n
+
+
+class WindowState:
+    """Everything the stateful checks need about a test's history."""
+
+    def __init__(self, window_specs: Tuple[Tuple[str, int], ...]):
+        self.window_specs = window_specs
+        self.windows: Dict[Tuple[str, int], RollingWindow] = {
+            spec: RollingWindow(spec[1]) for spec in window_specs
+        }
+        self.samples_seen = 0
+        self.last_state_vector: Optional[Dict[str, Any]] = None
+        self.last_timestamp: Optional[datetime] = None
+        self._violations: Deque[datetime] = deque()
+        # window values recorded since they were last shipped to an evaluation
+        # worker's mirror; None when no mirror is in sync (see envelope_executor)
+        self.generation = next(_generations)
+        self.outbox: Optional[list] = None
+        self.remote_seq = 0
+
+    def sample_gap(self, timestamp: datetime) -> Optional[float]:
+        if self.last_timestamp is None:
+            return None
+        return (timestamp - self.last_timestamp).total_seconds()
+
+    def recent_violations(self, timestamp: datetime) -> int:
+        cutoff = timestamp - timedelta(seconds=VIOLATION_WINDOW_S)
+        while self._violations and self._violations[0] < cutoff:
+            self._violations.popleft()
+        return len(self._violations)
+
+    def record(self, state_vector: Optional[Dict[str, Any]], timestamp: datetime, violated: bool = False):
+        """Fold a committed sample in. Empty state vectors move the last-sample
+        pointer but never enter the windows."""
+        if state_vector and self.windows:
+            values = tuple(window_value(state_vector.get(variable)) for variable, _ in self.windows)
+            for window, value in zip(self.windows.values(), values):
+                window.push(value)
+            if self.outbox is not None:
+                self.outbox.append(values)
+        if self.last_timestamp is None or timestamp >= self.last_timestamp:
+            self.last_state_vector = state_vector
+            self.last_timestamp = timestamp
+        if violated:
+            self._violations.append(timestamp)
+
+
+async def _rebuild(db: AsyncSession, test, window_specs, timestamp: datetime) -> WindowState:
+    state = WindowState(window_specs)
+    depth = max([w.size for w in state.windows.values()] + [1])
+    rows = (await db.execute(
+        select(Telemetry.state_vector, Telemetry.timestamp).where(Telemetry.test_id == test.id)
+        .order_by(Telemetry.timestamp.desc()).limit(depth)
+    )).all()
+    for sv, ts in reversed(rows):
+        state.record(sv, ts)
+
+    since = timestamp - timedelta(seconds=VIOLATION_WINDOW_S)
+    viol_rows = await db.execute(
+        select(InterlockEvent.timestamp).where(
+            InterlockEvent.test_id == test.id,
+            InterlockEvent.timestamp >= since,
+        ).order_by(InterlockEvent.timestamp)
+    )
+    state._violations.extend(ts for (ts,) in viol_rows.all())
+    state.samples_seen = test.total_samples or 0
+    return state
+
+
+async def get_window_state(
+    db: AsyncSession, test, compiled: CompiledEnvelope, timestamp: datetime
+) -> WindowState:
+    """The cached state for a test, rebuilt (two queries) only when stale."""
+    state = _states.get(test.test_id)
+    if (state is None or state.samples_seen != (test.total_samples or 0)
+            or state.window_specs != compiled.window_specs):
+        state = await _rebuild(db, test, compiled.window_specs, timestamp)
+        _states[test.test_id] = state
+        if len(_states) > WINDOW_STATE_MAX_TESTS:
+            _states.popitem(last=False)
+    _states.move_to_end(test.test_id)
+    return state
+
+
+def discard_window_state(test_id: str):
+    _states.pop(test_id, None)
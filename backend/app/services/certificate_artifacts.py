@@ -0,0 +1,225 @@
+"""
+Certificate PDF Artifacts
+- A certificate's PDF is rendered once and stored in certificates.certificate_pdf
+  together with certificate_pdf_hash, the SHA-256 of everything the document
+  shows (plus RENDER_VERSION). Stored bytes are served while the hash still
+  matches the row; any change to a rendered field makes the next request render
+  a fresh copy
+- The content hash doubles as the download's ETag, so revalidations get a 304
+  without touching the PDF bytes
+- Recently served documents are kept per process in an LRU keyed by
+  (certificate number, content hash); concurrent requests for the same missing
+  artifact share one render
+- Renders run in the PDF render pool, never on the event loop
+- Bulk regeneration is a background batch with at most PDF_RENDER_WORKERS
+  renders in flight: the certificate_pdfs job backfills missing and stale
+  artifacts, and admins can trigger a run of that job on demand. It runs under
+  the job's lease, so there is one run at a time cluster-wide, and its status
+  comes from the job's row
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.models import CAT72Test, Certificate
+from app.services.certificate_pdf import generate_certificate_pdf
+from app.services.job_scheduler import get_scheduler
+from app.services.pdf_render_pool import pdf_render_pool
+
+logger = logging.getLogger(__name__)
+
+RENDER_VERSION = 2                     # bump when certificate_pdf.py's layout changes
+CERTIFICATE_PDF_SWEEP_SECONDS = 3600
+REGENERATION_JOB = "certificate_pdfs"
+REGENERATION_BATCH = 100
+REGENERATION_ERRORS_KEPT = 20          # per run, in the job's row
+
+
+def render_inputs(cert: Certificate, test_ref: Optional[str]) -> dict:
+    """generate_certificate_pdf keyword arguments for a certificate."""
+    odd_spec = cert.odd_specification or {}
+    odd_string = odd_spec.get("environment_type", "General") if isinstance(odd_spec, dict) else str(odd_spec)
+    return dict(
+        certificate_id=cert.certificate_number,
+        organization_name=cert.organization_name,
+        system_name=cert.system_name,
+        odd_specification=odd_string,
+        issued_date=cert.issued_at,
+        expiry_date=cert.expires_at,
+        test_id=test_ref or "N/A",
+        convergence_score=cert.convergence_score or 0.95,
+        stability_index=0.95,
+        drift_rate=0.01,
+        evidence_hash=cert.evidence_hash or "N/A",
+    )
+
+
+def content_hash(inputs: dict) -> str:
+    canonical = json.dumps({"v": RENDER_VERSION, **inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _stamp_query():
+    """Certificates with their CAT-72 test reference, PDF bytes left unloaded."""
+    return (select(Certificate, CAT72Test.test_id)
+            .outerjoin(CAT72Test, CAT72Test.id == Certificate.test_id)
+            .options(defer(Certificate.certificate_pdf)))
+
+
+async def load_certificate(db: AsyncSession, certificate_number: str) -> Optional[Tuple[Certificate, dict, str]]:
+    """(certificate, render inputs, content hash), or None if there is no such certificate."""
+    row = (await db.execute(_stamp_query().where(Certificate.certificate_number == certificate_number))).first()
+    if row is None:
+        return None
+    cert, test_ref = row
+    inputs = render_inputs(cert, test_ref)
+    return cert, inputs, content_hash(inputs)
+
+
+# ── Per-process LRU and single-flight rendering ─────────────────────────────
+
+_pdf_cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+_inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+stats = {"cache_hits": 0, "stored_hits": 0, "renders": 0}
+
+
+def _cache_get(key: Tuple[str, str]) -> Optional[bytes]:
+    pdf = _pdf_cache.get(key)
+    if pdf is not None:
+        _pdf_cache.move_to_end(key)
+    return pdf
+
+
+def _cache_put(key: Tuple[str, str], pdf: bytes):
+    _pdf_cache[key] = pdf
+    _pdf_cache.move_to_end(key)
+    while len(_pdf_cache) > settings.CERTIFICATE_PDF_CACHE_SIZE:
+        _pdf_cache.popitem(last=False)
+
+
+async def _render(key: Tuple[str, str], inputs: dict) -> bytes:
+    future = _inflight.get(key)
+    if future is None:
+        stats["renders"] += 1
+        future = asyncio.ensure_future(pdf_render_pool.render(generate_certificate_pdf, **inputs))
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shielded: a client hanging up must not cancel a render others are waiting on
+    return await asyncio.shield(future)
+
+
+async def _store(db: AsyncSession, cert_id: int, pdf: bytes, digest: str):
+    await db.execute(update(Certificate).where(Certificate.id == cert_id)
+                     .values(certificate_pdf=pdf, certificate_pdf_hash=digest))
+    await db.commit()
+
+
+async def certificate_pdf(db: AsyncSession, cert: Certificate, inputs: dict, digest: str) -> bytes:
+    """The certificate's PDF for the given content hash: from the LRU, from the
+    stored artifact if it is current, else rendered and stored."""
+    key = (cert.certificate_number, digest)
+    pdf = _cache_get(key)
+    if pdf is not None:
+        stats["cache_hits"] += 1
+        return pdf
+    if cert.certificate_pdf_hash == digest:
+        pdf = (await db.execute(select(Certificate.certificate_pdf).where(Certificate.id == cert.id))).scalar()
+        if pdf:
+            stats["stored_hits"] += 1
+            _cache_put(key, pdf)
+            return pdf
+    pdf = await _render(key, inputs)
+    await _store(db, cert.id, pdf, digest)
+    _cache_put(key, pdf)
+    return pdf
+
+
+async def render_certificate_pdf(db: AsyncSession, cert: Certificate, test_ref: Optional[str]) -> bytes:
+    """Render and store a certificate's PDF now (issuance, admin regeneration)."""
+    inputs = render_inputs(cert, test_ref)
+    digest = content_hash(inputs)
+    key = (cert.certificate_number, digest)
+    pdf = await _render(key, inputs)
+    await _store(db, cert.id, pdf, digest)
+    _cache_put(key, pdf)
+    return pdf
+
+
+# ── Bulk regeneration ───────────────────────────────────────────────────────
+
+async def regenerate_certificate_pdfs(force: bool = False, concurrency: Optional[int] = None,
+                                      progress: Optional[dict] = None) -> dict:
+    """Render every certificate whose stored PDF is missing or stale (every
+    certificate with force=True), at most `concurrency` at a time, each stored
+    on a session of its own as it finishes."""
+    concurrency = concurrency or max(settings.PDF_RENDER_WORKERS, 1)
+    progress = progress if progress is not None else {}
+    progress.update(checked=0, rendered=0, errors=[])
+    limit = asyncio.Semaphore(concurrency)
+
+    async def regenerate(cert_id: int, number: str, inputs: dict, digest: str):
+        async with limit:
+            try:
+                pdf = await _render((number, digest), inputs)
+                async with AsyncSessionLocal() as db:
+                    await _store(db, cert_id, pdf, digest)
+                progress["rendered"] += 1
+            except Exception as e:
+                logger.warning(f"Certificate PDF render failed for {number}: {e}")
+                progress["errors"].append({"cert": number, "error": str(e)})
+
+    after_id = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(_stamp_query().where(Certificate.id > after_id)
+                                     .order_by(Certificate.id).limit(REGENERATION_BATCH))).all()
+        if not rows:
+            break
+        batch = []
+        for cert, test_ref in rows:
+            inputs = render_inputs(cert, test_ref)
+            digest = content_hash(inputs)
+            if force or cert.certificate_pdf_hash != digest:
+                batch.append(regenerate(cert.id, cert.certificate_number, inputs, digest))
+        await asyncio.gather(*batch)
+        progress["checked"] += len(rows)
+        after_id = rows[-1][0].id
+    if progress["rendered"] or progress["errors"]:
+        logger.info(f"Certificate PDFs: {progress['rendered']} rendered, {len(progress['errors'])} failed "
+                    f"of {progress['checked']} checked")
+    return progress
+
+
+async def certificate_pdf_sweep(force: bool = False) -> dict:
+    result = await regenerate_certificate_pdfs(force=force)
+    return {**result, "failed": len(result["errors"]), "errors": result["errors"][:REGENERATION_ERRORS_KEPT]}
+
+
+async def start_regeneration(force: bool = False) -> dict:
+    """Request a run of the certificate_pdfs job now, unless one is already
+    running or requested anywhere in the cluster. Returns its status."""
+    started = await get_scheduler().trigger(REGENERATION_JOB, force=force)
+    return {**(await regeneration_status()), "started": started}
+
+
+async def regeneration_status() -> dict:
+    """The certificate_pdfs job's current state and its last run's counts,
+    whether an admin or the hourly schedule started it."""
+    job = await get_scheduler().job_state(REGENERATION_JOB)
+    state = job["state"]
+    if state == "idle" and job.get("last_status"):
+        state = "finished" if job["last_status"] == "ok" else "failed"
+    status = {"state": state, "started_at": job.get("last_started_at"), "finished_at": job.get("last_finished_at")}
+    if job.get("last_error"):
+        status["error"] = job["last_error"]
+    return {**status, **(job.get("last_result") or {})}
@@ -4,7 +4,6 @@ from reportlab.lib.colors import Color
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader, simpleSplit
 from io import BytesIO
-from datetime import datetime
 import qrcode
 
 INK     = Color(0.059, 0.063, 0.129)
@@ -183,7 +182,6 @@ def generate_certificate_pdf(
     c.line(M, 44, W-M, 44)
     c.setFillColor(DIM); c.setFont('Helvetica', 7)
     c.drawString(M, 30, 'Valid while ENVELO Interlock and telemetry remain active. Certificate subject to continuous conformance surveillance. Issued by Sentinel Authority.')
-    c.drawRightString(W-M, 30, f'Generated {datetime.now().strftime("%Y-%m-%d")}')
 
     c.save()
     buf.seek(0)
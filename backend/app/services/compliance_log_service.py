@@ -6,6 +6,10 @@ Generates a cryptographically signed record of boundary enforcement activity
 for a given certificate and reporting period. This is the insurance-facing
 artifact — a verifiable document a deploying entity can hand to an underwriter.
 
+Totals are aggregated in SQL and only the capped violation detail is streamed
+out, so memory stays flat for yearly logs of busy fleets; the PDF renders in a
+worker process and the finished document is cached per certificate and period.
+
 Usage:
     from app.services.compliance_log_service import generate_compliance_log
 
@@ -21,18 +25,21 @@ import base64
 import hashlib
 import json
 import os
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Optional
+from typing import List, Optional, Tuple
 
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.models.models import (
     Certificate,
     EnveloSession,
     TelemetryRecord,
     Violation,
 )
+from app.services.pdf_render_pool import pdf_render_pool
 
 try:
     from cryptography.hazmat.primitives.asymmetric.ed25519 import (
@@ -45,6 +52,11 @@ except ImportError:
     _CRYPTO_AVAILABLE = False
 
 
+VIOLATION_RECORD_CAP = 500     # violations listed in the payload; the count covers all of them
+VIOLATION_MESSAGE_MAX = 500
+VIOLATION_CHUNK_SIZE = 100
+
+
 # ── Signing key management ────────────────────────────────────────────────────
 
 SA_KEY_ID = "sa-compliance-key-1"
@@ -122,104 +134,119 @@ def _canonical_json(data: dict) -> bytes:
     ).encode("utf-8")
 
 
-def _sign(payload: dict) -> str:
-    """Sign canonical JSON of payload, return base64url signature."""
-    key = _load_signing_key()
-    body = _canonical_json(payload)
-    sig = key.sign(body)
+def _sign_body(body: bytes) -> str:
+    """Sign canonical JSON bytes, return base64url signature."""
+    sig = _load_signing_key().sign(body)
     return base64.urlsafe_b64encode(sig).rstrip(b"=").decode("ascii")
 
 
-def _payload_hash(payload: dict) -> str:
-    body = _canonical_json(payload)
-    return "sha256:" + hashlib.sha256(body).hexdigest()
-
 
 # ── Data aggregation ──────────────────────────────────────────────────────────
-
-async def _get_sessions(
-    db: AsyncSession,
-    certificate_db_id: int,
-    period_from: datetime,
-    period_to: datetime,
-) -> list:
-    result = await db.execute(
-        select(EnveloSession).where(
-            and_(
-                EnveloSession.certificate_id == certificate_db_id,
-                EnveloSession.session_type == "production",
-                EnveloSession.started_at >= period_from,
-                EnveloSession.started_at <= period_to,
-            )
-        ).order_by(EnveloSession.started_at)
+# Everything is aggregated in SQL over the period's production sessions; only
+# the capped violation detail leaves the database as rows.
+
+def _session_filter(certificate_db_id: int, period_from: datetime, period_to: datetime) -> tuple:
+    return (
+        EnveloSession.certificate_id == certificate_db_id,
+        EnveloSession.session_type == "production",
+        EnveloSession.started_at >= period_from,
+        EnveloSession.started_at <= period_to,
     )
-    return result.scalars().all()
 
 
-async def _get_violations(
-    db: AsyncSession,
-    session_ids: list[int],
-    period_from: datetime,
-    period_to: datetime,
-) -> list:
-    if not session_ids:
-        return []
-    result = await db.execute(
-        select(Violation).where(
-            and_(
-                Violation.session_id.in_(session_ids),
-                Violation.timestamp >= period_from,
-                Violation.timestamp <= period_to,
-            )
-        ).order_by(Violation.timestamp)
-    )
-    return result.scalars().all()
+async def _session_totals(db: AsyncSession, sessions: tuple) -> dict:
+    row = (await db.execute(
+        select(
+            func.count(EnveloSession.id),
+            func.coalesce(func.sum(EnveloSession.pass_count), 0),
+            func.coalesce(func.sum(EnveloSession.block_count), 0),
+        ).where(*sessions)
+    )).one()
+    return {"sessions": row[0], "passed": int(row[1]), "blocked": int(row[2])}
 
 
 async def _get_telemetry_counts(
     db: AsyncSession,
-    session_ids: list[int],
+    session_ids,
     period_from: datetime,
     period_to: datetime,
 ) -> dict:
-    """Return {total, passed, blocked} counts from telemetry_records."""
-    if not session_ids:
-        return {"total": 0, "passed": 0, "blocked": 0}
-
-    total_q = await db.execute(
-        select(func.count(TelemetryRecord.id)).where(
-            and_(
-                TelemetryRecord.session_id.in_(session_ids),
-                TelemetryRecord.timestamp >= period_from,
-                TelemetryRecord.timestamp <= period_to,
-            )
-        )
-    )
-    pass_q = await db.execute(
-        select(func.count(TelemetryRecord.id)).where(
-            and_(
-                TelemetryRecord.session_id.in_(session_ids),
-                TelemetryRecord.result == "PASS",
-                TelemetryRecord.timestamp >= period_from,
-                TelemetryRecord.timestamp <= period_to,
-            )
+    """Return {total, passed, blocked} counts from telemetry_records in one scan."""
+    row = (await db.execute(
+        select(
+            func.count(TelemetryRecord.id),
+            func.count(TelemetryRecord.id).filter(TelemetryRecord.result == "PASS"),
+            func.count(TelemetryRecord.id).filter(TelemetryRecord.result == "BLOCK"),
+        ).where(
+            TelemetryRecord.session_id.in_(session_ids),
+            TelemetryRecord.timestamp >= period_from,
+            TelemetryRecord.timestamp <= period_to,
         )
+    )).one()
+    return {"total": row[0], "passed": row[1], "blocked": row[2]}
+
+
+def _violation_filter(session_ids, period_from: datetime, period_to: datetime) -> tuple:
+    return (
+        Violation.session_id.in_(session_ids),
+        Violation.timestamp >= period_from,
+        Violation.timestamp <= period_to,
     )
-    block_q = await db.execute(
-        select(func.count(TelemetryRecord.id)).where(
-            and_(
-                TelemetryRecord.session_id.in_(session_ids),
-                TelemetryRecord.result == "BLOCK",
-                TelemetryRecord.timestamp >= period_from,
-                TelemetryRecord.timestamp <= period_to,
-            )
-        )
+
+
+async def _violation_summary(db: AsyncSession, violations: tuple) -> Tuple[int, List[str]]:
+    """(violation count, sorted names of the boundaries that triggered blocks)"""
+    count = (await db.execute(select(func.count(Violation.id)).where(*violations))).scalar() or 0
+    names = (await db.execute(
+        select(Violation.boundary_name).where(*violations, Violation.boundary_name.isnot(None)).distinct()
+    )).scalars().all()
+    return count, sorted(names)
+
+
+async def _violation_records(db: AsyncSession, violations: tuple) -> List[dict]:
+    """The first VIOLATION_RECORD_CAP violations of the period, streamed in chunks.
+    The session's public id comes from a join rather than a lookup per violation."""
+    stmt = (
+        select(Violation.timestamp, Violation.boundary_name, Violation.violation_message, EnveloSession.session_id)
+        .join(EnveloSession, EnveloSession.id == Violation.session_id)
+        .where(*violations)
+        .order_by(Violation.timestamp, Violation.id)
+        .limit(VIOLATION_RECORD_CAP)
+        .execution_options(yield_per=VIOLATION_CHUNK_SIZE)
     )
+    records = []
+    result = await db.stream(stmt)
+    async for rows in result.partitions():
+        # Truncate detail to avoid PII/proprietary leakage
+        records.extend({
+            "timestamp": ts.isoformat() if ts else None,
+            "boundary_name": boundary or "unknown",
+            "message": (message or "")[:VIOLATION_MESSAGE_MAX],
+            "session_id": session_id or "unknown",
+        } for ts, boundary, message, session_id in rows)
+    return records
+
+
+# ── Document cache ────────────────────────────────────────────────────────────
+# Keyed by certificate, period and a hash of the payload content (everything but
+# generated_at): an identical log is served as signed the first time, and any
+# change in the underlying data produces a new document.
 
-    total = total_q.scalar() or 0
-    passed = pass_q.scalar() or 0
-    blocked = block_q.scalar() or 0
-    return {"total": total, "passed": passed, "blocked": blocked}
+_log_cache: "OrderedDict[tuple, Tuple[dict, str, bytes]]" = OrderedDict()
+
+
+def _cache_get(key: tuple) -> Optional[Tuple[dict, str, bytes]]:
+    entry = _log_cache.get(key)
+    if entry is not None:
+        _log_cache.move_to_end(key)
+    return entry
+
+
+def _cache_put(key: tuple, entry: Tuple[dict, str, bytes]):
+    _log_cache[key] = entry
+    _log_cache.move_to_end(key)
+    while len(_log_cache) > settings.COMPLIANCE_LOG_CACHE_SIZE:
+        _log_cache.popitem(last=False)
 
 
 # ── Main entry point ──────────────────────────────────────────────────────────
@@ -239,7 +266,8 @@ async def generate_compliance_log(
     The payload_dict + signature can be used for independent verification:
         canonical_json(payload) → Ed25519 verify with SA public key
 
-    The pdf_bytes is the human-readable artifact for download.
+    The pdf_bytes is the human-readable artifact for download. It is rendered
+    in the PDF worker pool and cached with its payload per certificate and period.
     """
     from app.services.compliance_log_pdf import generate_compliance_log_pdf
 
@@ -249,39 +277,23 @@ async def generate_compliance_log(
     if period_to.tzinfo is not None:
         period_to = period_to.replace(tzinfo=None)
 
-    sessions = await _get_sessions(db, certificate.id, period_from, period_to)
-    session_ids = [s.id for s in sessions]
+    sessions = _session_filter(certificate.id, period_from, period_to)
+    session_ids = select(EnveloSession.id).where(*sessions).scalar_subquery()
+    violations = _violation_filter(session_ids, period_from, period_to)
 
+    session_totals = await _session_totals(db, sessions)
     telemetry_counts = await _get_telemetry_counts(db, session_ids, period_from, period_to)
-    violations = await _get_violations(db, session_ids, period_from, period_to)
-
-    # Aggregate session-level pass/block from EnveloSession counters
-    # (faster than counting telemetry when sessions are large)
-    session_pass = sum(s.pass_count or 0 for s in sessions)
-    session_block = sum(s.block_count or 0 for s in sessions)
+    violation_count, unique_boundaries = await _violation_summary(db, violations)
+    violation_records = await _violation_records(db, violations)
 
     # Prefer telemetry counts if available; fall back to session aggregates
-    total_checks = telemetry_counts["total"] or (session_pass + session_block)
-    total_passed = telemetry_counts["passed"] or session_pass
-    total_blocked = telemetry_counts["blocked"] or session_block
+    # (session counters cover sessions whose telemetry was never stored)
+    total_checks = telemetry_counts["total"] or (session_totals["passed"] + session_totals["blocked"])
+    total_passed = telemetry_counts["passed"] or session_totals["passed"]
+    total_blocked = telemetry_counts["blocked"] or session_totals["blocked"]
 
     block_rate = round((total_blocked / total_checks * 100), 4) if total_checks > 0 else 0.0
 
-    # Unique boundaries that triggered blocks
-    unique_boundaries = list({v.boundary_name for v in violations if v.boundary_name})
-
-    # Violation records — truncate detail to avoid PII/proprietary leakage
-    violation_records = []
-    for v in violations[:500]:  # cap at 500 in payload
-        violation_records.append({
-            "timestamp": v.timestamp.isoformat() if v.timestamp else None,
-            "boundary_name": v.boundary_name or "unknown",
-            "message": v.violation_message or "",
-            "session_id": next(
-                (s.session_id for s in sessions if s.id == v.session_id), "unknown"
-            ),
-        })
-
     # Certificate validity at time of generation
     now = datetime.utcnow()
     cert_valid = (
@@ -295,7 +307,6 @@ async def generate_compliance_log(
     payload = {
         "version": "1",
         "document_type": "oddc_compliance_log",
-        "generated_at": now.isoformat() + "Z",
         "issuer": "Sentinel Authority",
         "issuer_key_id": SA_KEY_ID,
         "certificate": {
@@ -314,7 +325,7 @@ async def generate_compliance_log(
             "to": period_to.isoformat() + "Z",
         },
         "summary": {
-            "total_sessions": len(sessions),
+            "total_sessions": session_totals["sessions"],
             "total_checks": total_checks,
             "passed": total_passed,
             "blocked": total_blocked,
@@ -323,22 +334,34 @@ async def generate_compliance_log(
             "unique_boundaries_triggered": len(unique_boundaries),
             "boundaries_triggered": unique_boundaries,
         },
-        "violation_count": len(violations),
+        "violation_count": violation_count,
         "violations": violation_records,
-        "interlock_status": "active" if sessions else "no_sessions_in_period",
+        "interlock_status": "active" if session_totals["sessions"] else "no_sessions_in_period",
         "verification_note": (
             "This document is signed with the Sentinel Authority compliance key. "
             "Verify at: https://www.sentinelauthority.org/verify-compliance-log"
         ),
     }
 
-    signature = _sign(payload)
-    payload_hash = _payload_hash(payload)
+    content_hash = hashlib.sha256(_canonical_json(payload)).hexdigest()
+    cache_key = (certificate.certificate_number, period_from, period_to, content_hash)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    payload["generated_at"] = now.isoformat() + "Z"
+    # One canonical serialization is both signed and hashed
+    body = _canonical_json(payload)
+    signature = _sign_body(body)
+    payload_hash = "sha256:" + hashlib.sha256(body).hexdigest()
 
-    pdf_bytes = generate_compliance_log_pdf(
+    pdf_bytes = await pdf_render_pool.render(
+        generate_compliance_log_pdf,
         payload=payload,
         signature=signature,
         payload_hash=payload_hash,
     )
 
-    return payload, signature, pdf_bytes
+    entry = (payload, signature, pdf_bytes)
+    _cache_put(cache_key, entry)
+    return entry
@@ -6,7 +6,6 @@ Scrapes sentinelauthority.org on startup and every 6 hours.
 Returns cleaned text for injection into chat system prompt.
 """
 
-import asyncio
 import httpx
 import re
 import logging
@@ -85,12 +84,3 @@ def get_knowledge() -> dict:
         "status": _store["status"],
     }
 
-
-async def scraper_loop():
-    """Background task: scrape on boot, refresh every 6 hours."""
-    logger.info("Content scraper starting initial fetch...")
-    await scrape_website()
-    while True:
-        await asyncio.sleep(REFRESH_INTERVAL_HOURS * 3600)
-        logger.info("Content scraper: refreshing...")
-        await scrape_website()
@@ -0,0 +1,1416 @@
+"""
+Compiled CAT-72 Envelope Evaluator
+- Parses an envelope definition once into typed boundary groups
+- Precomputed numeric limits, categorical membership sets, polygon vertex tables
+  and sorted envelope-curve tables
+- Evaluation semantics identical to the per-sample parse it replaces
+- Compiled evaluators cached per (test ID, envelope hash)
+"""
+
+import hashlib
+import logging
+import math
+import pickle
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPILED_CACHE_SIZE = 512
+# cap on memoized state-vector key lookups per compiled envelope (keys are client-supplied)
+RESOLVED_KEYS_MAX = 4096
+
+# (group, boundary types, default violation name) in classification order,
+# after the geographic/polygon special cases
+BOUNDARY_GROUPS = (
+    ("temporal", ("temporal",), "operating_hours"),
+    ("rate", ("rate_of_change",), "rate_check"),
+    ("compound", ("compound", "conditional"), "conditional"),
+    ("boolean", ("boolean",), "boolean_check"),
+    ("connectivity", ("connectivity",), "connectivity"),
+    ("cumulative", ("cumulative",), "cumulative"),
+    ("statistical", ("statistical", "rolling_window"), "statistical"),
+    ("frequency", ("frequency", "count"), "frequency"),
+    ("sequence", ("sequence", "state_machine"), "sequence"),
+    ("drift", ("drift", "baseline"), "drift"),
+    ("multi_condition", ("multi_condition", "multi_variable"), "multi_condition"),
+    ("exclusion_zone", ("exclusion_zone", "no_fly", "restricted_area"), "exclusion_zone"),
+    ("proximity", ("proximity", "separation", "daa"), "proximity"),
+    ("redundancy", ("redundancy", "min_count"), "redundancy"),
+    ("energy_reserve", ("energy_reserve", "fuel_reserve", "battery_reserve"), "energy_reserve"),
+    ("dynamic", ("dynamic", "notam", "live_boundary"), "dynamic"),
+    ("envelope_curve", ("envelope_curve", "function_boundary", "lookup_table"), "envelope_curve"),
+    ("calculated", ("calculated", "formula", "composite_score"), "calculated"),
+    ("contraindication", ("contraindication", "prohibition", "never"), "contraindication"),
+    ("escalation", ("escalation", "response_time", "time_to_action"), "escalation"),
+    ("protocol", ("protocol", "checklist", "care_bundle"), "protocol"),
+    ("ratio", ("ratio", "proportion", "staffing"), "ratio"),
+    ("jurisdiction", ("jurisdiction", "scope", "authorization"), "jurisdiction"),
+)
+_GROUP_BY_TYPE = {t: (group, default) for group, types, default in BOUNDARY_GROUPS for t in types}
+
+_EARTH_RADIUS_M = 6371000
+
+
+def _norm(name: str) -> str:
+    return name.lower().replace(" ", "_")
+
+
+def _compile_bound(bounds: dict):
+    """One numeric/categorical entry -> ("categorical", allowed list, allowed set) or ("numeric", min, max).
+
+    Entries that cannot be precomputed stay raw and are re-read per sample, so a
+    malformed dict-form boundary fails exactly where it used to.
+    """
+    if not isinstance(bounds, dict):
+        return ("raw", bounds)
+    if bounds.get("type", "numeric") == "categorical":
+        allowed = [str(v).lower() for v in bounds.get("allowed", [])]
+        return ("categorical", allowed, frozenset(allowed))
+    try:
+        return ("numeric", float(bounds.get("min", float("-inf"))), float(bounds.get("max", float("inf"))))
+    except (ValueError, TypeError):
+        return ("raw", bounds)
+
+
+def _skip_malformed(name: str, boundary: dict):
+    """Geometry and curve tables are converted at compile time; one that doesn't
+    parse is left out of the envelope rather than failing every sample."""
+    logger.warning(f"Envelope boundary {name!r} is malformed and is skipped: {boundary!r}")
+
+
+def _ring(vertices) -> Tuple[Tuple[float, float], ...]:
+    return tuple((float(v[0]), float(v[1])) for v in vertices)
+
+
+def _point_in_ring(ring, px: float, py: float) -> bool:
+    """Ray casting; ring is ((lat, lng), ...), px/py are lng/lat."""
+    inside = False
+    yj, xj = ring[-1]
+    for yi, xi in ring:
+        if ((yi > py) != (yj > py)) and (px < (xj - xi) * (py - yi) / (yj - yi + 1e-12) + xi):
+            inside = not inside
+        yj, xj = yi, xi
+    return inside
+
+
+def window_value(v) -> Optional[float]:
+    """A state-vector value as a rolling-window number: numerics as-is, true/false words as 1/0, else None."""
+    if v is None:
+        return None
+    try:
+        return float(v)
+    except (ValueError, TypeError):
+        if isinstance(v, bool):
+            return 1.0 if v else 0.0
+        if str(v).lower() in ("true", "1", "yes", "pass"):
+            return 1.0
+        if str(v).lower() in ("false", "0", "no", "fail"):
+            return 0.0
+        return None
+
+
+def aggregate_values(values: List[float], aggregation: str) -> float:
+    if aggregation == "median":
+        sorted_v = sorted(values)
+        mid = len(sorted_v) // 2
+        return sorted_v[mid] if len(sorted_v) % 2 else (sorted_v[mid-1] + sorted_v[mid]) / 2
+    if aggregation == "sum":
+        return sum(values)
+    if aggregation == "min":
+        return min(values)
+    if aggregation == "max":
+        return max(values)
+    if aggregation == "ratio_true":
+        return sum(1 for v in values if v > 0) / len(values)
+    if aggregation == "stddev":
+        mean = sum(values) / len(values)
+        return (sum((v - mean) ** 2 for v in values) / len(values)) ** 0.5
+    return sum(values) / len(values)  # mean, and the fallback for unknown aggregations
+
+
+class CompiledEnvelope:
+    """An envelope definition parsed once; evaluate() runs per sample."""
+
+    def __init__(self, envelope: Dict[str, Any]):
+        self.source = envelope
+        self.key: Optional[str] = None  # cache key (envelope version or hash), set when cached
+        raw = envelope.get("boundaries", {})
+        groups: Dict[str, list] = {group: [] for group, _, _ in BOUNDARY_GROUPS}
+        geo, polygon = [], []
+        boundaries = {}
+
+        if isinstance(raw, list):
+            for b in raw:
+                btype = _norm(b.get("type", "") or "")
+                key = _norm(b.get("name", "") or btype) or btype
+                if not key:
+                    continue
+                if btype == "geographic" or (b.get("center_lat") is not None and btype != "polygon"):
+                    geo.append(b)
+                elif btype == "polygon" and b.get("vertices"):
+                    polygon.append(b)
+                elif btype in _GROUP_BY_TYPE:
+                    group, default = _GROUP_BY_TYPE[btype]
+                    groups[group].append((_norm(b.get("name", "") or default), b))
+                elif b.get("allowed"):
+                    boundaries[key] = {"type": "categorical", "allowed": [str(v).lower() for v in b["allowed"]]}
+                else:
+                    boundaries[key] = {
+                        "type": "numeric",
+                        "min": float(b["min"]) if b.get("min") is not None else float("-inf"),
+                        "max": float(b["max"]) if b.get("max") is not None else float("inf"),
+                    }
+        elif isinstance(raw, dict):
+            boundaries = raw
+
+        self.bounds = {k: _compile_bound(v) for k, v in boundaries.items() if v}
+        # state-vector key -> resolved entry (or None), filled lazily per variable name
+        self._resolved: Dict[str, Any] = {}
+
+        self.geo = []
+        for b in geo:
+            clat, clng, radius_m = b.get("center_lat"), b.get("center_lng"), b.get("radius_m")
+            if clat is None or clng is None or radius_m is None:
+                continue
+            try:
+                clat, clng = float(clat), float(clng)
+                self.geo.append((clat, clng, math.radians(clat), float(radius_m)))
+            except (ValueError, TypeError):
+                _skip_malformed(b.get("name") or "geofence", b)
+
+        self.polygon = []
+        for b in polygon:
+            vertices = b.get("vertices", [])
+            if len(vertices) < 3:
+                continue
+            try:
+                self.polygon.append((_norm(b.get("name", "") or "polygon_geofence"), _ring(vertices)))
+            except (ValueError, TypeError, IndexError):
+                _skip_malformed(b.get("name") or "polygon_geofence", b)
+
+        for group, _, _ in BOUNDARY_GROUPS:
+            setattr(self, group, groups[group])
+
+        # (variable, window_size) of every rolling window the statistical boundaries read
+        specs = [(sb.get("variable", ""), sb.get("window_size", 100)) for _, sb in self.statistical]
+        self.window_specs = tuple(sorted({(var, size) for var, size in specs
+                                          if var and isinstance(var, str) and isinstance(size, int)}))
+
+        # compound conditions: lowercase membership sets for list values
+        self.compound = [
+            (cname, cb, {cvar: (frozenset(str(v).lower() for v in cval) if isinstance(cval, list) else str(cval).lower())
+                         for cvar, cval in cb.get("condition", {}).items()})
+            for cname, cb in self.compound
+        ]
+
+        # exclusion zones: radius or prebuilt vertex ring, skipped if incomplete or malformed
+        zones = []
+        for ezname, ez in self.exclusion_zone:
+            if ez.get("shape", "polygon") == "radius" or ez.get("center_lat") is not None:
+                clat, clng, radius_m = ez.get("center_lat"), ez.get("center_lng"), ez.get("radius_m")
+                if clat is None or clng is None or radius_m is None:
+                    continue
+                try:
+                    clat, clng = float(clat), float(clng)
+                    zones.append((ezname, "radius", (clat, clng, math.radians(clat), float(radius_m))))
+                except (ValueError, TypeError):
+                    _skip_malformed(ezname, ez)
+            elif ez.get("vertices"):
+                vertices = ez.get("vertices", [])
+                if len(vertices) < 3:
+                    continue
+                try:
+                    zones.append((ezname, "polygon", _ring(vertices)))
+                except (ValueError, TypeError, IndexError):
+                    _skip_malformed(ezname, ez)
+        self.exclusion_zone = zones
+
+        # envelope curves: points sorted by x and converted once
+        curves = []
+        for ecname, ec in self.envelope_curve:
+            input_variable = ec.get("input_variable")
+            output_variable = ec.get("output_variable")
+            points = ec.get("points", [])
+            if not input_variable or not output_variable or len(points) < 2:
+                continue
+            try:
+                table = tuple((float(p[0]), float(p[1])) for p in sorted(points, key=lambda p: float(p[0])))
+            except (ValueError, TypeError, IndexError):
+                _skip_malformed(ecname, ec)
+                continue
+            curves.append((ecname, input_variable, output_variable, ec.get("curve_type", "max"), table))
+        self.envelope_curve = curves
+
+        # rough per-sample work: one unit per simple check, polygon vertices and
+        # curve points count individually; decides inline vs process-pool evaluation
+        self.cost = len(self.bounds) + 4 * len(self.geo) + sum(len(ring) for _, ring in self.polygon)
+        self.cost += sum(len(data) if kind == "polygon" else 4 for _, kind, data in self.exclusion_zone)
+        self.cost += sum(len(table) for *_, table in self.envelope_curve)
+        self.cost += sum(len(getattr(self, group)) for group, _, _ in BOUNDARY_GROUPS
+                         if group not in ("exclusion_zone", "envelope_curve"))
+
+    def _resolve(self, var: str):
+        key = var.lower().replace(" ", "_")
+        if key in ("latitude", "longitude", "timestamp"):
+            return None
+        return self.bounds.get(var) or self.bounds.get(key)
+
+    def evaluate(
+        self,
+        state_vector: Dict[str, Any],
+        prev_state_vector: Optional[Dict[str, Any]] = None,
+        sample_interval_s: Optional[float] = None,
+        current_timestamp: Optional[datetime] = None,
+        test_stats: Optional[Dict[str, Any]] = None,
+        recent_samples: Optional[List[Dict[str, Any]]] = None,
+        recent_violations_count: int = 0,
+        recent_violations_window: int = 0,
+        cumulative_state: Optional[Dict[str, Any]] = None,
+        baseline_metrics: Optional[Dict[str, Any]] = None,
+        windows: Optional[Dict[Tuple[str, Any], Any]] = None,
+    ) -> tuple:
+        """Returns (in_envelope, min_distance, violations), same as check_envelope."""
+        min_distance = float("inf")
+        in_envelope = True
+        violations = []
+
+        # ── 1. NUMERIC & CATEGORICAL ─────────────────────────────
+        resolved = self._resolved
+        for var, value in state_vector.items():
+            try:
+                bounds = resolved[var]
+            except KeyError:
+                bounds = self._resolve(var)
+                if len(resolved) < RESOLVED_KEYS_MAX:
+                    resolved[var] = bounds
+            if not bounds:
+                continue
+
+            if bounds[0] == "categorical":
+                if str(value).lower() not in bounds[2]:
+                    in_envelope = False
+                    violations.append({"var": var, "value": value, "bound": "allowed", "threshold": list(bounds[1])})
+                    min_distance = min(min_distance, 1)
+                else:
+                    min_distance = min(min_distance, 0)
+            else:
+                try:
+                    fval = float(value)
+                except (ValueError, TypeError):
+                    violations.append({"var": var, "value": str(value), "bound": "type_error", "threshold": "numeric expected"})
+                    in_envelope = False
+                    continue
+                if bounds[0] == "numeric":
+                    min_val, max_val = bounds[1], bounds[2]
+                else:
+                    min_val = float(bounds[1].get("min", float("-inf")))
+                    max_val = float(bounds[1].get("max", float("inf")))
+                if fval < min_val:
+                    in_envelope = False
+                    violations.append({"var": var, "value": fval, "bound": "min", "threshold": min_val})
+                    distance = min_val - fval
+                elif fval > max_val:
+                    in_envelope = False
+                    violations.append({"var": var, "value": fval, "bound": "max", "threshold": max_val})
+                    distance = fval - max_val
+                else:
+                    distance = min(fval - min_val, max_val - fval)
+                min_distance = min(min_distance, distance)
+
+        # ── 2. GEOGRAPHIC (radius geofence) ──────────────────────
+        sv_lat = state_vector.get("latitude")
+        sv_lng = state_vector.get("longitude")
+        if sv_lat is not None and sv_lng is not None:
+            for clat, clng, lat1, radius_m in self.geo:
+                lat2 = math.radians(float(sv_lat))
+                dlat = math.radians(float(sv_lat) - clat)
+                dlng = math.radians(float(sv_lng) - clng)
+                a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlng/2)**2
+                c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+                dist_m = _EARTH_RADIUS_M * c
+                if dist_m > radius_m:
+                    in_envelope = False
+                    violations.append({
+                        "var": "geofence", "value": round(dist_m, 1),
+                        "bound": "radius", "threshold": radius_m,
+                        "center": [clat, clng],
+                        "position": [float(sv_lat), float(sv_lng)]
+                    })
+                    distance = dist_m - radius_m
+                else:
+                    distance = radius_m - dist_m
+                min_distance = min(min_distance, distance)
+
+        # ── 3. POLYGON GEOFENCE (point-in-polygon, ray casting) ──
+        if sv_lat is not None and sv_lng is not None:
+            for pname, ring in self.polygon:
+                if not _point_in_ring(ring, float(sv_lng), float(sv_lat)):
+                    in_envelope = False
+                    violations.append({
+                        "var": pname, "value": [float(sv_lat), float(sv_lng)],
+                        "bound": "polygon", "threshold": f"{len(ring)}-vertex boundary"
+                    })
+                    min_distance = min(min_distance, 1)
+
+        # ── 4. TEMPORAL (time-of-day windows) ─────────────────────
+        if current_timestamp and self.temporal:
+            for tname, tb in self.temporal:
+                start_h = tb.get("start_hour", 0)
+                end_h = tb.get("end_hour", 24)
+                allowed_days = tb.get("allowed_days")  # e.g. [0,1,2,3,4] for Mon-Fri
+
+                current_hour = current_timestamp.hour + current_timestamp.minute / 60.0
+                current_dow = current_timestamp.weekday()
+
+                # Check time-of-day
+                time_ok = False
+                if start_h <= end_h:
+                    time_ok = start_h <= current_hour < end_h
+                else:
+                    # Overnight window, e.g. 22:00-06:00
+                    time_ok = current_hour >= start_h or current_hour < end_h
+
+                # Check day-of-week if specified
+                day_ok = True
+                if allowed_days is not None:
+                    day_ok = current_dow in allowed_days
+
+                if not time_ok or not day_ok:
+                    in_envelope = False
+                    detail = {}
+                    if not time_ok:
+                        detail["current_hour"] = round(current_hour, 2)
+                        detail["allowed_window"] = f"{start_h}:00-{end_h}:00"
+                    if not day_ok:
+                        detail["current_day"] = current_dow
+                        detail["allowed_days"] = allowed_days
+                    violations.append({
+                        "var": tname, "value": detail,
+                        "bound": "temporal", "threshold": {"start_hour": start_h, "end_hour": end_h}
+                    })
+                    min_distance = min(min_distance, 1)
+
+        # ── 5. RATE OF CHANGE (delta between consecutive samples) ─
+        if prev_state_vector and sample_interval_s and sample_interval_s > 0:
+            for rname, rb in self.rate:
+                variable = rb.get("variable", "")
+                max_rate = rb.get("max_rate")
+                if not variable or max_rate is None:
+                    continue
+
+                curr_val = state_vector.get(variable)
+                prev_val = prev_state_vector.get(variable)
+                if curr_val is None or prev_val is None:
+                    continue
+
+                try:
+                    delta = abs(float(curr_val) - float(prev_val))
+                    rate = delta / sample_interval_s
+                    if rate > float(max_rate):
+                        in_envelope = False
+                        violations.append({
+                            "var": rname, "value": round(rate, 4),
+                            "bound": "max_rate", "threshold": float(max_rate),
+                            "variable": variable,
+                            "delta": round(delta, 4),
+                            "interval_s": round(sample_interval_s, 2)
+                        })
+                        distance = rate - float(max_rate)
+                        min_distance = min(min_distance, distance)
+                except (ValueError, TypeError):
+                    continue
+
+        # ── 6. COMPOUND / CONDITIONAL ─────────────────────────────
+        for cname, cb, compiled_condition in self.compound:
+            condition = cb.get("condition", {})
+            then_rules = cb.get("then", {})
+
+            # Check if condition is met
+            condition_met = True
+            for cvar, cval in compiled_condition.items():
+                sv_val = state_vector.get(cvar)
+                if sv_val is None:
+                    condition_met = False
+                    break
+                if isinstance(cval, frozenset):
+                    if str(sv_val).lower() not in cval:
+                        condition_met = False
+                        break
+                elif str(sv_val).lower() != cval:
+                    condition_met = False
+                    break
+
+            if condition_met:
+                # Apply conditional sub-boundaries
+                for tvar, trule in then_rules.items():
+                    sv_val = state_vector.get(tvar)
+                    if sv_val is None:
+                        continue
+                    try:
+                        fval = float(sv_val)
+                    except (ValueError, TypeError):
+                        continue
+                    tmin = float(trule.get("min", float("-inf"))) if isinstance(trule, dict) else float("-inf")
+                    tmax = float(trule.get("max", float("inf"))) if isinstance(trule, dict) else float("inf")
+                    if fval < tmin:
+                        in_envelope = False
+                        violations.append({
+                            "var": cname, "value": fval,
+                            "bound": "conditional_min", "threshold": tmin,
+                            "condition": condition, "target": tvar
+                        })
+                        min_distance = min(min_distance, tmin - fval)
+                    elif fval > tmax:
+                        in_envelope = False
+                        violations.append({
+                            "var": cname, "value": fval,
+                            "bound": "conditional_max", "threshold": tmax,
+                            "condition": condition, "target": tvar
+                        })
+                        min_distance = min(min_distance, fval - tmax)
+
+        # ── 7. BOOLEAN (sensor health, system state) ──────────────
+        for bname, bb in self.boolean:
+            variable = bb.get("variable", bname)
+            required = bb.get("required_value", True)
+
+            sv_val = state_vector.get(variable)
+            if sv_val is None:
+                # Missing required sensor → violation
+                in_envelope = False
+                violations.append({
+                    "var": bname, "value": None,
+                    "bound": "boolean_missing", "threshold": required,
+                    "variable": variable
+                })
+                min_distance = min(min_distance, 1)
+            else:
+                # Coerce to bool
+                if isinstance(sv_val, str):
+                    bval = sv_val.lower() in ("true", "1", "yes", "on", "active", "operational")
+                else:
+                    bval = bool(sv_val)
+                if bval != required:
+                    in_envelope = False
+                    violations.append({
+                        "var": bname, "value": bval,
+                        "bound": "boolean", "threshold": required,
+                        "variable": variable
+                    })
+                    min_distance = min(min_distance, 1)
+
+        # ── 8. CONNECTIVITY (heartbeat gap) ───────────────────────
+        if sample_interval_s is not None:
+            for cname, conn in self.connectivity:
+                max_gap = conn.get("max_gap_seconds")
+                if max_gap is None:
+                    continue
+                if sample_interval_s > float(max_gap):
+                    in_envelope = False
+                    violations.append({
+                        "var": cname, "value": round(sample_interval_s, 2),
+                        "bound": "max_gap", "threshold": float(max_gap),
+                    })
+                    min_distance = min(min_distance, sample_interval_s - float(max_gap))
+
+
+        # ── 9. CUMULATIVE (running totals) ────────────────────────
+        # "total distance < 100km", "total transactions < $1M"
+        if cumulative_state:
+            for cname, cum in self.cumulative:
+                variable = cum.get("variable", "")
+                max_total = cum.get("max_total")
+                min_total = cum.get("min_total")
+                if not variable:
+                    continue
+
+                current_total = cumulative_state.get(variable, 0)
+                # Add current sample value to running total
+                sv_val = state_vector.get(variable)
+                if sv_val is not None:
+                    try:
+                        current_total += float(sv_val)
+                    except (ValueError, TypeError):
+                        pass
+
+                if max_total is not None and current_total > float(max_total):
+                    in_envelope = False
+                    violations.append({
+                        "var": cname, "value": round(current_total, 4),
+                        "bound": "max_total", "threshold": float(max_total),
+                        "variable": variable
+                    })
+                    min_distance = min(min_distance, current_total - float(max_total))
+
+                if min_total is not None and current_total < float(min_total):
+                    in_envelope = False
+                    violations.append({
+                        "var": cname, "value": round(current_total, 4),
+                        "bound": "min_total", "threshold": float(min_total),
+                        "variable": variable
+                    })
+                    min_distance = min(min_distance, float(min_total) - current_total)
+
+        # ── 10. STATISTICAL / ROLLING WINDOW ──────────────────────
+        # "accuracy > 95% over last 100 decisions", "false_positive_rate < 5%"
+        # Incrementally maintained `windows` (keyed by window_specs) take
+        # precedence over re-aggregating `recent_samples`.
+        if windows or recent_samples:
+            for sname, sb in self.statistical:
+                variable = sb.get("variable", "")
+                window_size = sb.get("window_size", 100)
+                min_value = sb.get("min_value")
+                max_value = sb.get("max_value")
+                aggregation = sb.get("aggregation", "mean")  # mean, median, sum, min, max, ratio_true
+
+                if not variable:
+                    continue
+
+                if windows is not None:
+                    window = windows.get((variable, window_size))
+                    if window is None or not window.count:
+                        continue
+                    agg_val, n_values = window.aggregate(aggregation), window.count
+                else:
+                    values = []
+                    for s in recent_samples[-window_size:]:
+                        v = window_value((s if isinstance(s, dict) else {}).get(variable))
+                        if v is not None:
+                            values.append(v)
+                    if not values:
+                        continue
+                    agg_val, n_values = aggregate_values(values, aggregation), len(values)
+
+                if min_value is not None and agg_val < float(min_value):
+                    in_envelope = False
+                    violations.append({
+                        "var": sname, "value": round(agg_val, 4),
+                        "bound": "min_value", "threshold": float(min_value),
+                        "aggregation": aggregation,
+                        "window_actual": n_values,
+                        "window_requested": window_size
+                    })
+                    min_distance = min(min_distance, float(min_value) - agg_val)
+
+                if max_value is not None and agg_val > float(max_value):
+                    in_envelope = False
+                    violations.append({
+                        "var": sname, "value": round(agg_val, 4),
+                        "bound": "max_value", "threshold": float(max_value),
+                        "aggregation": aggregation,
+                        "window_actual": n_values,
+                        "window_requested": window_size
+                    })
+                    min_distance = min(min_distance, agg_val - float(max_value))
+
+        # ── 11. FREQUENCY / COUNT ─────────────────────────────────
+        # "max 3 emergency stops per hour", "max 10 violations before halt"
+        for fname, fb in self.frequency:
+            max_count = fb.get("max_count")
+            window_seconds = fb.get("window_seconds")
+
+            if max_count is None:
+                continue
+
+            # Use recent_violations_count and window passed from caller
+            relevant_count = recent_violations_count
+            if window_seconds and recent_violations_window:
+                # Scale if the window we got doesn't match what's requested
+                if recent_violations_window > 0 and recent_violations_window != window_seconds:
+                    relevant_count = int(relevant_count * (float(window_seconds) / recent_violations_window))
+
+            if relevant_count > int(max_count):
+                in_envelope = False
+                violations.append({
+                    "var": fname, "value": relevant_count,
+                    "bound": "max_count", "threshold": int(max_count),
+                    "window_seconds": window_seconds
+                })
+                min_distance = min(min_distance, relevant_count - int(max_count))
+
+        # ── 12. SEQUENCE / STATE MACHINE ──────────────────────────
+        # "must complete pre-flight before takeoff", "verify identity before dispense"
+        for seqname, seq in self.sequence:
+            required_state = seq.get("required_state")  # state that must be current
+            prerequisite = seq.get("prerequisite")  # state_vector key that must be true/present
+            prerequisite_value = seq.get("prerequisite_value", True)
+            action_key = seq.get("action_key")  # what triggers the check
+
+            if not action_key:
+                continue
+
+            # Only check if the action is being attempted
+            action_val = state_vector.get(action_key)
+            if action_val is None:
+                continue
+
+            # Coerce to check if action is "active"
+            action_active = False
+            if isinstance(action_val, bool):
+                action_active = action_val
+            elif isinstance(action_val, (int, float)):
+                action_active = action_val > 0
+            else:
+                action_active = str(action_val).lower() in ("true", "1", "yes", "active", "on")
+
+            if not action_active:
+                continue
+
+            # Check prerequisite
+            if prerequisite:
+                prereq_val = state_vector.get(prerequisite)
+                if prereq_val is None:
+                    in_envelope = False
+                    violations.append({
+                        "var": seqname, "value": None,
+                        "bound": "prerequisite_missing", "threshold": prerequisite,
+                        "action": action_key
+                    })
+                    min_distance = min(min_distance, 1)
+                else:
+                    # Check if prereq matches required value
+                    if isinstance(prerequisite_value, bool):
+                        pval = str(prereq_val).lower() in ("true", "1", "yes")
+                        if pval != prerequisite_value:
+                            in_envelope = False
+                            violations.append({
+                                "var": seqname, "value": prereq_val,
+                                "bound": "prerequisite_not_met", "threshold": prerequisite_value,
+                                "prerequisite": prerequisite, "action": action_key
+                            })
+                            min_distance = min(min_distance, 1)
+                    elif str(prereq_val).lower() != str(prerequisite_value).lower():
+                        in_envelope = False
+                        violations.append({
+                            "var": seqname, "value": prereq_val,
+                            "bound": "prerequisite_not_met", "threshold": prerequisite_value,
+                            "prerequisite": prerequisite, "action": action_key
+                        })
+                        min_distance = min(min_distance, 1)
+
+            if required_state:
+                current_state = state_vector.get("system_state") or state_vector.get("state")
+                if current_state and str(current_state).lower() != str(required_state).lower():
+                    in_envelope = False
+                    violations.append({
+                        "var": seqname, "value": current_state,
+                        "bound": "wrong_state", "threshold": required_state,
+                        "action": action_key
+                    })
+                    min_distance = min(min_distance, 1)
+
+        # ── 13. DRIFT / BASELINE DEGRADATION ──────────────────────
+        # "confidence must not degrade > 10% from baseline"
+        if baseline_metrics:
+            for dname, db_ in self.drift:
+                variable = db_.get("variable", "")
+                max_drift_pct = db_.get("max_drift_pct")  # max % change from baseline
+                max_drift_abs = db_.get("max_drift_abs")  # max absolute change
+                direction = db_.get("direction", "both")  # "up", "down", "both"
+
+                if not variable:
+                    continue
+
+                baseline_val = baseline_metrics.get(variable)
+                current_val = state_vector.get(variable)
+
+                if baseline_val is None or current_val is None:
+                    continue
+
+                try:
+                    bv = float(baseline_val)
+                    cv = float(current_val)
+                except (ValueError, TypeError):
+                    continue
+
+                abs_change = cv - bv
+                pct_change = (abs_change / bv * 100) if bv != 0 else 0
+
+                violated = False
+                if max_drift_pct is not None:
+                    if direction == "down" and pct_change < -float(max_drift_pct):
+                        violated = True
+                    elif direction == "up" and pct_change > float(max_drift_pct):
+                        violated = True
+                    elif direction == "both" and abs(pct_change) > float(max_drift_pct):
+                        violated = True
+
+                if max_drift_abs is not None:
+                    if direction == "down" and abs_change < -float(max_drift_abs):
+                        violated = True
+                    elif direction == "up" and abs_change > float(max_drift_abs):
+                        violated = True
+                    elif direction == "both" and abs(abs_change) > float(max_drift_abs):
+                        violated = True
+
+                if violated:
+                    in_envelope = False
+                    violations.append({
+                        "var": dname, "value": round(cv, 4),
+                        "bound": "drift",
+                        "baseline": round(bv, 4),
+                        "drift_pct": round(pct_change, 2),
+                        "drift_abs": round(abs_change, 4),
+                        "max_drift_pct": max_drift_pct,
+                        "max_drift_abs": max_drift_abs,
+                        "direction": direction
+                    })
+                    min_distance = min(min_distance, abs(abs_change))
+
+        # ── 14. MULTI-CONDITION (AND/OR across variables) ─────────
+        # "if speed > 15 AND wind > 20 AND rain = true, then halt"
+        for mcname, mc in self.multi_condition:
+            conditions = mc.get("conditions", [])
+            logic = mc.get("logic", "all")  # "all" (AND) or "any" (OR)
+            action = mc.get("action", "violate")  # "violate" = flag if conditions met
+
+            if not conditions:
+                continue
+
+            results = []
+            for cond in conditions:
+                cvar = cond.get("variable", "")
+                cop = cond.get("operator", "eq")  # eq, neq, gt, gte, lt, lte, in, not_in
+                cval = cond.get("value")
+
+                sv_val = state_vector.get(cvar)
+                if sv_val is None:
+                    results.append(False)
+                    continue
+
+                try:
+                    sv_num = float(sv_val)
+                    cval_num = float(cval) if not isinstance(cval, list) else None
+                except (ValueError, TypeError):
+                    sv_num = None
+                    cval_num = None
+
+                if cop == "eq":
+                    results.append(str(sv_val).lower() == str(cval).lower())
+                elif cop == "neq":
+                    results.append(str(sv_val).lower() != str(cval).lower())
+                elif cop == "gt" and sv_num is not None and cval_num is not None:
+                    results.append(sv_num > cval_num)
+                elif cop == "gte" and sv_num is not None and cval_num is not None:
+                    results.append(sv_num >= cval_num)
+                elif cop == "lt" and sv_num is not None and cval_num is not None:
+                    results.append(sv_num < cval_num)
+                elif cop == "lte" and sv_num is not None and cval_num is not None:
+                    results.append(sv_num <= cval_num)
+                elif cop == "in" and isinstance(cval, list):
+                    results.append(str(sv_val).lower() in [str(v).lower() for v in cval])
+                elif cop == "not_in" and isinstance(cval, list):
+                    results.append(str(sv_val).lower() not in [str(v).lower() for v in cval])
+                else:
+                    results.append(False)
+
+            # Evaluate logic
+            if logic == "all":
+                triggered = all(results) if results else False
+            else:  # "any"
+                triggered = any(results) if results else False
+
+            if triggered and action == "violate":
+                in_envelope = False
+                violations.append({
+                    "var": mcname,
+                    "value": {c.get("variable", ""): state_vector.get(c.get("variable", "")) for c in conditions},
+                    "bound": "multi_condition",
+                    "logic": logic,
+                    "conditions_met": sum(results),
+                    "conditions_total": len(results)
+                })
+                min_distance = min(min_distance, 1)
+
+
+        # ══════════════════════════════════════════════════════════
+        # AVIATION / ADVANCED BOUNDARIES (16-21)
+        # ══════════════════════════════════════════════════════════
+
+        # ── 16. EXCLUSION ZONE (must stay OUT of area) ────────────
+        if sv_lat is not None and sv_lng is not None:
+            for ezname, shape, zone in self.exclusion_zone:
+                if shape == "radius":
+                    clat, clng, lat1, radius_m = zone
+                    lat2 = math.radians(float(sv_lat))
+                    dlat = math.radians(float(sv_lat) - clat)
+                    dlng = math.radians(float(sv_lng) - clng)
+                    a = math.sin(dlat/2)**2 + math.cos(lat1)*math.cos(lat2)*math.sin(dlng/2)**2
+                    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+                    dist_m = _EARTH_RADIUS_M * c
+                    if dist_m <= radius_m:
+                        in_envelope = False
+                        violations.append({
+                            "var": ezname, "value": round(dist_m, 1),
+                            "bound": "exclusion_radius", "threshold": radius_m,
+                            "penetration_m": round(radius_m - dist_m, 1)
+                        })
+                        min_distance = min(min_distance, radius_m - dist_m)
+
+                elif _point_in_ring(zone, float(sv_lng), float(sv_lat)):
+                    in_envelope = False
+                    violations.append({
+                        "var": ezname, "value": [float(sv_lat), float(sv_lng)],
+                        "bound": "exclusion_polygon",
+                        "threshold": f"{len(zone)}-vertex exclusion zone"
+                    })
+                    min_distance = min(min_distance, 1)
+
+        # ── 17. PROXIMITY / SEPARATION (DAA) ──────────────────────
+        for pname, prox in self.proximity:
+            min_separation_m = prox.get("min_separation_m")
+            objects_key = prox.get("objects_key", "nearby_objects")
+            if min_separation_m is None:
+                continue
+            nearby = state_vector.get(objects_key)
+            if not nearby:
+                continue
+            if isinstance(nearby, list):
+                for idx_obj, obj in enumerate(nearby):
+                    if isinstance(obj, dict):
+                        if "distance_m" in obj:
+                            dist = float(obj["distance_m"])
+                        elif "lat" in obj and "lng" in obj and sv_lat is not None and sv_lng is not None:
+                            R = 6371000
+                            lat1, lat2 = math.radians(float(sv_lat)), math.radians(float(obj["lat"]))
+                            dlat = math.radians(float(obj["lat"]) - float(sv_lat))
+                            dlng = math.radians(float(obj["lng"]) - float(sv_lng))
+                            a = math.sin(dlat/2)**2 + math.cos(lat1)*math.cos(lat2)*math.sin(dlng/2)**2
+                            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+                            dist = R * c
+                        else:
+                            continue
+                        if dist < float(min_separation_m):
+                            in_envelope = False
+                            violations.append({
+                                "var": pname, "value": round(dist, 1),
+                                "bound": "min_separation", "threshold": float(min_separation_m),
+                                "object_id": obj.get("id", f"object_{idx_obj}")
+                            })
+                            min_distance = min(min_distance, float(min_separation_m) - dist)
+            elif isinstance(nearby, (int, float)):
+                if float(nearby) < float(min_separation_m):
+                    in_envelope = False
+                    violations.append({
+                        "var": pname, "value": float(nearby),
+                        "bound": "min_separation", "threshold": float(min_separation_m)
+                    })
+                    min_distance = min(min_distance, float(min_separation_m) - float(nearby))
+
+        # ── 18. REDUNDANCY (min operational subsystems) ───────────
+        for rname, red in self.redundancy:
+            variables = red.get("variables", [])
+            group_key = red.get("group_key")
+            min_operational = red.get("min_operational", 1)
+            if group_key:
+                count_val = state_vector.get(group_key)
+                if count_val is not None:
+                    try:
+                        count = int(float(count_val))
+                    except (ValueError, TypeError):
+                        count = 0
+                    if count < int(min_operational):
+                        in_envelope = False
+                        violations.append({
+                            "var": rname, "value": count,
+                            "bound": "min_operational", "threshold": int(min_operational)
+                        })
+                        min_distance = min(min_distance, int(min_operational) - count)
+            elif variables:
+                operational = 0
+                for v in variables:
+                    sv_val = state_vector.get(v)
+                    if sv_val is None:
+                        continue
+                    if isinstance(sv_val, bool) and sv_val:
+                        operational += 1
+                    elif isinstance(sv_val, (int, float)) and float(sv_val) > 0:
+                        operational += 1
+                    elif isinstance(sv_val, str) and sv_val.lower() in ("true", "1", "yes", "on", "active", "operational"):
+                        operational += 1
+                if operational < int(min_operational):
+                    in_envelope = False
+                    violations.append({
+                        "var": rname, "value": operational,
+                        "bound": "min_operational", "threshold": int(min_operational),
+                        "total_subsystems": len(variables)
+                    })
+                    min_distance = min(min_distance, int(min_operational) - operational)
+
+        # ── 19. ENERGY RESERVE ────────────────────────────────────
+        for ername, er in self.energy_reserve:
+            current_key = er.get("current_key", "battery_pct")
+            consumption_rate_key = er.get("consumption_rate_key")
+            min_reserve_pct = er.get("min_reserve_pct")
+            min_reserve_abs = er.get("min_reserve_abs")
+            min_reserve_time_s = er.get("min_reserve_time_s")
+            current_energy = state_vector.get(current_key)
+            if current_energy is None:
+                continue
+            try:
+                energy = float(current_energy)
+            except (ValueError, TypeError):
+                continue
+            if min_reserve_pct is not None and energy < float(min_reserve_pct):
+                in_envelope = False
+                violations.append({"var": ername, "value": round(energy, 2), "bound": "min_reserve_pct", "threshold": float(min_reserve_pct)})
+                min_distance = min(min_distance, float(min_reserve_pct) - energy)
+            if min_reserve_abs is not None and energy < float(min_reserve_abs):
+                in_envelope = False
+                violations.append({"var": ername, "value": round(energy, 2), "bound": "min_reserve_abs", "threshold": float(min_reserve_abs)})
+                min_distance = min(min_distance, float(min_reserve_abs) - energy)
+            if min_reserve_time_s is not None and consumption_rate_key:
+                rate = state_vector.get(consumption_rate_key)
+                if rate is not None:
+                    try:
+                        rate_f = float(rate)
+                        if rate_f > 0:
+                            time_remaining = energy / rate_f
+                            if time_remaining < float(min_reserve_time_s):
+                                in_envelope = False
+                                violations.append({"var": ername, "value": round(time_remaining, 1), "bound": "min_reserve_time", "threshold": float(min_reserve_time_s)})
+                                min_distance = min(min_distance, float(min_reserve_time_s) - time_remaining)
+                    except (ValueError, TypeError):
+                        pass
+
+        # ── 20. DYNAMIC BOUNDARY (NOTAMs, live feeds) ─────────────
+        for dname, dyn in self.dynamic:
+            status_key = dyn.get("status_key")
+            violation_value = dyn.get("violation_value", "active")
+            detail_key = dyn.get("detail_key")
+            if not status_key:
+                continue
+            sv_val = state_vector.get(status_key)
+            if sv_val is None:
+                continue
+            is_violation = False
+            if isinstance(violation_value, list):
+                is_violation = str(sv_val).lower() in [str(v).lower() for v in violation_value]
+            elif isinstance(violation_value, bool):
+                sv_bool = str(sv_val).lower() in ("true", "1", "yes", "active") if not isinstance(sv_val, bool) else sv_val
+                is_violation = sv_bool == violation_value
+            else:
+                is_violation = str(sv_val).lower() == str(violation_value).lower()
+            if is_violation:
+                detail = state_vector.get(detail_key, "") if detail_key else ""
+                in_envelope = False
+                violations.append({"var": dname, "value": sv_val, "bound": "dynamic_condition", "threshold": violation_value, "detail": detail})
+                min_distance = min(min_distance, 1)
+
+        # ── 21. ENVELOPE CURVE (piecewise function) ───────────────
+        for ecname, input_variable, output_variable, curve_type, table in self.envelope_curve:
+            input_val = state_vector.get(input_variable)
+            output_val = state_vector.get(output_variable)
+            if input_val is None or output_val is None:
+                continue
+            try:
+                x = float(input_val)
+                y = float(output_val)
+            except (ValueError, TypeError):
+                continue
+            limit = None
+            if x <= table[0][0]:
+                limit = table[0][1]
+            elif x >= table[-1][0]:
+                limit = table[-1][1]
+            else:
+                for i in range(len(table) - 1):
+                    x0, y0 = table[i]
+                    x1, y1 = table[i+1]
+                    if x0 <= x <= x1:
+                        t = (x - x0) / (x1 - x0) if x1 != x0 else 0
+                        limit = y0 + t * (y1 - y0)
+                        break
+            if limit is None:
+                continue
+            violated = False
+            if curve_type == "max" and y > limit:
+                violated = True
+                edist = y - limit
+            elif curve_type == "min" and y < limit:
+                violated = True
+                edist = limit - y
+            if violated:
+                in_envelope = False
+                violations.append({
+                    "var": ecname, "value": round(y, 4), "bound": f"curve_{curve_type}",
+                    "threshold": round(limit, 4), "input_variable": input_variable, "input_value": round(x, 4)
+                })
+                min_distance = min(min_distance, edist)
+
+        # ══════════════════════════════════════════════════════════
+        # HEALTHCARE / MEDICAL BOUNDARIES (22-27)
+        # ══════════════════════════════════════════════════════════
+
+        # ── 22. CALCULATED / FORMULA (composite scores, dosing) ───
+        for calcname, calc in self.calculated:
+            formula_type = calc.get("formula_type", "weighted_sum")
+            inputs = calc.get("inputs", [])
+            result_min = calc.get("result_min")
+            result_max = calc.get("result_max")
+            divisor_variable = calc.get("divisor_variable")
+            multiplier_variable = calc.get("multiplier_variable")
+            thresholds = calc.get("thresholds", [])
+            if not inputs:
+                continue
+            computed = 0
+            all_present = True
+            if formula_type == "weighted_sum":
+                for inp in inputs:
+                    sv_val = state_vector.get(inp.get("variable", ""))
+                    if sv_val is None:
+                        all_present = False
+                        break
+                    try:
+                        computed += float(sv_val) * float(inp.get("weight", 1)) + float(inp.get("offset", 0))
+                    except (ValueError, TypeError):
+                        all_present = False
+                        break
+            elif formula_type == "product":
+                computed = 1
+                for inp in inputs:
+                    sv_val = state_vector.get(inp.get("variable", ""))
+                    if sv_val is None:
+                        all_present = False
+                        break
+                    try:
+                        computed *= float(sv_val)
+                    except (ValueError, TypeError):
+                        all_present = False
+                        break
+            elif formula_type == "lookup_sum":
+                for inp in inputs:
+                    sv_val = state_vector.get(inp.get("variable", ""))
+                    if sv_val is None:
+                        all_present = False
+                        break
+                    lookup = inp.get("lookup", [])
+                    score = 0
+                    try:
+                        fval = float(sv_val)
+                    except (ValueError, TypeError):
+                        fval = None
+                    if isinstance(lookup, list):
+                        for entry in lookup:
+                            if fval is not None:
+                                if float(entry.get("min", float("-inf"))) <= fval <= float(entry.get("max", float("inf"))):
+                                    score = float(entry.get("score", 0))
+                                    break
+                            elif "value" in entry and str(sv_val).lower() == str(entry["value"]).lower():
+                                score = float(entry.get("score", 0))
+                                break
+                    computed += score
+            if not all_present:
+                continue
+            if divisor_variable:
+                dv = state_vector.get(divisor_variable)
+                if dv is not None:
+                    try:
+                        dvf = float(dv)
+                        if dvf > 0:
+                            computed = computed / dvf
+                    except (ValueError, TypeError):
+                        pass
+            if multiplier_variable:
+                mv = state_vector.get(multiplier_variable)
+                if mv is not None:
+                    try:
+                        computed = computed * float(mv)
+                    except (ValueError, TypeError):
+                        pass
+            if result_max is not None and computed > float(result_max):
+                in_envelope = False
+                violations.append({"var": calcname, "value": round(computed, 4), "bound": "formula_max", "threshold": float(result_max)})
+                min_distance = min(min_distance, computed - float(result_max))
+            if result_min is not None and computed < float(result_min):
+                in_envelope = False
+                violations.append({"var": calcname, "value": round(computed, 4), "bound": "formula_min", "threshold": float(result_min)})
+                min_distance = min(min_distance, float(result_min) - computed)
+            if thresholds:
+                for tier in thresholds:
+                    if float(tier.get("min", float("-inf"))) <= computed <= float(tier.get("max", float("inf"))):
+                        if tier.get("action") == "violate":
+                            in_envelope = False
+                            violations.append({"var": calcname, "value": round(computed, 4), "bound": "threshold_tier", "tier_level": tier.get("level", "unknown")})
+                            min_distance = min(min_distance, 1)
+                        break
+
+        # ── 23. CONTRAINDICATION / PROHIBITION ────────────────────
+        for cname, contra in self.contraindication:
+            conditions = contra.get("conditions", [])
+            prohibited_action = contra.get("prohibited_action")
+            prohibited_value = contra.get("prohibited_value")
+            message = contra.get("message", "Contraindicated action detected")
+            severity = contra.get("severity", "critical")
+            conditions_met = True
+            for cond in conditions:
+                cvar = cond.get("variable", "")
+                cop = cond.get("operator", "eq")
+                cval = cond.get("value")
+                sv_val = state_vector.get(cvar)
+                if sv_val is None:
+                    conditions_met = False
+                    break
+                try:
+                    sv_num = float(sv_val)
+                    cval_num = float(cval) if cval is not None and not isinstance(cval, (list, bool)) else None
+                except (ValueError, TypeError):
+                    sv_num = None
+                    cval_num = None
+                met = False
+                if cop == "eq": met = str(sv_val).lower() == str(cval).lower()
+                elif cop == "neq": met = str(sv_val).lower() != str(cval).lower()
+                elif cop == "gt" and sv_num is not None and cval_num is not None: met = sv_num > cval_num
+                elif cop == "gte" and sv_num is not None and cval_num is not None: met = sv_num >= cval_num
+                elif cop == "lt" and sv_num is not None and cval_num is not None: met = sv_num < cval_num
+                elif cop == "lte" and sv_num is not None and cval_num is not None: met = sv_num <= cval_num
+                elif cop == "in" and isinstance(cval, list): met = str(sv_val).lower() in [str(v).lower() for v in cval]
+                elif cop == "contains" and isinstance(sv_val, str): met = str(cval).lower() in sv_val.lower()
+                elif cop == "present": met = True
+                elif cop == "trending_up" and prev_state_vector:
+                    pv = prev_state_vector.get(cvar)
+                    if pv is not None:
+                        try: met = float(sv_val) > float(pv)
+                        except Exception: met = False
+                elif cop == "trending_down" and prev_state_vector:
+                    pv = prev_state_vector.get(cvar)
+                    if pv is not None:
+                        try: met = float(sv_val) < float(pv)
+                        except Exception: met = False
+                if not met:
+                    conditions_met = False
+                    break
+            if not conditions_met:
+                continue
+            if prohibited_action:
+                pa_val = state_vector.get(prohibited_action)
+                if pa_val is None:
+                    continue
+                if prohibited_value is not None:
+                    if str(pa_val).lower() != str(prohibited_value).lower():
+                        continue
+                else:
+                    if isinstance(pa_val, bool) and not pa_val: continue
+                    if isinstance(pa_val, (int, float)) and pa_val <= 0: continue
+                    if isinstance(pa_val, str) and pa_val.lower() in ("false", "0", "no", "none", ""): continue
+            in_envelope = False
+            violations.append({
+                "var": cname, "value": {c.get("variable"): state_vector.get(c.get("variable")) for c in conditions},
+                "bound": "contraindication", "prohibited_action": prohibited_action,
+                "severity": severity, "message": message
+            })
+            min_distance = min(min_distance, 0)
+
+        # ── 24. ESCALATION / RESPONSE TIME ────────────────────────
+        for escname, esc in self.escalation:
+            trigger_conditions = esc.get("trigger_conditions", [])
+            response_key = esc.get("response_key")
+            response_value = esc.get("response_value", True)
+            max_response_seconds = esc.get("max_response_seconds")
+            trigger_time_key = esc.get("trigger_time_key")
+            triggered = True
+            for tc in trigger_conditions:
+                tcvar = tc.get("variable", "")
+                tcop = tc.get("operator", "gt")
+                tcval = tc.get("value")
+                sv_val = state_vector.get(tcvar)
+                if sv_val is None:
+                    triggered = False
+                    break
+                try:
+                    sv_num = float(sv_val)
+                    tc_num = float(tcval) if tcval is not None else None
+                except (ValueError, TypeError):
+                    sv_num = None
+                    tc_num = None
+                met = False
+                if tcop == "gt" and sv_num is not None and tc_num is not None: met = sv_num > tc_num
+                elif tcop == "gte" and sv_num is not None and tc_num is not None: met = sv_num >= tc_num
+                elif tcop == "lt" and sv_num is not None and tc_num is not None: met = sv_num < tc_num
+                elif tcop == "eq": met = str(sv_val).lower() == str(tcval).lower()
+                elif tcop == "present": met = True
+                elif tcop == "truthy": met = str(sv_val).lower() in ("true", "1", "yes")
+                if not met:
+                    triggered = False
+                    break
+            if not triggered:
+                continue
+            if response_key:
+                resp_val = state_vector.get(response_key)
+                if resp_val is not None:
+                    if isinstance(response_value, bool):
+                        if (str(resp_val).lower() in ("true", "1", "yes")) == response_value:
+                            continue
+                    elif str(resp_val).lower() == str(response_value).lower():
+                        continue
+            if max_response_seconds and trigger_time_key and current_timestamp:
+                trigger_time = state_vector.get(trigger_time_key)
+                if trigger_time is not None:
+                    try:
+                        from datetime import datetime as _dt
+                        if isinstance(trigger_time, str):
+                            tt = _dt.fromisoformat(trigger_time.replace("Z", "+00:00")).replace(tzinfo=None)
+                        elif isinstance(trigger_time, (int, float)):
+                            tt = _dt.utcfromtimestamp(float(trigger_time))
+                        else:
+                            tt = None
+                        if tt and (current_timestamp - tt).total_seconds() <= float(max_response_seconds):
+                            continue
+                    except Exception:
+                        pass
+            in_envelope = False
+            violations.append({
+                "var": escname,
+                "value": {tc.get("variable"): state_vector.get(tc.get("variable")) for tc in trigger_conditions},
+                "bound": "escalation_overdue", "response_key": response_key,
+                "max_response_seconds": max_response_seconds
+            })
+            min_distance = min(min_distance, 0)
+
+        # ── 25. PROTOCOL / ORDERED CHECKLIST ──────────────────────
+        for pname, proto in self.protocol:
+            steps = proto.get("steps", [])
+            protocol_active_key = proto.get("active_key")
+            if not steps:
+                continue
+            if protocol_active_key:
+                active_val = state_vector.get(protocol_active_key)
+                if active_val is None or str(active_val).lower() in ("false", "0", "no", "inactive"):
+                    continue
+            prev_step_complete = True
+            for step_idx, step in enumerate(steps):
+                step_key = step.get("key", "")
+                required_value = step.get("required_value", True)
+                sv_val = state_vector.get(step_key)
+                step_complete = False
+                if sv_val is not None:
+                    if isinstance(required_value, bool):
+                        step_complete = str(sv_val).lower() in ("true", "1", "yes", "done", "complete")
+                    else:
+                        step_complete = str(sv_val).lower() == str(required_value).lower()
+                if not step_complete and prev_step_complete:
+                    for later_step in steps[step_idx + 1:]:
+                        later_val = state_vector.get(later_step.get("key", ""))
+                        if later_val is not None and str(later_val).lower() in ("true", "1", "yes", "done", "complete"):
+                            in_envelope = False
+                            violations.append({
+                                "var": pname, "value": f"Step '{later_step.get('key')}' before '{step_key}'",
+                                "bound": "protocol_order", "skipped_step": step_key, "completed_step": later_step.get("key")
+                            })
+                            min_distance = min(min_distance, 0)
+                            break
+                prev_step_complete = step_complete
+
+        # ── 26. RATIO / PROPORTION ────────────────────────────────
+        for ratname, rat in self.ratio:
+            numerator_key = rat.get("numerator_key")
+            denominator_key = rat.get("denominator_key")
+            min_ratio = rat.get("min_ratio")
+            max_ratio = rat.get("max_ratio")
+            if not numerator_key or not denominator_key:
+                continue
+            num_val = state_vector.get(numerator_key)
+            den_val = state_vector.get(denominator_key)
+            if num_val is None or den_val is None:
+                continue
+            try:
+                num = float(num_val)
+                den = float(den_val)
+            except (ValueError, TypeError):
+                continue
+            if den == 0:
+                continue
+            ratio_val = num / den
+            if min_ratio is not None and ratio_val < float(min_ratio):
+                in_envelope = False
+                violations.append({"var": ratname, "value": round(ratio_val, 4), "bound": "min_ratio", "threshold": float(min_ratio), "numerator": round(num, 2), "denominator": round(den, 2)})
+                min_distance = min(min_distance, float(min_ratio) - ratio_val)
+            if max_ratio is not None and ratio_val > float(max_ratio):
+                in_envelope = False
+                violations.append({"var": ratname, "value": round(ratio_val, 4), "bound": "max_ratio", "threshold": float(max_ratio), "numerator": round(num, 2), "denominator": round(den, 2)})
+                min_distance = min(min_distance, ratio_val - float(max_ratio))
+
+        # ── 27. JURISDICTION / SCOPE / AUTHORIZATION ──────────────
+        for jurname, jur in self.jurisdiction:
+            role_key = jur.get("role_key", "system_role")
+            action_key = jur.get("action_key")
+            allowed_actions = jur.get("allowed_actions", {})
+            prohibited_actions = jur.get("prohibited_actions", {})
+            scope_key = jur.get("scope_key")
+            allowed_scopes = jur.get("allowed_scopes")
+            if scope_key and allowed_scopes:
+                scope_val = state_vector.get(scope_key)
+                if scope_val is not None and str(scope_val).lower() not in [str(s).lower() for s in allowed_scopes]:
+                    in_envelope = False
+                    violations.append({"var": jurname, "value": scope_val, "bound": "scope_unauthorized", "allowed_scopes": allowed_scopes})
+                    min_distance = min(min_distance, 0)
+                    continue
+            current_role = state_vector.get(role_key)
+            current_action = state_vector.get(action_key) if action_key else None
+            if not current_role or not current_action:
+                continue
+            role_str = str(current_role).lower()
+            action_str = str(current_action).lower()
+            if allowed_actions:
+                for r, actions in allowed_actions.items():
+                    if str(r).lower() == role_str:
+                        role_allowed = [str(a).lower() for a in actions]
+                        if action_str not in role_allowed:
+                            in_envelope = False
+                            violations.append({"var": jurname, "value": action_str, "bound": "action_not_allowed", "role": role_str, "allowed_actions": role_allowed})
+                            min_distance = min(min_distance, 0)
+                        break
+            if prohibited_actions:
+                for r, actions in prohibited_actions.items():
+                    if str(r).lower() == role_str:
+                        role_prohibited = [str(a).lower() for a in actions]
+                        if action_str in role_prohibited:
+                            in_envelope = False
+                            violations.append({"var": jurname, "value": action_str, "bound": "action_prohibited", "role": role_str})
+                            min_distance = min(min_distance, 0)
+                        break
+
+        return in_envelope, min_distance if min_distance != float("inf") else 0, violations
+
+
+_compiled_cache: "OrderedDict[Tuple[str, str], CompiledEnvelope]" = OrderedDict()
+
+
+def envelope_hash(envelope: Dict[str, Any]) -> str:
+    """Fingerprint of the boundary definitions only; learning-profile and other
+    metadata don't affect evaluation.
+
+    Keys the cache when no envelope version is known (replay, ad-hoc compiles),
+    so it pickles rather than canonical-JSON encodes (about 5x cheaper). Only
+    stable within a process, which is all a per-process cache needs.
+    """
+    return hashlib.blake2b(pickle.dumps(envelope.get("boundaries", {}), pickle.HIGHEST_PROTOCOL), digest_size=16).hexdigest()
+
+
+def compile_envelope(envelope: Dict[str, Any]) -> CompiledEnvelope:
+    return CompiledEnvelope(envelope or {})
+
+
+def get_compiled_envelope(test_id: str, envelope: Dict[str, Any], version: Optional[int] = None) -> CompiledEnvelope:
+    """Compiled evaluator for a test's envelope, recompiled only when it changes.
+
+    With the test's envelope_version (bumped on every envelope_definition
+    assignment) the lookup is O(1) per sample; without it the boundaries are
+    fingerprinted with envelope_hash() on each call.
+    """
+    envelope = envelope or {}
+    key = (test_id, f"{test_id}@v{version}" if version is not None else envelope_hash(envelope))
+    compiled = _compiled_cache.get(key)
+    if compiled is not None:
+        _compiled_cache.move_to_end(key)
+        return compiled
+    for stale in [k for k in _compiled_cache if k[0] == test_id]:
+        del _compiled_cache[stale]
+    compiled = compile_envelope(envelope)
+    compiled.key = key[1]
+    _compiled_cache[key] = compiled
+    if len(_compiled_cache) > COMPILED_CACHE_SIZE:
+        _compiled_cache.popitem(last=False)
+    return compiled
@@ -0,0 +1,214 @@
+"""
+CAT-72 Envelope Evaluation Executor
+- Runs compiled envelope checks inline or in a process pool, chosen per envelope by
+  its compiled cost: cheap envelopes aren't worth the IPC round trip, heavy ones
+  (large polygons, long curve tables, many boundaries) shouldn't hold the event loop
+- Sticky routing: a test always lands on the same single-process worker, which keeps
+  the compiled envelope and a mirror of the test's rolling windows. Each call ships
+  only the window values recorded since the previous call; a full snapshot only after
+  a window-state rebuild, an inline stretch or a worker restart
+- A broken worker is replaced and the sample retried; if that fails too the sample is
+  evaluated inline
+- Event-loop lag monitor: how late a periodic timer wakes up, to measure the effect
+  under mixed load
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.envelope_evaluator import COMPILED_CACHE_SIZE, CompiledEnvelope, compile_envelope, envelope_hash
+from app.services.cat72_window_state import RollingWindow, WindowState, WINDOW_STATE_MAX_TESTS
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL_S = 0.25
+LOOP_LAG_SAMPLES = 240        # one minute of lag readings at the default interval
+
+
+# ── worker process side ─────────────────────────────────────
+# Module globals live in each worker process; the API process never touches them.
+
+_worker_envelopes: "OrderedDict[str, CompiledEnvelope]" = OrderedDict()
+_worker_windows: "OrderedDict[str, tuple]" = OrderedDict()  # test_id -> (generation, seq, windows)
+
+_RESYNC_ENVELOPE = "envelope"
+_RESYNC_WINDOWS = "windows"
+
+
+def _remote_evaluate(test_id: str, key: str, envelope: Optional[dict], sync: Optional[tuple], kwargs: dict):
+    """Evaluate one sample in a worker. Returns ("ok", result) or ("resync", what)
+    when the worker lacks the envelope or its window mirror is out of step."""
+    compiled = _worker_envelopes.get(key)
+    if compiled is None:
+        if envelope is None:
+            return "resync", _RESYNC_ENVELOPE
+        compiled = compile_envelope(envelope)
+        _worker_envelopes[key] = compiled
+        if len(_worker_envelopes) > COMPILED_CACHE_SIZE:
+            _worker_envelopes.popitem(last=False)
+    _worker_envelopes.move_to_end(key)
+
+    windows = None
+    if sync is not None:
+        kind, generation, seq, payload = sync
+        if kind == "snapshot":
+            windows = {}
+            for spec, values in zip(compiled.window_specs, payload):
+                window = RollingWindow(spec[1])
+                for value in values:
+                    window.push(value)
+                windows[spec] = window
+            _worker_windows[test_id] = (generation, seq, windows)
+        else:
+            mirror = _worker_windows.get(test_id)
+            if mirror is None or mirror[0] != generation or mirror[1] != seq:
+                return "resync", _RESYNC_WINDOWS
+            windows = mirror[2]
+            for values in payload:
+                for window, value in zip(windows.values(), values):
+                    window.push(value)
+            _worker_windows[test_id] = (generation, seq + len(payload), windows)
+        _worker_windows.move_to_end(test_id)
+        if len(_worker_windows) > WINDOW_STATE_MAX_TESTS:
+            _worker_windows.popitem(last=False)
+
+    return "ok", compiled.evaluate(windows=windows, **kwargs)
+
+
+# ── API process side ────────────────────────────────────────
+
+def _snapshot(state: WindowState) -> tuple:
+    return tuple(list(window._ring) for window in state.windows.values())
+
+
+class EvaluationExecutor:
+    """Routes envelope evaluations inline or to a sticky worker process."""
+
+    def __init__(self, workers: int = 0, offload_cost: int = 0):
+        self.workers = max(0, workers)
+        self.offload_cost = offload_cost
+        self._pools: List[Optional[ProcessPoolExecutor]] = [None] * self.workers
+        # envelope keys each worker has compiled, so the definition is only sent once
+        self._shipped: List["OrderedDict[str, None]"] = [OrderedDict() for _ in range(self.workers)]
+        self.stats = {"inline": 0, "offloaded": 0, "resyncs": 0, "worker_restarts": 0, "fallbacks": 0}
+
+    def offloads(self, compiled: CompiledEnvelope) -> bool:
+        return self.workers > 0 and compiled.cost >= self.offload_cost
+
+    def _slot(self, test_id: str) -> int:
+        return zlib.crc32(test_id.encode()) % self.workers
+
+    def _pool(self, slot: int) -> ProcessPoolExecutor:
+        pool = self._pools[slot]
+        if pool is None:
+            # forkserver: workers don't inherit the API process's threads, sockets or event loop
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context(method))
+            self._pools[slot] = pool
+        return pool
+
+    def _restart(self, slot: int):
+        pool, self._pools[slot] = self._pools[slot], None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._shipped[slot].clear()
+        self.stats["worker_restarts"] += 1
+
+    async def evaluate(self, test_id: str, compiled: CompiledEnvelope, window_state: WindowState, **kwargs) -> tuple:
+        """(in_envelope, min_distance, violations) for one sample; kwargs as CompiledEnvelope.evaluate
+        minus windows, which come from window_state."""
+        if not self.offloads(compiled):
+            self.stats["inline"] += 1
+            window_state.outbox = None  # the worker mirror (if any) is no longer followed
+            return compiled.evaluate(windows=window_state.windows, **kwargs)
+
+        slot = self._slot(test_id)
+        key = compiled.key or envelope_hash(compiled.source)
+        shipped = self._shipped[slot]
+        loop = asyncio.get_running_loop()
+        resend_envelope = key not in shipped
+        resend_windows = window_state.outbox is None
+        for _ in range(3):
+            sync = None
+            if window_state.windows:
+                if resend_windows:
+                    sync = ("snapshot", window_state.generation, window_state.remote_seq, _snapshot(window_state))
+                else:
+                    sync = ("delta", window_state.generation, window_state.remote_seq, window_state.outbox)
+                    # the worker applies calls in order, so the next call's base can move on now
+                    window_state.remote_seq += len(window_state.outbox)
+                window_state.outbox = []
+            pool = self._pool(slot)
+            try:
+                status, result = await loop.run_in_executor(
+                    pool, _remote_evaluate, test_id, key,
+                    compiled.source if resend_envelope else None, sync, kwargs,
+                )
+            except BrokenProcessPool:
+                if self._pools[slot] is pool:
+                    logger.warning("Envelope worker %d died; restarting", slot)
+                    self._restart(slot)
+                resend_envelope = resend_windows = True
+                continue
+            except Exception:
+                window_state.outbox = None
+                raise
+            if status == "ok":
+                shipped[key] = None
+                shipped.move_to_end(key)
+                if len(shipped) > COMPILED_CACHE_SIZE:
+                    shipped.popitem(last=False)
+                self.stats["offloaded"] += 1
+                return result
+            # the worker lost the envelope or its mirror is out of step (evicted, or
+            # overtaken by a concurrent call): a snapshot of the current windows covers it
+            self.stats["resyncs"] += 1
+            resend_envelope = resend_envelope or result == _RESYNC_ENVELOPE
+            resend_windows = True
+
+        self.stats["fallbacks"] += 1
+        window_state.outbox = None
+        return compiled.evaluate(windows=window_state.windows, **kwargs)
+
+    def shutdown(self):
+        for slot, pool in enumerate(self._pools):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._pools[slot] = None
+
+
+evaluation_executor = EvaluationExecutor(settings.ENVELOPE_WORKERS, settings.ENVELOPE_OFFLOAD_COST)
+
+
+# ── event-loop lag ──────────────────────────────────────────
+
+_loop_lag: "deque[float]" = deque(maxlen=LOOP_LAG_SAMPLES)
+
+
+async def loop_lag_monitor(interval: float = LOOP_LAG_INTERVAL_S):
+    """Sleep for `interval` forever and record how late each wakeup was."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        _loop_lag.append(max(0.0, loop.time() - start - interval))
+
+
+def loop_lag_stats() -> Dict[str, Any]:
+    """Event-loop lag over the last LOOP_LAG_SAMPLES readings, in milliseconds."""
+    if not _loop_lag:
+        return {"samples": 0, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    lags = sorted(_loop_lag)
+    return {
+        "samples": len(lags),
+        "mean_ms": round(sum(lags) / len(lags) * 1000, 3),
+        "p99_ms": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000, 3),
+        "max_ms": round(lags[-1] * 1000, 3),
+    }
@@ -0,0 +1,314 @@
+"""
+CAT-72 Evidence Chain
+- canonical_json(): byte-identical to json.dumps(sort_keys=True, default=str), the
+  encoding every existing hash was made with, at roughly half the cost
+- Append-only cat72_evidence_blocks (genesis, spec confirmation, final) instead of
+  rewriting the evidence_chain JSON column
+- Merkle checkpoints over every CHECKPOINT_INTERVAL samples' hashes in sample
+  number order, built behind ingest by a sweeper and sealed when a test ends;
+  a checkpoint never skips over a sample number that isn't committed yet
+- Inclusion proof for any sample from its PROOF_CHUNK_LEVEL chunk plus the tree
+  levels stored with the checkpoint; full verification checks checkpoints
+  concurrently, then their linkage
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime
+from json.encoder import c_make_encoder, encode_basestring_ascii
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models.models import CAT72Test, Telemetry, CAT72EvidenceBlock, CAT72EvidenceCheckpoint
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_INTERVAL = 1024   # samples per Merkle checkpoint
+PROOF_CHUNK_LEVEL = 5        # proofs read 2**5 sample hashes; checkpoints keep the levels above
+CHECKPOINT_SWEEP_INTERVAL = 60
+VERIFY_CONCURRENCY = 4
+
+_LEAF = b"\x00"
+_NODE = b"\x01"
+
+if c_make_encoder is not None:
+    # same C encoder json.dumps uses, built once; markers=None skips the
+    # circular-reference bookkeeping (evidence payloads come from parsed JSON)
+    _encode = c_make_encoder(None, str, encode_basestring_ascii, None, ": ", ", ", True, False, True)
+
+    def canonical_json(data: Any) -> str:
+        return "".join(_encode(data, 0))
+else:  # pragma: no cover - interpreters without the _json accelerator
+    _encoder = json.JSONEncoder(sort_keys=True, default=str)
+
+    def canonical_json(data: Any) -> str:
+        return _encoder.encode(data)
+
+
+def compute_hash(data: dict, prev_hash: str = "") -> str:
+    """Compute SHA-256 hash for evidence chain."""
+    return hashlib.sha256((canonical_json(data) + prev_hash).encode()).hexdigest()
+
+
+# ── blocks ──────────────────────────────────────────────────
+
+async def append_evidence_block(db: AsyncSession, test: CAT72Test, block_type: str, data: dict,
+                                prev_hash: Optional[str] = None) -> str:
+    """Append a block chained to the test's current head (or prev_hash) and move
+    the head to it. Genesis blocks pass prev_hash="" to start the chain."""
+    if prev_hash is None:
+        prev_hash = test.evidence_hash or ""
+    block_hash = compute_hash(data, prev_hash)
+    index = (await db.execute(
+        select(func.coalesce(func.max(CAT72EvidenceBlock.block_index) + 1, 0))
+        .where(CAT72EvidenceBlock.test_id == test.id)
+    )).scalar()
+    db.add(CAT72EvidenceBlock(test_id=test.id, block_index=index, block_type=block_type,
+                              hash=block_hash, prev_hash=prev_hash, data=data))
+    test.evidence_hash = block_hash
+    return block_hash
+
+
+async def evidence_blocks(db: AsyncSession, test: CAT72Test) -> List[dict]:
+    """The test's blocks in the shape the evidence_chain column used."""
+    rows = (await db.execute(
+        select(CAT72EvidenceBlock).where(CAT72EvidenceBlock.test_id == test.id)
+        .order_by(CAT72EvidenceBlock.block_index)
+    )).scalars().all()
+    if not rows:
+        return test.evidence_chain or []  # tests chained before the block table
+    return [{"block": b.block_index, "hash": b.hash, "data": b.data} for b in rows]
+
+
+# ── Merkle trees ────────────────────────────────────────────
+
+def _leaf(sample_hash: str) -> bytes:
+    return hashlib.sha256(_LEAF + bytes.fromhex(sample_hash)).digest()
+
+
+def _levels(sample_hashes: List[str]) -> List[List[bytes]]:
+    level = [_leaf(h) for h in sample_hashes]
+    levels = [level]
+    while len(level) > 1:
+        nxt = [hashlib.sha256(_NODE + level[i] + level[i + 1]).digest() for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])  # odd node carried up unchanged
+        levels.append(nxt)
+        level = nxt
+    return levels
+
+
+def merkle_root(sample_hashes: List[str]) -> str:
+    return _levels(sample_hashes)[-1][0].hex() if sample_hashes else ""
+
+
+def merkle_proof(sample_hashes: List[str], index: int) -> List[dict]:
+    """Sibling path from leaf `index` to the root."""
+    return _path(_levels(sample_hashes)[:-1], index)
+
+
+def _path(levels: List[List[bytes]], index: int) -> List[dict]:
+    path = []
+    for level in levels:
+        sibling = index ^ 1
+        if sibling < len(level):
+            path.append({"side": "left" if sibling < index else "right", "hash": level[sibling].hex()})
+        index //= 2
+    return path
+
+
+def verify_merkle_proof(sample_hash: str, path: List[dict], root: str) -> bool:
+    node = _leaf(sample_hash)
+    for step in path:
+        sibling = bytes.fromhex(step["hash"])
+        node = hashlib.sha256(_NODE + sibling + node if step["side"] == "left" else _NODE + node + sibling).digest()
+    return node.hex() == root
+
+
+# ── checkpoints ─────────────────────────────────────────────
+
+def _chunk_level_sizes(samples: int) -> List[int]:
+    """Node counts of a checkpoint's tree from the proof-chunk level up to the root."""
+    sizes = [-(-samples // (1 << PROOF_CHUNK_LEVEL))]
+    while sizes[-1] > 1:
+        sizes.append(-(-sizes[-1] // 2))
+    return sizes
+
+
+def _upper_nodes(levels: List[List[bytes]]) -> bytes:
+    """The levels from PROOF_CHUNK_LEVEL up to (not including) the root, concatenated;
+    empty for a checkpoint that is a single chunk."""
+    return b"".join(node for level in levels[PROOF_CHUNK_LEVEL:-1] for node in level)
+
+
+def _sample_range(test_pk: int, first: int, last: int):
+    return (Telemetry.test_id == test_pk, Telemetry.sample_number >= first, Telemetry.sample_number <= last)
+
+
+async def build_checkpoints(db: AsyncSession, test: CAT72Test, seal: bool = False) -> int:
+    """Checkpoint every full CHECKPOINT_INTERVAL run of samples not yet covered,
+    in sample number order; seal=True also checkpoints a trailing partial run.
+    A run ends at the first missing sample number, so a sample still being
+    committed is never left behind a checkpoint. Returns the number of
+    checkpoints added. The caller commits."""
+    last = (await db.execute(
+        select(CAT72EvidenceCheckpoint).where(CAT72EvidenceCheckpoint.test_id == test.id)
+        .order_by(CAT72EvidenceCheckpoint.seq.desc()).limit(1)
+    )).scalar_one_or_none()
+    seq = last.seq + 1 if last else 0
+    first_sample = last.last_sample + 1 if last else 1
+    added = 0
+    while True:
+        rows = (await db.execute(
+            select(Telemetry.id, Telemetry.sample_number, Telemetry.sample_hash, Telemetry.prev_hash)
+            .where(*_sample_range(test.id, first_sample, first_sample + CHECKPOINT_INTERVAL - 1))
+            .order_by(Telemetry.sample_number)
+        )).all()
+        run = 0
+        while run < len(rows) and rows[run].sample_number == first_sample + run:
+            run += 1
+        rows = rows[:run]
+        if not rows or (len(rows) < CHECKPOINT_INTERVAL and not seal):
+            return added
+        hashes = [r.sample_hash or "" for r in rows]
+        levels = _levels(hashes)
+        db.add(CAT72EvidenceCheckpoint(
+            test_id=test.id, seq=seq, first_sample=first_sample, last_sample=first_sample + len(rows) - 1,
+            first_telemetry_id=rows[0].id, last_telemetry_id=rows[-1].id,
+            first_prev_hash=rows[0].prev_hash or "", last_hash=hashes[-1],
+            merkle_root=levels[-1][0].hex(), merkle_nodes=_upper_nodes(levels), created_at=datetime.utcnow(),
+        ))
+        added += 1
+        seq += 1
+        first_sample += len(rows)
+        if len(rows) < CHECKPOINT_INTERVAL:
+            return added
+
+
+async def sample_proof(db: AsyncSession, test: CAT72Test, sample_number: int) -> Optional[dict]:
+    """Inclusion proof for the sample_number'th ingested sample, or None if no
+    checkpoint covers it yet. Reads the sample's 2**PROOF_CHUNK_LEVEL chunk and
+    takes the rest of the path from the checkpoint's stored nodes; checkpoints
+    from before those were stored read all their samples."""
+    cp = (await db.execute(
+        select(CAT72EvidenceCheckpoint).where(
+            CAT72EvidenceCheckpoint.test_id == test.id,
+            CAT72EvidenceCheckpoint.first_sample <= sample_number,
+            CAT72EvidenceCheckpoint.last_sample >= sample_number,
+        )
+    )).scalar_one_or_none()
+    if cp is None:
+        return None
+    sizes = _chunk_level_sizes(cp.last_sample - cp.first_sample + 1)[:-1]
+    nodes = cp.merkle_nodes
+    chunked = nodes is not None and len(nodes) == 32 * sum(sizes)
+    if chunked:
+        chunk = (sample_number - cp.first_sample) >> PROOF_CHUNK_LEVEL
+        first = cp.first_sample + (chunk << PROOF_CHUNK_LEVEL)
+        last = min(first + (1 << PROOF_CHUNK_LEVEL) - 1, cp.last_sample)
+    else:
+        first, last = cp.first_sample, cp.last_sample
+    hashes = (await db.execute(
+        select(Telemetry.sample_hash).where(*_sample_range(test.id, first, last))
+        .order_by(Telemetry.sample_number)
+    )).scalars().all()
+    path = merkle_proof(list(hashes), sample_number - first)
+    if chunked:
+        upper, offset = [], 0
+        for size in sizes:
+            upper.append([nodes[32 * i:32 * (i + 1)] for i in range(offset, offset + size)])
+            offset += size
+        path += _path(upper, chunk)
+    return {
+        "sample_number": sample_number,
+        "sample_hash": hashes[sample_number - first],
+        "checkpoint": cp.seq,
+        "merkle_root": cp.merkle_root,
+        "path": path,
+    }
+
+
+async def _verify_checkpoint(test_pk: int, cp: CAT72EvidenceCheckpoint, sem: asyncio.Semaphore) -> List[str]:
+    async with sem:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(Telemetry.sample_hash, Telemetry.prev_hash)
+                .where(*_sample_range(test_pk, cp.first_sample, cp.last_sample))
+                .order_by(Telemetry.sample_number)
+            )).all()
+    errors = []
+    if len(rows) != cp.last_sample - cp.first_sample + 1:
+        errors.append(f"checkpoint {cp.seq}: expected {cp.last_sample - cp.first_sample + 1} samples, found {len(rows)}")
+        return errors
+    hashes = [r.sample_hash or "" for r in rows]
+    if merkle_root(hashes) != cp.merkle_root:
+        errors.append(f"checkpoint {cp.seq}: Merkle root mismatch")
+    if (rows[0].prev_hash or "") != cp.first_prev_hash:
+        errors.append(f"checkpoint {cp.seq}: first sample's prev_hash changed")
+    for i in range(1, len(rows)):
+        # learning samples aren't chained (no prev_hash)
+        if rows[i].prev_hash and rows[i].prev_hash != hashes[i - 1]:
+            errors.append(f"checkpoint {cp.seq}: chain broken at sample {cp.first_sample + i}")
+            break
+    return errors
+
+
+async def verify_evidence(db: AsyncSession, test: CAT72Test) -> Dict[str, Any]:
+    """Verify blocks, then each checkpoint's samples concurrently, then the
+    links between consecutive checkpoints. Samples past the last checkpoint
+    are reported as unchecked."""
+    errors: List[str] = []
+    blocks = (await db.execute(
+        select(CAT72EvidenceBlock).where(CAT72EvidenceBlock.test_id == test.id)
+        .order_by(CAT72EvidenceBlock.block_index)
+    )).scalars().all()
+    for b in blocks:
+        if compute_hash(b.data, b.prev_hash) != b.hash:
+            errors.append(f"block {b.block_index} ({b.block_type}): hash mismatch")
+
+    checkpoints = (await db.execute(
+        select(CAT72EvidenceCheckpoint).where(CAT72EvidenceCheckpoint.test_id == test.id)
+        .order_by(CAT72EvidenceCheckpoint.seq)
+    )).scalars().all()
+    sem = asyncio.Semaphore(VERIFY_CONCURRENCY)
+    for result in await asyncio.gather(*(_verify_checkpoint(test.id, cp, sem) for cp in checkpoints)):
+        errors.extend(result)
+    for prev, cp in zip(checkpoints, checkpoints[1:]):
+        if cp.first_prev_hash and cp.first_prev_hash != prev.last_hash:
+            errors.append(f"checkpoint {cp.seq}: does not continue checkpoint {prev.seq}")
+
+    covered = checkpoints[-1].last_sample if checkpoints else 0
+    unchecked = (await db.execute(
+        select(func.count()).select_from(Telemetry).where(
+            Telemetry.test_id == test.id,
+            or_(Telemetry.sample_number > covered, Telemetry.sample_number.is_(None)),
+        )
+    )).scalar()
+    return {
+        "test_id": test.test_id,
+        "valid": not errors,
+        "errors": errors,
+        "blocks_checked": len(blocks),
+        "checkpoints_checked": len(checkpoints),
+        "samples_checked": covered,
+        "samples_unchecked": unchecked,
+    }
+
+
+async def evidence_checkpoint_sweep():
+    """Scheduled job: checkpoint running tests' new samples"""
+    async with AsyncSessionLocal() as db:
+        tests = (await db.execute(select(CAT72Test).where(CAT72Test.state == "running"))).scalars().all()
+        for test in tests:
+            try:
+                if await build_checkpoints(db, test):
+                    await db.commit()
+            except Exception as e:
+                # e.g. a checkpoint written by an API request for the same run first
+                await db.rollback()
+                logger.warning(f"Evidence checkpoint for {test.test_id} skipped: {e}")
@@ -0,0 +1,105 @@
+"""
+Platform Job Registry
+- Every periodic background job of the API, declared in one table and run by
+  app/services/job_scheduler.py
+- Cluster jobs (DB sweeps, notifications, backups) run on one replica per
+  interval; local jobs keep per-process state fresh on every replica
+- Production-only jobs (backups, renewals, engagement agent) are registered
+  only when ENVIRONMENT=production
+"""
+
+import asyncio
+import logging
+import os
+import subprocess
+from datetime import time
+from typing import List
+
+from app.services import audit_verification, background_tasks, certificate_artifacts, content_scraper, evidence_chain, learning_profile, partition_manager, telemetry_rollup
+from app.services.job_scheduler import Job, JobScheduler
+
+logger = logging.getLogger(__name__)
+
+BACKUP_INTERVAL_SECONDS = 6 * 3600
+BACKUP_TIMEOUT_SECONDS = 600
+RENEWAL_CRON_URL = "http://localhost:8080/api/billing/cron/renewals"
+ENGAGEMENT_AGENT_INTERVAL_SECONDS = 30 * 60
+
+
+def _run_backup_script():
+    result = subprocess.run(
+        ["python", "scripts/backup_db.py"],
+        capture_output=True, text=True, timeout=BACKUP_TIMEOUT_SECONDS,
+        env={**os.environ}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"backup_db.py failed: {result.stderr[-300:]}")
+    logger.info("[BACKUP] Scheduled backup completed")
+
+
+async def run_database_backup():
+    await asyncio.to_thread(_run_backup_script)
+
+
+async def run_renewal_cron():
+    import httpx
+    async with httpx.AsyncClient(timeout=30) as client:
+        response = await client.post(RENEWAL_CRON_URL)
+        response.raise_for_status()
+
+
+async def run_engagement_agent():
+    from app.exposure_agent import run_engagement_agent as agent
+    await agent()
+
+
+def platform_jobs(production: bool) -> List[Job]:
+    jobs = [
+        # per process: the chat knowledge store and this process's learning-profile deltas
+        Job("content_scraper", content_scraper.scrape_website,
+            interval_s=content_scraper.REFRESH_INTERVAL_HOURS * 3600, max_runtime_s=300, local=True),
+        Job("learning_profile_flush", learning_profile.flush_due_learning_profiles,
+            interval_s=learning_profile.LEARNING_FLUSH_SECONDS, max_runtime_s=120, local=True,
+            initial_delay_s=learning_profile.LEARNING_FLUSH_SECONDS),
+
+        Job("compliance_enforcement", background_tasks.enforce_compliance,
+            interval_s=background_tasks.CHECK_INTERVAL_SECONDS, max_runtime_s=240),
+        Job("certificate_expiry", background_tasks.check_certificate_expiry,
+            interval_s=background_tasks.EXPIRY_CHECK_INTERVAL, max_runtime_s=1800),
+        Job("offline_auto_suspend", background_tasks.auto_suspend_offline,
+            interval_s=background_tasks.OFFLINE_SUSPEND_INTERVAL_SECONDS, max_runtime_s=900,
+            initial_delay_s=background_tasks.OFFLINE_SUSPEND_INTERVAL_SECONDS),
+        Job("demo_session_ticker", background_tasks.demo_session_ticker,
+            interval_s=background_tasks.DEMO_TICK_SECONDS, max_runtime_s=30),
+        Job("cat72_auto_evaluator", background_tasks.cat72_auto_evaluator,
+            interval_s=background_tasks.CAT72_EVAL_SWEEP_SECONDS, max_runtime_s=300, jitter=0.0),
+        Job("partition_maintenance", partition_manager.maintain_partitions,
+            interval_s=partition_manager.PARTITION_CHECK_INTERVAL, max_runtime_s=600),
+        Job("rollup_compaction", telemetry_rollup.run_rollup_compaction,
+            interval_s=telemetry_rollup.COMPACTION_INTERVAL, max_runtime_s=900),
+        Job("evidence_checkpoints", evidence_chain.evidence_checkpoint_sweep,
+            interval_s=evidence_chain.CHECKPOINT_SWEEP_INTERVAL, max_runtime_s=600,
+            initial_delay_s=evidence_chain.CHECKPOINT_SWEEP_INTERVAL),
+        Job("audit_anchors", audit_verification.anchor_audit_chain,
+            interval_s=audit_verification.AUDIT_ANCHOR_SWEEP_SECONDS, max_runtime_s=600),
+        Job("certificate_pdfs", certificate_artifacts.certificate_pdf_sweep,
+            interval_s=certificate_artifacts.CERTIFICATE_PDF_SWEEP_SECONDS, max_runtime_s=1800, initial_delay_s=60),
+    ]
+    if production:
+        jobs += [
+            Job("db_backup", run_database_backup,
+                interval_s=BACKUP_INTERVAL_SECONDS, max_runtime_s=BACKUP_TIMEOUT_SECONDS + 60,
+                initial_delay_s=BACKUP_INTERVAL_SECONDS),
+            Job("renewal_cron", run_renewal_cron,
+                interval_s=24 * 3600, max_runtime_s=120, daily_at_utc=time(6, 0)),
+            Job("engagement_agent", run_engagement_agent,
+                interval_s=ENGAGEMENT_AGENT_INTERVAL_SECONDS, max_runtime_s=ENGAGEMENT_AGENT_INTERVAL_SECONDS),
+        ]
+    return jobs
+
+
+def register_platform_jobs(scheduler: JobScheduler, production: bool) -> JobScheduler:
+    for job in platform_jobs(production):
+        if job.name not in scheduler.jobs:  # a second app startup in the same process
+            scheduler.register(job)
+    return scheduler
@@ -0,0 +1,357 @@
+"""
+Background Job Scheduler
+- Jobs are registered declaratively (interval or daily UTC time, jitter, max
+  runtime) and run by one scheduler task per process instead of a loop each
+- Cluster jobs are leased through their scheduled_jobs row, claimed under a pg
+  advisory xact lock: one replica runs each due job, the next run time lives in
+  the row so replicas share one schedule, and a crashed run's lease lapses after
+  max_runtime
+- Local jobs (per-process state such as in-memory caches) run on every replica
+- A cluster job can be triggered on demand: the request (keyword arguments for
+  its func) waits in the row for whichever replica claims the lease next, so it
+  never overlaps another run, and the row keeps the dict a run returns so any
+  replica can report it
+- Runs are isolated: exceptions are logged and counted, runs past max_runtime
+  are cancelled, and one job's failure never delays another
+- Duration and start-lag histograms per job, served at /api/v1/jobs
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import func, select
+
+from app.core.database import AsyncSessionLocal
+from app.models.models import ScheduledJob
+
+logger = logging.getLogger(__name__)
+
+JOB_LOCK_NAMESPACE = 720045       # pg advisory lock namespace; key 2 is hashtext(job name)
+CLAIM_JITTER_S = 2.0              # replicas wake at slightly different times to claim a due job
+IDLE_WAKEUP_S = 60.0              # upper bound on the scheduler's sleep
+HISTOGRAM_BUCKETS_S = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 1800)
+
+
+class Histogram:
+    """Fixed-bucket histogram: counts of observations <= each bound, plus sum and max."""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS_S):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot: above every bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        value = max(0.0, value)
+        i = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        cumulative, seen = {}, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            cumulative[f"le_{bound:g}"] = seen
+        cumulative["le_inf"] = self.count
+        return {
+            "count": self.count,
+            "sum_s": round(self.total, 3),
+            "mean_s": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_s": self.quantile(0.5),
+            "p99_s": self.quantile(0.99),
+            "max_s": round(self.max, 3),
+            "buckets": cumulative,
+        }
+
+
+@dataclass
+class Job:
+    """A unit of background work. `func` takes no arguments (except those of a
+    triggered run); it may return a datetime (naive UTC) to run again sooner
+    than the interval, e.g. a deadline, or a dict kept as the run's result."""
+    name: str
+    func: Callable[[], Awaitable]
+    interval_s: float
+    max_runtime_s: float
+    jitter: float = 0.1                # +/- fraction of the interval
+    initial_delay_s: float = 0.0       # first attempt this long after the process starts
+    daily_at_utc: Optional[time] = None  # run once a day at this time instead of every interval
+    local: bool = False                # run on every replica, no lease
+
+    def next_run(self, after: datetime, sooner: Optional[datetime] = None) -> datetime:
+        if self.daily_at_utc is not None:
+            at = datetime.combine(after.date(), self.daily_at_utc)
+            regular = at if at > after else at + timedelta(days=1)
+        else:
+            regular = after + timedelta(seconds=self.interval_s * (1 + random.uniform(-self.jitter, self.jitter)))
+        if sooner is not None:
+            return max(min(regular, sooner), after)
+        return regular
+
+
+@dataclass
+class JobStats:
+    runs: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    skipped: int = 0              # due here, but another replica held or had just run it
+    last_status: Optional[str] = None
+    last_error: Optional[str] = None
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    duration: Histogram = field(default_factory=Histogram)
+    lag: Histogram = field(default_factory=Histogram)
+
+
+class JobScheduler:
+    def __init__(self, session_factory=None, worker_id: Optional[str] = None):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.jobs: Dict[str, Job] = {}
+        self.stats: Dict[str, JobStats] = {}
+        self._due: Dict[str, datetime] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, job: Job) -> Job:
+        if job.name in self.jobs:
+            raise ValueError(f"Job {job.name} is already registered")
+        self.jobs[job.name] = job
+        self.stats[job.name] = JobStats()
+        return job
+
+    # ── Running ──
+
+    def start(self):
+        if self._task is None or self._task.done():
+            now = datetime.utcnow()
+            for job in self.jobs.values():
+                first = job.next_run(now) if job.daily_at_utc else now + timedelta(seconds=job.initial_delay_s)
+                self._due.setdefault(job.name, first)
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"Job scheduler {self.worker_id} started with {len(self.jobs)} jobs")
+
+    async def stop(self):
+        tasks = [t for t in (self._task, *self._running.values()) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._running.clear()
+
+    async def _loop(self):
+        while True:
+            now = datetime.utcnow()
+            for name in self.due_jobs(now):
+                self._running[name] = asyncio.create_task(self.run_job(name))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._seconds_until_next(now))
+            except asyncio.TimeoutError:
+                pass
+
+    def due_jobs(self, now: datetime) -> List[str]:
+        self._running = {n: t for n, t in self._running.items() if not t.done()}
+        return [n for n, due in self._due.items() if due <= now and n not in self._running]
+
+    def _seconds_until_next(self, now: datetime) -> float:
+        pending = [due for n, due in self._due.items() if n not in self._running]
+        if not pending:
+            return IDLE_WAKEUP_S
+        return min(max((min(pending) - now).total_seconds(), 0.01), IDLE_WAKEUP_S)
+
+    def _set_due(self, name: str, due: datetime):
+        self._due[name] = due
+        self._wakeup.set()
+
+    async def run_job(self, name: str, now: Optional[datetime] = None) -> Optional[str]:
+        """Run one job if it is due here (and, for cluster jobs, this replica wins
+        the lease). Returns the run's status, or None if it was not run."""
+        job, stats = self.jobs[name], self.stats[name]
+        now = now or datetime.utcnow()
+        scheduled, request = self._due.get(name, now), None
+        if not job.local:
+            try:
+                claim = await self._claim(job, now)
+            except Exception as e:
+                logger.error(f"Job {name}: lease claim failed: {e}")
+                self._set_due(name, now + timedelta(seconds=min(job.interval_s, IDLE_WAKEUP_S)))
+                return None
+            claimed, when, request = claim
+            if not claimed:
+                stats.skipped += 1
+                self._set_due(name, when + timedelta(seconds=random.uniform(0, CLAIM_JITTER_S)))
+                return None
+            scheduled = when
+
+        stats.lag.observe((now - scheduled).total_seconds())
+        stats.last_started_at = now
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        sooner, result, error = None, None, None
+        try:
+            result = await asyncio.wait_for(job.func(**(request or {})), timeout=job.max_runtime_s)
+            if isinstance(result, datetime):
+                sooner = result
+            status = "ok"
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"exceeded max runtime of {job.max_runtime_s:g}s"
+            stats.timeouts += 1
+            logger.error(f"Job {name} cancelled: {error}")
+        except Exception as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+            stats.failures += 1
+            logger.exception(f"Job {name} failed: {e}")
+        duration = loop.time() - started
+        finished = now + timedelta(seconds=duration)
+        stats.runs += 1
+        stats.duration.observe(duration)
+        stats.last_status, stats.last_error, stats.last_finished_at = status, error, finished
+
+        next_run = job.next_run(finished, sooner)
+        if not job.local:
+            try:
+                await self._release(job, finished, next_run, status, error, duration,
+                                    result if isinstance(result, dict) else None)
+            except Exception as e:
+                logger.error(f"Job {name}: lease release failed: {e}")
+        self._set_due(name, next_run)
+        return status
+
+    # ── Leases ──
+
+    async def _claim(self, job: Job, now: datetime):
+        """Take the job's lease if it is due. Returns (True, the time it was due,
+        the triggered run's keyword arguments) when claimed, else (False, the
+        time worth checking again, None)."""
+        async with self.session_factory() as db:
+            await db.execute(select(func.pg_advisory_xact_lock(JOB_LOCK_NAMESPACE, func.hashtext(job.name))))
+            row = await db.get(ScheduledJob, job.name)
+            if row is None:
+                row = ScheduledJob(name=job.name, next_run_at=now, run_count=0)
+                db.add(row)
+            elif row.lease_expires_at is not None and row.lease_expires_at > now:
+                return False, row.lease_expires_at, None   # running on another replica
+            elif row.next_run_at is not None and row.next_run_at > now:
+                return False, row.next_run_at, None        # another replica already ran it
+            scheduled, request = row.next_run_at or now, row.run_request
+            row.run_request = None
+            row.owner = self.worker_id
+            row.lease_expires_at = now + timedelta(seconds=job.max_runtime_s)
+            row.last_started_at = now
+            await db.commit()
+        return True, scheduled, request
+
+    async def _release(self, job: Job, finished: datetime, next_run: datetime,
+                       status: str, error: Optional[str], duration: float, result: Optional[dict]):
+        async with self.session_factory() as db:
+            await db.execute(select(func.pg_advisory_xact_lock(JOB_LOCK_NAMESPACE, func.hashtext(job.name))))
+            row = await db.get(ScheduledJob, job.name)
+            if row is None or row.owner != self.worker_id:
+                return  # lease lapsed and was taken over; that run owns the schedule now
+            row.next_run_at = next_run
+            row.lease_expires_at = None
+            row.last_finished_at = finished
+            row.last_status = status
+            row.last_error = error
+            row.last_duration_ms = int(duration * 1000)
+            row.run_count = (row.run_count or 0) + 1
+            row.last_result = result
+            await db.commit()
+
+    async def trigger(self, name: str, **kwargs) -> bool:
+        """Request a run of a cluster job now, calling its func with kwargs, on
+        whichever replica claims it. False if a run is in progress or already
+        requested."""
+        job = self.jobs.get(name)
+        if job is not None and job.local:
+            raise ValueError(f"Job {name} is local; only cluster jobs can be triggered")
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            await db.execute(select(func.pg_advisory_xact_lock(JOB_LOCK_NAMESPACE, func.hashtext(name))))
+            row = await db.get(ScheduledJob, name)
+            if row is None:
+                row = ScheduledJob(name=name, run_count=0)
+                db.add(row)
+            elif (row.lease_expires_at is not None and row.lease_expires_at > now) or row.run_request is not None:
+                return False
+            row.next_run_at = now
+            row.run_request = kwargs
+            await db.commit()
+        if job is not None:
+            self._set_due(name, now)
+        return True
+
+    async def job_state(self, name: str) -> dict:
+        """A cluster job's state as recorded in its row: idle, requested or running,
+        with its last run."""
+        async with self.session_factory() as db:
+            row = await db.get(ScheduledJob, name)
+        if row is None:
+            return {"state": "idle"}
+        running = row.lease_expires_at is not None and row.lease_expires_at > datetime.utcnow()
+        return {
+            "state": "running" if running else "requested" if row.run_request is not None else "idle",
+            "owner": row.owner,
+            "last_started_at": row.last_started_at.isoformat() if row.last_started_at else None,
+            "last_finished_at": row.last_finished_at.isoformat() if row.last_finished_at else None,
+            "last_status": row.last_status,
+            "last_error": row.last_error,
+            "last_result": row.last_result,
+        }
+
+    # ── Metrics ──
+
+    def snapshot(self) -> dict:
+        now = datetime.utcnow()
+        jobs = {}
+        for name, job in self.jobs.items():
+            s = self.stats[name]
+            due = self._due.get(name)
+            jobs[name] = {
+                "scope": "local" if job.local else "cluster",
+                "schedule": f"daily {job.daily_at_utc.strftime('%H:%M')} UTC" if job.daily_at_utc
+                            else f"every {job.interval_s:g}s ±{job.jitter:.0%}",
+                "max_runtime_s": job.max_runtime_s,
+                "running": name in self._running and not self._running[name].done(),
+                "next_check_in_s": round((due - now).total_seconds(), 1) if due else None,
+                "runs": s.runs,
+                "failures": s.failures,
+                "timeouts": s.timeouts,
+                "skipped": s.skipped,
+                "last_status": s.last_status,
+                "last_error": s.last_error,
+                "last_started_at": s.last_started_at.isoformat() if s.last_started_at else None,
+                "duration": s.duration.snapshot(),
+                "lag": s.lag.snapshot(),
+            }
+        return {"worker_id": self.worker_id, "jobs": jobs}
+
+
+scheduler = JobScheduler()
+
+
+def get_scheduler() -> JobScheduler:
+    return scheduler
@@ -0,0 +1,604 @@
+"""
+CAT-72 Learning Profile Store
+- Streaming per-variable estimators: Welford mean/variance, a merging t-digest for
+  quantiles, reservoir-sampled positions (plus the exact extreme fixes), set-based
+  categoricals; constant work per sample however long the learning run
+- Profiles live in cat72_learning_profiles, not in the test's envelope JSON
+- Each process accumulates a delta per test and flushes it every
+  LEARNING_FLUSH_SAMPLES samples or LEARNING_FLUSH_SECONDS, merging into the
+  stored profile under a row lock, so replicas ingesting the same test compose
+- to_legacy() gives the dict shape generate_boundaries_from_profile() reads
+"""
+
+import asyncio
+import logging
+import math
+import random
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models.models import CAT72Test, CAT72LearningProfile
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FORMAT = 2
+DIGEST_COMPRESSION = 100
+POSITION_RESERVOIR = 200
+CATEGORICAL_MAX_VALUES = 100
+LEARNING_FLUSH_SAMPLES = 500
+LEARNING_FLUSH_SECONDS = 30
+PENDING_MAX_TESTS = 1024
+
+_LAT_KEYS = ("latitude", "lat")
+_LNG_KEYS = ("longitude", "lng", "lon")
+
+
+class TDigest:
+    """Merging t-digest (k1 scale): mergeable quantile sketch in O(compression) space."""
+
+    __slots__ = ("compression", "centroids", "count", "min", "max", "_buffer")
+
+    def __init__(self, compression: int = DIGEST_COMPRESSION):
+        self.compression = compression
+        self.centroids: List[Tuple[float, float]] = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[Tuple[float, float]] = []
+
+    def add(self, x: float, w: float = 1.0):
+        self._buffer.append((x, w))
+        self.count += w
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other: "TDigest"):
+        if not other.count:
+            return
+        self._buffer.extend(other.centroids)
+        self._buffer.extend(other._buffer)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def _q_limit(self, q: float) -> float:
+        k = self._k(q) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(self.centroids + self._buffer)
+        self._buffer = []
+        total = self.count
+        out = []
+        done = 0.0
+        cur_m, cur_w = points[0]
+        limit = self._q_limit(0.0) * total
+        for m, w in points[1:]:
+            if done + cur_w + w <= limit:
+                cur_m += (m - cur_m) * w / (cur_w + w)
+                cur_w += w
+            else:
+                out.append((cur_m, cur_w))
+                done += cur_w
+                limit = self._q_limit(done / total) * total
+                cur_m, cur_w = m, w
+        out.append((cur_m, cur_w))
+        self.centroids = out
+
+    def quantile(self, q: float) -> Optional[float]:
+        self._compress()
+        cs = self.centroids
+        if not cs:
+            return None
+        if len(cs) == 1:
+            return cs[0][0]
+        target = q * self.count
+        # centroid i sits at cumulative weight (sum of earlier weights) + w_i/2
+        prev_pos, prev_val = 0.0, self.min
+        cum = 0.0
+        for m, w in cs:
+            pos = cum + w / 2
+            if target <= pos:
+                if pos == prev_pos:
+                    return m
+                return prev_val + (m - prev_val) * (target - prev_pos) / (pos - prev_pos)
+            prev_pos, prev_val = pos, m
+            cum += w
+        if self.count == prev_pos:
+            return self.max
+        return prev_val + (self.max - prev_val) * (target - prev_pos) / (self.count - prev_pos)
+
+    def to_dict(self) -> dict:
+        self._compress()
+        return {"c": [[m, w] for m, w in self.centroids], "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TDigest":
+        digest = cls()
+        digest.centroids = [(float(m), float(w)) for m, w in data.get("c", [])]
+        digest.count = sum(w for _, w in digest.centroids)
+        if digest.centroids:
+            digest.min, digest.max = float(data["min"]), float(data["max"])
+        return digest
+
+
+class VariableProfile:
+    __slots__ = ("count", "type", "n", "min", "max", "mean", "m2", "digest", "max_rate",
+                 "true_count", "false_count", "values", "max_length")
+
+    def __init__(self):
+        self.count = 0
+        self.type: Optional[str] = None
+        self.n = 0  # numeric observations
+        self.min = math.inf
+        self.max = -math.inf
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.digest: Optional[TDigest] = None
+        self.max_rate: Optional[float] = None
+        self.true_count = 0
+        self.false_count = 0
+        self.values: Dict[str, str] = {}  # lowercase -> first-seen spelling
+        self.max_length = 0
+
+    def add_numeric(self, fv: float):
+        self.n += 1
+        delta = fv - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (fv - self.mean)
+        if fv < self.min:
+            self.min = fv
+        if fv > self.max:
+            self.max = fv
+        if self.digest is None:
+            self.digest = TDigest()
+        self.digest.add(fv)
+
+    def merge(self, other: "VariableProfile"):
+        self.count += other.count
+        if other.type is not None:
+            self.type = other.type
+        if other.n:
+            n = self.n + other.n
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta * delta * self.n * other.n / n
+            self.mean += delta * other.n / n
+            self.n = n
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            if self.digest is None:
+                self.digest = TDigest()
+            self.digest.merge(other.digest or TDigest())
+        if other.max_rate is not None and (self.max_rate is None or other.max_rate > self.max_rate):
+            self.max_rate = other.max_rate
+        self.true_count += other.true_count
+        self.false_count += other.false_count
+        for low, value in other.values.items():
+            if len(self.values) >= CATEGORICAL_MAX_VALUES:
+                break
+            self.values.setdefault(low, value)
+        self.max_length = max(self.max_length, other.max_length)
+
+    def to_dict(self) -> dict:
+        data: Dict[str, Any] = {"count": self.count, "type": self.type}
+        if self.n:
+            data.update(n=self.n, min=self.min, max=self.max, mean=self.mean, m2=self.m2,
+                        digest=self.digest.to_dict() if self.digest else None)
+        if self.max_rate is not None:
+            data["max_rate"] = self.max_rate
+        if self.true_count or self.false_count:
+            data.update(true_count=self.true_count, false_count=self.false_count)
+        if self.values:
+            data["values"] = list(self.values.values())
+        if self.max_length:
+            data["max_length"] = self.max_length
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "VariableProfile":
+        vp = cls()
+        vp.count = data.get("count", 0)
+        vp.type = data.get("type")
+        vp.n = data.get("n", 0)
+        if vp.n:
+            vp.min, vp.max = data["min"], data["max"]
+            vp.mean, vp.m2 = data["mean"], data["m2"]
+            vp.digest = TDigest.from_dict(data["digest"]) if data.get("digest") else None
+        vp.max_rate = data.get("max_rate")
+        vp.true_count = data.get("true_count", 0)
+        vp.false_count = data.get("false_count", 0)
+        vp.values = {str(v).lower(): v for v in data.get("values", [])}
+        vp.max_length = data.get("max_length", 0)
+        return vp
+
+    def to_legacy(self) -> dict:
+        data: Dict[str, Any] = {"count": self.count}
+        if self.type is not None:
+            data["type"] = self.type
+        if self.n:
+            data.update(min=self.min, max=self.max, sum=self.mean * self.n,
+                        sum_sq=self.m2 + self.n * self.mean * self.mean,
+                        mean=self.mean, stddev=math.sqrt(max(self.m2, 0.0) / self.n))
+            if self.digest is not None:
+                data.update(p01=self.digest.quantile(0.01), p50=self.digest.quantile(0.5),
+                            p99=self.digest.quantile(0.99))
+        if self.max_rate is not None:
+            data["max_rate"] = self.max_rate
+        if self.true_count or self.false_count:
+            data.update(true_count=self.true_count, false_count=self.false_count)
+        if self.values:
+            data["unique_values"] = list(self.values.values())
+        if self.max_length:
+            data["max_length"] = self.max_length
+        return data
+
+
+class StreamingProfile:
+    """Everything learning mode knows about a test's telemetry."""
+
+    def __init__(self):
+        self.sample_count = 0
+        self.variables: Dict[str, VariableProfile] = {}
+        self.max_gap_s: Optional[float] = None
+        self.avg_gap_s: Optional[float] = None
+        self.gap_count = 0
+        self.positions_seen = 0
+        self.positions: List[List[float]] = []
+        # exact fixes at the min/max latitude and longitude, so the reservoir can't
+        # miss the edge of the operating area
+        self.extremes: Dict[str, List[float]] = {}
+
+    def add(self, state_vector: dict, prev_sv: Optional[dict] = None, interval_s: Optional[float] = None):
+        """Fold one sample in; same typing rules as the per-sample JSON profile it replaces."""
+        self.sample_count += 1
+        if interval_s is not None:
+            self.max_gap_s = interval_s if self.max_gap_s is None else max(self.max_gap_s, interval_s)
+            self.gap_count += 1
+            self.avg_gap_s = interval_s if self.avg_gap_s is None else self.avg_gap_s + (interval_s - self.avg_gap_s) / self.gap_count
+
+        variables = self.variables
+        for key, value in state_vector.items():
+            vp = variables.get(key)
+            if vp is None:
+                vp = variables[key] = VariableProfile()
+            vp.count += 1
+
+            if isinstance(value, bool) or str(value).lower() in ("true", "false"):
+                vp.type = "boolean"
+                if value is True or str(value).lower() == "true":
+                    vp.true_count += 1
+                else:
+                    vp.false_count += 1
+
+            elif isinstance(value, (int, float)):
+                vp.type = "numeric"
+                fv = float(value)
+                vp.add_numeric(fv)
+                if prev_sv and key in prev_sv and interval_s and interval_s > 0:
+                    try:
+                        rate = abs(fv - float(prev_sv[key])) / interval_s
+                        if vp.max_rate is None or rate > vp.max_rate:
+                            vp.max_rate = rate
+                    except (ValueError, TypeError):
+                        pass
+                if key.lower() in _LAT_KEYS:
+                    lng_key = next((k for k in state_vector if k.lower() in _LNG_KEYS), None)
+                    if lng_key is not None:
+                        try:
+                            self._add_position([fv, float(state_vector[lng_key])])
+                        except (ValueError, TypeError):
+                            pass
+
+            elif isinstance(value, list):
+                vp.type = "list"
+                vp.max_length = max(vp.max_length, len(value))
+
+            elif isinstance(value, str):
+                try:
+                    fv = float(value)
+                except ValueError:
+                    vp.type = "categorical"
+                    low = value.lower()
+                    if low not in vp.values and len(vp.values) < CATEGORICAL_MAX_VALUES:
+                        vp.values[low] = value
+                else:
+                    vp.type = "numeric"
+                    vp.add_numeric(fv)
+
+    def _add_position(self, pos: List[float]):
+        self.positions_seen += 1
+        if len(self.positions) < POSITION_RESERVOIR:
+            self.positions.append(pos)
+        else:
+            j = random.randrange(self.positions_seen)
+            if j < POSITION_RESERVOIR:
+                self.positions[j] = pos
+        self._add_extremes([pos])
+
+    def _add_extremes(self, positions):
+        ex = self.extremes
+        for pos in positions:
+            if "min_lat" not in ex or pos[0] < ex["min_lat"][0]:
+                ex["min_lat"] = pos
+            if "max_lat" not in ex or pos[0] > ex["max_lat"][0]:
+                ex["max_lat"] = pos
+            if "min_lng" not in ex or pos[1] < ex["min_lng"][1]:
+                ex["min_lng"] = pos
+            if "max_lng" not in ex or pos[1] > ex["max_lng"][1]:
+                ex["max_lng"] = pos
+
+    def merge(self, other: "StreamingProfile"):
+        self.sample_count += other.sample_count
+        for key, vp in other.variables.items():
+            mine = self.variables.get(key)
+            if mine is None:
+                mine = self.variables[key] = VariableProfile()
+            mine.merge(vp)
+        if other.gap_count:
+            self.max_gap_s = other.max_gap_s if self.max_gap_s is None else max(self.max_gap_s, other.max_gap_s)
+            total = self.gap_count + other.gap_count
+            self.avg_gap_s = ((self.avg_gap_s or 0.0) * self.gap_count + other.avg_gap_s * other.gap_count) / total
+            self.gap_count = total
+        if other.positions_seen:
+            # each reservoir slot comes from either side in proportion to what it has seen
+            seen = self.positions_seen + other.positions_seen
+            take_other = round(POSITION_RESERVOIR * other.positions_seen / seen)
+            take_other = min(take_other, len(other.positions))
+            take_self = min(POSITION_RESERVOIR - take_other, len(self.positions))
+            take_other = min(POSITION_RESERVOIR - take_self, len(other.positions))
+            self.positions = random.sample(self.positions, take_self) + random.sample(other.positions, take_other)
+            self.positions_seen = seen
+            self._add_extremes(other.extremes.values())
+
+    def seed_range(self, key: str, min_value: float, max_value: float, min_count: int = 10):
+        """Replace a numeric variable's statistics with an externally discovered range."""
+        vp = self.variables.get(key) or VariableProfile()
+        count = max(vp.count, min_count)
+        seeded = VariableProfile()
+        seeded.add_numeric(float(min_value))
+        seeded.add_numeric(float(max_value))
+        seeded.type, seeded.count, seeded.max_rate = "numeric", count, vp.max_rate
+        self.variables[key] = seeded
+
+    def seed_categorical(self, key: str, allowed: List[str], min_count: int = 10):
+        vp = self.variables.get(key)
+        if vp is None:
+            vp = self.variables[key] = VariableProfile()
+        vp.type = "categorical"
+        vp.values = {str(v).lower(): v for v in allowed[:CATEGORICAL_MAX_VALUES]}
+        vp.count = max(vp.count, min_count)
+
+    def to_dict(self) -> dict:
+        return {
+            "v": PROFILE_FORMAT,
+            "sample_count": self.sample_count,
+            "variables": {k: vp.to_dict() for k, vp in self.variables.items()},
+            "max_gap_s": self.max_gap_s,
+            "avg_gap_s": self.avg_gap_s,
+            "gap_count": self.gap_count,
+            "positions_seen": self.positions_seen,
+            "positions": self.positions,
+            "extremes": self.extremes,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "StreamingProfile":
+        data = data or {}
+        if data.get("v") != PROFILE_FORMAT:
+            return cls.from_legacy(data)
+        profile = cls()
+        profile.sample_count = data.get("sample_count", 0)
+        profile.variables = {k: VariableProfile.from_dict(v) for k, v in data.get("variables", {}).items()}
+        profile.max_gap_s = data.get("max_gap_s")
+        profile.avg_gap_s = data.get("avg_gap_s")
+        profile.gap_count = data.get("gap_count", 0)
+        profile.positions_seen = data.get("positions_seen", 0)
+        profile.positions = data.get("positions", [])
+        profile.extremes = data.get("extremes", {})
+        return profile
+
+    @classmethod
+    def from_legacy(cls, data: dict) -> "StreamingProfile":
+        """Convert a profile accumulated in envelope_definition["_learning_profile"]."""
+        profile = cls()
+        profile.sample_count = data.get("sample_count", 0)
+        for key, lv in (data.get("variables") or {}).items():
+            vp = profile.variables[key] = VariableProfile()
+            vp.count = lv.get("count", 0)
+            vp.type = lv.get("type")
+            if lv.get("type") == "numeric" and "min" in lv and vp.count:
+                n = vp.count
+                vp.n, vp.min, vp.max = n, float(lv["min"]), float(lv.get("max", lv["min"]))
+                vp.mean = lv.get("sum", 0) / n
+                vp.m2 = max(lv.get("sum_sq", 0) - n * vp.mean * vp.mean, 0.0)
+                vp.digest = TDigest()
+                vp.digest.add(vp.min)
+                vp.digest.add(vp.max)
+            vp.max_rate = lv.get("max_rate")
+            vp.true_count = lv.get("true_count", 0)
+            vp.false_count = lv.get("false_count", 0)
+            vp.values = {str(v).lower(): v for v in lv.get("unique_values", [])}
+            vp.max_length = lv.get("max_length", 0)
+        profile.max_gap_s = data.get("max_gap_s")
+        profile.avg_gap_s = data.get("avg_gap_s")
+        profile.gap_count = data.get("gap_count", 1 if data.get("avg_gap_s") is not None else 0)
+        profile.positions = [list(p) for p in data.get("_positions", [])]
+        profile.positions_seen = len(profile.positions)
+        profile._add_extremes(profile.positions)
+        return profile
+
+    def to_legacy(self) -> dict:
+        """The dict shape generate_boundaries_from_profile() and the profile views read."""
+        legacy: Dict[str, Any] = {
+            "sample_count": self.sample_count,
+            "variables": {k: vp.to_legacy() for k, vp in self.variables.items()},
+        }
+        positions = list(self.positions)
+        positions.extend(p for p in self.extremes.values() if p not in positions)
+        if positions:
+            legacy["_positions"] = positions
+        if self.gap_count:
+            legacy.update(max_gap_s=self.max_gap_s, avg_gap_s=self.avg_gap_s, gap_count=self.gap_count)
+        return legacy
+
+
+# ── store ───────────────────────────────────────────────────
+
+class _Pending:
+    __slots__ = ("test_pk", "delta", "base_samples", "base_variables", "last_flush")
+
+    def __init__(self, test_pk: int, stored: StreamingProfile):
+        self.test_pk = test_pk
+        self.delta = StreamingProfile()
+        self.base_samples = stored.sample_count
+        self.base_variables = set(stored.variables)
+        self.last_flush = datetime.utcnow()
+
+    @property
+    def sample_count(self) -> int:
+        return self.base_samples + self.delta.sample_count
+
+    @property
+    def variable_count(self) -> int:
+        return len(self.base_variables.union(self.delta.variables))
+
+    def flush_due(self) -> bool:
+        return (self.delta.sample_count >= LEARNING_FLUSH_SAMPLES
+                or (self.delta.sample_count and (datetime.utcnow() - self.last_flush).total_seconds() >= LEARNING_FLUSH_SECONDS))
+
+
+_pending: "OrderedDict[str, _Pending]" = OrderedDict()
+
+
+async def _stored_profile(db: AsyncSession, test_pk: int, for_update: bool = False) -> Optional[CAT72LearningProfile]:
+    query = select(CAT72LearningProfile).where(CAT72LearningProfile.test_id == test_pk)
+    if for_update:
+        query = query.with_for_update()
+    return (await db.execute(query)).scalar_one_or_none()
+
+
+async def _legacy_profile(db: AsyncSession, test_pk: int) -> StreamingProfile:
+    env = (await db.execute(select(CAT72Test.envelope_definition).where(CAT72Test.id == test_pk))).scalar_one_or_none()
+    return StreamingProfile.from_legacy((env or {}).get("_learning_profile") or {})
+
+
+async def _read_profile(db: AsyncSession, test_pk: int) -> StreamingProfile:
+    row = await _stored_profile(db, test_pk)
+    if row is not None:
+        return StreamingProfile.from_dict(row.profile)
+    # tests that started learning before the store existed
+    return await _legacy_profile(db, test_pk)
+
+
+async def record_learning_sample(db: AsyncSession, test, state_vector: dict,
+                                 prev_sv: Optional[dict], interval_s: Optional[float]) -> _Pending:
+    """Add a sample to this process's pending delta for the test. The stored
+    profile is only read the first time a process sees the test."""
+    pending = _pending.get(test.test_id)
+    if pending is None:
+        pending = _Pending(test.id, await _read_profile(db, test.id))
+        _pending[test.test_id] = pending
+        while len(_pending) > PENDING_MAX_TESTS:
+            evicted_id, evicted = _pending.popitem(last=False)
+            if evicted.delta.sample_count:
+                asyncio.get_running_loop().create_task(_flush(evicted_id, evicted))
+    _pending.move_to_end(test.test_id)
+    pending.delta.add(state_vector, prev_sv, interval_s)
+    return pending
+
+
+async def _flush(test_id: str, pending: _Pending):
+    delta, pending.delta = pending.delta, StreamingProfile()
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(pg_insert(CAT72LearningProfile).values(
+                test_id=pending.test_pk, sample_count=0, profile=None, updated_at=datetime.utcnow(),
+            ).on_conflict_do_nothing(index_elements=["test_id"]))
+            row = await _stored_profile(db, pending.test_pk, for_update=True)
+            stored = StreamingProfile.from_dict(row.profile) if row.profile else await _legacy_profile(db, pending.test_pk)
+            stored.merge(delta)
+            row.profile = stored.to_dict()
+            row.sample_count = stored.sample_count
+            row.updated_at = datetime.utcnow()
+            await db.commit()
+    except Exception:
+        # keep the samples for the next attempt
+        delta.merge(pending.delta)
+        pending.delta = delta
+        raise
+    pending.base_samples = stored.sample_count
+    pending.base_variables = set(stored.variables)
+    pending.last_flush = datetime.utcnow()
+
+
+async def flush_learning_profile(test_id: str):
+    """Merge this process's pending samples for a test into the stored profile."""
+    pending = _pending.get(test_id)
+    if pending is not None and pending.delta.sample_count:
+        await _flush(test_id, pending)
+
+
+async def flush_if_due(test_id: str, pending: _Pending):
+    """Flush after an ingest once enough samples or time have built up; a failed
+    flush keeps the delta and is retried on the next sample or by the scheduled flush job."""
+    if not pending.flush_due():
+        return
+    try:
+        await _flush(test_id, pending)
+    except Exception as e:
+        logger.error(f"Learning profile flush failed for {test_id}: {e}")
+
+
+async def load_learning_profile(db: AsyncSession, test) -> StreamingProfile:
+    """The stored profile, including anything this process hasn't flushed yet."""
+    await flush_learning_profile(test.test_id)
+    return await _read_profile(db, test.id)
+
+
+async def save_learning_profile(db: AsyncSession, test, profile: StreamingProfile):
+    """Overwrite the stored profile inside the caller's transaction. Samples still
+    pending in this or another process merge into it on their next flush."""
+    data = profile.to_dict()
+    await db.execute(pg_insert(CAT72LearningProfile).values(
+        test_id=test.id, sample_count=profile.sample_count, profile=data, updated_at=datetime.utcnow(),
+    ).on_conflict_do_update(index_elements=["test_id"], set_={
+        "sample_count": profile.sample_count, "profile": data, "updated_at": datetime.utcnow(),
+    }))
+
+
+async def reset_learning_profile(db: AsyncSession, test):
+    _pending.pop(test.test_id, None)
+    await save_learning_profile(db, test, StreamingProfile())
+
+
+def discard_learning_profile(test_id: str):
+    _pending.pop(test_id, None)
+
+
+async def flush_due_learning_profiles():
+    """Scheduled job (per process): flush deltas for tests whose samples have stopped arriving"""
+    for test_id, pending in list(_pending.items()):
+        if not pending.flush_due():
+            continue
+        try:
+            await _flush(test_id, pending)
+        except Exception as e:
+            logger.error(f"Learning profile flush failed for {test_id}: {e}")
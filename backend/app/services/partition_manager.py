@@ -0,0 +1,144 @@
+"""
+Time Partition Maintenance for ENVELO Telemetry
+- telemetry_records and violations are range-partitioned on timestamp (alembic 006)
+- Pre-creates upcoming partitions so ingest never lands in the default partition
+- Drops partitions that fall entirely outside TELEMETRY_RETENTION_DAYS
+"""
+
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("telemetry_records", "violations")
+PARTITION_CHECK_INTERVAL = 6 * 3600  # 6 hours
+
+_BOUND_RE = re.compile(r"FROM \((MINVALUE|'[^']+')\) TO \((MAXVALUE|'[^']+')\)")
+
+
+def period_start(ts: datetime, interval: str) -> datetime:
+    """Start of the partition period containing ts"""
+    if interval == "daily":
+        return datetime(ts.year, ts.month, ts.day)
+    return datetime(ts.year, ts.month, 1)
+
+
+def next_period(start: datetime, interval: str) -> datetime:
+    """Start of the partition period following start"""
+    if interval == "daily":
+        return start + timedelta(days=1)
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def partition_name(table: str, start: datetime, interval: str) -> str:
+    fmt = "%Y%m%d" if interval == "daily" else "%Y%m"
+    return f"{table}_p{start.strftime(fmt)}"
+
+
+def create_partition_sql(table: str, start: datetime, end: datetime, interval: str) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, start, interval)} "
+        f"PARTITION OF {table} FOR VALUES FROM ('{start.isoformat(sep=' ')}') "
+        f"TO ('{end.isoformat(sep=' ')}')"
+    )
+
+
+def _parse_bound(raw: str) -> Optional[datetime]:
+    if raw in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(raw.strip("'"))
+
+
+async def is_partitioned(db: AsyncSession, table: str) -> bool:
+    result = await db.execute(
+        text("SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table"),
+        {"table": table},
+    )
+    return result.first() is not None
+
+
+async def list_partitions(db: AsyncSession, table: str) -> List[Tuple[str, Optional[datetime], Optional[datetime]]]:
+    """Return (name, lower, upper) for each range partition; None means unbounded.
+    The default partition is not included."""
+    result = await db.execute(
+        text("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = :table
+        """),
+        {"table": table},
+    )
+    partitions = []
+    for name, bound in result.fetchall():
+        match = _BOUND_RE.search(bound or "")
+        if not match:
+            continue  # DEFAULT partition
+        partitions.append((name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+    return partitions
+
+
+def _overlaps(lower, upper, start: datetime, end: datetime) -> bool:
+    return (lower is None or lower < end) and (upper is None or upper > start)
+
+
+async def ensure_partitions(
+    db: AsyncSession, table: str, now: datetime, interval: str, premake: int
+) -> List[str]:
+    """Create the current partition plus `premake` future ones. Ranges already
+    covered (e.g. after switching interval) are left alone."""
+    existing = await list_partitions(db, table)
+    created = []
+    start = period_start(now, interval)
+    for _ in range(premake + 1):
+        end = next_period(start, interval)
+        if not any(_overlaps(lo, hi, start, end) for _, lo, hi in existing):
+            await db.execute(text(create_partition_sql(table, start, end, interval)))
+            created.append(partition_name(table, start, interval))
+        start = end
+    return created
+
+
+async def drop_expired_partitions(db: AsyncSession, table: str, cutoff: datetime) -> List[str]:
+    """Detach and drop partitions whose upper bound is at or before cutoff"""
+    dropped = []
+    for name, _, upper in await list_partitions(db, table):
+        if upper is not None and upper <= cutoff:
+            await db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            await db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+async def maintain_partitions(now: Optional[datetime] = None) -> dict:
+    """Run one maintenance pass over all partitioned telemetry tables"""
+    now = now or datetime.utcnow()
+    report = {}
+    async with AsyncSessionLocal() as db:
+        for table in PARTITIONED_TABLES:
+            if not await is_partitioned(db, table):
+                logger.warning(f"Partition maintenance skipped — {table} is not partitioned (run alembic upgrade)")
+                continue
+            created = await ensure_partitions(
+                db, table, now,
+                settings.TELEMETRY_PARTITION_INTERVAL,
+                settings.TELEMETRY_PARTITION_PREMAKE,
+            )
+            dropped = []
+            if settings.TELEMETRY_RETENTION_DAYS > 0:
+                cutoff = now - timedelta(days=settings.TELEMETRY_RETENTION_DAYS)
+                dropped = await drop_expired_partitions(db, table, cutoff)
+            report[table] = {"created": created, "dropped": dropped}
+            if created or dropped:
+                logger.info(f"Partitions for {table}: created={created} dropped={dropped}")
+        await db.commit()
+    return report
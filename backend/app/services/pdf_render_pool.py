@@ -0,0 +1,67 @@
+"""
+PDF Render Pool
+- ReportLab rendering is pure-Python CPU work that holds the GIL for the whole
+  document; renders go to a small process pool so a long compliance log or a
+  batch of certificates never stalls the event loop
+- Renderers are module-level functions taking picklable arguments and returning bytes
+- A broken pool is replaced and the render retried once; PDF_RENDER_WORKERS=0
+  renders in a thread instead
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PdfRenderPool:
+    def __init__(self, workers: int = 0):
+        self.workers = max(0, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.stats = {"rendered": 0, "in_thread": 0, "pool_restarts": 0}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # forkserver: workers don't inherit the API process's threads, sockets or event loop
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+        return self._pool
+
+    def _restart(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        self.stats["pool_restarts"] += 1
+
+    async def render(self, func: Callable[..., bytes], **kwargs) -> bytes:
+        self.stats["rendered"] += 1
+        if self.workers == 0:
+            self.stats["in_thread"] += 1
+            return await asyncio.to_thread(func, **kwargs)
+        loop = asyncio.get_running_loop()
+        for attempt in (1, 2):
+            try:
+                return await loop.run_in_executor(self._get_pool(), _call, func, kwargs)
+            except BrokenProcessPool:
+                logger.warning(f"PDF render pool broke rendering {func.__name__} (attempt {attempt}); restarting")
+                self._restart()
+        self.stats["in_thread"] += 1
+        return await asyncio.to_thread(func, **kwargs)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def _call(func: Callable[..., bytes], kwargs: dict) -> bytes:
+    return func(**kwargs)
+
+
+pdf_render_pool = PdfRenderPool(settings.PDF_RENDER_WORKERS)
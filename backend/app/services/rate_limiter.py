@@ -0,0 +1,152 @@
+"""
+Shared Rate Limiter
+- Sliding-window counters: each key keeps only the current and previous fixed
+  window's counts, and the previous window is weighted by how much of it still
+  overlaps the sliding window, so a check is O(1) in time and memory
+- Several limits per key (e.g. per-minute and per-second burst); a request only
+  counts if it passes all of them
+- Pluggable backends: in-process (LRU-bounded, idle keys evicted) or Redis through
+  CacheService, so limits hold across uvicorn workers and replicas
+- A Redis failure falls back to the in-process counters rather than failing the
+  request or letting it through unchecked
+"""
+
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_KEY_PREFIX = "ratelimit"
+REDIS_ERROR_LOG_INTERVAL_S = 60
+
+
+class RateLimit(NamedTuple):
+    limit: int
+    window_s: float
+
+
+def _estimate(prev: int, curr: int, window_s: float, now: float) -> float:
+    """Requests in the sliding window ending now, from the fixed-window counts."""
+    overlap = 1.0 - (now % window_s) / window_s
+    return prev * overlap + curr
+
+
+TELEMETRY_LIMITS: List[RateLimit] = [RateLimit(120, 60), RateLimit(10, 1)]   # requests per CAT-72 test
+TELEMETRY_SAMPLE_LIMITS: List[RateLimit] = [RateLimit(3600, 60)]             # samples per CAT-72 test (60 Hz)
+GLOBAL_API_LIMITS: List[RateLimit] = [RateLimit(200, 60)]                    # per client IP
+
+
+class MemoryRateLimitBackend:
+    """Counters in this process. Keys idle for longer than their longest window are
+    dropped as they reach the LRU front; max_keys bounds memory under key churn."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> (expires_at, {window_s: [window_index, prev, curr]})
+        self._keys: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _evict(self, now: float):
+        while self._keys:
+            key, (expires_at, _) = next(iter(self._keys.items()))
+            if expires_at > now and len(self._keys) <= self.max_keys:
+                break
+            del self._keys[key]
+
+    async def hit(self, key: str, limits: Sequence[RateLimit], now: float, cost: int = 1) -> bool:
+        entry = self._keys.pop(key, None)
+        counters = entry[1] if entry else {}
+        allowed, touched = True, []
+        for rl in limits:
+            index = math.floor(now / rl.window_s)
+            c = counters.get(rl.window_s)
+            if c is None:
+                c = counters[rl.window_s] = [index, 0, 0]
+            elif c[0] != index:
+                # roll over: the old current window is the new previous one only if adjacent
+                c[1], c[2] = (c[2] if c[0] == index - 1 else 0), 0
+                c[0] = index
+            touched.append(c)
+            if _estimate(c[1], c[2], rl.window_s, now) + cost - 1 >= rl.limit:
+                allowed = False
+        if allowed:
+            for c in touched:
+                c[2] += cost
+        self._keys[key] = (now + 2 * max(rl.window_s for rl in limits), counters)
+        self._evict(now)
+        return allowed
+
+    def reset(self):
+        self._keys.clear()
+
+
+class RedisRateLimitBackend:
+    """Counters in Redis: one INCR'd key per (key, window, window index), expiring
+    after two windows. One pipelined round trip per check, plus one to undo the
+    increments when the request is rejected."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def hit(self, key: str, limits: Sequence[RateLimit], now: float, cost: int = 1) -> bool:
+        pipe = self.client.pipeline(transaction=True)
+        current_keys = []
+        for rl in limits:
+            index = math.floor(now / rl.window_s)
+            base = f"{RATE_LIMIT_KEY_PREFIX}:{key}:{rl.window_s:g}"
+            current_keys.append(f"{base}:{index}")
+            pipe.incrby(f"{base}:{index}", cost)
+            pipe.expire(f"{base}:{index}", math.ceil(2 * rl.window_s))
+            pipe.get(f"{base}:{index - 1}")
+        results = await pipe.execute()
+        allowed = True
+        for i, rl in enumerate(limits):
+            curr, prev = int(results[3 * i]), int(results[3 * i + 2] or 0)
+            # curr includes this request's cost
+            if _estimate(prev, curr - cost, rl.window_s, now) + cost - 1 >= rl.limit:
+                allowed = False
+        if not allowed:
+            pipe = self.client.pipeline(transaction=True)
+            for k in current_keys:
+                pipe.decrby(k, cost)
+            await pipe.execute()
+        return allowed
+
+
+class RateLimiter:
+    def __init__(self, backend=None, fallback: Optional[MemoryRateLimitBackend] = None):
+        self.fallback = MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS) if fallback is None else fallback
+        self.backend = self.fallback if backend is None else backend
+        self._last_error_log = 0.0
+
+    async def hit(self, key: str, limits: Sequence[RateLimit], now: Optional[float] = None, cost: int = 1) -> bool:
+        """Count one request (or `cost` units, e.g. samples) against `key`; False,
+        counting nothing, if that would exceed any limit."""
+        now = time.time() if now is None else now
+        if self.backend is not self.fallback:
+            try:
+                return await self.backend.hit(key, limits, now, cost)
+            except Exception as e:
+                if now - self._last_error_log >= REDIS_ERROR_LOG_INTERVAL_S:
+                    self._last_error_log = now
+                    logger.warning(f"Shared rate limiter unavailable, limiting per process: {e}")
+        return await self.fallback.hit(key, limits, now, cost)
+
+
+def _build_rate_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        from app.services.cache_service import cache
+        if cache.redis_client is not None:
+            return RateLimiter(RedisRateLimitBackend(cache.redis_client))
+        logger.warning("RATE_LIMIT_BACKEND=redis but Redis is unavailable; limiting per process")
+    return RateLimiter()
+
+
+rate_limiter = _build_rate_limiter()
@@ -0,0 +1,141 @@
+"""
+Telemetry Export
+- Keyset pagination over (timestamp, id) for telemetry_records and violations
+- Opaque cursors: urlsafe base64 of "<iso timestamp>|<id>"
+- Column-level selects, no ORM object materialization
+- Streaming NDJSON/CSV export through a server-side cursor in constant memory
+"""
+
+import base64
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import TelemetryRecord, Violation
+
+logger = logging.getLogger(__name__)
+
+EXPORT_KINDS = {
+    "telemetry": (TelemetryRecord, (
+        "id", "timestamp", "action_id", "action_type", "result",
+        "execution_time_ms", "parameters", "boundary_evaluations",
+    )),
+    "violations": (Violation, (
+        "id", "timestamp", "boundary_name", "violation_message", "parameters",
+    )),
+}
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+MAX_PAGE_SIZE = 5000
+EXPORT_CHUNK_SIZE = 2000
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{ts.isoformat()}|{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError on anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def serialize_row(row: dict) -> dict:
+    out = dict(row)
+    out["timestamp"] = row["timestamp"].isoformat() if row["timestamp"] else None
+    return out
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+def _select(kind: str, session_pk: int):
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"Unknown export kind: {kind}")
+    model, columns = EXPORT_KINDS[kind]
+    return model, select(*[getattr(model, c) for c in columns]).where(model.session_id == session_pk)
+
+
+async def keyset_page(
+    db: AsyncSession,
+    kind: str,
+    session_pk: int,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    filters: Sequence = (),
+) -> Tuple[List[dict], Optional[str]]:
+    """One page, newest first, plus the cursor for the next page (None on the last page).
+
+    Seeks straight to the cursor position via the (session_id, timestamp) index,
+    so page N costs the same as page 1. `filters` are extra WHERE clauses.
+    """
+    model, stmt = _select(kind, session_pk)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stmt = stmt.where(*filters)
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(model.timestamp, model.id) < tuple_(ts, row_id))
+    stmt = stmt.order_by(model.timestamp.desc(), model.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(stmt)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+    return [dict(r) for r in rows], next_cursor
+
+
+async def count_rows(db: AsyncSession, kind: str, session_pk: int, filters: Sequence = ()) -> int:
+    """Rows of a session matching the same WHERE clauses as keyset_page"""
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"Unknown export kind: {kind}")
+    model = EXPORT_KINDS[kind][0]
+    stmt = select(func.count()).select_from(model).where(model.session_id == session_pk, *filters)
+    return int((await db.execute(stmt)).scalar() or 0)
+
+
+def _encode_chunk(rows, columns, fmt: str) -> str:
+    if fmt == "ndjson":
+        return "".join(json.dumps(serialize_row(r), default=str) + "\n" for r in rows)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for r in rows:
+        r = serialize_row(r)
+        writer.writerow([_csv_value(r[c]) for c in columns])
+    return buf.getvalue()
+
+
+async def iter_export(db: AsyncSession, kind: str, session_pk: int, fmt: str = "ndjson") -> AsyncIterator[str]:
+    """Yield a whole session's rows in chronological order as NDJSON or CSV text chunks.
+
+    Rows come off a server-side cursor EXPORT_CHUNK_SIZE at a time, so memory stays
+    flat regardless of session size.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    model, stmt = _select(kind, session_pk)
+    columns = EXPORT_KINDS[kind][1]
+    stmt = stmt.order_by(model.timestamp, model.id).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.writer(buf).writerow(columns)
+        yield buf.getvalue()
+
+    result = await db.stream(stmt)
+    async for rows in result.mappings().partitions():
+        yield _encode_chunk(rows, columns, fmt)
@@ -0,0 +1,248 @@
+"""
+Telemetry JSONB
+- Online Text -> JSONB conversion of the telemetry JSON columns (alembic 008,
+  scripts/backfill_telemetry_jsonb.py): shadow columns kept current by a trigger,
+  batched backfill by id range, a batched catch-up pass, then a swap under lock
+  that only looks at ids past the catch-up
+- GIN (jsonb_path_ops) indexes, built concurrently per partition
+- Server-side parameter/boundary filters and aggregates for the read endpoints
+"""
+
+import logging
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import select, func, text, case, cast, Float
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import TelemetryRecord
+
+logger = logging.getLogger(__name__)
+
+JSONB_COLUMNS = {
+    "telemetry_records": ("parameters", "boundary_evaluations", "system_state"),
+    "violations": ("parameters",),
+}
+GIN_INDEXES = {
+    "ix_telemetry_records_parameters": ("telemetry_records", "parameters"),
+    "ix_telemetry_records_boundary_evaluations": ("telemetry_records", "boundary_evaluations"),
+    "ix_violations_parameters": ("violations", "parameters"),
+}
+BACKFILL_BATCH_SIZE = 50000
+SHADOW_SUFFIX = "_jsonb"
+
+# Rows written before validation existed may hold non-JSON text; keep them as JSON strings
+TRY_JSONB_FUNCTION = """
+CREATE OR REPLACE FUNCTION telemetry_try_jsonb(t text) RETURNS jsonb AS $$
+BEGIN
+    IF t IS NULL OR t = '' THEN
+        RETURN NULL;
+    END IF;
+    RETURN t::jsonb;
+EXCEPTION WHEN others THEN
+    RETURN to_jsonb(t);
+END
+$$ LANGUAGE plpgsql IMMUTABLE
+"""
+
+PARAMETER_OPS = {"eq", "ne", "gt", "gte", "lt", "lte"}
+
+
+# --- Conversion (sync: runs on alembic's connection or via run_sync) ---
+
+def column_type(conn, table: str, column: str) -> Optional[str]:
+    return conn.execute(text(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :t AND column_name = :c"
+    ), {"t": table, "c": column}).scalar()
+
+
+def needs_conversion(conn, table: str) -> bool:
+    return any(column_type(conn, table, c) == "text" for c in JSONB_COLUMNS[table])
+
+
+def _pending_predicate(table: str) -> str:
+    return " OR ".join(
+        f"({c} IS NOT NULL AND {c}{SHADOW_SUFFIX} IS NULL)" for c in JSONB_COLUMNS[table]
+    )
+
+
+def expand(conn, table: str):
+    """Add shadow JSONB columns and a trigger that fills them on every write"""
+    cols = JSONB_COLUMNS[table]
+    conn.execute(text(TRY_JSONB_FUNCTION))
+    for c in cols:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {c}{SHADOW_SUFFIX} JSONB"))
+    assigns = "\n".join(f"    NEW.{c}{SHADOW_SUFFIX} := telemetry_try_jsonb(NEW.{c});" for c in cols)
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION {table}_jsonb_sync() RETURNS trigger AS $$
+        BEGIN
+        {assigns}
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """))
+    conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_jsonb_sync ON {table}"))
+    conn.execute(text(
+        f"CREATE TRIGGER {table}_jsonb_sync BEFORE INSERT OR UPDATE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {table}_jsonb_sync()"
+    ))
+
+
+def _fill(conn, table: str, batch_size: int,
+          progress: Optional[Callable[[str, int, int], None]] = None) -> Tuple[int, int]:
+    """(rows filled, highest id covered) of one batched pass."""
+    lo, hi = conn.execute(text(f"SELECT min(id), max(id) FROM {table}")).one()
+    if lo is None:
+        return 0, 0
+    sets = ", ".join(f"{c}{SHADOW_SUFFIX} = telemetry_try_jsonb({c})" for c in JSONB_COLUMNS[table])
+    stmt = text(
+        f"UPDATE {table} SET {sets} WHERE id >= :lo AND id < :hi AND ({_pending_predicate(table)})"
+    )
+    done = 0
+    while lo <= hi:
+        result = conn.execute(stmt, {"lo": lo, "hi": lo + batch_size})
+        done += result.rowcount or 0
+        lo += batch_size
+        if progress:
+            progress(table, lo, done)
+    return done, hi
+
+
+def backfill(conn, table: str, batch_size: int = BACKFILL_BATCH_SIZE,
+             progress: Optional[Callable[[str, int, int], None]] = None) -> int:
+    """Fill shadow columns in id-range batches. Run with the connection in autocommit
+    so every batch commits on its own and holds row locks only briefly. Resumable."""
+    return _fill(conn, table, batch_size, progress)[0]
+
+
+def catch_up(conn, table: str, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """A backfill pass (autocommit, batched) right before swap(); returns the
+    highest id it covered. The sync trigger exists by then (CREATE TRIGGER waits
+    out in-flight writers), so only rows above that id can still be pending."""
+    return _fill(conn, table, batch_size)[1]
+
+
+def swap(conn, table: str, covered_id: int):
+    """Fill rows written since catch_up() covered `covered_id`, then replace the
+    text columns with the shadows. Runs in the caller's transaction; under the
+    lock it reads only ids past covered_id (an index range), and DROP/RENAME
+    COLUMN are catalog-only."""
+    cols = JSONB_COLUMNS[table]
+    conn.execute(text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+    sets = ", ".join(f"{c}{SHADOW_SUFFIX} = telemetry_try_jsonb({c})" for c in cols)
+    conn.execute(text(f"UPDATE {table} SET {sets} WHERE id > :covered AND ({_pending_predicate(table)})"),
+                 {"covered": covered_id})
+    conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_jsonb_sync ON {table}"))
+    conn.execute(text(f"DROP FUNCTION IF EXISTS {table}_jsonb_sync()"))
+    for c in cols:
+        conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {c}"))
+        conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {c}{SHADOW_SUFFIX} TO {c}"))
+
+
+def create_gin_indexes(conn):
+    """Build the GIN indexes without blocking writes (needs an autocommit connection).
+
+    CREATE INDEX CONCURRENTLY is not allowed on a partitioned parent, so the parent
+    index is created ON ONLY (invalid, no data) and each partition's index is built
+    concurrently and attached; the parent becomes valid once all are attached.
+    """
+    for name, (table, column) in GIN_INDEXES.items():
+        using = f"USING gin ({column} jsonb_path_ops)"
+        partitioned = conn.execute(text(
+            "SELECT relkind = 'p' FROM pg_class WHERE relname = :t AND relnamespace = current_schema()::regnamespace"
+        ), {"t": table}).scalar()
+        if not partitioned:
+            conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {using}"))
+            continue
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} {using}"))
+        parts = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :t ORDER BY c.relname"
+        ), {"t": table}).scalars().all()
+        for part in parts:
+            part_index = f"{part}_{column}_idx"[:63]
+            conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {part_index} ON {part} {using}"))
+            conn.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {part_index}"))
+
+
+# --- Query helpers ---
+
+def _as_number(field):
+    """field::float when it holds a JSON number, else NULL (CASE guards the cast)"""
+    return case((func.jsonb_typeof(field) == "number", cast(field.astext, Float)))
+
+
+def parameter_filter(model, key: str, op: str, value: str):
+    """WHERE clause comparing parameters->key to value.
+    eq/ne use JSONB containment (served by the GIN index); ordering ops compare numerically."""
+    if op not in PARAMETER_OPS:
+        raise ValueError(f"op must be one of {sorted(PARAMETER_OPS)}")
+    if op in ("eq", "ne"):
+        try:
+            literal = float(value)
+            if literal.is_integer():
+                literal = int(literal)
+        except ValueError:
+            literal = value
+        clause = model.parameters.contains({key: literal})
+        return clause if op == "eq" else ~clause
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError("gt/gte/lt/lte need a numeric value")
+    value = _as_number(model.parameters[key])
+    return {"gt": value > number, "gte": value >= number,
+            "lt": value < number, "lte": value <= number}[op]
+
+
+def failed_boundary_filter(boundary: str):
+    """Telemetry records where `boundary` was evaluated and failed (GIN containment)"""
+    return TelemetryRecord.boundary_evaluations.contains([{"boundary": boundary, "passed": False}])
+
+
+async def parameter_stats(db: AsyncSession, session_pk: int, key: str) -> dict:
+    """count/min/max/avg/stddev of a numeric parameter, overall and per result"""
+    value = _as_number(TelemetryRecord.parameters[key])
+    result = await db.execute(
+        select(
+            TelemetryRecord.result,
+            func.count(),
+            func.min(value), func.max(value), func.avg(value), func.stddev_pop(value),
+        )
+        .where(TelemetryRecord.session_id == session_pk, value.isnot(None))
+        .group_by(TelemetryRecord.result)
+    )
+    by_result = {}
+    for res, n, lo, hi, avg, std in result.all():
+        by_result[res or ""] = {"count": n, "min": lo, "max": hi, "mean": avg, "stddev": std}
+    total = sum(r["count"] for r in by_result.values())
+    return {
+        "parameter": key,
+        "count": total,
+        "min": min((r["min"] for r in by_result.values()), default=None),
+        "max": max((r["max"] for r in by_result.values()), default=None),
+        "mean": (sum(r["mean"] * r["count"] for r in by_result.values()) / total) if total else None,
+        "by_result": by_result,
+    }
+
+
+async def boundary_stats(db: AsyncSession, session_pk: int) -> List[dict]:
+    """Evaluations and failures per boundary, unnested from boundary_evaluations in SQL"""
+    result = await db.execute(text("""
+        SELECT coalesce(ev->>'boundary', ev->>'parameter', '') AS boundary,
+               count(*) AS evaluations,
+               count(*) FILTER (WHERE ev->>'passed' = 'false') AS failures
+        FROM telemetry_records t
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(t.boundary_evaluations) = 'array'
+                 THEN t.boundary_evaluations ELSE '[]'::jsonb END
+        ) AS ev
+        WHERE t.session_id = :session_id
+        GROUP BY 1
+        ORDER BY 3 DESC, 1
+    """), {"session_id": session_pk})
+    return [
+        {"boundary": b, "evaluations": n, "failures": f, "failure_rate": round(f / n, 4) if n else 0.0}
+        for b, n, f in result.all()
+    ]
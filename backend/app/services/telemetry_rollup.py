@@ -0,0 +1,272 @@
+"""
+Telemetry Rollups
+- Per session per minute/hour pass/block counts and violation counts by boundary
+- Maintained incrementally at ingest with ON CONFLICT upserts
+- A background compactor prunes minute buckets past MINUTE_ROLLUP_RETENTION_HOURS
+- rebuild_rollups() recomputes any window from the raw tables (backfill / repair)
+- Fleet totals live in fleet_rollup_totals, kept by a trigger on the hourly
+  rollups, so every write moves them (live, late or backfilled samples,
+  rebuilds, sessions deleted with their rollups) and every worker reads the
+  same numbers from FLEET_TOTAL_SLOTS rows
+"""
+
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, delete, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models.models import FleetRollupTotal, TelemetryRollup, ViolationRollup
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_GRANULARITIES = ("minute", "hour")
+MINUTE_ROLLUP_RETENTION_HOURS = 48
+COMPACTION_INTERVAL = 3600  # 1 hour
+FLEET_TOTAL_SLOTS = 16  # fleet_rollup_totals rows, by session_id, so concurrent ingest rarely shares one
+
+# Trigger keeping fleet_rollup_totals equal to the sums of the hourly rollups
+FLEET_TOTALS_SQL = [
+    f"""
+    CREATE OR REPLACE FUNCTION fleet_rollup_totals_sync() RETURNS trigger AS $$
+    DECLARE
+        d_tel BIGINT := 0;
+        d_viol BIGINT := 0;
+        sid INTEGER;
+    BEGIN
+        IF TG_OP <> 'DELETE' THEN
+            IF NEW.granularity = 'hour' THEN
+                IF TG_TABLE_NAME = 'telemetry_rollups' THEN
+                    d_tel := NEW.pass_count + NEW.block_count;
+                ELSE
+                    d_viol := NEW.violation_count;
+                END IF;
+            END IF;
+            sid := NEW.session_id;
+        END IF;
+        IF TG_OP <> 'INSERT' THEN
+            IF OLD.granularity = 'hour' THEN
+                IF TG_TABLE_NAME = 'telemetry_rollups' THEN
+                    d_tel := d_tel - OLD.pass_count - OLD.block_count;
+                ELSE
+                    d_viol := d_viol - OLD.violation_count;
+                END IF;
+            END IF;
+            sid := OLD.session_id;
+        END IF;
+        IF d_tel <> 0 OR d_viol <> 0 THEN
+            INSERT INTO fleet_rollup_totals (slot, telemetry_count, violation_count)
+            VALUES (sid % {FLEET_TOTAL_SLOTS}, d_tel, d_viol)
+            ON CONFLICT (slot) DO UPDATE SET
+                telemetry_count = fleet_rollup_totals.telemetry_count + EXCLUDED.telemetry_count,
+                violation_count = fleet_rollup_totals.violation_count + EXCLUDED.violation_count;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS telemetry_rollups_fleet_totals ON telemetry_rollups",
+    "CREATE TRIGGER telemetry_rollups_fleet_totals AFTER INSERT OR UPDATE OR DELETE ON telemetry_rollups "
+    "FOR EACH ROW EXECUTE FUNCTION fleet_rollup_totals_sync()",
+    "DROP TRIGGER IF EXISTS violation_rollups_fleet_totals ON violation_rollups",
+    "CREATE TRIGGER violation_rollups_fleet_totals AFTER INSERT OR UPDATE OR DELETE ON violation_rollups "
+    "FOR EACH ROW EXECUTE FUNCTION fleet_rollup_totals_sync()",
+]
+
+# Sets fleet_rollup_totals from the hourly rollups (install, repair)
+FLEET_TOTALS_RECOUNT_SQL = [
+    "DELETE FROM fleet_rollup_totals",
+    f"""
+    INSERT INTO fleet_rollup_totals (slot, telemetry_count, violation_count)
+    SELECT slot, sum(tel), sum(viol) FROM (
+        SELECT session_id % {FLEET_TOTAL_SLOTS} AS slot, CAST(pass_count + block_count AS BIGINT) AS tel,
+               CAST(0 AS BIGINT) AS viol
+        FROM telemetry_rollups WHERE granularity = 'hour'
+        UNION ALL
+        SELECT session_id % {FLEET_TOTAL_SLOTS}, 0, violation_count
+        FROM violation_rollups WHERE granularity = 'hour'
+    ) counts GROUP BY slot
+    """,
+]
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return ts.replace(second=0, microsecond=0)
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+async def record_rollups(
+    db: AsyncSession,
+    session_pk: int,
+    results: Iterable[Tuple[datetime, str]],
+    violations: Iterable[Tuple[datetime, str]] = (),
+):
+    """Fold one ingest batch into the rollup tables.
+
+    results: (timestamp, result) per telemetry record; anything but PASS counts as a block,
+    matching how the timeline has always been bucketed.
+    violations: (timestamp, boundary_name) per violation row.
+    Runs in the caller's transaction so rollups commit atomically with the raw rows.
+    """
+    passes, blocks = Counter(), Counter()
+    for ts, result in results:
+        for g in ROLLUP_GRANULARITIES:
+            key = (g, bucket_start(ts, g))
+            if result == "PASS":
+                passes[key] += 1
+            else:
+                blocks[key] += 1
+
+    if passes or blocks:
+        stmt = pg_insert(TelemetryRollup).values([
+            {"session_id": session_pk, "granularity": g, "bucket_start": b,
+             "pass_count": passes.get((g, b), 0), "block_count": blocks.get((g, b), 0)}
+            for g, b in sorted(set(passes) | set(blocks))
+        ])
+        await db.execute(stmt.on_conflict_do_update(
+            constraint="uq_telemetry_rollups_bucket",
+            set_={
+                "pass_count": TelemetryRollup.pass_count + stmt.excluded.pass_count,
+                "block_count": TelemetryRollup.block_count + stmt.excluded.block_count,
+            },
+        ))
+
+    counts = Counter()
+    for ts, boundary in violations:
+        for g in ROLLUP_GRANULARITIES:
+            counts[(g, bucket_start(ts, g), (boundary or "")[:100])] += 1
+
+    if counts:
+        stmt = pg_insert(ViolationRollup).values([
+            {"session_id": session_pk, "granularity": g, "bucket_start": b,
+             "boundary_name": name, "violation_count": n}
+            for (g, b, name), n in sorted(counts.items())
+        ])
+        await db.execute(stmt.on_conflict_do_update(
+            constraint="uq_violation_rollups_bucket",
+            set_={"violation_count": ViolationRollup.violation_count + stmt.excluded.violation_count},
+        ))
+
+
+async def read_timeline(
+    db: AsyncSession, session_pk: int, since: datetime, granularity: str = "hour"
+) -> List[dict]:
+    """One entry per non-empty bucket since `since`, with violations broken out by boundary"""
+    start = bucket_start(since, granularity)
+    result = await db.execute(
+        select(TelemetryRollup.bucket_start, TelemetryRollup.pass_count, TelemetryRollup.block_count)
+        .where(
+            TelemetryRollup.session_id == session_pk,
+            TelemetryRollup.granularity == granularity,
+            TelemetryRollup.bucket_start >= start,
+        )
+        .order_by(TelemetryRollup.bucket_start)
+    )
+    buckets = {
+        b: {"hour": b.isoformat(), "pass": p, "block": k, "total": p + k, "violations": {}}
+        for b, p, k in result.all()
+    }
+
+    result = await db.execute(
+        select(ViolationRollup.bucket_start, ViolationRollup.boundary_name, ViolationRollup.violation_count)
+        .where(
+            ViolationRollup.session_id == session_pk,
+            ViolationRollup.granularity == granularity,
+            ViolationRollup.bucket_start >= start,
+        )
+    )
+    for b, name, n in result.all():
+        if b in buckets:
+            buckets[b]["violations"][name] = n
+
+    return [buckets[b] for b in sorted(buckets)]
+
+
+async def rollup_totals(db: AsyncSession) -> Tuple[int, int]:
+    """(telemetry records, violations) across the fleet, from the hourly rollups."""
+    tel, viol = (await db.execute(select(
+        func.coalesce(func.sum(FleetRollupTotal.telemetry_count), 0),
+        func.coalesce(func.sum(FleetRollupTotal.violation_count), 0),
+    ))).one()
+    return int(tel), int(viol)
+
+
+async def session_totals(db: AsyncSession, session_pk: int) -> Tuple[int, int]:
+    """(telemetry records, violations) for one session, from the hourly rollups"""
+    tel = await db.execute(
+        select(func.coalesce(func.sum(TelemetryRollup.pass_count + TelemetryRollup.block_count), 0))
+        .where(TelemetryRollup.session_id == session_pk, TelemetryRollup.granularity == "hour")
+    )
+    viol = await db.execute(
+        select(func.coalesce(func.sum(ViolationRollup.violation_count), 0))
+        .where(ViolationRollup.session_id == session_pk, ViolationRollup.granularity == "hour")
+    )
+    return int(tel.scalar() or 0), int(viol.scalar() or 0)
+
+
+def rebuild_rollups_sql(granularity: str, session_filter: str = "") -> List[str]:
+    """Statements that replace rollups of one granularity from :since onward.
+    session_filter is an optional extra predicate on session_id (e.g. "= :session_id")."""
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise ValueError(f"Unknown rollup granularity: {granularity}")
+    sess = f" AND session_id {session_filter}" if session_filter else ""
+    window = f"date_trunc('{granularity}', CAST(:since AS timestamp))"
+    return [
+        f"DELETE FROM telemetry_rollups WHERE granularity = '{granularity}' AND bucket_start >= {window}{sess}",
+        f"DELETE FROM violation_rollups WHERE granularity = '{granularity}' AND bucket_start >= {window}{sess}",
+        f"""
+        INSERT INTO telemetry_rollups (session_id, granularity, bucket_start, pass_count, block_count)
+        SELECT session_id, '{granularity}', date_trunc('{granularity}', timestamp),
+               count(*) FILTER (WHERE result = 'PASS'),
+               count(*) FILTER (WHERE result IS DISTINCT FROM 'PASS')
+        FROM telemetry_records
+        WHERE session_id IS NOT NULL AND timestamp >= {window}{sess}
+        GROUP BY 1, 3
+        """,
+        f"""
+        INSERT INTO violation_rollups (session_id, granularity, bucket_start, boundary_name, violation_count)
+        SELECT session_id, '{granularity}', date_trunc('{granularity}', timestamp),
+               left(coalesce(boundary_name, ''), 100), count(*)
+        FROM violations
+        WHERE session_id IS NOT NULL AND timestamp >= {window}{sess}
+        GROUP BY 1, 3, 4
+        """,
+    ]
+
+
+async def rebuild_rollups(db: AsyncSession, since: datetime, session_pk: Optional[int] = None):
+    """Recompute rollups from raw telemetry for buckets starting at or after `since`"""
+    params = {"since": since}
+    session_filter = ""
+    if session_pk is not None:
+        params["session_id"] = session_pk
+        session_filter = "= :session_id"
+    for g in ROLLUP_GRANULARITIES:
+        for stmt in rebuild_rollups_sql(g, session_filter):
+            await db.execute(text(stmt), params)
+
+
+async def compact_rollups(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """Drop minute buckets older than the retention window; hourly buckets are kept"""
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=MINUTE_ROLLUP_RETENTION_HOURS)
+    removed = 0
+    for model in (TelemetryRollup, ViolationRollup):
+        result = await db.execute(
+            delete(model).where(model.granularity == "minute", model.bucket_start < cutoff)
+        )
+        removed += result.rowcount or 0
+    return removed
+
+
+async def run_rollup_compaction():
+    """Scheduled job: prune expired minute rollups"""
+    async with AsyncSessionLocal() as db:
+        removed = await compact_rollups(db)
+        await db.commit()
+    if removed:
+        logger.info(f"Rollup compactor removed {removed} minute buckets")
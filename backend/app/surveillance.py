@@ -14,13 +14,21 @@ Wire up in main.py with: from app.surveillance import start_surveillance
 """
 
 import asyncio
+import json
 import logging
+import math
+import os
+import socket
+import time
+import uuid
+import zlib
+from collections import OrderedDict, deque
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
-from sqlalchemy import select, update, and_
+from sqlalchemy import select, update, and_, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 log = logging.getLogger("sentinel.surveillance")
@@ -46,11 +54,24 @@ class SurveillanceConfig:
     VIOLATION_SUSPEND_RATE: float = 0.10       # 10% block rate → auto-suspend
 
     # Scan intervals
-    SCAN_INTERVAL_SECONDS: int = 30            # how often the engine runs
+    SCAN_INTERVAL_SECONDS: int = 30            # longest the engine sleeps between passes
+    EVENT_BATCH_SECONDS: float = 1.0           # after a heartbeat wakes the engine, wait this long to batch more
     SCORE_RECALC_SECONDS: int = 60             # how often scores refresh
 
+    # Alert store
+    ALERT_STORE_CAPACITY: int = 500            # alerts kept in memory (older ones stay in the DB)
+    ALERT_DEDUP_RETENTION_SECONDS: int = 3600  # dedup keys older than any dedup window are dropped
+    ALERT_FLUSH_SECONDS: float = 1.0           # alert writes are batched for up to this long
+    ALERT_FLUSH_BATCH: int = 100               # ... or until this many are pending
+
+    # Multiple workers / replicas
+    SHARD_COUNT: int = 64                      # sessions are split into this many leased shards
+    SHARD_LEASE_SECONDS: int = 30              # a lease not renewed for this long is free to take
+    SHARD_REBALANCE_SECONDS: int = 10          # how often leases are renewed and rebalanced
+    CLUSTER_SYNC_SECONDS: int = 5              # how often heartbeats/alerts from other workers are read
+
     # Grace period after certification
-    GRACE_PERIOD_SECONDS: int = 300            # 5 min grace before enforcement kicks in
+    GRACE_PERIOD_SECONDS: int = 300            # 5 min for sessions taken over dark to reconnect before suspension
 
 
 # ── Data structures ───────────────────────────────────────────
@@ -145,8 +166,196 @@ class SurveillanceAlert:
         }
 
 
+class AlertStore:
+    """
+    The most recent alerts, capped at `capacity`. Alerts are indexed by id,
+    certificate and severity in arrival order, so lookups and filtered queries
+    cost O(result) and evicting the oldest alert is O(1) in every index.
+    """
+
+    def __init__(self, capacity: int = SurveillanceConfig.ALERT_STORE_CAPACITY):
+        self.capacity = capacity
+        self._by_id: "OrderedDict[str, SurveillanceAlert]" = OrderedDict()
+        self._by_cert: Dict[str, deque] = {}
+        self._by_severity: Dict[str, deque] = {}
+        self.unacknowledged: int = 0
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def get(self, alert_id: str) -> Optional[SurveillanceAlert]:
+        return self._by_id.get(alert_id)
+
+    def append(self, alert: SurveillanceAlert):
+        if alert.id in self._by_id:
+            return
+        self._by_id[alert.id] = alert
+        self._by_cert.setdefault(alert.certificate_id, deque()).append(alert)
+        self._by_severity.setdefault(alert.severity.value, deque()).append(alert)
+        self.unacknowledged += not alert.acknowledged
+        while len(self._by_id) > self.capacity:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        _, alert = self._by_id.popitem(last=False)
+        # the oldest alert overall is also the oldest in each of its indexes
+        for index, key in ((self._by_cert, alert.certificate_id), (self._by_severity, alert.severity.value)):
+            bucket = index[key]
+            bucket.popleft()
+            if not bucket:
+                del index[key]
+        self.unacknowledged -= not alert.acknowledged
+
+    def acknowledge(self, alert_id: str, acknowledged_by: str) -> Optional[SurveillanceAlert]:
+        alert = self._by_id.get(alert_id)
+        if alert is None:
+            return None
+        if not alert.acknowledged:
+            self.unacknowledged -= 1
+        alert.acknowledged = True
+        alert.acknowledged_at = datetime.now(timezone.utc)
+        alert.acknowledged_by = acknowledged_by
+        return alert
+
+    def query(self, limit: int = 50, severity: Optional[str] = None, certificate_id: Optional[str] = None,
+              unacknowledged_only: bool = False) -> List[SurveillanceAlert]:
+        """Newest `limit` matching alerts, oldest first. Scans the narrowest index backwards."""
+        if certificate_id:
+            source = self._by_cert.get(certificate_id, ())
+        elif severity:
+            source = self._by_severity.get(severity, ())
+        else:
+            source = self._by_id.values()
+        out = []
+        for alert in reversed(source):
+            if len(out) >= limit:
+                break
+            if severity and alert.severity.value != severity:
+                continue
+            if unacknowledged_only and alert.acknowledged:
+                continue
+            out.append(alert)
+        out.reverse()
+        return out
+
+
+class AlertWriter:
+    """
+    Persists alerts and acknowledgements to surveillance_alerts in batches:
+    everything queued within ALERT_FLUSH_SECONDS (or ALERT_FLUSH_BATCH items)
+    is written in one transaction. A failed batch is kept for the next flush,
+    up to the alert store capacity.
+    """
+
+    INSERT_SQL = text(
+        "INSERT INTO surveillance_alerts (alert_id, alert_type, severity, certificate_id, session_id, message, details, "
+        "created_at, acknowledged, acknowledged_at, acknowledged_by) "
+        "VALUES (:aid, :atype, :sev, :cert, :sess, :msg, :det, :cat, :ack, :aat, :aby) "
+        "ON CONFLICT (alert_id) DO NOTHING"
+    )
+    ACK_SQL = text(
+        "UPDATE surveillance_alerts SET acknowledged=TRUE, acknowledged_at=:aat, acknowledged_by=:aby WHERE alert_id=:aid"
+    )
+
+    def __init__(self, session_factory=None, config: "SurveillanceConfig" = None):
+        self.session_factory = session_factory
+        self.config = config or SurveillanceConfig
+        self._inserts: List[SurveillanceAlert] = []
+        self._acks: Dict[str, SurveillanceAlert] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._timer_sleeping = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._inserts) + len(self._acks)
+
+    def add(self, alert: SurveillanceAlert):
+        self._inserts.append(alert)
+        self._schedule()
+
+    def acknowledge(self, alert: SurveillanceAlert):
+        self._acks[alert.id] = alert
+        self._schedule()
+
+    def _schedule(self, retry: bool = False):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop (e.g. a sync caller); written on the next flush
+        # A full batch is written right away; otherwise wait for more. Retries always wait.
+        full = self.pending >= self.config.ALERT_FLUSH_BATCH and not retry
+        if self._timer is not None and not self._timer.done():
+            if not full or not self._timer_sleeping:
+                return
+            self._timer.cancel()
+        self._timer_sleeping = not full
+        self._timer = loop.create_task(self.flush() if full else self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.config.ALERT_FLUSH_SECONDS)
+        self._timer_sleeping = False
+        await self.flush()
+
+    async def flush(self):
+        current = asyncio.current_task()
+        # An explicit flush supersedes a timer that is still waiting
+        if self._timer is not None and self._timer is not current and self._timer_sleeping:
+            self._timer.cancel()
+            self._timer = None
+        # Take the batch before the first await so concurrent flushes never overlap
+        inserts, self._inserts = self._inserts, []
+        acks, self._acks = self._acks, {}
+        if not inserts and not acks:
+            return
+        failed = False
+        try:
+            factory = self.session_factory
+            if factory is None:
+                from app.core.database import AsyncSessionLocal as factory
+            async with factory() as db:
+                if inserts:
+                    await db.execute(self.INSERT_SQL, [{
+                        "aid": a.id, "atype": a.alert_type.value, "sev": a.severity.value,
+                        "cert": a.certificate_id, "sess": a.session_id, "msg": a.message,
+                        "det": json.dumps(a.details), "cat": a.created_at.replace(tzinfo=None),
+                        "ack": a.acknowledged, "aat": a.acknowledged_at, "aby": a.acknowledged_by,
+                    } for a in inserts])
+                if acks:
+                    await db.execute(self.ACK_SQL, [
+                        {"aat": a.acknowledged_at, "aby": a.acknowledged_by, "aid": a.id} for a in acks.values()
+                    ])
+                await db.commit()
+        except Exception as e:
+            log.warning(f"[SURVEILLANCE] Alert DB persist failed for {len(inserts)} alerts (non-fatal, will retry): {e}")
+            self._inserts = (inserts + self._inserts)[-self.config.ALERT_STORE_CAPACITY:]
+            self._acks = {**acks, **self._acks}
+            failed = True
+        if self._timer is current:
+            self._timer = None
+        # Anything queued meanwhile (or a failed batch) gets its own timer
+        if self.pending:
+            self._schedule(retry=failed)
+
+
 # ── In-memory state (backed by DB on write) ──────────────────
 
+HEARTBEAT_STAGES = ("stale", "offline", "suspend")
+SUSPEND_LOCK_NAMESPACE = 720043   # pg advisory lock (namespace, hashtext(cert)): one suspension per certificate
+
+
+def session_shard(session_id: str, shard_count: int = None) -> int:
+    """Stable shard of a session, the same in every worker."""
+    return zlib.crc32(session_id.encode()) % (shard_count or SurveillanceConfig.SHARD_COUNT)
+
+
+def heartbeat_thresholds(config: "SurveillanceConfig") -> Tuple[float, ...]:
+    """Seconds without a heartbeat before each of HEARTBEAT_STAGES."""
+    return (config.HEARTBEAT_STALE_SECONDS, config.HEARTBEAT_OFFLINE_SECONDS, config.HEARTBEAT_SUSPEND_SECONDS)
+
+
 class SurveillanceState:
     _engine_started_at = None
 
@@ -157,19 +366,46 @@ class SurveillanceState:
 
     def __init__(self):
         self.scores: Dict[str, ConformanceScore] = {}       # session_id → score
-        self.alerts: List[SurveillanceAlert] = []            # all alerts (recent)
+        self.alerts = AlertStore()                           # recent alerts, bounded + indexed
+        self.alert_writer = AlertWriter()                    # batched DB persistence
         self.last_heartbeats: Dict[str, datetime] = {}       # session_id → last seen
         self.session_cert_map: Dict[str, str] = {}           # session_id → cert number
         self.suspended_certs: set = set()                    # cert IDs currently suspended by engine
         self._alert_counter: int = 0
-        self._dedup_window: Dict[str, datetime] = {}         # alert dedup: key → last fired
-
-    def record_heartbeat(self, session_id: str, certificate_id: str, stats: dict):
-        """Called by the heartbeat endpoint to feed the engine."""
-        now = datetime.now(timezone.utc)
+        self._dedup_window: "OrderedDict[str, datetime]" = OrderedDict()  # alert dedup: key → last fired, oldest first
+        # Heartbeat deadlines. Every session has the same stale/offline/suspend
+        # thresholds, so ordering by last heartbeat is ordering by deadline: one
+        # insertion-ordered queue per stage replaces a heap, and a heartbeat moves
+        # the session to the back of the first queue in O(1).
+        self._hb_queues: List["OrderedDict[str, datetime]"] = [OrderedDict() for _ in HEARTBEAT_STAGES]
+        self._hb_stage: Dict[str, int] = {}                  # session_id → next stage to cross
+        self._dirty: set = set()                             # sessions with new stats to score
+        self._wakeup: Optional[asyncio.Event] = None         # set by the engine loop once running
+        # Shards of sessions this worker watches (see ShardCoordinator); None = all of them
+        self.owned_shards: Optional[set] = None
+        self.alert_prefix: str = "SA-ALERT"
+
+    def owns(self, session_id: str) -> bool:
+        return self.owned_shards is None or session_shard(session_id) in self.owned_shards
+
+    def record_heartbeat(self, session_id: str, certificate_id: str, stats: dict,
+                         now: Optional[datetime] = None, restored: bool = False):
+        """Called by the heartbeat endpoint to feed the engine. Sessions owned by
+        another worker are ignored here; their owner picks them up from the DB."""
+        if not self.owns(session_id):
+            return
+        now = now or datetime.now(timezone.utc)
         self.last_heartbeats[session_id] = now
         self.session_cert_map[session_id] = certificate_id
 
+        # Re-arm the heartbeat deadlines from the first stage
+        stage = self._hb_stage.get(session_id)
+        if stage is not None and stage < len(self._hb_queues):
+            self._hb_queues[stage].pop(session_id, None)
+        self._hb_queues[0][session_id] = now
+        self._hb_stage[session_id] = 0
+        self._mark_dirty(session_id)
+
         # Update or create score
         if session_id not in self.scores:
             self.scores[session_id] = ConformanceScore(
@@ -191,7 +427,7 @@ class SurveillanceState:
         score.total_actions = pass_count + block_count
 
         # If agent reconnects after being offline, fire reconnect alert
-        if certificate_id in self.suspended_certs:
+        if certificate_id in self.suspended_certs and not restored:
             # Don't auto-reinstate — that requires manual review
             self._fire_alert(
                 AlertType.INTERLOCK_RECONNECT,
@@ -209,6 +445,44 @@ class SurveillanceState:
             score.block_count = block_count
             score.total_actions = pass_count + block_count
             score.updated_at = datetime.now(timezone.utc)
+            self._mark_dirty(session_id)
+
+    def _mark_dirty(self, session_id: str):
+        self._dirty.add(session_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def take_dirty(self) -> set:
+        """Sessions whose stats changed since the last call."""
+        dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    def expire_heartbeats(self, now: datetime, thresholds: Tuple[float, ...]) -> Dict[str, int]:
+        """
+        Advance every session whose heartbeat has crossed a threshold and return
+        session_id → highest stage crossed. Only the queue fronts are examined, so
+        the cost is proportional to the sessions crossing, not the sessions tracked.
+        """
+        crossed: Dict[str, int] = {}
+        last_stage = len(self._hb_queues) - 1
+        for stage, threshold in enumerate(thresholds):
+            queue = self._hb_queues[stage]
+            while queue:
+                session_id, last_hb = next(iter(queue.items()))
+                if (now - last_hb).total_seconds() <= threshold:
+                    break
+                queue.popitem(last=False)
+                if stage < last_stage:
+                    self._hb_queues[stage + 1][session_id] = last_hb
+                self._hb_stage[session_id] = stage + 1
+                crossed[session_id] = stage
+        return crossed
+
+    def next_heartbeat_deadline(self, thresholds: Tuple[float, ...]) -> Optional[datetime]:
+        """Earliest moment any session crosses its next heartbeat threshold."""
+        deadlines = [next(iter(queue.values())) + timedelta(seconds=threshold)
+                     for queue, threshold in zip(self._hb_queues, thresholds) if queue]
+        return min(deadlines) if deadlines else None
 
     def get_score(self, session_id: str) -> Optional[dict]:
         if session_id in self.scores:
@@ -219,97 +493,104 @@ class SurveillanceState:
         return [s.to_dict() for s in self.scores.values()]
 
     def get_alerts(self, limit: int = 50, severity: Optional[str] = None,
-                   certificate_id: Optional[str] = None) -> List[dict]:
-        filtered = self.alerts
-        if severity:
-            filtered = [a for a in filtered if a.severity.value == severity]
-        if certificate_id:
-            filtered = [a for a in filtered if a.certificate_id == certificate_id]
-        return [a.to_dict() for a in filtered[-limit:]]
+                   certificate_id: Optional[str] = None, unacknowledged_only: bool = False) -> List[dict]:
+        return [a.to_dict() for a in self.alerts.query(limit, severity, certificate_id, unacknowledged_only)]
 
     def acknowledge_alert(self, alert_id: str, acknowledged_by: str = "admin") -> bool:
-        for alert in self.alerts:
-            if alert.id == alert_id:
-                alert.acknowledged = True
-                alert.acknowledged_at = datetime.now(timezone.utc)
-                alert.acknowledged_by = acknowledged_by
-                # Persist to DB
-                try:
-                    import asyncio as _aio
-                    async def _persist_ack():
-                        from app.core.database import AsyncSessionLocal
-                        from sqlalchemy import text as raw_t
-                        async with AsyncSessionLocal() as db:
-                            await db.execute(raw_t(
-                                "UPDATE surveillance_alerts SET acknowledged=TRUE, acknowledged_at=:aat, acknowledged_by=:aby WHERE alert_id=:aid"
-                            ), {"aat": alert.acknowledged_at, "aby": acknowledged_by, "aid": alert_id})
-                            await db.commit()
-                    loop = _aio.get_event_loop()
-                    if loop.is_running():
-                        _aio.ensure_future(_persist_ack())
-                except Exception:
-                    pass
-                return True
-        return False
-
-
-    async def persist_alert_to_db(self, alert: 'SurveillanceAlert'):
-        """Write alert to DB for persistence across restarts."""
-        try:
-            from app.core.database import AsyncSessionLocal
-            from sqlalchemy import text as raw_t
-            async with AsyncSessionLocal() as db:
-                await db.execute(raw_t(
-                    "INSERT INTO surveillance_alerts (alert_id, alert_type, severity, certificate_id, session_id, message, details, created_at, acknowledged) "
-                    "VALUES (:aid, :atype, :sev, :cert, :sess, :msg, :det, :cat, :ack) "
-                    "ON CONFLICT (alert_id) DO NOTHING"
-                ), {
-                    "aid": alert.id, "atype": alert.alert_type.value, "sev": alert.severity.value,
-                    "cert": alert.certificate_id, "sess": alert.session_id, "msg": alert.message,
-                    "det": __import__('json').dumps(alert.details), "cat": alert.created_at.replace(tzinfo=None), "ack": False,
-                })
-                await db.commit()
-        except Exception as e:
-            log.warning(f"[SURVEILLANCE] Alert DB persist failed (non-fatal): {e}")
+        alert = self.alerts.acknowledge(alert_id, acknowledged_by)
+        if alert is None:
+            return False
+        self.alert_writer.acknowledge(alert)
+        return True
+
+    def restore_sessions(self, rows, now: datetime, thresholds: Tuple[float, ...], grace_seconds: float = 0):
+        """
+        Take over sessions from the DB: rows of (session_id, certificate_id,
+        pass_count, block_count, last_heartbeat). Thresholds already crossed are
+        assumed handled by the previous owner. Nobody may have been watching
+        (engine down, previous owner dead), so the heartbeat clock is started no
+        earlier than grace_seconds before suspension: a session that went dark
+        meanwhile gets that long to reconnect before it is suspended.
+        """
+        last_stage = len(self._hb_queues) - 1
+        earliest = now - timedelta(seconds=max(thresholds[-1] - grace_seconds, 0))
+        touched = set()
+        for session_id, certificate_id, pass_count, block_count, last_hb in rows:
+            if not self.owns(session_id):
+                continue
+            self.record_heartbeat(session_id, certificate_id, {"pass": pass_count, "block": block_count},
+                                  now=last_hb, restored=True)
+            armed = max(last_hb, earliest)
+            staleness = (now - armed).total_seconds()
+            stage = min(sum(staleness > t for t in thresholds), last_stage)
+            del self._hb_queues[0][session_id]
+            self._hb_queues[stage][session_id] = armed
+            self._hb_stage[session_id] = stage
+            touched.add(stage)
+        # restored heartbeats arrive out of order; put each touched queue back in order
+        for stage in touched:
+            queue = self._hb_queues[stage]
+            self._hb_queues[stage] = OrderedDict(sorted(queue.items(), key=lambda item: item[1]))
+
+    def forget_shards(self, shards: set):
+        """Drop every session in `shards` (another worker owns them now)."""
+        for session_id in [sid for sid in self.scores if session_shard(sid) in shards]:
+            stage = self._hb_stage.pop(session_id, None)
+            if stage is not None and stage < len(self._hb_queues):
+                self._hb_queues[stage].pop(session_id, None)
+            self.scores.pop(session_id, None)
+            self.last_heartbeats.pop(session_id, None)
+            self.session_cert_map.pop(session_id, None)
+            self._dirty.discard(session_id)
+
+    def load_alerts(self, alerts: List[SurveillanceAlert]):
+        """Restore persisted alerts (oldest first) and continue numbering after them."""
+        for alert in alerts:
+            self.alerts.append(alert)
+            suffix = alert.id.rsplit("-", 1)[-1]
+            if alert.id == f"{self.alert_prefix}-{suffix}" and suffix.isdigit():
+                self._alert_counter = max(self._alert_counter, int(suffix))
+
+    def _prune_dedup(self, now: datetime):
+        retention = SurveillanceConfig.ALERT_DEDUP_RETENTION_SECONDS
+        while self._dedup_window:
+            key, fired_at = next(iter(self._dedup_window.items()))
+            if (now - fired_at).total_seconds() < retention:
+                break
+            del self._dedup_window[key]
 
     def _fire_alert(self, alert_type: AlertType, severity: AlertSeverity,
                     certificate_id: str, session_id: Optional[str], message: str,
-                    details: dict = None, dedup_minutes: int = 5):
-        """Fire an alert with dedup protection."""
+                    details: dict = None, dedup_minutes: int = 5) -> Optional[SurveillanceAlert]:
+        """Fire an alert with dedup protection. Returns None if it was suppressed."""
         dedup_key = f"{alert_type.value}:{certificate_id}:{session_id or 'none'}"
         now = datetime.now(timezone.utc)
 
         if dedup_key in self._dedup_window:
             if (now - self._dedup_window[dedup_key]).total_seconds() < dedup_minutes * 60:
-                return  # suppress duplicate
+                return None  # suppress duplicate
 
+        self._dedup_window.pop(dedup_key, None)
         self._dedup_window[dedup_key] = now
+        self._prune_dedup(now)
         self._alert_counter += 1
 
         alert = SurveillanceAlert(
-            id=f"SA-ALERT-{self._alert_counter:06d}",
+            id=f"{self.alert_prefix}-{self._alert_counter:06d}",
             alert_type=alert_type,
             severity=severity,
             certificate_id=certificate_id,
             session_id=session_id,
             message=message,
             details=details or {},
+            created_at=now,
         )
         self.alerts.append(alert)
         log.warning(f"[SURVEILLANCE] {severity.value.upper()}: {message}")
 
-        # Persist to DB
-        import asyncio as _aio
-        try:
-            loop = _aio.get_event_loop()
-            if loop.is_running():
-                _aio.ensure_future(self.persist_alert_to_db(alert))
-        except Exception:
-            pass
-
-        # Trim old alerts (keep last 500)
-        if len(self.alerts) > 500:
-            self.alerts = self.alerts[-500:]
+        # Persist to DB (batched)
+        self.alert_writer.add(alert)
+        return alert
 
 
 # ── Global singleton ──────────────────────────────────────────
@@ -330,7 +611,8 @@ def get_surveillance_config() -> SurveillanceConfig:
 
 def compute_conformance_score(pass_count: int, block_count: int,
                                last_heartbeat: Optional[datetime],
-                               config: SurveillanceConfig = None) -> tuple:
+                               config: SurveillanceConfig = None,
+                               now: Optional[datetime] = None) -> tuple:
     """
     Compute conformance score (0-100) and status.
 
@@ -349,7 +631,7 @@ def compute_conformance_score(pass_count: int, block_count: int,
     if config is None:
         config = _config
 
-    now = datetime.now(timezone.utc)
+    now = now or datetime.now(timezone.utc)
     total = pass_count + block_count
 
     # Not enough data yet
@@ -394,156 +676,165 @@ def compute_conformance_score(pass_count: int, block_count: int,
 
 # ── Background scan loop ─────────────────────────────────────
 
-async def _surveillance_scan(get_db_session):
+async def _surveillance_scan(get_db_session, now: Optional[datetime] = None):
     """
-    Single scan pass. Runs every SCAN_INTERVAL_SECONDS.
-    Checks all tracked sessions for:
-      - Heartbeat staleness → alerts + suspension
-      - Violation rates → alerts + suspension
-      - Score recalculation
+    Single scan pass. Only sessions with something new are looked at:
+      - Sessions whose heartbeat just crossed a stale/offline/suspend
+        threshold → alerts + suspension
+      - Sessions with new heartbeat/telemetry stats → score recalculation,
+        violation rates → alerts + suspension
     """
-    now = datetime.now(timezone.utc)
-
-    for session_id, score in list(_state.scores.items()):
-        cert_id = score.certificate_id
-        last_hb = _state.last_heartbeats.get(session_id)
-
-        # Skip if cert already manually revoked (not our business)
-        # We only manage auto-suspensions
-
-        # ── 1. Recalculate conformance score ──
-        new_score, new_status = compute_conformance_score(
-            score.pass_count, score.block_count, last_hb
-        )
-        score.score = new_score
-        score.status = new_status
-        score.block_rate = score.block_count / score.total_actions if score.total_actions > 0 else 0
-        score.window_end = now
-        score.updated_at = now
-
-        # ── 2. Heartbeat monitoring ──
-        if last_hb:
-            staleness = (now - last_hb).total_seconds()
-
-            if staleness > _config.HEARTBEAT_SUSPEND_SECONDS:
-                # NON-CONFORMANT: Interlock has been dark too long
-                if cert_id not in _state.suspended_certs:
-                    _state.suspended_certs.add(cert_id)
-                    _state._fire_alert(
-                        AlertType.HEARTBEAT_NON_CONFORMANT,
-                        AlertSeverity.NON_CONFORMANT,
-                        cert_id, session_id,
-                        f"Certificate {cert_id} NON-CONFORMANT: no heartbeat for {int(staleness)}s",
-                        details={"staleness_seconds": int(staleness), "action": "non_conformant"},
-                        dedup_minutes=30,
-                    )
-                    # Persist to DB
-                    await _suspend_certificate_in_db(cert_id, get_db_session,
-                        reason=f"Surveillance auto-suspend: no heartbeat for {int(staleness)}s")
-                    score.status = "suspended"
-                    # Email customer
-                    try:
-                        from app.services.email_service import notify_customer_non_conformant
-                        customer_email = await _get_customer_email(cert_id, get_db_session)
-                        system_name = score.system_name or cert_id
-                        org_name = score.org_name or ""
-                        if customer_email:
-                            await notify_customer_non_conformant(customer_email, system_name, org_name, cert_id, f"No heartbeat for {int(staleness)} seconds")
-                    except Exception as e:
-                        print(f"[SURVEILLANCE] Failed to email customer on suspend: {e}")
-
-            elif staleness > _config.HEARTBEAT_OFFLINE_SECONDS:
+    now = now or datetime.now(timezone.utc)
+    crossed = _state.expire_heartbeats(now, heartbeat_thresholds(_config))
+    dirty = _state.take_dirty()
+
+    for session_id in dirty | crossed.keys():
+        score = _state.scores.get(session_id)
+        if score is None:
+            continue
+        await _evaluate_session(session_id, score, now, crossed.get(session_id), get_db_session)
+
+
+async def _evaluate_session(session_id: str, score: ConformanceScore, now: datetime,
+                            crossed_stage: Optional[int], get_db_session):
+    cert_id = score.certificate_id
+    last_hb = _state.last_heartbeats.get(session_id)
+
+    # Skip if cert already manually revoked (not our business)
+    # We only manage auto-suspensions
+
+    # ── 1. Recalculate conformance score ──
+    new_score, new_status = compute_conformance_score(
+        score.pass_count, score.block_count, last_hb, now=now
+    )
+    score.score = new_score
+    score.status = new_status
+    score.block_rate = score.block_count / score.total_actions if score.total_actions > 0 else 0
+    score.window_end = now
+    score.updated_at = now
+
+    # ── 2. Heartbeat monitoring (fires once per threshold crossed) ──
+    if last_hb and crossed_stage is not None:
+        staleness = (now - last_hb).total_seconds()
+
+        if HEARTBEAT_STAGES[crossed_stage] == "suspend":
+            # NON-CONFORMANT: Interlock has been dark too long
+            # Persist to DB first: the lock + heartbeat re-check there decides, not this worker's memory
+            if cert_id not in _state.suspended_certs and await _suspend_certificate_in_db(
+                    cert_id, get_db_session,
+                    reason=f"Surveillance auto-suspend: no heartbeat for {int(staleness)}s",
+                    heartbeat_grace_seconds=_config.HEARTBEAT_SUSPEND_SECONDS):
                 _state._fire_alert(
-                    AlertType.HEARTBEAT_OFFLINE,
-                    AlertSeverity.CRITICAL,
+                    AlertType.HEARTBEAT_NON_CONFORMANT,
+                    AlertSeverity.NON_CONFORMANT,
                     cert_id, session_id,
-                    f"Interlock offline for {cert_id}: no heartbeat for {int(staleness)}s",
-                    details={"staleness_seconds": int(staleness)},
-                    dedup_minutes=5,
+                    f"Certificate {cert_id} NON-CONFORMANT: no heartbeat for {int(staleness)}s",
+                    details={"staleness_seconds": int(staleness), "action": "non_conformant"},
+                    dedup_minutes=30,
                 )
+                score.status = "suspended"
+                # Email customer
+                try:
+                    from app.services.email_service import notify_customer_non_conformant
+                    contact = await _get_customer_contact(cert_id, get_db_session)
+                    if contact:
+                        customer_email, system_name, org_name = contact
+                        await notify_customer_non_conformant(customer_email, system_name, org_name, cert_id, f"No heartbeat for {int(staleness)} seconds")
+                except Exception as e:
+                    log.warning(f"[SURVEILLANCE] Failed to email customer on suspend: {e}")
+
+        elif HEARTBEAT_STAGES[crossed_stage] == "offline":
+            _state._fire_alert(
+                AlertType.HEARTBEAT_OFFLINE,
+                AlertSeverity.CRITICAL,
+                cert_id, session_id,
+                f"Interlock offline for {cert_id}: no heartbeat for {int(staleness)}s",
+                details={"staleness_seconds": int(staleness)},
+                dedup_minutes=5,
+            )
 
-            elif staleness > _config.HEARTBEAT_STALE_SECONDS:
-                _state._fire_alert(
-                    AlertType.HEARTBEAT_STALE,
-                    AlertSeverity.WARN,
-                    cert_id, session_id,
-                    f"Interlock stale for {cert_id}: no heartbeat for {int(staleness)}s",
-                    details={"staleness_seconds": int(staleness)},
-                    dedup_minutes=5,
-                )
+        else:
+            _state._fire_alert(
+                AlertType.HEARTBEAT_STALE,
+                AlertSeverity.WARN,
+                cert_id, session_id,
+                f"Interlock stale for {cert_id}: no heartbeat for {int(staleness)}s",
+                details={"staleness_seconds": int(staleness)},
+                dedup_minutes=5,
+            )
 
-        # ── 3. Violation rate monitoring ──
-        if score.total_actions >= _config.SCORE_MIN_SAMPLES:
-            block_rate = score.block_rate
-
-            if block_rate >= _config.VIOLATION_SUSPEND_RATE:
-                # NON-CONFORMANT: Too many violations
-                if cert_id not in _state.suspended_certs:
-                    _state.suspended_certs.add(cert_id)
-                    _state._fire_alert(
-                        AlertType.VIOLATION_NON_CONFORMANT,
-                        AlertSeverity.NON_CONFORMANT,
-                        cert_id, session_id,
-                        f"Certificate {cert_id} NON-CONFORMANT: block rate {block_rate:.1%} exceeds {_config.VIOLATION_SUSPEND_RATE:.0%} threshold",
-                        details={"block_rate": block_rate, "threshold": _config.VIOLATION_SUSPEND_RATE, "action": "non_conformant"},
-                        dedup_minutes=30,
-                    )
-                    await _suspend_certificate_in_db(cert_id, get_db_session,
-                        reason=f"Surveillance auto-suspend: block rate {block_rate:.1%}")
-                    score.status = "suspended"
-                    # Email customer
-                    try:
-                        from app.services.email_service import notify_customer_non_conformant
-                        customer_email = await _get_customer_email(cert_id, get_db_session)
-                        system_name = score.system_name or cert_id
-                        org_name = score.org_name or ""
-                        if customer_email:
-                            await notify_customer_non_conformant(customer_email, system_name, org_name, cert_id, f"Block rate {block_rate:.1%} exceeds threshold")
-                    except Exception as e:
-                        print(f"[SURVEILLANCE] Failed to email customer on suspend: {e}")
-
-            elif block_rate >= _config.VIOLATION_CRITICAL_RATE:
-                _state._fire_alert(
-                    AlertType.VIOLATION_CRITICAL,
-                    AlertSeverity.CRITICAL,
-                    cert_id, session_id,
-                    f"Critical violation rate for {cert_id}: {block_rate:.1%} (threshold: {_config.VIOLATION_CRITICAL_RATE:.0%})",
-                    details={"block_rate": block_rate, "threshold": _config.VIOLATION_CRITICAL_RATE},
-                )
+    # ── 3. Violation rate monitoring ──
+    if score.total_actions >= _config.SCORE_MIN_SAMPLES:
+        block_rate = score.block_rate
 
-            elif block_rate >= _config.VIOLATION_WARN_RATE:
+        if block_rate >= _config.VIOLATION_SUSPEND_RATE:
+            # NON-CONFORMANT: Too many violations
+            if cert_id not in _state.suspended_certs and await _suspend_certificate_in_db(
+                    cert_id, get_db_session, reason=f"Surveillance auto-suspend: block rate {block_rate:.1%}"):
                 _state._fire_alert(
-                    AlertType.VIOLATION_WARN,
-                    AlertSeverity.WARN,
+                    AlertType.VIOLATION_NON_CONFORMANT,
+                    AlertSeverity.NON_CONFORMANT,
                     cert_id, session_id,
-                    f"Elevated violation rate for {cert_id}: {block_rate:.1%} (threshold: {_config.VIOLATION_WARN_RATE:.0%})",
-                    details={"block_rate": block_rate, "threshold": _config.VIOLATION_WARN_RATE},
+                    f"Certificate {cert_id} NON-CONFORMANT: block rate {block_rate:.1%} exceeds {_config.VIOLATION_SUSPEND_RATE:.0%} threshold",
+                    details={"block_rate": block_rate, "threshold": _config.VIOLATION_SUSPEND_RATE, "action": "non_conformant"},
+                    dedup_minutes=30,
                 )
+                score.status = "suspended"
+                # Email customer
+                try:
+                    from app.services.email_service import notify_customer_non_conformant
+                    contact = await _get_customer_contact(cert_id, get_db_session)
+                    if contact:
+                        customer_email, system_name, org_name = contact
+                        await notify_customer_non_conformant(customer_email, system_name, org_name, cert_id, f"Block rate {block_rate:.1%} exceeds threshold")
+                except Exception as e:
+                    log.warning(f"[SURVEILLANCE] Failed to email customer on suspend: {e}")
+
+        elif block_rate >= _config.VIOLATION_CRITICAL_RATE:
+            _state._fire_alert(
+                AlertType.VIOLATION_CRITICAL,
+                AlertSeverity.CRITICAL,
+                cert_id, session_id,
+                f"Critical violation rate for {cert_id}: {block_rate:.1%} (threshold: {_config.VIOLATION_CRITICAL_RATE:.0%})",
+                details={"block_rate": block_rate, "threshold": _config.VIOLATION_CRITICAL_RATE},
+            )
 
-        # ── 4. Score degradation alert ──
-        if new_status == "degraded" and score.total_actions >= _config.SCORE_MIN_SAMPLES:
+        elif block_rate >= _config.VIOLATION_WARN_RATE:
             _state._fire_alert(
-                AlertType.SCORE_DEGRADED,
+                AlertType.VIOLATION_WARN,
                 AlertSeverity.WARN,
                 cert_id, session_id,
-                f"Conformance score degraded for {cert_id}: {new_score:.1f}/100",
-                details={"score": new_score, "block_rate": score.block_rate},
-                dedup_minutes=15,
+                f"Elevated violation rate for {cert_id}: {block_rate:.1%} (threshold: {_config.VIOLATION_WARN_RATE:.0%})",
+                details={"block_rate": block_rate, "threshold": _config.VIOLATION_WARN_RATE},
             )
-            # Email customer
+
+    # ── 4. Score degradation alert ──
+    # A degraded session is re-scored on every heartbeat, so only email when
+    # the alert itself fires (not while it is deduplicated).
+    if new_status == "degraded" and score.total_actions >= _config.SCORE_MIN_SAMPLES:
+        fired = _state._fire_alert(
+            AlertType.SCORE_DEGRADED,
+            AlertSeverity.WARN,
+            cert_id, session_id,
+            f"Conformance score degraded for {cert_id}: {new_score:.1f}/100",
+            details={"score": new_score, "block_rate": score.block_rate},
+            dedup_minutes=15,
+        )
+        # Email customer
+        if fired is not None:
             try:
                 from app.services.email_service import notify_customer_degraded
-                customer_email = await _get_customer_email(cert_id, get_db_session)
-                system_name = score.system_name or cert_id
-                org_name = score.org_name or ""
-                if customer_email:
+                contact = await _get_customer_contact(cert_id, get_db_session)
+                if contact:
+                    customer_email, system_name, org_name = contact
                     await notify_customer_degraded(customer_email, system_name, org_name, new_score, score.block_rate, cert_id)
             except Exception as e:
-                print(f"[SURVEILLANCE] Failed to email customer on degradation: {e}")
+                log.warning(f"[SURVEILLANCE] Failed to email customer on degradation: {e}")
 
 
-async def _get_customer_email(certificate_id: str, get_db_session) -> str:
-    """Look up the customer email for a certificate."""
+async def _get_customer_contact(certificate_id: str, get_db_session) -> Optional[Tuple[str, str, str]]:
+    """Look up (customer email, system name, organization name) for a certificate;
+    None without a customer email. The names come from the certificate."""
     try:
         async with get_db_session() as db:
             from app.models.models import Certificate, Application, User
@@ -564,40 +855,65 @@ async def _get_customer_email(certificate_id: str, get_db_session) -> str:
                 select(User).where(User.id == app.applicant_id)
             )
             user = user_result.scalar_one_or_none()
-            return user.email if user else None
+            if not user or not user.email:
+                return None
+            return user.email, cert.system_name or certificate_id, cert.organization_name or ""
     except Exception as e:
-        print(f"[SURVEILLANCE] Failed to look up customer email: {e}")
+        log.warning(f"[SURVEILLANCE] Failed to look up customer email: {e}")
         return None
 
 
-async def _suspend_certificate_in_db(certificate_id: str, get_db_session, reason: str = ""):
-    """Persist certificate suspension to database."""
+async def _suspend_certificate_in_db(certificate_id: str, get_db_session, reason: str = "",
+                                     heartbeat_grace_seconds: Optional[float] = None) -> bool:
+    """
+    Persist certificate suspension to database. Returns True only if this call
+    suspended it. Workers serialize on a per-certificate advisory lock, so
+    sessions of one certificate watched by different workers suspend it once.
+    With heartbeat_grace_seconds, the decision is re-checked against the
+    heartbeats in the DB (another worker may have served one this worker never saw).
+    """
     try:
         async with get_db_session() as db:
             # Import here to avoid circular imports
-            from app.models.models import Certificate
+            from app.models.models import Certificate, EnveloSession
 
+            await db.execute(select(func.pg_advisory_xact_lock(SUSPEND_LOCK_NAMESPACE, func.hashtext(certificate_id))))
             result = await db.execute(
                 select(Certificate).where(Certificate.certificate_number == certificate_id)
             )
             cert = result.scalar_one_or_none()
-            if cert and cert.status not in ("suspended", "revoked"):
-                cert.status = "suspended"
-                cert.suspended_at = datetime.now(timezone.utc)
-                cert.suspension_reason = reason
-                cert.suspended_by = "surveillance_engine"
-                await db.commit()
-                log.warning(f"[SURVEILLANCE] DB: Certificate {certificate_id} suspended — {reason}")
-                # Audit trail
-                try:
-                    from app.services.audit_service import write_audit_log
-                    await write_audit_log(db, action="certificate_non_conformanted",
-                        resource_type="certificate", user_email="surveillance_engine",
-                        details={"certificate_id": certificate_id, "reason": reason})
-                except Exception:
-                    pass
+            if cert is None:
+                return False
+            if cert.state in ("suspended", "revoked"):
+                _state.suspended_certs.add(certificate_id)
+                return False
+            if heartbeat_grace_seconds is not None:
+                latest = (await db.execute(
+                    select(func.max(EnveloSession.last_heartbeat_at)).where(
+                        EnveloSession.certificate_id == cert.id, EnveloSession.status == "active")
+                )).scalar()
+                if latest and (datetime.utcnow() - latest).total_seconds() < heartbeat_grace_seconds:
+                    log.info(f"[SURVEILLANCE] Not suspending {certificate_id}: heartbeat at {latest.isoformat()} in DB")
+                    return False
+            cert.state = "suspended"
+            cert.suspended_at = datetime.utcnow()
+            cert.suspension_reason = reason
+            cert.suspended_by = "surveillance_engine"
+            # Audit trail (queued for the chain when this transaction commits)
+            try:
+                from app.services.audit_service import write_audit_log
+                await write_audit_log(db, action="certificate_non_conformanted",
+                    resource_type="certificate", user_email="surveillance_engine",
+                    details={"certificate_id": certificate_id, "reason": reason})
+            except Exception:
+                pass
+            await db.commit()
+            _state.suspended_certs.add(certificate_id)
+            log.warning(f"[SURVEILLANCE] DB: Certificate {certificate_id} suspended — {reason}")
+            return True
     except Exception as e:
         log.error(f"[SURVEILLANCE] Failed to suspend {certificate_id} in DB: {e}")
+    return False
 
 
 async def _reinstate_certificate_in_db(certificate_id: str, get_db_session, reason: str = ""):
@@ -610,9 +926,9 @@ async def _reinstate_certificate_in_db(certificate_id: str, get_db_session, reas
                 select(Certificate).where(Certificate.certificate_number == certificate_id)
             )
             cert = result.scalar_one_or_none()
-            if cert and cert.status == "suspended":
-                cert.status = "active"
-                cert.reinstated_at = datetime.now(timezone.utc)
+            if cert and cert.state == "suspended":
+                cert.state = "conformant"
+                cert.reinstated_at = datetime.utcnow()
                 cert.reinstatement_reason = reason
                 await db.commit()
                 log.warning(f"[SURVEILLANCE] DB: Certificate {certificate_id} reinstated — {reason}")
@@ -630,24 +946,244 @@ async def _reinstate_certificate_in_db(certificate_id: str, get_db_session, reas
     return False
 
 
+# ── Multi-worker ownership ────────────────────────────────────
+
+_DB_UTC_NOW = "timezone('utc', now())"
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def _alert_from_row(row) -> SurveillanceAlert:
+    return SurveillanceAlert(
+        id=row.alert_id, alert_type=AlertType(row.alert_type), severity=AlertSeverity(row.severity),
+        certificate_id=row.certificate_id, session_id=row.session_id, message=row.message,
+        details=row.details or {}, created_at=row.created_at,
+        acknowledged=row.acknowledged or False, acknowledged_at=row.acknowledged_at, acknowledged_by=row.acknowledged_by,
+    )
+
+
+class ShardCoordinator:
+    """
+    Splits monitored sessions across uvicorn workers and replicas.
+
+    Sessions hash into SHARD_COUNT shards, each leased to one worker through
+    surveillance_shard_leases. Workers announce themselves in
+    surveillance_workers and hold ceil(shards / live workers) leases each,
+    releasing any surplus so a newcomer gets its share; the shards of a worker
+    that dies are taken over once its leases expire. The owner of a shard reads
+    that shard's heartbeats from envelo_sessions, so it also sees heartbeats
+    served by other workers, and every worker reads new rows of
+    surveillance_alerts so the dashboard sees all alerts.
+    """
+
+    ALERT_COLUMNS = ("id, alert_id, alert_type, severity, certificate_id, session_id, message, details, "
+                     "created_at, acknowledged, acknowledged_at, acknowledged_by")
+
+    def __init__(self, session_factory, state: Optional[SurveillanceState] = None,
+                 config: Optional[SurveillanceConfig] = None, worker_id: Optional[str] = None):
+        self.session_factory = session_factory
+        self.state = state or _state
+        self.config = config or _config
+        self.node = uuid.uuid4().hex[:6]
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{self.node}"
+        self.owned: set = set()
+        self._next_rebalance = 0.0
+        self._heartbeats_since: Optional[datetime] = None
+        self._last_alert_pk: Optional[int] = None
+        self._suspended_loaded = False
+
+    async def rebalance(self) -> Tuple[set, set]:
+        """Renew this worker's leases, release surplus or claim free shards. Returns (gained, lost)."""
+        cfg = self.config
+        params = {"me": self.worker_id, "ttl": float(cfg.SHARD_LEASE_SECONDS), "n": cfg.SHARD_COUNT}
+        lease_until = f"{_DB_UTC_NOW} + make_interval(secs => :ttl)"
+        async with self.session_factory() as db:
+            await db.execute(text(
+                "INSERT INTO surveillance_shard_leases (shard) SELECT generate_series(0, :n - 1) ON CONFLICT DO NOTHING"
+            ), params)
+            await db.execute(text(
+                f"INSERT INTO surveillance_workers (worker_id, started_at, last_seen) VALUES (:me, {_DB_UTC_NOW}, {_DB_UTC_NOW}) "
+                "ON CONFLICT (worker_id) DO UPDATE SET last_seen = EXCLUDED.last_seen"
+            ), params)
+            live = (await db.execute(text(
+                f"SELECT count(*) FROM surveillance_workers WHERE last_seen > {_DB_UTC_NOW} - make_interval(secs => :ttl)"
+            ), params)).scalar()
+            target = math.ceil(cfg.SHARD_COUNT / max(live, 1))
+
+            owned = set((await db.execute(text(
+                f"UPDATE surveillance_shard_leases SET expires_at = {lease_until} "
+                "WHERE owner = :me AND shard < :n RETURNING shard"
+            ), params)).scalars())
+            if len(owned) > target:
+                surplus = sorted(owned)[target:]
+                await db.execute(text(
+                    "UPDATE surveillance_shard_leases SET owner = NULL, expires_at = NULL "
+                    "WHERE owner = :me AND shard = ANY(:surplus)"
+                ), {**params, "surplus": surplus})
+                owned -= set(surplus)
+            elif len(owned) < target:
+                owned |= set((await db.execute(text(
+                    f"UPDATE surveillance_shard_leases SET owner = :me, expires_at = {lease_until} "
+                    "WHERE shard IN (SELECT shard FROM surveillance_shard_leases "
+                    f"  WHERE shard < :n AND (owner IS NULL OR expires_at < {_DB_UTC_NOW}) "
+                    "  ORDER BY random() LIMIT :need FOR UPDATE SKIP LOCKED) "
+                    "RETURNING shard"
+                ), {**params, "need": target - len(owned)})).scalars())
+
+            await db.execute(text(
+                f"DELETE FROM surveillance_workers WHERE last_seen < {_DB_UTC_NOW} - make_interval(secs => :ttl * 10)"
+            ), params)
+            await db.commit()
+        gained, lost = owned - self.owned, self.owned - owned
+        self.owned = owned
+        return gained, lost
+
+    async def release(self):
+        """Give up every lease (clean shutdown) so other workers take over without waiting for expiry."""
+        async with self.session_factory() as db:
+            await db.execute(text(
+                "UPDATE surveillance_shard_leases SET owner = NULL, expires_at = NULL WHERE owner = :me"
+            ), {"me": self.worker_id})
+            await db.execute(text("DELETE FROM surveillance_workers WHERE worker_id = :me"), {"me": self.worker_id})
+            await db.commit()
+        self.owned = set()
+        self.state.owned_shards = set()
+
+    async def sync(self, now: Optional[datetime] = None):
+        """Rebalance when due, then read heartbeats and alerts other workers wrote."""
+        now = now or datetime.now(timezone.utc)
+        if not self._suspended_loaded:
+            await self._load_suspended_certs()
+            self._suspended_loaded = True
+        if time.monotonic() >= self._next_rebalance:
+            self._next_rebalance = time.monotonic() + self.config.SHARD_REBALANCE_SECONDS
+            gained, lost = await self.rebalance()
+            self.state.owned_shards = set(self.owned)
+            if lost:
+                self.state.forget_shards(lost)
+            if gained:
+                await self._load_shards(gained, now)
+            if gained or lost:
+                log.info(f"[SURVEILLANCE] {self.worker_id} owns {len(self.owned)} shards (+{len(gained)} -{len(lost)})")
+        await self._sync_heartbeats(now)
+        try:
+            await self._sync_alerts()
+        except Exception as e:
+            log.warning(f"[SURVEILLANCE] Alert sync failed (non-fatal): {e}")
+
+    def _sessions_query(self):
+        from app.models.models import Certificate, EnveloSession
+        return (
+            select(EnveloSession.session_id, Certificate.certificate_number, EnveloSession.pass_count,
+                   EnveloSession.block_count, EnveloSession.last_heartbeat_at)
+            .join(Certificate, Certificate.id == EnveloSession.certificate_id)
+            .where(EnveloSession.status == "active", EnveloSession.last_heartbeat_at.isnot(None))
+        )
+
+    async def _load_shards(self, shards: set, now: datetime):
+        async with self.session_factory() as db:
+            rows = (await db.execute(self._sessions_query())).all()
+        n = self.config.SHARD_COUNT
+        self.state.restore_sessions(
+            [(sid, cert, pc or 0, bc or 0, _as_utc(hb)) for sid, cert, pc, bc, hb in rows
+             if cert and session_shard(sid, n) in shards],
+            now, heartbeat_thresholds(self.config), self.config.GRACE_PERIOD_SECONDS,
+        )
+
+    async def _sync_heartbeats(self, now: datetime):
+        from app.models.models import EnveloSession
+        since = self._heartbeats_since or now - timedelta(seconds=self.config.CLUSTER_SYNC_SECONDS)
+        async with self.session_factory() as db:
+            rows = (await db.execute(
+                self._sessions_query()
+                .where(EnveloSession.last_heartbeat_at > since.replace(tzinfo=None))
+                .order_by(EnveloSession.last_heartbeat_at)
+            )).all()
+        for sid, cert, pc, bc, hb in rows:
+            hb = _as_utc(hb)
+            last = self.state.last_heartbeats.get(sid)
+            if cert and self.state.owns(sid) and (last is None or hb > last):
+                self.state.record_heartbeat(sid, cert, {"pass": pc or 0, "block": bc or 0}, now=hb)
+        # heartbeat rows can commit a little out of timestamp order; re-read an overlap
+        newest = _as_utc(rows[-1][4]) if rows else since
+        self._heartbeats_since = max(since, newest - timedelta(seconds=self.config.CLUSTER_SYNC_SECONDS))
+
+    async def _sync_alerts(self):
+        async with self.session_factory() as db:
+            if self._last_alert_pk is None:
+                rows = (await db.execute(text(
+                    f"SELECT {self.ALERT_COLUMNS} FROM surveillance_alerts ORDER BY id DESC LIMIT :cap"
+                ), {"cap": self.config.ALERT_STORE_CAPACITY})).all()[::-1]
+            else:
+                rows = (await db.execute(text(
+                    f"SELECT {self.ALERT_COLUMNS} FROM surveillance_alerts WHERE id > :pk ORDER BY id LIMIT :cap"
+                ), {"pk": self._last_alert_pk, "cap": self.config.ALERT_STORE_CAPACITY})).all()
+        alerts = []
+        for row in rows:
+            try:
+                alerts.append(_alert_from_row(row))
+            except ValueError:
+                pass  # alert type/severity this version doesn't know
+        self.state.load_alerts(alerts)
+        self._last_alert_pk = rows[-1].id if rows else (self._last_alert_pk or 0)
+
+    async def _load_suspended_certs(self):
+        from app.models.models import Certificate
+        async with self.session_factory() as db:
+            numbers = (await db.execute(
+                select(Certificate.certificate_number).where(Certificate.state == "suspended")
+            )).scalars().all()
+        self.state.suspended_certs.update(n for n in numbers if n)
+
+
 # ── Engine startup ────────────────────────────────────────────
 
-async def _surveillance_loop(get_db_session):
+def _seconds_until_next_pass(now: datetime) -> float:
+    """Sleep until the next heartbeat deadline, but never longer than SCAN_INTERVAL_SECONDS
+    so threshold changes made through the config endpoint are picked up."""
+    delay = float(_config.SCAN_INTERVAL_SECONDS)
+    deadline = _state.next_heartbeat_deadline(heartbeat_thresholds(_config))
+    if deadline is not None:
+        # crossing means strictly past the threshold, hence the small margin
+        delay = min(delay, (deadline - now).total_seconds() + 0.01)
+    return max(delay, 0.0)
+
+
+async def _surveillance_loop(get_db_session, coordinator: Optional[ShardCoordinator] = None):
     _state._engine_started_at = datetime.now(timezone.utc)
-    """Main loop — runs continuously in background."""
-    log.info("[SURVEILLANCE] Engine started — scanning every %ds", _config.SCAN_INTERVAL_SECONDS)
+    """Main loop — wakes at the next heartbeat deadline, when new stats arrive,
+    or (with a coordinator) to sync with the other workers."""
+    log.info("[SURVEILLANCE] Engine started — deadline-driven, idle pass every %ds", _config.SCAN_INTERVAL_SECONDS)
+    _state._wakeup = asyncio.Event()
     while True:
+        if coordinator is not None:
+            try:
+                await coordinator.sync()
+            except Exception as e:
+                log.error(f"[SURVEILLANCE] Cluster sync error: {e}")
         try:
             await _surveillance_scan(get_db_session)
         except Exception as e:
             log.error(f"[SURVEILLANCE] Scan error: {e}")
-        await asyncio.sleep(_config.SCAN_INTERVAL_SECONDS)
+        timeout = _seconds_until_next_pass(datetime.now(timezone.utc))
+        if coordinator is not None:
+            timeout = min(timeout, _config.CLUSTER_SYNC_SECONDS)
+        try:
+            await asyncio.wait_for(_state._wakeup.wait(), timeout=timeout)
+            # Woken by new stats: let a batch of heartbeats accumulate
+            await asyncio.sleep(_config.EVENT_BATCH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _state._wakeup.clear()
 
 
 _task: Optional[asyncio.Task] = None
+_coordinator: Optional[ShardCoordinator] = None
 
 
-def start_surveillance(get_db_session):
+def start_surveillance(get_db_session, sharded: bool = True):
     """
     Call from FastAPI startup event.
 
@@ -658,9 +1194,29 @@ def start_surveillance(get_db_session):
         @app.on_event("startup")
         async def startup():
             start_surveillance(get_db_session)
+
+    With sharded=True (the default) every worker/replica watches only the
+    sessions in the shards it leases, and rebuilds that state from the DB;
+    sharded=False watches every session this process hears about.
     """
-    global _task
+    global _task, _coordinator
     if _task is None or _task.done():
-        _task = asyncio.create_task(_surveillance_loop(get_db_session))
+        if sharded:
+            _coordinator = ShardCoordinator(get_db_session)
+            # nothing is owned until the first lease round; that round loads the shards from the DB
+            _state.owned_shards = set()
+            _state.alert_prefix = f"SA-ALERT-{_coordinator.node}"
+        _task = asyncio.create_task(_surveillance_loop(get_db_session, _coordinator))
         log.info("[SURVEILLANCE] Background task created")
     return _task
+
+
+async def stop_surveillance():
+    """Stop the engine, flush pending alerts and hand this worker's shards back."""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+    await _state.alert_writer.flush()
+    if _coordinator is not None:
+        await _coordinator.release()
@@ -15,7 +15,6 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from chat import router as chat_router
 from app.api.routes.content import router as content_router
-from app.services.content_scraper import scraper_loop
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -32,6 +31,7 @@ from fastapi import Depends
 from app.api.routes import audit as audit_routes, auth, dashboard, applicants, cat72, certificates, verification, licensees, envelo, apikeys, envelo_boundaries, registry, users, documents, deploy, session_routes, webhooks
 from app.api.routes import quotes as quotes_routes, billing as billing_routes
 from app.api.routes import stripe_webhook
+from app.api.routes import jobs as jobs_routes
 
 # Logging setup
 
@@ -70,8 +70,6 @@ async def lifespan(app: FastAPI):
 
     await init_db()
     logger.info("Database initialized")
-    import asyncio as _asyncio; _asyncio.create_task(scraper_loop())
-    logger.info("Content scraper started")
     
     # Organization migration
     from app.core.database import engine
@@ -166,46 +164,15 @@ async def lifespan(app: FastAPI):
             logger.info("Tamper-proof audit triggers installed")
         except Exception as e:
             logger.warning(f"Audit trigger setup: {e}")
-    # Auto-create daily audit anchor
-    async with engine.begin() as anchor_conn:
-        try:
-            # Check if anchor exists for today
-            last_anchor = await anchor_conn.execute(raw_text(
-                "SELECT created_at FROM audit_anchors ORDER BY id DESC LIMIT 1"
-            ))
-            last_row = last_anchor.first()
-            need_anchor = True
-            if last_row and last_row[0]:
-                if (datetime.utcnow() - last_row[0]) < timedelta(hours=24):
-                    need_anchor = False
-            
-            if need_anchor:
-                latest = await anchor_conn.execute(raw_text(
-                    "SELECT id, log_hash FROM audit_log ORDER BY id DESC LIMIT 1"
-                ))
-                latest_row = latest.first()
-                if latest_row:
-                    count_result = await anchor_conn.execute(raw_text("SELECT COUNT(*) FROM audit_log"))
-                    total = count_result.scalar()
-                    import hmac as hmac_mod
-                    secret = (os.environ.get("SECRET_KEY") or "").strip()
-                if not secret:
-                    logger.warning("SECRET_KEY not set — skipping auto audit anchor")
-                    need_anchor = False
-                    sig_payload = f"{latest_row[0]}:{latest_row[1]}:{total}:{datetime.utcnow().isoformat()}"
-                    signature = hmac_mod.new(secret.encode(), sig_payload.encode(), hashlib.sha256).hexdigest()
-                    await anchor_conn.execute(raw_text(
-                        "INSERT INTO audit_anchors (last_audit_id, chain_hash, entry_count, anchor_signature) VALUES (:aid, :hash, :count, :sig)"
-                    ), {"aid": latest_row[0], "hash": latest_row[1], "count": total, "sig": signature})
-                    await anchor_conn.commit()
-                    logger.info(f"Daily audit anchor created at entry #{latest_row[0]}")
-                else:
-                    logger.info("No audit entries yet, skipping anchor")
-            else:
-                logger.info("Recent anchor exists, skipping")
-        except Exception as e:
-            logger.warning(f"Auto-anchor: {e}")
+    # Signed audit anchors are written by the audit_anchors job (app/services/audit_verification.py)
 
+    # Audit chain writer: recovers the chain head, then appends committed entries in batches
+    from app.services.audit_service import audit_writer
+    try:
+        await audit_writer.start()
+    except Exception as e:
+        logger.error(f"Audit writer: chain head recovery failed, recovering on first batch: {e}")
+        audit_writer.submit([])
 
     # Schema migrations (idempotent)
     schema_migrations = [
@@ -300,35 +267,11 @@ async def lifespan(app: FastAPI):
     import asyncio
 
     try:
-        from app.services.auto_evaluator import run_auto_evaluator
-        asyncio.create_task(run_auto_evaluator())
-        logger.info("Auto evaluator started")
+        from app.services.envelope_executor import loop_lag_monitor
+        asyncio.create_task(loop_lag_monitor())
+        logger.info("Event-loop lag monitor started")
     except Exception as e:
-        logger.warning(f"Auto evaluator failed to start: {e}")
-
-    try:
-        from app.services.background_tasks import check_offline_agents_task
-        from app.core.database import get_db
-        asyncio.create_task(check_offline_agents_task(get_db))
-        logger.info("Offline agent monitor started")
-    except Exception as e:
-        logger.warning(f"Offline agent monitor failed to start: {e}")
-
-    try:
-        from app.services.background_tasks import check_certificate_expiry_task
-        asyncio.create_task(check_certificate_expiry_task())
-        logger.info("Certificate expiry monitor started")
-    except Exception as e:
-        logger.warning(f"Certificate expiry monitor failed to start: {e}")
-
-    try:
-        from app.services.background_tasks import demo_session_ticker, auto_suspend_offline
-        asyncio.create_task(demo_session_ticker())
-        asyncio.create_task(auto_suspend_offline())
-        logger.info("Auto-suspend monitor started (checks every hour)")
-        logger.info("Demo session ticker started")
-    except Exception as e:
-        logger.warning(f"Demo ticker failed to start: {e}")
+        logger.warning(f"Event-loop lag monitor failed to start: {e}")
 
 
     # Backfill system_type for legacy apps
@@ -458,45 +401,29 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"CAT-72 test seed failed: {e}")
 
-    try:
-        from app.services.background_tasks import cat72_auto_evaluator
-        asyncio.create_task(cat72_auto_evaluator())
-        logger.info("CAT-72 auto-evaluator started (checks every 60s)")
-    except Exception as e:
-        logger.warning(f"CAT-72 auto-evaluator failed to start: {e}")
+    # Periodic jobs (sweeps, expiry, CAT-72 evaluation, maintenance, backups):
+    # one scheduler per process, cluster jobs leased so one replica runs each
+    from app.services.job_scheduler import get_scheduler
+    from app.services.job_registry import register_platform_jobs
+    job_scheduler = register_platform_jobs(
+        get_scheduler(), production=os.environ.get("ENVIRONMENT", "development") == "production"
+    )
+    job_scheduler.start()
 
 
     # Start scheduler (LinkedIn, X, backups, renewals, exposure)
     import os as _os
     if _os.environ.get("ENVIRONMENT", "development") == "production":
         logger.info("[SCHEDULER] Production detected — starting schedulers...")
+        # Backups, renewals and the engagement agent are jobs of the job scheduler;
+        # the timezone-specific social/exposure crons stay on APScheduler.
         try:
-            from apscheduler.schedulers.background import BackgroundScheduler
             from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-            bg_scheduler = BackgroundScheduler()
-            bg_scheduler.add_job(_run_scheduled_backup, "interval", hours=6, id="db_backup")
-            bg_scheduler.start()
-            logger.info("[BACKUP] Scheduler started — every 6 hours")
-
             async_scheduler = AsyncIOScheduler()
-
-            async def _run_renewal_cron():
-                import httpx
-                try:
-                    async with httpx.AsyncClient(timeout=30) as client:
-                        await client.post("http://localhost:8080/api/billing/cron/renewals")
-                except Exception as e:
-                    logger.warning(f"[RENEWAL] Cron failed: {e}")
-
-            async_scheduler.add_job(_run_renewal_cron, "cron", hour=6, minute=0, id="renewal_cron")
-            logger.info("[SCHEDULER] Renewal cron added")
             from app.exposure_agent import run_exposure_agent
             async_scheduler.add_job(run_exposure_agent, "cron", hour="7,12,17", minute=0, timezone="America/Toronto", id="sa_exposure_agent", replace_existing=True)
             logger.info("[SCHEDULER] Exposure agent added")
-            from app.exposure_agent import run_engagement_agent
-            async_scheduler.add_job(run_engagement_agent, "interval", minutes=30, id="sa_engagement_agent", replace_existing=True)
-            logger.info("[SCHEDULER] Engagement agent added")
             from linkedin_poster import start_linkedin_scheduler
             start_linkedin_scheduler(async_scheduler)
             logger.info("[SCHEDULER] LinkedIn poster added")
@@ -513,67 +440,23 @@ async def lifespan(app: FastAPI):
     from app.core.database import AsyncSessionLocal
     start_surveillance(AsyncSessionLocal)
     logger.info("Surveillance engine started")
-    # Reload surveillance state from DB (persist across restarts)
-    try:
-        from app.surveillance import get_surveillance_state
-        surv_state = get_surveillance_state()
-        async with AsyncSessionLocal() as reload_db:
-            from sqlalchemy import select as sel, text as raw_t
-            from app.models.models import EnveloSession, Certificate
-            # Reload active sessions
-            active = await reload_db.execute(
-                sel(EnveloSession).where(EnveloSession.status == "active")
-            )
-            reloaded = 0
-            for session in active.scalars().all():
-                cert_num = None
-                if session.certificate_id:
-                    cert_r = await reload_db.execute(
-                        sel(Certificate).where(Certificate.id == session.certificate_id)
-                    )
-                    cert = cert_r.scalar_one_or_none()
-                    cert_num = cert.certificate_number if cert else None
-                if cert_num and session.last_heartbeat_at:
-                    surv_state.record_heartbeat(
-                        session_id=session.session_id,
-                        certificate_id=cert_num,
-                        stats={"pass": session.pass_count or 0, "block": session.block_count or 0},
-                    )
-                    reloaded += 1
-            # Reload suspended certs
-            suspended = await reload_db.execute(
-                sel(Certificate).where(Certificate.state == "suspended")
-            )
-            for cert in suspended.scalars().all():
-                if cert.certificate_number:
-                    surv_state.suspended_certs.add(cert.certificate_number)
-            # Reload unacknowledged alerts
-            try:
-                alert_rows = await reload_db.execute(raw_t(
-                    "SELECT alert_id, alert_type, severity, certificate_id, session_id, message, details, created_at, acknowledged, acknowledged_at, acknowledged_by FROM surveillance_alerts ORDER BY id DESC LIMIT 200"
-                ))
-                from app.surveillance import SurveillanceAlert, AlertType, AlertSeverity
-                for row in alert_rows:
-                    try:
-                        alert = SurveillanceAlert(
-                            id=row[0], alert_type=AlertType(row[1]), severity=AlertSeverity(row[2]),
-                            certificate_id=row[3], session_id=row[4], message=row[5],
-                            details=row[6] or {}, created_at=row[7],
-                            acknowledged=row[8] or False, acknowledged_at=row[9], acknowledged_by=row[10],
-                        )
-                        surv_state.alerts.append(alert)
-                    except Exception:
-                        pass
-            except Exception:
-                pass  # Table may not have data yet
-        logger.info(f"Surveillance state reloaded: {reloaded} sessions, {len(surv_state.suspended_certs)} suspended certs, {len(surv_state.alerts)} alerts")
-    except Exception as e:
-        logger.warning(f"Surveillance reload: {e}")
-    reload_surveillance_from_db = True
+    # Surveillance state (sessions of the shards this worker leases, suspended
+    # certificates, recent alerts) is rebuilt from the DB by the engine itself.
 
 
     yield
     logger.info("Shutting down...")
+    await job_scheduler.stop()
+    try:
+        from app.surveillance import stop_surveillance
+        await stop_surveillance()
+    except Exception as e:
+        logger.warning(f"Surveillance shutdown: {e}")
+    from app.services.envelope_executor import evaluation_executor
+    evaluation_executor.shutdown()
+    from app.services.pdf_render_pool import pdf_render_pool
+    pdf_render_pool.shutdown()
+    await audit_writer.stop()
 
 
 limiter = Limiter(key_func=get_remote_address)
@@ -595,6 +478,7 @@ OPENAPI_TAGS = [
     {"name": "Documents", "description": "Upload, list, and download certification-related documents"},
     {"name": "One-Command Deploy", "description": "Single-command ENVELO agent deployment configuration"},
     {"name": "Audit Log", "description": "Tamper-evident audit trail of all platform actions"},
+    {"name": "Background Jobs", "description": "Background job schedule, leases, and run duration/lag metrics"},
 ]
 
 app = FastAPI(
@@ -651,59 +535,6 @@ app.add_middleware(
 
 
 
-# ── Automated Backup Scheduler ──
-def _run_scheduled_backup():
-    import subprocess, os, logging
-    logger = logging.getLogger("sentinel")
-    logger.info("[BACKUP] Running scheduled backup...")
-    try:
-        result = subprocess.run(
-            ["python", "scripts/backup_db.py"],
-            capture_output=True, text=True, timeout=600,
-            env={**os.environ}
-        )
-        if result.returncode == 0:
-            logger.info("[BACKUP] Scheduled backup completed")
-        else:
-            logger.error(f"[BACKUP] Failed: {result.stderr[-300:]}")
-    except Exception as e:
-        logger.error(f"[BACKUP] Exception: {e}")
-
-@app.on_event("startup")
-async def start_backup_scheduler():
-    import os
-    if os.environ.get("ENVIRONMENT", "development") == "production":
-        from apscheduler.schedulers.background import BackgroundScheduler
-        scheduler = BackgroundScheduler()
-        scheduler.add_job(_run_scheduled_backup, "interval", hours=6, id="db_backup")
-        # Renewal automation: daily at 6am UTC
-        async def _run_renewal_cron():
-            import httpx
-            try:
-                async with httpx.AsyncClient(timeout=30) as client:
-                    await client.post("http://localhost:8080/api/billing/cron/renewals")
-            except Exception as e:
-                logger.warning(f"[RENEWAL] Cron failed: {e}")
-        from apscheduler.schedulers.asyncio import AsyncIOScheduler
-        renewal_scheduler = AsyncIOScheduler()
-        renewal_scheduler.add_job(_run_renewal_cron, "cron", hour=6, minute=0, id="renewal_cron")
-        renewal_scheduler.start()
-        from app.exposure_agent import run_exposure_agent
-        renewal_scheduler.add_job(run_exposure_agent, "cron", hour="7,12,17", minute=0, timezone="America/Toronto", id="sa_exposure_agent", replace_existing=True)
-        logger.info("[EXPOSURE] Agent scheduled — 7am Toronto daily")
-        from app.exposure_agent import run_engagement_agent
-        renewal_scheduler.add_job(run_engagement_agent, "interval", minutes=30, id="sa_engagement_agent", replace_existing=True)
-        logger.info("[ENGAGEMENT] Agent scheduled — every 30 minutes")
-        from linkedin_poster import start_linkedin_scheduler
-        start_linkedin_scheduler(renewal_scheduler)
-        from x_poster import start_x_scheduler
-        start_x_scheduler(renewal_scheduler)
-        logger.info("[EXPOSURE] Agent scheduled — 7am Toronto daily")
-        logger.info("[ENGAGEMENT] Agent scheduled — every 30 minutes")
-        logger.info("[RENEWAL] Daily cron scheduled — 6am UTC")
-        scheduler.start()
-        logger.info("[BACKUP] Scheduler started — every 6 hours")
-
 # ── Backup Cron Endpoint ──
 @app.post("/internal/backup", include_in_schema=False)
 async def trigger_backup(request: Request):
@@ -772,6 +603,8 @@ app.include_router(deploy.router, prefix="/api", tags=["One-Command Deploy"])
 app.include_router(audit_routes.router, prefix="/api/audit", tags=["Audit Log"])
 app.include_router(ai_review.router, prefix="/api", tags=["AI Review"])
 app.include_router(surveillance_router, prefix="/api/surveillance", tags=["Surveillance"])
+app.include_router(jobs_routes.router, prefix="/api/v1/jobs", tags=["Background Jobs"])
+app.include_router(jobs_routes.router, prefix="/api/jobs", tags=["Background Jobs"])
 app.include_router(quotes_routes.router, prefix="/api/v1/quotes", tags=["Quote Engine"])
 app.include_router(billing_routes.router, prefix="/api/v1/billing", tags=["Billing"])
 app.include_router(quotes_routes.router, prefix="/api/quotes", tags=["Quote Engine"])
@@ -782,20 +615,15 @@ app.include_router(stripe_webhook.router, prefix="/api/webhooks", tags=["Webhook
 
 
 # ── Global API rate limit: 200 req/min per IP ─────────────────────────────────
-from collections import defaultdict
-_global_rate: dict = defaultdict(list)
+from app.services.rate_limiter import GLOBAL_API_LIMITS, rate_limiter
 
 @app.middleware("http")
 async def global_rate_limit(request, call_next):
     if request.url.path.startswith("/api/"):
         ip = request.client.host if request.client else "unknown"
-        now = time.time()
-        hits = [t for t in _global_rate[ip] if now - t < 60]
-        if len(hits) >= 200:
+        if not await rate_limiter.hit(f"ip:{ip}", GLOBAL_API_LIMITS):
             from fastapi.responses import JSONResponse
             return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded: 200 requests/minute"})
-        hits.append(now)
-        _global_rate[ip] = hits
     return await call_next(request)
 
 @app.middleware("http")
@@ -0,0 +1,225 @@
+"""
+Concurrent-load benchmark for the audit log API.
+Runs the FastAPI app in-process (httpx ASGITransport) against a local Postgres.
+Appends --entries audit entries through the chain writer, then has --readers
+concurrent clients page /api/audit/logs by cursor (plus /my-logs, /admin-logs
+and a short /verify) while a probe times GET /health. Reports per-endpoint
+throughput and p50/p95/p99 latency, the probe's latency (event-loop health),
+the peak number of threadpool slots in use, and the peak number of backend
+connections this process holds, as JSON.
+
+Usage:
+    python scripts/audit_benchmark.py --entries 20000 --readers 50 --pages 20
+    python scripts/audit_benchmark.py --database-url postgresql://postgres@localhost:5433/postgres --out bench.json
+
+The schema comes from `alembic upgrade head`. Entries are tagged with the run
+id and removed afterwards unless --keep is given (the startup triggers that
+make audit_log append-only must not be installed on the benchmark database).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import secrets
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+try:
+    import httpx
+except ImportError:
+    print("pip install httpx")
+    exit(1)
+
+from load_test import Stats
+
+PROBE_INTERVAL_S = 0.02
+SAMPLE_INTERVAL_S = 0.05
+
+
+async def seed(run_id: str, entries: int) -> float:
+    """Append entries through the batched writer; returns entries per second."""
+    from app.core.database import AsyncSessionLocal
+    from app.services.audit_service import audit_writer, write_audit_log
+
+    await audit_writer.start()
+    start = time.perf_counter()
+    for offset in range(0, entries, 500):
+        async with AsyncSessionLocal() as db:
+            for i in range(offset, min(offset + 500, entries)):
+                await write_audit_log(db, random.choice(["user.login", "certificate.issued", "cat72.started"]),
+                                      "certificate", i, user_email=f"bench-{run_id}-{i % 20}@bench.invalid",
+                                      details={"run": run_id})
+            await db.commit()
+    await audit_writer.flush()
+    return entries / (time.perf_counter() - start)
+
+
+async def cleanup(run_id: str):
+    from sqlalchemy import text
+    from app.core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.execute(text("DELETE FROM audit_log WHERE user_email LIKE :tag"), {"tag": f"bench-{run_id}-%"})
+            await db.commit()
+        except Exception as e:
+            print(f"cleanup: {e}", file=sys.stderr)
+
+
+def _record(stats: Stats, status, elapsed: float):
+    stats.total_requests += 1
+    if isinstance(status, int) and status < 400:
+        stats.successful += 1
+        stats.latencies.append(elapsed)
+    else:
+        stats.failed += 1
+        stats.errors[str(status)] = stats.errors.get(str(status), 0) + 1
+
+
+async def _get(client, stats, path, headers, params=None):
+    start = time.perf_counter()
+    try:
+        resp = await client.get(path, headers=headers, params=params)
+        status, body = resp.status_code, (resp.json() if resp.status_code < 400 else None)
+    except Exception as e:
+        status, body = type(e).__name__, None
+    _record(stats, status, time.perf_counter() - start)
+    return body
+
+
+async def run_reader(app, index, run_id, admin, args, stats):
+    transport = httpx.ASGITransport(app=app, client=(f"10.1.{index // 256 % 256}.{index % 256}", 40000))
+    user = {"Authorization": f"Bearer {args.user_tokens[index % len(args.user_tokens)]}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        cursor = None
+        for page in range(args.pages):
+            params = {"limit": args.page_size, **({"cursor": cursor} if cursor else {})}
+            body = await _get(client, stats["logs"], "/api/audit/logs", admin, params)
+            cursor = body and body.get("next_cursor")
+            if page % 5 == 0:
+                await _get(client, stats["my_logs"], "/api/audit/my-logs", user, {"limit": 20})
+                await _get(client, stats["admin_logs"], "/api/audit/admin-logs", admin, {"limit": 8})
+        if index == 0:
+            await _get(client, stats["verify"], "/api/audit/verify", admin, {"limit": 5000})
+
+
+async def run_probe(app, done: asyncio.Event, stats: Stats):
+    transport = httpx.ASGITransport(app=app, client=("10.2.0.1", 40000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        while not done.is_set():
+            await _get(client, stats, "/health", {})
+            await asyncio.sleep(PROBE_INTERVAL_S)
+
+
+async def sample_pressure(done: asyncio.Event, peaks: dict):
+    """Peak threadpool slots in use and peak backend connections held by this process."""
+    from anyio.to_thread import current_default_thread_limiter
+    from sqlalchemy import text
+    from app.core.database import engine
+
+    limiter = current_default_thread_limiter()
+    async with engine.connect() as conn:
+        while not done.is_set():
+            peaks["threadpool_in_use"] = max(peaks["threadpool_in_use"], limiter.borrowed_tokens)
+            held = (await conn.execute(text(
+                "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()"
+            ))).scalar()
+            peaks["db_connections"] = max(peaks["db_connections"], held)
+            await asyncio.sleep(SAMPLE_INTERVAL_S)
+
+
+def _latency(s: Stats) -> dict:
+    return {
+        "p50": round(s.p50 * 1000, 3),
+        "p95": round(s.p95 * 1000, 3),
+        "p99": round(s.p99 * 1000, 3),
+        "mean": round(sum(s.latencies) / len(s.latencies) * 1000, 3) if s.latencies else 0,
+    }
+
+
+async def main(args):
+    random.seed(args.seed)
+    if not args.skip_migrate:
+        proc = subprocess.run(["alembic", "upgrade", "head"], cwd=BACKEND_DIR, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr, file=sys.stderr)
+            raise SystemExit("alembic upgrade head failed")
+
+    from main import app
+    from app.core.database import engine
+    from app.core.security import create_access_token
+    from app.services.audit_service import audit_writer
+
+    run_id = secrets.token_hex(4)
+    admin = {"Authorization": f"Bearer {create_access_token({'sub': '1', 'email': 'bench@bench.invalid', 'role': 'admin'})}"}
+    args.user_tokens = [create_access_token({"sub": str(i + 2), "email": f"bench-{run_id}-{i}@bench.invalid",
+                                             "role": "applicant"}) for i in range(20)]
+    stats = {name: Stats() for name in ("logs", "my_logs", "admin_logs", "verify")}
+    probe = Stats()
+    peaks = {"threadpool_in_use": 0, "db_connections": 0}
+    try:
+        write_rate = await seed(run_id, args.entries)
+        done = asyncio.Event()
+        background = [asyncio.create_task(run_probe(app, done, probe)),
+                      asyncio.create_task(sample_pressure(done, peaks))]
+        start = time.perf_counter()
+        await asyncio.gather(*[run_reader(app, i, run_id, admin, args, stats) for i in range(args.readers)])
+        wall = time.perf_counter() - start
+        done.set()
+        await asyncio.gather(*background)
+    finally:
+        await audit_writer.stop()
+        if not args.keep:
+            await cleanup(run_id)
+        await engine.dispose()
+
+    result = {
+        "benchmark": "audit",
+        "started_at": datetime.utcnow().isoformat(),
+        "config": {"entries": args.entries, "readers": args.readers, "pages": args.pages,
+                   "page_size": args.page_size, "seed": args.seed},
+        "writer_entries_per_s": round(write_rate, 1),
+        "wall_seconds": round(wall, 3),
+        "endpoints": {
+            name: {"requests": s.total_requests, "ok": s.successful, "failed": s.failed, "errors": s.errors,
+                   "throughput_rps": round(s.successful / wall, 2), "latency_ms": _latency(s)}
+            for name, s in stats.items() if s.total_requests
+        },
+        "health_probe_latency_ms": _latency(probe),
+        "peak_threadpool_in_use": peaks["threadpool_in_use"],
+        "peak_db_connections": peaks["db_connections"],
+    }
+    out = json.dumps(result, indent=2)
+    print(out)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(out + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentinel Authority audit log benchmark")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"),
+                        help="Postgres to benchmark against (default: DATABASE_URL)")
+    parser.add_argument("--entries", type=int, default=10000, help="Audit entries appended before reading")
+    parser.add_argument("--readers", type=int, default=40, help="Concurrent readers")
+    parser.add_argument("--pages", type=int, default=20, help="Cursor pages each reader walks")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=72)
+    parser.add_argument("--out", help="Also write the JSON report to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep appended entries")
+    parser.add_argument("--skip-migrate", action="store_true", help="Don't run alembic upgrade head first")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        raise SystemExit("set DATABASE_URL or pass --database-url")
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("ENVIRONMENT", "development")
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args))
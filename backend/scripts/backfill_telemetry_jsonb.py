@@ -0,0 +1,60 @@
+"""
+Pre-deploy backfill for alembic 008 (telemetry JSON text -> JSONB).
+Adds the shadow JSONB columns and sync trigger, then fills them in committed
+id-range batches while the current release keeps serving traffic. The
+migration then only has to catch up the tail and swap columns.
+Safe to interrupt and re-run.
+
+Usage:
+    python scripts/backfill_telemetry_jsonb.py
+    python scripts/backfill_telemetry_jsonb.py --batch-size 20000 --table violations
+
+Uses DATABASE_URL.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import DATABASE_URL
+from app.services.telemetry_jsonb import JSONB_COLUMNS, BACKFILL_BATCH_SIZE, needs_conversion, expand, backfill
+
+
+def run(conn, tables, batch_size):
+    started = time.time()
+
+    def progress(table, next_id, done):
+        print(f"  {table}: up to id {next_id}, {done} rows filled ({time.time() - started:.0f}s)", flush=True)
+
+    for table in tables:
+        if not needs_conversion(conn, table):
+            print(f"{table}: already JSONB, skipping")
+            continue
+        print(f"{table}: adding shadow columns and sync trigger")
+        expand(conn, table)
+        filled = backfill(conn, table, batch_size, progress)
+        print(f"{table}: done, {filled} rows filled")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Online JSONB backfill for telemetry tables")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    parser.add_argument("--table", choices=sorted(JSONB_COLUMNS), action="append")
+    args = parser.parse_args()
+
+    engine = create_async_engine(DATABASE_URL, isolation_level="AUTOCOMMIT",
+                                 connect_args={"statement_cache_size": 0})
+    try:
+        async with engine.connect() as conn:
+            await conn.run_sync(run, args.table or list(JSONB_COLUMNS), args.batch_size)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
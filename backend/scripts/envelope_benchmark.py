@@ -0,0 +1,186 @@
+"""
+CAT-72 envelope evaluation benchmark.
+Builds a realistic 50-boundary envelope (numeric limits, categorical sets,
+radius and polygon geofences, a performance curve, rate/compound/boolean/
+statistical rules and a no-fly polygon) and times per-sample evaluation:
+
+    original           check_envelope() as it was before the compiled evaluator,
+                       loaded from git (--baseline-rev): the per-sample cost ingest
+                       paid before, envelope parsing included
+    compiled           get_compiled_envelope(test_id, envelope, version).evaluate(),
+                       the ingest path: cache hit on the envelope version + evaluate
+
+Both paths are checked for identical results on every sample. No database
+needed; the baseline needs the repository's git history.
+
+Usage:
+    python scripts/envelope_benchmark.py
+    python scripts/envelope_benchmark.py --samples 20000 --out envelope_bench.json
+"""
+import argparse
+import ast
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+from load_test import percentile
+from app.services.envelope_evaluator import compile_envelope, get_compiled_envelope
+
+# last revision whose check_envelope() parsed the envelope on every sample
+BASELINE_REV = "9c63ba1"
+BASELINE_PATH = "backend/app/api/routes/cat72.py"
+
+NUMERIC_VARS = 30
+CATEGORICAL = {
+    "surface_type": ["dry", "wet", "gravel"],
+    "lighting": ["day", "dusk", "night"],
+    "weather": ["clear", "overcast", "light_rain"],
+    "flight_mode": ["auto", "assisted", "manual"],
+    "comms_link": ["primary", "backup"],
+    "operator_role": ["pilot", "observer"],
+    "airspace_class": ["g", "e"],
+    "payload_state": ["stowed", "deployed"],
+}
+
+
+def build_envelope() -> dict:
+    boundaries = [
+        {"name": f"sensor {i}", "type": "numeric", "min": 0, "max": 100 + i}
+        for i in range(NUMERIC_VARS)
+    ]
+    boundaries += [
+        {"name": name, "type": "categorical", "allowed": allowed}
+        for name, allowed in CATEGORICAL.items()
+    ]
+    boundaries += [
+        {"name": "ops area", "type": "geographic", "center_lat": 37.77, "center_lng": -122.42, "radius_m": 8000},
+        {"name": "corridor", "type": "polygon", "vertices": [
+            [37.70, -122.50], [37.84, -122.50], [37.86, -122.44], [37.84, -122.36],
+            [37.78, -122.33], [37.70, -122.36], [37.68, -122.43], [37.69, -122.48],
+        ]},
+        {"name": "stadium tfr", "type": "no_fly", "vertices": [
+            [37.776, -122.392], [37.780, -122.392], [37.780, -122.386], [37.776, -122.386],
+        ]},
+        {"name": "climb limit", "type": "envelope_curve", "input_variable": "sensor_0",
+         "output_variable": "sensor_1", "curve_type": "max",
+         "points": [[90, 60], [0, 100], [30, 95], [60, 80], [75, 70], [45, 88]]},
+        {"name": "sensor 2 slew", "type": "rate_of_change", "variable": "sensor_2", "max_rate": 40},
+        {"name": "wet speed", "type": "compound", "condition": {"surface_type": ["wet", "gravel"]},
+         "then": {"sensor_3": {"max": 60}}},
+        {"name": "gps health", "type": "boolean", "variable": "gps_ok", "required_value": True},
+        {"name": "link gap", "type": "connectivity", "max_gap_seconds": 5},
+        {"name": "sensor 4 mean", "type": "statistical", "variable": "sensor_4",
+         "aggregation": "mean", "window_size": 50, "max_value": 95},
+        {"name": "battery", "type": "battery_reserve", "current_key": "sensor_5", "min_reserve_pct": 2},
+        {"name": "nav redundancy", "type": "redundancy", "variables": ["gps_ok", "imu_ok", "vision_ok"], "min_operational": 2},
+        {"name": "payload ratio", "type": "ratio", "numerator_key": "sensor_6", "denominator_key": "sensor_7", "max_ratio": 50},
+    ]
+    assert len(boundaries) == 50
+    return {"boundaries": boundaries}
+
+
+def sample_stream(rng: random.Random, n: int):
+    t0 = datetime(2026, 1, 5, 12, 0)
+    prev = None
+    recent = []
+    for i in range(n):
+        sv = {f"sensor_{j}": round(rng.uniform(-2, 104), 3) for j in range(NUMERIC_VARS)}
+        for name, allowed in CATEGORICAL.items():
+            sv[name] = rng.choice(allowed) if rng.random() > 0.02 else "unknown"
+        sv.update(latitude=37.77 + rng.uniform(-0.05, 0.05), longitude=-122.42 + rng.uniform(-0.05, 0.05),
+                  gps_ok=rng.random() > 0.01, imu_ok=True, vision_ok=rng.random() > 0.3)
+        kwargs = dict(
+            prev_state_vector=prev, sample_interval_s=1.0,
+            current_timestamp=t0 + timedelta(seconds=i),
+            recent_samples=recent[-100:], recent_violations_count=0, recent_violations_window=3600,
+            cumulative_state={}, baseline_metrics={},
+        )
+        yield sv, kwargs
+        prev = sv
+        recent.append(sv)
+
+
+def load_original_check_envelope(rev: str):
+    """check_envelope() from `rev`, compiled on its own: only the function is
+    taken from the old route module, which would not import against today's tree."""
+    source = subprocess.run(["git", "show", f"{rev}:{BASELINE_PATH}"], cwd=BACKEND_DIR,
+                            check=True, capture_output=True, text=True).stdout
+    func = next(node for node in ast.parse(source).body
+                if isinstance(node, ast.FunctionDef) and node.name == "check_envelope")
+    namespace = {"Any": Any, "Dict": Dict, "List": List, "Optional": Optional,
+                 "datetime": datetime, "math": math}
+    exec(compile(ast.Module(body=[func], type_ignores=[]), f"{rev}:{BASELINE_PATH}", "exec"), namespace)
+    return namespace["check_envelope"]
+
+
+def summarize(latencies_us):
+    ordered = sorted(latencies_us)
+    return {
+        "mean_us": round(sum(ordered) / len(ordered), 2),
+        "p50_us": round(percentile(ordered, 0.50), 2),
+        "p95_us": round(percentile(ordered, 0.95), 2),
+        "p99_us": round(percentile(ordered, 0.99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CAT-72 envelope evaluation benchmark")
+    parser.add_argument("--samples", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=72)
+    parser.add_argument("--baseline-rev", default=BASELINE_REV,
+                        help="git revision whose check_envelope() is the baseline")
+    parser.add_argument("--out", help="Write the JSON report to this file as well")
+    args = parser.parse_args()
+
+    check_envelope = load_original_check_envelope(args.baseline_rev)
+
+    envelope = build_envelope()
+    samples = list(sample_stream(random.Random(args.seed), args.samples))
+
+    t = time.perf_counter()
+    compile_envelope(envelope)
+    compile_us = (time.perf_counter() - t) * 1e6
+
+    original_lat, compiled_lat, violating = [], [], 0
+    for sv, kwargs in samples:
+        t = time.perf_counter()
+        expected = check_envelope(sv, envelope, **kwargs)
+        original_lat.append((time.perf_counter() - t) * 1e6)
+
+        t = time.perf_counter()
+        got = get_compiled_envelope("CAT72-BENCH", envelope, 1).evaluate(sv, **kwargs)
+        compiled_lat.append((time.perf_counter() - t) * 1e6)
+
+        if got != expected:
+            raise SystemExit(f"Result mismatch on sample {sv}: {got} != {expected}")
+        violating += not got[0]
+
+    report = {
+        "boundaries": len(envelope["boundaries"]),
+        "samples": args.samples,
+        "violating_samples": violating,
+        "compile_us": round(compile_us, 2),
+        "baseline_rev": args.baseline_rev,
+        "original": summarize(original_lat),
+        "compiled": summarize(compiled_lat),
+        "speedup_mean": round(sum(original_lat) / sum(compiled_lat), 2),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""
+Ingestion benchmark for the ENVELO / CAT-72 write paths.
+Runs the FastAPI app in-process (httpx ASGITransport, one client IP per agent)
+against a local Postgres. Seeds certificates, API keys, sessions and running
+CAT-72 tests, drives a weighted request mix, then reports per-endpoint
+throughput, p50/p95/p99 latency and DB round trips per request as JSON.
+
+Endpoints (mix keys):
+    telemetry        POST /api/envelo/telemetry            (API key, --batch-size records)
+    heartbeat        POST /api/envelo/heartbeat            (API key)
+    cat72            POST /api/v1/cat72/tests/{id}/telemetry (admin JWT)
+    boundaries       GET  /api/envelo/boundaries/config    (API key)
+    verify           GET  /api/v1/verify/{certificate_number}
+    verify_evidence  GET  /api/v1/verify/{certificate_number}/evidence
+
+Local Postgres stand-in:
+    docker run -d --name sa-bench -p 5433:5432 -e POSTGRES_HOST_AUTH_METHOD=trust postgres:16
+    python scripts/ingest_benchmark.py --database-url postgresql://postgres@localhost:5433/postgres
+
+Usage:
+    python scripts/ingest_benchmark.py --agents 50 --requests 200 --batch-size 20
+    python scripts/ingest_benchmark.py --mix telemetry=70,heartbeat=20,cat72=10 --block-rate 0.05 --out bench.json
+
+Schema: on a database that already has the platform tables the script runs
+`alembic upgrade head`, as app startup does. The migrations start from the
+pre-alembic schema (001 alters `applications`), so an empty database such as
+the container above gets its tables from the models instead, as the test
+suite does, and is stamped at head. Seeded rows (and everything the run
+writes against them) are tagged with the run id and removed afterwards unless
+--keep is given; audit_log entries stay, as the table rejects deletes.
+The per-IP global limit (200/min) and the CAT-72 per-test limit (120/min)
+stay on; 429s are counted per endpoint and excluded from the latency figures.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import secrets
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+try:
+    import httpx
+except ImportError:
+    print("pip install httpx")
+    exit(1)
+
+from load_test import Stats, percentile
+
+DEFAULT_MIX = "telemetry=50,heartbeat=20,cat72=15,boundaries=5,verify=5,verify_evidence=5"
+
+_round_trips = contextvars.ContextVar("round_trips", default=None)
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"unknown mix entry {name!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def make_envelope(n: int) -> dict:
+    """n numeric boundaries named p0..p{n-1}, all with range [0, 100]"""
+    return {"boundaries": [
+        {"name": f"p{i}", "type": "numeric", "min": 0, "max": 100, "unit": "u"} for i in range(n)
+    ]}
+
+
+def make_state(n: int, block: bool) -> dict:
+    state = {f"p{i}": round(random.uniform(5, 95), 3) for i in range(n)}
+    if block:
+        state[f"p{random.randrange(n)}"] = round(random.uniform(120, 200), 3)
+    return state
+
+
+def count_round_trips(engine):
+    """Attribute every statement, BEGIN and COMMIT/ROLLBACK to the request running it"""
+    from sqlalchemy import event
+
+    def bump(*_):
+        counter = _round_trips.get()
+        if counter is not None:
+            counter[0] += 1
+
+    for name in ("before_cursor_execute", "begin", "commit", "rollback"):
+        event.listen(engine.sync_engine, name, bump)
+
+
+# --- Seeding ---
+
+async def seed(run_id: str, agents: int, boundaries: int):
+    from app.core.database import AsyncSessionLocal
+    from app.core.security import get_password_hash, create_access_token
+    from app.api.routes.apikeys import hash_key
+    from app.models.models import (
+        User, Application, Certificate, APIKey, EnveloSession, CAT72Test,
+    )
+
+    envelope = make_envelope(boundaries)
+    now = datetime.utcnow()
+    fixtures = []
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"bench-{run_id}@bench.invalid", hashed_password=get_password_hash(secrets.token_hex(16)),
+                    full_name="Benchmark", organization=f"bench-{run_id}", role="admin")
+        db.add(user)
+        await db.flush()
+        for i in range(agents):
+            org, system = f"bench-{run_id}", f"agent-{i:04d}"
+            app_row = Application(application_number=f"BENCH-{run_id}-{i:04d}", applicant_id=user.id,
+                                  organization_name=org, system_name=system,
+                                  envelope_definition=envelope, state="conformant")
+            db.add(app_row)
+            await db.flush()
+            cert = Certificate(certificate_number=f"ODDC-BENCH-{run_id}-{i:04d}", application_id=app_row.id,
+                               organization_name=org, system_name=system, envelope_definition=envelope,
+                               state="conformant", issued_at=now, expires_at=now + timedelta(days=365),
+                               issued_by=user.id, evidence_hash=secrets.token_hex(32), history=[])
+            db.add(cert)
+            await db.flush()
+            raw_key = f"sa_live_{secrets.token_hex(24)}"
+            key = APIKey(key_hash=hash_key(raw_key), key_prefix=raw_key[:12], certificate_id=cert.id,
+                         user_id=user.id, name=f"bench {run_id}", scope="full")
+            db.add(key)
+            await db.flush()
+            session = EnveloSession(session_id=uuid.uuid4().hex[:16], certificate_id=cert.id, api_key_id=key.id,
+                                    agent_version="bench", status="active", started_at=now,
+                                    last_heartbeat_at=now, organization_name=org, system_name=system)
+            test = CAT72Test(test_id=f"BENCH-{run_id}-{i:04d}", application_id=app_row.id, duration_hours=72,
+                             envelope_definition=envelope, state="running", started_at=now,
+                             operator_id=user.id, evidence_chain=[], evidence_hash="0" * 64)
+            db.add_all([session, test])
+            fixtures.append({"api_key": raw_key, "certificate_number": cert.certificate_number,
+                             "session_id": session.session_id, "test_id": test.test_id})
+        await db.commit()
+        token = create_access_token({"sub": str(user.id), "email": user.email, "role": "admin"})
+    return fixtures, token
+
+
+async def prepare_schema():
+    """alembic upgrade head, or on an empty database the models' tables stamped at head."""
+    from sqlalchemy import inspect, text
+    from app.core.database import Base, engine
+    from app.models import models  # noqa: F401  (registers the tables)
+    from app.services.telemetry_rollup import FLEET_TOTALS_SQL
+
+    async with engine.begin() as conn:
+        empty = not await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table("applications"))
+        if empty:
+            await conn.run_sync(Base.metadata.create_all)
+            for stmt in FLEET_TOTALS_SQL:
+                await conn.execute(text(stmt))
+    command = ["alembic", "stamp" if empty else "upgrade", "head"]
+    proc = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(proc.stderr, file=sys.stderr)
+        raise SystemExit(f"{' '.join(command)} failed")
+
+
+async def cleanup(run_id: str):
+    from sqlalchemy import text
+    from app.core.database import AsyncSessionLocal
+
+    org = f"bench-{run_id}"
+    sessions = "(SELECT id FROM envelo_sessions WHERE organization_name = :org)"
+    tests = "(SELECT t.id FROM cat72_tests t JOIN applications a ON a.id = t.application_id WHERE a.organization_name = :org)"
+    statements = [
+        f"DELETE FROM violations WHERE session_id IN {sessions}",
+        f"DELETE FROM telemetry_records WHERE session_id IN {sessions}",
+        f"DELETE FROM violation_rollups WHERE session_id IN {sessions}",
+        f"DELETE FROM telemetry_rollups WHERE session_id IN {sessions}",
+        "DELETE FROM envelo_sessions WHERE organization_name = :org",
+        "DELETE FROM api_keys WHERE user_id IN (SELECT id FROM users WHERE organization = :org)",
+        f"DELETE FROM interlock_events WHERE test_id IN {tests}",
+        f"DELETE FROM cat72_evidence_checkpoints WHERE test_id IN {tests}",
+        f"DELETE FROM cat72_evidence_blocks WHERE test_id IN {tests}",
+        f"DELETE FROM cat72_learning_profiles WHERE test_id IN {tests}",
+        f"DELETE FROM telemetry WHERE test_id IN {tests}",
+        "DELETE FROM certificates WHERE organization_name = :org",
+        "DELETE FROM cat72_tests WHERE application_id IN (SELECT id FROM applications WHERE organization_name = :org)",
+        "DELETE FROM applications WHERE organization_name = :org",
+        "DELETE FROM users WHERE organization = :org",
+    ]
+    async with AsyncSessionLocal() as db:
+        for stmt in statements:
+            try:
+                await db.execute(text(stmt), {"org": org})
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                print(f"cleanup: {stmt.split(' WHERE')[0]}: {e}", file=sys.stderr)
+
+
+# --- Request builders: (method, path, headers, json body) ---
+
+def _telemetry(fx, token, args):
+    now = datetime.utcnow()
+    records = []
+    for j in range(args.batch_size):
+        block = random.random() < args.block_rate
+        state = make_state(args.boundaries, block)
+        evals = [{"boundary": k, "passed": 0 <= v <= 100} for k, v in state.items()]
+        records.append({
+            "timestamp": (now + timedelta(microseconds=j)).isoformat(),
+            "action_id": uuid.uuid4().hex[:12], "action_type": "move",
+            "result": "BLOCK" if block else "PASS", "execution_time_ms": round(random.uniform(0.1, 2), 3),
+            "parameters": state, "boundary_evaluations": evals,
+        })
+    body = {"certificate_id": fx["certificate_number"], "session_id": fx["session_id"], "records": records}
+    return "POST", "/api/envelo/telemetry", {"Authorization": f"Bearer {fx['api_key']}"}, body
+
+
+def _heartbeat(fx, token, args):
+    return "POST", "/api/envelo/heartbeat", {"Authorization": f"Bearer {fx['api_key']}"}, None
+
+
+def _cat72(fx, token, args):
+    body = {"state_vector": make_state(args.boundaries, random.random() < args.block_rate)}
+    return "POST", f"/api/v1/cat72/tests/{fx['test_id']}/telemetry", {"Authorization": f"Bearer {token}"}, body
+
+
+def _boundaries(fx, token, args):
+    return "GET", "/api/envelo/boundaries/config", {"Authorization": f"Bearer {fx['api_key']}"}, None
+
+
+def _verify(fx, token, args):
+    return "GET", f"/api/v1/verify/{fx['certificate_number']}", {}, None
+
+
+def _verify_evidence(fx, token, args):
+    return "GET", f"/api/v1/verify/{fx['certificate_number']}/evidence", {}, None
+
+
+ENDPOINTS = {
+    "telemetry": _telemetry,
+    "heartbeat": _heartbeat,
+    "cat72": _cat72,
+    "boundaries": _boundaries,
+    "verify": _verify,
+    "verify_evidence": _verify_evidence,
+}
+
+
+# --- Driver ---
+
+async def run_agent(app, index, fx, token, args, mix, stats, round_trips):
+    names, weights = list(mix), list(mix.values())
+    transport = httpx.ASGITransport(app=app, client=(f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}", 40000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(args.requests):
+            name = random.choices(names, weights)[0]
+            method, path, headers, body = ENDPOINTS[name](fx, token, args)
+            counter = [0]
+            _round_trips.set(counter)
+            s = stats[name]
+            start = time.perf_counter()
+            try:
+                resp = await client.request(method, path, headers=headers, json=body)
+                status = resp.status_code
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            _round_trips.set(None)
+
+            s.total_requests += 1
+            if status == 429:
+                s.errors["429"] = s.errors.get("429", 0) + 1
+            elif isinstance(status, int) and status < 400:
+                s.successful += 1
+                s.latencies.append(elapsed)
+                round_trips[name].append(counter[0])
+            else:
+                s.failed += 1
+                s.errors[str(status)] = s.errors.get(str(status), 0) + 1
+            if args.interval:
+                await asyncio.sleep(args.interval)
+
+
+def report(stats: dict, round_trips: dict, args, mix, wall: float) -> dict:
+    endpoints = {}
+    for name, s in stats.items():
+        if not s.total_requests:
+            continue
+        trips = sorted(round_trips[name])
+        endpoints[name] = {
+            "requests": s.total_requests,
+            "ok": s.successful,
+            "failed": s.failed,
+            "rate_limited": s.errors.get("429", 0),
+            "errors": {k: v for k, v in s.errors.items() if k != "429"},
+            "throughput_rps": round(s.successful / wall, 2),
+            "records_per_s": round(s.successful * args.batch_size / wall, 2) if name == "telemetry" else None,
+            "latency_ms": {
+                "p50": round(s.p50 * 1000, 3),
+                "p95": round(s.p95 * 1000, 3),
+                "p99": round(s.p99 * 1000, 3),
+                "mean": round(sum(s.latencies) / len(s.latencies) * 1000, 3) if s.latencies else 0,
+            },
+            "db_round_trips": {
+                "mean": round(sum(trips) / len(trips), 2) if trips else 0,
+                "p50": percentile(trips, 0.50),
+                "p95": percentile(trips, 0.95),
+                "max": trips[-1] if trips else 0,
+            },
+        }
+    total_ok = sum(s.successful for s in stats.values())
+    return {
+        "benchmark": "ingest",
+        "started_at": datetime.utcnow().isoformat(),
+        "config": {
+            "agents": args.agents, "requests_per_agent": args.requests, "batch_size": args.batch_size,
+            "boundaries": args.boundaries, "block_rate": args.block_rate, "interval_s": args.interval,
+            "mix": mix, "seed": args.seed,
+        },
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(total_ok / wall, 2),
+        "endpoints": endpoints,
+    }
+
+
+async def main(args):
+    random.seed(args.seed)
+    mix = parse_mix(args.mix)
+
+    if not args.skip_migrate:
+        await prepare_schema()
+
+    from main import app
+    from app.core.database import engine
+    count_round_trips(engine)
+
+    run_id = secrets.token_hex(4)
+    fixtures, token = await seed(run_id, args.agents, args.boundaries)
+    stats = {name: Stats() for name in ENDPOINTS}
+    round_trips = {name: [] for name in ENDPOINTS}
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            run_agent(app, i, fx, token, args, mix, stats, round_trips) for i, fx in enumerate(fixtures)
+        ])
+        wall = time.perf_counter() - start
+    finally:
+        if not args.keep:
+            await cleanup(run_id)
+        await engine.dispose()
+
+    result = report(stats, round_trips, args, mix, wall)
+    out = json.dumps(result, indent=2)
+    print(out)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(out + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentinel Authority ingestion benchmark")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"),
+                        help="Postgres to benchmark against (default: DATABASE_URL)")
+    parser.add_argument("--agents", type=int, default=20, help="Concurrent agents (one cert/key/session/test each)")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per agent")
+    parser.add_argument("--batch-size", type=int, default=10, help="Records per /telemetry batch")
+    parser.add_argument("--boundaries", type=int, default=10, help="Numeric boundaries per envelope")
+    parser.add_argument("--block-rate", type=float, default=0.05, help="Fraction of out-of-envelope records")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted endpoint mix, e.g. telemetry=70,heartbeat=30")
+    parser.add_argument("--interval", type=float, default=0.0, help="Per-agent pause between requests (s)")
+    parser.add_argument("--seed", type=int, default=72)
+    parser.add_argument("--out", help="Also write the JSON report to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep seeded rows")
+    parser.add_argument("--skip-migrate", action="store_true", help="Don't prepare the schema (alembic upgrade head) first")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        raise SystemExit("set DATABASE_URL or pass --database-url")
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("ENVIRONMENT", "development")
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args))
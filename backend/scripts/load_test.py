@@ -25,6 +25,13 @@ except ImportError:
     exit(1)
 
 
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    return sorted_values[min(int(len(sorted_values) * q), len(sorted_values) - 1)]
+
+
 @dataclass
 class Stats:
     total_requests: int = 0
@@ -34,6 +41,7 @@ class Stats:
     errors: dict = field(default_factory=dict)
     start_time: float = 0
     end_time: float = 0
+    _sorted: List[float] = field(default_factory=list, repr=False)
 
     @property
     def duration(self) -> float:
@@ -43,26 +51,23 @@ class Stats:
     def rps(self) -> float:
         return self.total_requests / max(self.duration, 0.001)
 
+    def sorted_latencies(self) -> List[float]:
+        # Sort once per batch of new samples, not once per percentile read
+        if len(self._sorted) != len(self.latencies):
+            self._sorted = sorted(self.latencies)
+        return self._sorted
+
     @property
     def p50(self) -> float:
-        if not self.latencies:
-            return 0
-        s = sorted(self.latencies)
-        return s[len(s) // 2]
+        return percentile(self.sorted_latencies(), 0.50)
 
     @property
     def p95(self) -> float:
-        if not self.latencies:
-            return 0
-        s = sorted(self.latencies)
-        return s[int(len(s) * 0.95)]
+        return percentile(self.sorted_latencies(), 0.95)
 
     @property
     def p99(self) -> float:
-        if not self.latencies:
-            return 0
-        s = sorted(self.latencies)
-        return s[int(len(s) * 0.99)]
+        return percentile(self.sorted_latencies(), 0.99)
 
 
 async def simulate_system(client: httpx.AsyncClient, system_id: int, base_url: str,
@@ -0,0 +1,183 @@
+"""
+Benchmark for time-partitioned telemetry_records.
+Builds a flat table (the pre-006 layout: separate session_id / timestamp indexes)
+and a range-partitioned table (composite (session_id, timestamp) index) in a
+scratch schema, fills both with the same synthetic rows, then measures the
+session timeline query, the compliance-log count query, vacuum and retention.
+
+Usage:
+    python scripts/partition_benchmark.py --rows 100000000 --sessions 5000 --days 365
+    python scripts/partition_benchmark.py --rows 1000000 --interval daily --days 30 --out bench.json
+
+Results are printed as JSON. Uses DATABASE_URL; everything lives in the
+bench_partition schema, which is dropped unless --keep is given.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import asyncpg
+except ImportError:
+    print("pip install asyncpg")
+    exit(1)
+
+from app.services.partition_manager import period_start, next_period, partition_name, create_partition_sql
+
+SCHEMA = "bench_partition"
+COLUMNS = """
+    id BIGINT NOT NULL,
+    session_id INTEGER NOT NULL,
+    timestamp TIMESTAMP NOT NULL,
+    action_id VARCHAR(50),
+    action_type VARCHAR(100),
+    result VARCHAR(10),
+    execution_time_ms DOUBLE PRECISION,
+    parameters TEXT,
+    boundary_evaluations TEXT,
+    system_state TEXT
+"""
+
+
+def _fill_sql(table: str, start: int, count: int, total: int, sessions: int, origin: datetime, span_seconds: int) -> str:
+    return f"""
+        INSERT INTO {table}
+        SELECT g, 1 + (g % {sessions}),
+               '{origin.isoformat(sep=' ')}'::timestamp + ((g::bigint * {span_seconds}) / {total + 1}) * interval '1 second',
+               'act-' || g, 'move',
+               CASE WHEN g % 20 = 0 THEN 'BLOCK' ELSE 'PASS' END,
+               (g % 50)::float,
+               '{{"speed": 12.5}}', '[]', '{{}}'
+        FROM generate_series({start}, {start + count - 1}) g
+    """
+
+
+async def _setup(conn, args, origin: datetime, end: datetime):
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    await conn.execute(f"SET search_path TO {SCHEMA}")
+
+    await conn.execute(f"CREATE TABLE flat ({COLUMNS}, PRIMARY KEY (id))")
+    await conn.execute("CREATE INDEX ix_flat_session ON flat (session_id)")
+    await conn.execute("CREATE INDEX ix_flat_ts ON flat (timestamp)")
+
+    await conn.execute(f"CREATE TABLE part ({COLUMNS}, PRIMARY KEY (id, timestamp)) PARTITION BY RANGE (timestamp)")
+    await conn.execute("CREATE INDEX ix_part_session_ts ON part (session_id, timestamp)")
+    start = period_start(origin, args.interval)
+    while start < end:
+        stop = next_period(start, args.interval)
+        await conn.execute(create_partition_sql("part", start, stop, args.interval))
+        start = stop
+
+    span = int((end - origin).total_seconds())
+    chunk = 5_000_000
+    for table in ("flat", "part"):
+        t0 = time.monotonic()
+        for offset in range(0, args.rows, chunk):
+            await conn.execute(_fill_sql(table, offset + 1, min(chunk, args.rows - offset), args.rows, args.sessions, origin, span))
+        await conn.execute(f"ANALYZE {table}")
+        print(f"[BENCH] loaded {args.rows} rows into {table} in {time.monotonic() - t0:.1f}s", file=sys.stderr)
+
+
+async def _time_query(conn, sql: str, params_list) -> dict:
+    latencies = []
+    buffers = 0
+    for params in params_list:
+        t0 = time.monotonic()
+        await conn.fetch(sql, *params)
+        latencies.append(time.monotonic() - t0)
+        plan = await conn.fetchval(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", *params)
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        top = plan[0]["Plan"]
+        buffers += top.get("Shared Hit Blocks", 0) + top.get("Shared Read Blocks", 0)
+    latencies.sort()
+    return {
+        "runs": len(latencies),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+        "avg_buffers": round(buffers / max(len(latencies), 1), 1),
+    }
+
+
+async def run_benchmark(args) -> dict:
+    url = os.environ.get("DATABASE_URL", "postgresql://localhost/sentinel_authority")
+    url = url.replace("postgresql+asyncpg://", "postgresql://", 1)
+    conn = await asyncpg.connect(url, statement_cache_size=0)
+    end = datetime.utcnow().replace(microsecond=0)
+    origin = end - timedelta(days=args.days)
+    try:
+        await _setup(conn, args, origin, end)
+        rng = random.Random(42)
+        sessions = [rng.randint(1, args.sessions) for _ in range(args.samples)]
+
+        timeline = """
+            SELECT date_trunc('hour', timestamp) AS h, count(*), count(*) FILTER (WHERE result = 'PASS')
+            FROM {t} WHERE session_id = $1 AND timestamp >= $2 GROUP BY h ORDER BY h
+        """
+        counts = """
+            SELECT count(*), count(*) FILTER (WHERE result = 'PASS'), count(*) FILTER (WHERE result = 'BLOCK')
+            FROM {t} WHERE session_id = ANY($1::int[]) AND timestamp >= $2 AND timestamp <= $3
+        """
+        day_ago = end - timedelta(hours=24)
+        month_ago = end - timedelta(days=30)
+        results = {"rows": args.rows, "sessions": args.sessions, "days": args.days, "interval": args.interval}
+        for table in ("flat", "part"):
+            results[table] = {
+                "session_timeline_24h": await _time_query(
+                    conn, timeline.format(t=table), [(s, day_ago) for s in sessions]),
+                "telemetry_counts_30d": await _time_query(
+                    conn, counts.format(t=table), [(sessions[i:i + 10], month_ago, end) for i in range(0, len(sessions), 10)]),
+            }
+
+        # Vacuum: churn the most recent day, then vacuum what autovacuum would have to visit
+        latest = period_start(end - timedelta(seconds=1), args.interval)
+        latest_part = partition_name("part", latest, args.interval)
+        for table, target in (("flat", "flat"), ("part", latest_part)):
+            await conn.execute(f"UPDATE {table} SET result = result WHERE timestamp >= $1", day_ago)
+            t0 = time.monotonic()
+            await conn.execute(f"VACUUM {target}")
+            results[table]["vacuum_after_recent_churn_ms"] = round((time.monotonic() - t0) * 1000, 1)
+
+        # Retention: DELETE the oldest period vs dropping its partition
+        oldest = period_start(origin, args.interval)
+        boundary = next_period(oldest, args.interval)
+        t0 = time.monotonic()
+        await conn.execute("DELETE FROM flat WHERE timestamp < $1", boundary)
+        await conn.execute("VACUUM flat")
+        results["flat"]["retention_ms"] = round((time.monotonic() - t0) * 1000, 1)
+        oldest_part = partition_name("part", oldest, args.interval)
+        t0 = time.monotonic()
+        await conn.execute(f"ALTER TABLE part DETACH PARTITION {oldest_part}")
+        await conn.execute(f"DROP TABLE {oldest_part}")
+        results["part"]["retention_ms"] = round((time.monotonic() - t0) * 1000, 1)
+        return results
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Telemetry partitioning benchmark")
+    parser.add_argument("--rows", type=int, default=100_000_000, help="Synthetic telemetry rows")
+    parser.add_argument("--sessions", type=int, default=5000, help="Distinct sessions")
+    parser.add_argument("--days", type=int, default=365, help="Time span of the data")
+    parser.add_argument("--interval", choices=["monthly", "daily"], default="monthly")
+    parser.add_argument("--samples", type=int, default=50, help="Queries per measurement")
+    parser.add_argument("--keep", action="store_true", help="Keep the bench_partition schema")
+    parser.add_argument("--out", type=str, default="", help="Also write JSON results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
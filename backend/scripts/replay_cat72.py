@@ -0,0 +1,60 @@
+"""
+Offline CAT-72 replay.
+Re-evaluates a test's stored telemetry against its own envelope, or a revised
+one from a JSON file, and prints the diff against the recorded verdicts as JSON.
+Read-only.
+
+Usage:
+    python scripts/replay_cat72.py CAT72-1a2b3c4d
+    python scripts/replay_cat72.py CAT72-1a2b3c4d --envelope revised_envelope.json --out replay.json
+
+Uses DATABASE_URL.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal
+from app.models.models import CAT72Test
+from app.services.cat72_replay import REPLAY_CHUNK_SIZE, REPLAY_MAX_EXAMPLES, replay_test
+
+
+async def run(args) -> dict:
+    envelope = None
+    if args.envelope:
+        with open(args.envelope) as f:
+            envelope = json.load(f)
+        # accept a whole test/application export as well as a bare definition
+        envelope = envelope.get("envelope_definition", envelope)
+    async with AsyncSessionLocal() as db:
+        test = (await db.execute(select(CAT72Test).where(CAT72Test.test_id == args.test_id))).scalar_one_or_none()
+        if test is None:
+            raise SystemExit(f"Test {args.test_id} not found")
+        return await replay_test(db, test, envelope, chunk_size=args.chunk_size, max_examples=args.examples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a CAT-72 test's telemetry against an envelope")
+    parser.add_argument("test_id")
+    parser.add_argument("--envelope", type=str, default="", help="JSON file with the envelope to replay against")
+    parser.add_argument("--chunk-size", type=int, default=REPLAY_CHUNK_SIZE)
+    parser.add_argument("--examples", type=int, default=REPLAY_MAX_EXAMPLES, help="Flipped samples to list")
+    parser.add_argument("--out", type=str, default="", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
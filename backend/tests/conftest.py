@@ -5,6 +5,7 @@ import pytest_asyncio
 import asyncio
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import text
 from sqlalchemy.pool import NullPool
 
 # Use test database
@@ -14,6 +15,7 @@ os.environ["ENVIRONMENT"] = "test"
 
 from main import app
 from app.core.database import Base, get_db
+from app.services.telemetry_rollup import FLEET_TOTALS_SQL
 
 TEST_DB_URL = os.environ["DATABASE_URL"]
 if TEST_DB_URL.startswith("postgresql://"):
@@ -22,6 +24,9 @@ if TEST_DB_URL.startswith("postgresql://"):
 test_engine = create_async_engine(TEST_DB_URL, poolclass=NullPool, connect_args={"statement_cache_size": 0})
 TestSession = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
 
+from app.services.audit_service import audit_writer
+audit_writer.session_factory = TestSession
+
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -34,6 +39,8 @@ def event_loop():
 async def setup_db():
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        for stmt in FLEET_TOTALS_SQL:
+            await conn.execute(text(stmt))
     yield
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
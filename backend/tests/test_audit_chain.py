@@ -66,3 +66,61 @@ async def test_audit_log_immutability(db_session):
     except Exception:
         await db_session.rollback()
         pass  # Expected: trigger blocks the update
+
+
+def _headers(role, email):
+    from app.core.security import create_access_token
+    return {"Authorization": f"Bearer {create_access_token({'sub': '1', 'role': role, 'email': email})}"}
+
+
+@pytest.mark.asyncio
+async def test_audit_logs_keyset_pages_and_chain_verifies(client):
+    """Admin listing walks the log newest-first by cursor; users see only their own."""
+    import uuid
+    from sqlalchemy import delete
+    from app.models.models import AuditLog
+    from app.services.audit_service import audit_writer, write_audit_log
+    from tests.conftest import TestSession
+
+    email = f"audit-{uuid.uuid4().hex[:8]}@test.example.com"
+    async with TestSession() as db:
+        for i in range(7):
+            await write_audit_log(db, "test.paged", "application", i, user_email=email)
+        await db.commit()
+    await audit_writer.flush()
+
+    try:
+        admin = _headers("admin", "admin@test.example.com")
+        seen, cursor = [], None
+        while True:
+            params = {"user_email": email, "limit": 3, **({"cursor": cursor} if cursor else {})}
+            resp = await client.get("/api/v1/audit/logs", params=params, headers=admin)
+            assert resp.status_code == 200
+            body = resp.json()
+            if cursor is None:
+                assert body["total"] == 7
+            seen += [log["resource_id"] for log in body["logs"]]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == [6, 5, 4, 3, 2, 1, 0]
+
+        mine = await client.get("/api/v1/audit/my-logs", params={"limit": 100}, headers=_headers("applicant", email))
+        assert mine.status_code == 200 and mine.json()["total"] == 7
+        one = await client.get("/api/v1/audit/my-logs", headers=_headers("applicant", email),
+                               params={"resource_type": "application", "resource_id": 4, "limit": 200})
+        assert [log["resource_id"] for log in one.json()["logs"]] == [4]
+
+        # user_email is an exact match (it has to hit the email index), not a substring search
+        partial = await client.get("/api/v1/audit/logs", params={"user_email": email[:-4]}, headers=admin)
+        assert partial.json()["total"] == 0
+
+        bad = await client.get("/api/v1/audit/logs", params={"cursor": "nope"}, headers=admin)
+        assert bad.status_code == 400
+
+        verify = await client.get("/api/v1/audit/verify", params={"limit": 50000}, headers=admin)
+        assert verify.status_code == 200 and verify.json()["checked"] >= 7
+    finally:
+        async with TestSession() as db:
+            await db.execute(delete(AuditLog).where(AuditLog.user_email == email))
+            await db.commit()
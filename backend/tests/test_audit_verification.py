@@ -0,0 +1,130 @@
+"""Anchored, incremental and parallel audit-chain verification."""
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select, update
+
+from app.models.models import AuditAnchor, AuditLog
+from app.services import audit_verification
+from app.services.audit_service import AuditChainWriter
+from app.services.audit_verification import anchor_audit_chain, last_trusted_anchor, verify_full, verify_incremental
+from tests.conftest import TestSession
+
+
+async def _clear():
+    async with TestSession() as db:
+        await db.execute(delete(AuditAnchor))
+        await db.execute(delete(AuditLog))
+        await db.commit()
+
+
+@pytest_asyncio.fixture
+async def chain(setup_db, monkeypatch):
+    """An audit log holding only this test's chain; returns a function appending n entries."""
+    monkeypatch.setattr(audit_verification, "AsyncSessionLocal", TestSession)
+    await _clear()
+    writer = AuditChainWriter(TestSession)
+
+    async def append(n):
+        return await writer.write_batch([
+            dict(action="test.verify", resource_type="certificate", resource_id=i, user_email="verify@test.example.com",
+                 details={"i": i}, timestamp=datetime.utcnow()) for i in range(n)])
+
+    yield append
+    await _clear()
+
+
+async def _report(items):
+    findings = []
+    async for item in items:
+        if item["type"] == "summary":
+            return findings, item
+        findings.append(item)
+
+
+@pytest.mark.asyncio
+async def test_routine_checks_start_at_the_last_trusted_anchor(chain):
+    ids = await chain(25)
+    assert await anchor_audit_chain(interval=10) == 2
+    assert await anchor_audit_chain(interval=10) == 0  # nothing new to anchor
+
+    async with TestSession() as db:
+        anchor = await last_trusted_anchor(db)
+        assert (anchor.last_audit_id, anchor.entry_count) == (ids[19], 20)
+        findings, summary = await _report(verify_incremental(db))
+    assert findings == [] and summary["checked"] == 5 and summary["from_entry"] == ids[19]
+
+    # a forged anchor (bad signature) is skipped: checks fall back to the one before it
+    async with TestSession() as db:
+        db.add(AuditAnchor(created_at=datetime.utcnow(), last_audit_id=ids[24], chain_hash="f" * 16,
+                           entry_count=25, anchor_signature="0" * 64))
+        await db.commit()
+        assert (await last_trusted_anchor(db)).last_audit_id == ids[19]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [0, 2])
+async def test_full_audit_reports_tampered_entries_and_anchors(chain, workers):
+    ids = await chain(30)
+    await anchor_audit_chain(interval=10)
+    async with TestSession() as db:
+        await db.execute(update(AuditLog).where(AuditLog.id == ids[4]).values(details={"i": "edited"}))
+        await db.execute(delete(AuditLog).where(AuditLog.id == ids[22]))
+        await db.execute(update(AuditAnchor).where(AuditAnchor.last_audit_id == ids[9])
+                         .values(entry_count=9))
+        await db.commit()
+
+        findings, summary = await _report(verify_full(db, workers=workers, segment=7))
+    assert summary["checked"] == 29 and summary["invalid"] == 2 and summary["bad_anchors"] == 1
+    assert [(f["type"], f.get("reason")) for f in findings] == [
+        ("anchor", "bad signature"), ("tampered", "hash mismatch"), ("tampered", "broken link")]
+    assert [f["id"] for f in findings[1:]] == [ids[4], ids[23]]
+
+
+@pytest.mark.asyncio
+async def test_anchoring_stops_at_a_tampered_interval(chain):
+    ids = await chain(30)
+    async with TestSession() as db:
+        await db.execute(update(AuditLog).where(AuditLog.id == ids[15]).values(action="test.forged"))
+        await db.commit()
+    assert await anchor_audit_chain(interval=10) == 1
+    async with TestSession() as db:
+        anchors = (await db.execute(select(AuditAnchor.last_audit_id))).scalars().all()
+    assert anchors == [ids[9]]
+
+    # no anchor past the break, however long the chain grows: routine checks
+    # fall back to re-hashing everything after the last good anchor and keep
+    # reporting the tampered entry
+    await chain(20)
+    assert await anchor_audit_chain(interval=10) == 0
+    async with TestSession() as db:
+        findings, summary = await _report(verify_incremental(db))
+    assert summary["from_entry"] == ids[9] and summary["checked"] == 40
+    assert [f["id"] for f in findings] == [ids[15]]
+
+
+@pytest.mark.asyncio
+async def test_legacy_entries_stored_with_empty_details_verify(chain):
+    """The old writer stored `details or {}` but hashed details as None."""
+    writer = AuditChainWriter(TestSession)
+    ids = await chain(5)
+    ids += await writer.write_batch([
+        dict(action="user.2fa_enabled", resource_type="user", resource_id=i, user_email="verify@test.example.com",
+             details=None, timestamp=datetime.utcnow()) for i in range(5)])
+    ids += await chain(10)
+    async with TestSession() as db:
+        await db.execute(update(AuditLog).where(AuditLog.id.in_(ids[5:10])).values(details={}))
+        await db.commit()
+
+    assert await anchor_audit_chain(interval=10) == 2
+    async with TestSession() as db:
+        findings, summary = await _report(verify_full(db, workers=0))
+    assert findings == [] and summary["checked"] == 20
+
+    # only the empty form is accepted as legacy: real details still have to match
+    async with TestSession() as db:
+        await db.execute(update(AuditLog).where(AuditLog.id == ids[6]).values(details={"forged": True}))
+        await db.commit()
+        findings, _ = await _report(verify_full(db, workers=0))
+    assert [f["id"] for f in findings] == [ids[6]]
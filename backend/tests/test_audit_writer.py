@@ -0,0 +1,123 @@
+"""Batched audit-chain writer."""
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.models.models import AuditLog
+from app.services.audit_service import AuditChainWriter, audit_writer, chain_hash, write_audit_log
+from tests.conftest import TestSession
+
+
+async def _chain(tag):
+    """This test's entries and every entry appended after its first one."""
+    async with TestSession() as db:
+        first = select(AuditLog.id).where(AuditLog.user_email == tag).order_by(AuditLog.id).limit(1)
+        return (await db.execute(
+            select(AuditLog).where(AuditLog.id >= first.scalar_subquery()).order_by(AuditLog.id)
+        )).scalars().all()
+
+
+async def _drop(tag):
+    async with TestSession() as db:
+        await db.execute(delete(AuditLog).where(AuditLog.user_email == tag))
+        await db.commit()
+
+
+def _assert_linear(rows):
+    prev = rows[0].prev_hash
+    for row in rows:
+        assert row.prev_hash == prev
+        entry = dict(action=row.action, resource_type=row.resource_type, resource_id=row.resource_id,
+                     user_id=row.user_id, user_email=row.user_email, details=row.details, timestamp=row.timestamp)
+        assert row.log_hash == chain_hash(row.prev_hash, entry)
+        prev = row.log_hash
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writers_append_one_linear_chain(setup_db):
+    tag = f"writer-{uuid.uuid4().hex[:8]}@test.example.com"
+    a, b = AuditChainWriter(TestSession), AuditChainWriter(TestSession)  # two replicas
+    await a.start()
+    await b.start()
+    try:
+        for i in range(300):
+            (a if i % 2 else b).submit([dict(action="test.event", user_email=tag, details={"i": i},
+                                             timestamp=datetime.utcnow())])
+            if i % 50 == 0:
+                await asyncio.sleep(0)
+        await asyncio.gather(a.flush(), b.flush())
+
+        rows = await _chain(tag)
+        mine = [r for r in rows if r.user_email == tag]
+        assert len(mine) == 300
+        _assert_linear(rows)
+        # batched: far fewer transactions than entries
+        assert a.stats["batches"] + b.stats["batches"] < 300
+        assert a.stats["written"] + b.stats["written"] == 300
+    finally:
+        await a.stop()
+        await b.stop()
+        await _drop(tag)
+
+
+@pytest.mark.asyncio
+async def test_entries_are_chained_only_when_their_transaction_commits(setup_db):
+    tag = f"session-{uuid.uuid4().hex[:8]}@test.example.com"
+    try:
+        async with TestSession() as db:
+            await write_audit_log(db, "test.rolled_back", "certificate", 1, user_email=tag)
+            await db.rollback()
+            await write_audit_log(db, "test.committed", "certificate", 2, user_email=tag, details={"k": "v"})
+            # a rolled-back savepoint takes its entries with it, those of savepoints inside it too
+            with pytest.raises(ValueError):
+                async with db.begin_nested():
+                    await write_audit_log(db, "test.savepoint_rolled_back", "certificate", 3, user_email=tag)
+                    async with db.begin_nested():
+                        await write_audit_log(db, "test.inner_released", "certificate", 4, user_email=tag)
+                    raise ValueError("undo the savepoint")
+            async with db.begin_nested():
+                await write_audit_log(db, "test.savepoint_released", "certificate", 5, user_email=tag)
+            await db.commit()
+        await audit_writer.flush()
+
+        rows = await _chain(tag)
+        assert [(r.action, r.resource_id, r.details) for r in rows if r.user_email == tag] == [
+            ("test.committed", 2, {"k": "v"}), ("test.savepoint_released", 5, None)]
+        _assert_linear(rows)
+    finally:
+        await _drop(tag)
+
+
+@pytest.mark.asyncio
+async def test_bad_entries_are_coerced_or_dead_lettered_without_blocking_the_queue(setup_db):
+    tag = f"poison-{uuid.uuid4().hex[:8]}@test.example.com"
+    writer = AuditChainWriter(TestSession)
+    await writer.start()
+    try:
+        async with TestSession() as db:
+            # a dict where the Integer resource_id goes, a numeric-string user id
+            entry = await write_audit_log(db, "test.coerced", "application", {"application_id": 7},
+                                          user_id="12", user_email=tag, details={"at": datetime(2026, 1, 2)})
+            db.sync_session.info.pop("audit_pending")
+        assert (entry["resource_id"], entry["user_id"]) == (None, 12)
+        assert entry["details"] == {"at": "2026-01-02 00:00:00", "resource_ref": {"application_id": 7}}
+
+        # a user id that violates the foreign key can only fail in the database
+        now = datetime.utcnow()
+        writer.submit([dict(action="test.ok", user_email=tag, details={"i": 1}, timestamp=now),
+                       dict(action="test.poison", user_email=tag, user_id=2**31 - 2, timestamp=now),
+                       dict(action="test.ok", user_email=tag, details={"i": 2}, timestamp=now)])
+        await asyncio.wait_for(writer.flush(), 10)
+
+        rows = await _chain(tag)
+        assert [(r.action, r.details) for r in rows if r.user_email == tag] == [
+            ("test.ok", {"i": 1}), ("test.ok", {"i": 2})]
+        _assert_linear(rows)
+        assert writer.stats["dead_lettered"] == 1
+        assert writer.dead_letters[0]["entry"]["action"] == "test.poison"
+    finally:
+        await writer.stop()
+        await _drop(tag)
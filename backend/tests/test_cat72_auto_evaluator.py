@@ -0,0 +1,110 @@
+"""CAT-72 auto-evaluator tests."""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.models.models import Application, CAT72Test, Certificate, EnveloSession
+from app.services import background_tasks
+from app.services.background_tasks import cat72_deadline, evaluate_cat72_tests
+from tests.conftest import TestSession
+
+
+async def _setup(db, started_hours_ago: float, sessions=(), certified=False, **test_fields):
+    tag = uuid.uuid4().hex[:8]
+    app = Application(organization_name=f"Org {tag}", system_name=f"System {tag}", state="testing")
+    db.add(app)
+    await db.flush()
+    cert = None
+    if certified:
+        cert = Certificate(certificate_number=f"ODDC-T-{tag}", application_id=app.id, organization_name=app.organization_name,
+                           system_name=app.system_name, state="pending")
+        db.add(cert)
+        await db.flush()
+    for passed, blocked in sessions:
+        db.add(EnveloSession(session_id=uuid.uuid4().hex[:16], status="active", pass_count=passed, block_count=blocked,
+                             certificate_id=cert.id if cert else None,
+                             organization_name=app.organization_name, system_name=app.system_name))
+    test = CAT72Test(test_id=f"CAT72-{tag}", application_id=app.id, state="running",
+                     started_at=datetime.utcnow() - timedelta(hours=started_hours_ago), **test_fields)
+    db.add(test)
+    await db.flush()
+    return test, app, cert
+
+
+@pytest.mark.asyncio
+async def test_evaluates_all_outcomes_in_one_pass(db_session):
+    passed, passed_app, passed_cert = await _setup(db_session, 73, [(600, 5), (390, 5)], certified=True)
+    timed_out, timed_out_app, _ = await _setup(db_session, 80, [(50, 0)])
+    failed, _, _ = await _setup(db_session, 1, [(80, 40)])
+    running, _, _ = await _setup(db_session, 10, [(500, 1)])
+    short, _, short_cert = await _setup(db_session, 2, [(200, 0), (100, 0)], certified=True, duration_hours=1)
+
+    result = await evaluate_cat72_tests(db_session, test_ids=[t.id for t in (passed, timed_out, failed, running, short)])
+    assert result["locked"] and result["evaluated"] == 5
+    assert result["completed"] == {passed.test_id: "pass", timed_out.test_id: "timeout",
+                                   failed.test_id: "fail", short.test_id: "pass"}
+    assert result["pending"] == [(cat72_deadline(running), running.id)]
+
+    assert passed.result == "PASS" and passed.total_samples == 1000 and passed.conformant_samples == 990
+    assert passed_cert.state == "conformant" and passed_app.state == "conformant"
+    assert timed_out.result == "FAIL" and "insufficient data" in timed_out.result_notes
+    assert failed.result == "FAIL" and failed.state == "completed"
+    assert running.state == "running" and running.total_samples == 501
+
+    # the deadline is started_at + duration_hours, not a fixed 72h
+    assert short.result == "PASS" and short_cert.state == "conformant"
+    # org+system fallback sessions of the timed-out test were ended
+    ended = (await db_session.execute(select(EnveloSession).where(
+        EnveloSession.system_name == timed_out_app.system_name))).scalars().all()
+    assert ended and all(s.status == "ended" for s in ended)
+
+
+@pytest.mark.asyncio
+async def test_second_replica_skips_while_locked(db_session):
+    test, _, _ = await _setup(db_session, 80, [(10, 0)])
+    first = await evaluate_cat72_tests(db_session, test_ids=[test.id])
+    assert first["locked"]
+
+    async with TestSession() as other:
+        second = await evaluate_cat72_tests(other, test_ids=[test.id])
+        assert second == {"locked": False, "evaluated": 0, "completed": {}, "pending": []}
+
+
+@pytest.mark.asyncio
+async def test_failed_evaluation_backs_off_instead_of_rerunning_now(db_session, monkeypatch):
+    test, _, _ = await _setup(db_session, 80, [(500, 0)], certified=True)
+    test_pk, test_id = test.id, test.test_id
+
+    async def broken(db, row, now):
+        raise ValueError("bad row")
+
+    monkeypatch.setattr(background_tasks, "_evaluate_cat72_row", broken)
+    now = datetime.utcnow()
+    retries = []
+    for _ in range(3):
+        result = await evaluate_cat72_tests(db_session, now=now, test_ids=[test_pk])
+        [(due, pk)] = result["pending"]
+        assert pk == test_pk and due > now  # past its deadline, but not due again immediately
+        retries.append((due - now).total_seconds())
+    assert retries == [1, 2, 4]
+
+    monkeypatch.undo()
+    result = await evaluate_cat72_tests(db_session, now=now, test_ids=[test_pk])
+    assert result["completed"] == {test_id: "pass"}
+    assert test_pk not in background_tasks._cat72_eval_failures
+
+
+@pytest.mark.asyncio
+async def test_ingest_fed_tests_keep_their_telemetry_counters(db_session):
+    """Session counts must not overwrite the counters telemetry ingest maintains."""
+    counters = dict(last_sample_number=300, total_samples=250, conformant_samples=249, convergence_score=0.996)
+    running, _, _ = await _setup(db_session, 10, [(10, 40)], **counters)
+    failing, _, _ = await _setup(db_session, 10, [(500, 0)], last_sample_number=200, total_samples=200,
+                                 conformant_samples=100)
+
+    result = await evaluate_cat72_tests(db_session, test_ids=[running.id, failing.id])
+    # scored from their own samples, not the sessions of the same system
+    assert result["completed"] == {failing.test_id: "fail"} and "50.0%" in failing.result_notes
+    assert {k: getattr(running, k) for k in counters} == counters
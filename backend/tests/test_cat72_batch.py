@@ -0,0 +1,157 @@
+"""CAT-72 batch telemetry ingestion tests."""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.api.routes.cat72 import (
+    ingest_telemetry, ingest_telemetry_batch, get_learned_boundaries, learn_complete,
+    TelemetryInput, TelemetryBatchInput,
+)
+from app.models.models import Application, CAT72Test, Telemetry, InterlockEvent
+from app.services.background_tasks import evaluate_cat72_tests
+from app.services.evidence_chain import build_checkpoints
+
+ENVELOPE = {"boundaries": [{"name": "speed", "type": "numeric", "min": 0, "max": 20}]}
+SPEEDS = [5, 12, 25, "18", 30, 3]
+ADMIN = {"sub": "1", "role": "admin"}
+
+
+async def _running_test(db, started_at):
+    test = CAT72Test(test_id=f"CAT72-{uuid.uuid4().hex[:8]}", state="running", duration_hours=72,
+                     started_at=started_at, envelope_definition=ENVELOPE)
+    db.add(test)
+    await db.commit()
+    return test
+
+
+@pytest.mark.asyncio
+async def test_batch_matches_sequential_ingest(db_session):
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    samples = [TelemetryInput(state_vector={"speed": s}, timestamp=start + timedelta(seconds=i + 1))
+               for i, s in enumerate(SPEEDS)]
+
+    single = await _running_test(db_session, start)
+    for sample in samples:
+        await ingest_telemetry(single.test_id, sample.model_copy(deep=True), db_session, ADMIN)
+
+    batched = await _running_test(db_session, start)
+    resp = await ingest_telemetry_batch(
+        batched.test_id, TelemetryBatchInput(samples=samples), db_session, ADMIN)
+    assert resp["accepted"] == 6 and resp["first_sample_number"] == 1 and resp["last_sample_number"] == 6
+    assert resp["conformant"] == 4 and resp["interlocks"] == 2
+
+    for attr in ("total_samples", "conformant_samples", "interlock_activations",
+                 "evidence_hash", "convergence_score", "envelope_margin"):
+        assert getattr(batched, attr) == getattr(single, attr)
+
+    async def chain(test):
+        rows = await db_session.execute(select(Telemetry.sample_hash, Telemetry.prev_hash)
+                                        .where(Telemetry.test_id == test.id).order_by(Telemetry.timestamp))
+        return rows.all()
+
+    assert await chain(batched) == await chain(single)
+    events = (await db_session.execute(select(InterlockEvent.trigger_value)
+                                       .where(InterlockEvent.test_id == batched.id))).scalars().all()
+    assert sorted(events) == [25.0, 30.0]
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_out_of_order_timestamps(db_session):
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    test = await _running_test(db_session, start)
+    samples = [TelemetryInput(state_vector={"speed": 1}, timestamp=start + timedelta(seconds=s)) for s in (2, 1)]
+    with pytest.raises(HTTPException) as exc:
+        await ingest_telemetry_batch(test.test_id, TelemetryBatchInput(samples=samples), db_session, ADMIN)
+    assert exc.value.status_code == 400
+    assert test.total_samples in (0, None)
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_replay_and_foreign_tests(db_session):
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    test = await _running_test(db_session, start)
+    batch = TelemetryBatchInput(samples=[
+        TelemetryInput(state_vector={"speed": 1}, timestamp=start + timedelta(seconds=s)) for s in (1, 2, 3)])
+    await ingest_telemetry_batch(test.test_id, batch, db_session, ADMIN)
+
+    # the same batch again, or one reaching back before the last stored sample
+    for seconds in ((1, 2, 3), (3, 4), (2, 5)):
+        again = TelemetryBatchInput(samples=[
+            TelemetryInput(state_vector={"speed": 1}, timestamp=start + timedelta(seconds=s)) for s in seconds])
+        with pytest.raises(HTTPException) as exc:
+            await ingest_telemetry_batch(test.test_id, again, db_session, ADMIN)
+        assert exc.value.status_code == 409
+    assert test.total_samples == 3
+
+    with pytest.raises(HTTPException) as exc:
+        await ingest_telemetry_batch(test.test_id, batch, db_session, {"sub": "999", "role": "applicant"})
+    assert exc.value.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_batch_learning_feeds_profile(db_session):
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    test = CAT72Test(test_id=f"CAT72-{uuid.uuid4().hex[:8]}", state="learning", duration_hours=72, started_at=start)
+    db_session.add(test)
+    await db_session.commit()
+    samples = [TelemetryInput(state_vector={"speed": 5 + i % 4}, timestamp=start + timedelta(seconds=i + 1))
+               for i in range(12)]
+    resp = await ingest_telemetry_batch(test.test_id, TelemetryBatchInput(samples=samples), db_session, ADMIN)
+    assert resp["mode"] == "learning" and resp["accepted"] == 12
+
+    preview = await get_learned_boundaries(test.test_id, 0.1, db_session, ADMIN)
+    assert preview["samples_collected"] == 12
+    speed = next(b for b in preview["auto_generated_boundaries"] if b["name"] == "speed")
+    assert (speed["observed_min"], speed["observed_max"]) == (5, 8)
+
+
+@pytest.mark.asyncio
+async def test_sample_numbers_continue_past_learning(db_session):
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    test = CAT72Test(test_id=f"CAT72-{uuid.uuid4().hex[:8]}", state="learning", duration_hours=72, started_at=start)
+    db_session.add(test)
+    await db_session.commit()
+    samples = [TelemetryInput(state_vector={"speed": 5 + i % 4}, timestamp=start + timedelta(seconds=i + 1))
+               for i in range(12)]
+    await ingest_telemetry_batch(test.test_id, TelemetryBatchInput(samples=samples), db_session, ADMIN)
+    await learn_complete(test.test_id, 0.1, db_session, ADMIN)
+
+    # learn-complete restarts the counters; the chain positions carry on
+    later = [TelemetryInput(state_vector={"speed": 6}, timestamp=datetime.utcnow() + timedelta(seconds=i))
+             for i in range(3)]
+    resp = await ingest_telemetry_batch(test.test_id, TelemetryBatchInput(samples=later), db_session, ADMIN)
+    assert resp["accepted"] == 3 and test.total_samples == 3
+    numbers = (await db_session.execute(select(Telemetry.sample_number).where(Telemetry.test_id == test.id)
+                                        .order_by(Telemetry.id))).scalars().all()
+    assert numbers == list(range(1, 16))
+    assert await build_checkpoints(db_session, test, seal=True) == 1
+
+
+@pytest.mark.asyncio
+async def test_sample_numbers_survive_the_auto_evaluator(db_session):
+    """The evaluator rewrites total_samples from session counts; numbering must not follow it."""
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    app = Application(organization_name="Org", system_name=f"Sys {uuid.uuid4().hex[:8]}", state="testing")
+    db_session.add(app)
+    await db_session.flush()
+    test = await _running_test(db_session, start)
+    test.application_id = app.id
+    await db_session.commit()
+
+    for i in range(6):
+        await ingest_telemetry(test.test_id, TelemetryInput(state_vector={"speed": 5},
+                               timestamp=start + timedelta(seconds=i + 1)), db_session, ADMIN)
+        if i % 2:
+            await evaluate_cat72_tests(db_session, test_ids=[test.id])
+            await db_session.commit()
+    batch = TelemetryBatchInput(samples=[TelemetryInput(state_vector={"speed": 5},
+                                                        timestamp=start + timedelta(seconds=10 + i)) for i in range(3)])
+    await ingest_telemetry_batch(test.test_id, batch, db_session, ADMIN)
+
+    numbers = (await db_session.execute(select(Telemetry.sample_number).where(Telemetry.test_id == test.id)
+                                        .order_by(Telemetry.id))).scalars().all()
+    assert numbers == list(range(1, 10)) and test.last_sample_number == 9
+    assert await build_checkpoints(db_session, test, seal=True) == 1
@@ -0,0 +1,40 @@
+"""CAT-72 final metrics tests."""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api.routes.cat72 import compute_metrics, compute_final_metrics
+from app.models.models import CAT72Test, Telemetry
+
+
+@pytest.mark.asyncio
+async def test_final_metrics_match_full_history(db_session):
+    now = datetime.utcnow().replace(microsecond=0)
+    test = CAT72Test(test_id=f"CAT72-{uuid.uuid4().hex[:8]}", state="running")
+    db_session.add(test)
+    await db_session.flush()
+
+    samples = []
+    for i in range(250):
+        sample = Telemetry(test_id=test.id, timestamp=now - timedelta(seconds=250 - i),
+                           in_envelope=i % 7 != 0, envelope_distance=float(i % 13))
+        samples.append(sample)
+        db_session.add(sample)
+    test.total_samples = len(samples)
+    test.conformant_samples = sum(1 for s in samples if s.in_envelope)
+    test.envelope_distance_sum = sum(s.envelope_distance for s in samples)
+    await db_session.flush()
+
+    expected = compute_metrics(samples)
+    got = await compute_final_metrics(db_session, test)
+    for key in ("convergence", "drift", "stability", "margin"):
+        assert got[key] == pytest.approx(expected[key])
+
+
+@pytest.mark.asyncio
+async def test_final_metrics_without_samples(db_session):
+    test = CAT72Test(test_id=f"CAT72-{uuid.uuid4().hex[:8]}", state="running")
+    db_session.add(test)
+    await db_session.flush()
+    assert await compute_final_metrics(db_session, test) == {"convergence": 0, "drift": 0, "stability": 0, "margin": 0}
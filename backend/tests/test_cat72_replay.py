@@ -0,0 +1,170 @@
+"""CAT-72 offline replay tests."""
+import random
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+pytest.importorskip("numpy")
+
+from app.api.routes.cat72 import TelemetryBatchInput, TelemetryInput, ingest_telemetry_batch, learn_complete
+from app.models.models import CAT72Test, Telemetry
+from app.services.cat72_replay import ReplayEngine, replay_test
+from app.services.cat72_window_state import VIOLATION_WINDOW_S, WindowState
+from app.services.envelope_evaluator import compile_envelope
+
+Row = namedtuple("Row", "id timestamp elapsed_seconds state_vector in_envelope prev_hash")
+
+ENVELOPE = {"boundaries": [
+    {"name": "speed", "type": "numeric", "min": 0, "max": 40},
+    {"name": "Battery Level", "type": "numeric", "min": 20},
+    {"name": "mode", "type": "categorical", "allowed": ["auto", "assisted"]},
+    {"name": "ops area", "type": "geographic", "center_lat": 37.77, "center_lng": -122.42, "radius_m": 3000},
+    {"name": "corridor", "type": "polygon", "vertices": [
+        [37.75, -122.45], [37.80, -122.44], [37.79, -122.39], [37.75, -122.40]]},
+    {"name": "accel", "type": "rate_of_change", "variable": "speed", "max_rate": 3},
+    {"name": "avg speed", "type": "statistical", "variable": "speed", "window_size": 20,
+     "aggregation": "mean", "max_value": 30},
+    {"name": "median speed", "type": "statistical", "variable": "speed", "window_size": 7,
+     "aggregation": "median", "min_value": 2},
+    {"name": "speed spread", "type": "statistical", "variable": "speed", "window_size": 15,
+     "aggregation": "stddev", "max_value": 4},
+    {"name": "link health", "type": "statistical", "variable": "link_ok", "window_size": 10,
+     "aggregation": "ratio_true", "min_value": 0.5},
+    {"name": "peak temp", "type": "statistical", "variable": "temp", "window_size": 5,
+     "aggregation": "max", "max_value": 80},
+    {"name": "shift", "type": "temporal", "start_hour": 6, "end_hour": 20},
+    {"name": "stops", "type": "frequency", "max_count": 600, "window_seconds": 3600},
+]}
+
+
+def _rows(n: int, seed: int = 7, learning: int = 0):
+    rng = random.Random(seed)
+    ts = datetime(2026, 3, 2, 19, 30)
+    speed = 20.0
+    rows = []
+    for i in range(n):
+        ts += timedelta(seconds=rng.choice([0, 1, 2, 5]))
+        speed = max(-2.0, min(45.0, speed + rng.uniform(-4, 4)))
+        sv = {"speed": round(speed, 2), "mode": rng.choice(["auto"] * 8 + ["assisted", "AUTO", "manual"]),
+              "latitude": 37.77 + rng.uniform(-0.03, 0.03), "longitude": -122.42 + rng.uniform(-0.03, 0.03),
+              "link_ok": rng.choice([True, "true", 1.0, 1.0, "no", 0.0]), "temp": rng.uniform(40, 81)}
+        if rng.random() < 0.1:
+            sv["battery_level"] = rng.uniform(10, 100)
+        if rng.random() < 0.01:
+            sv["speed"] = "fast"
+        if rng.random() < 0.05:
+            del sv["latitude"]
+        if rng.random() < 0.02:
+            sv = {}
+        rows.append(Row(i + 1, ts, i, sv, None, None if i < learning else "h"))
+    return rows
+
+
+def _sequential(envelope: dict, rows):
+    """Verdicts from the per-sample ingest evaluator, fed rows in order."""
+    compiled = compile_envelope(envelope)
+    state = WindowState(compiled.window_specs)
+    verdicts, conformant, interlocks = [], 0, 0
+    for r in rows:
+        if r.prev_hash is None:
+            state.record(r.state_vector, r.timestamp)
+            verdicts.append(None)
+            continue
+        in_env, _, violations = compiled.evaluate(
+            r.state_vector, prev_state_vector=state.last_state_vector,
+            sample_interval_s=state.sample_gap(r.timestamp), current_timestamp=r.timestamp,
+            test_stats={"total_samples": len(verdicts) - verdicts.count(None), "conformant_samples": conformant,
+                        "interlock_activations": interlocks, "elapsed_seconds": r.elapsed_seconds},
+            recent_violations_count=state.recent_violations(r.timestamp),
+            recent_violations_window=VIOLATION_WINDOW_S, windows=state.windows,
+        )
+        conformant += in_env
+        interlocks += bool(violations)
+        state.record(r.state_vector, r.timestamp, violated=bool(violations))
+        verdicts.append(in_env)
+    return [r._replace(in_envelope=v) for r, v in zip(rows, verdicts)]
+
+
+def _replay(envelope: dict, rows, chunk: int):
+    engine = ReplayEngine(compile_envelope(envelope))
+    for i in range(0, len(rows), chunk):
+        engine.feed(rows[i:i + chunk])
+    return engine.report()
+
+
+@pytest.mark.parametrize("chunk", [1, 37, 5000])
+def test_replay_matches_sequential_evaluator(chunk):
+    rows = _sequential(ENVELOPE, _rows(1500, learning=25))
+    report = _replay(ENVELOPE, rows, chunk)
+    assert report["samples"] == 1475
+    assert report["learning_samples_skipped"] == 25
+    assert report["changed"]["total"] == 0, report["examples"][:3]
+    assert 0 < report["replayed"]["conformant"] < report["samples"]
+    assert report["per_sample_boundaries"]
+
+
+def test_replay_reports_flips_against_new_envelope():
+    rows = _sequential(ENVELOPE, _rows(800, seed=3))
+    tightened = {"boundaries": [dict(b, max=30) if b["name"] == "speed" else b for b in ENVELOPE["boundaries"]]}
+    expected = _sequential(tightened, rows)
+    flips = sum(a.in_envelope != b.in_envelope for a, b in zip(rows, expected))
+
+    report = _replay(tightened, rows, 100)
+    assert report["changed"]["total"] == report["changed"]["newly_violating"] == flips > 0
+    assert report["replayed"]["conformant"] == sum(r.in_envelope for r in expected)
+    assert all(not e["replayed_in_envelope"] for e in report["examples"])
+    assert any("speed" in e["violated"] for e in report["examples"])
+
+
+@pytest.mark.asyncio
+async def test_replay_test_streams_stored_telemetry(db_session):
+    envelope = {"boundaries": [b for b in ENVELOPE["boundaries"] if b["type"] != "frequency"]}
+    test = CAT72Test(test_id=f"CAT72-{uuid.uuid4().hex[:8]}", state="completed", envelope_definition=envelope)
+    db_session.add(test)
+    await db_session.flush()
+    rows = _sequential(envelope, _rows(300, seed=11))
+    db_session.add_all([Telemetry(test_id=test.id, timestamp=r.timestamp, elapsed_seconds=r.elapsed_seconds,
+                                  state_vector=r.state_vector, in_envelope=r.in_envelope, prev_hash=r.prev_hash)
+                        for r in rows])
+    await db_session.flush()
+
+    same = await replay_test(db_session, test, chunk_size=64)
+    assert same["samples"] == 300 and same["changed"]["total"] == 0
+    assert same["envelope_hash"] == same["original_envelope_hash"]
+
+    loosened = await replay_test(db_session, test, envelope={"boundaries": []})
+    assert loosened["changed"]["newly_conformant"] == same["original"]["nonconformant"]
+    assert loosened["replayed"]["nonconformant"] == 0
+
+
+@pytest.mark.asyncio
+async def test_replay_numbers_samples_like_ingest(db_session):
+    admin = {"sub": "1", "role": "admin"}
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    test = CAT72Test(test_id=f"CAT72-{uuid.uuid4().hex[:8]}", state="learning", duration_hours=72, started_at=start)
+    db_session.add(test)
+    await db_session.commit()
+    learning = [TelemetryInput(state_vector={"speed": 10 + i % 5}, timestamp=start + timedelta(seconds=i + 1))
+                for i in range(12)]
+    await ingest_telemetry_batch(test.test_id, TelemetryBatchInput(samples=learning), db_session, admin)
+    await learn_complete(test.test_id, 0.1, db_session, admin)
+    now = datetime.utcnow()
+    enforced = [TelemetryInput(state_vector={"speed": speed}, timestamp=now + timedelta(seconds=i))
+                for i, speed in enumerate([11, 90, 12, 95])]
+    await ingest_telemetry_batch(test.test_id, TelemetryBatchInput(samples=enforced), db_session, admin)
+
+    report = await replay_test(db_session, test, envelope={"boundaries": []})
+    assert (report["samples"], report["learning_samples_skipped"]) == (4, 12)
+    assert report["samples"] == test.total_samples
+    # same numbering as ingest and the evidence proofs: learning samples included
+    stored = dict((await db_session.execute(
+        select(Telemetry.id, Telemetry.sample_number).where(Telemetry.test_id == test.id))).all())
+    assert report["examples"] and {e["sample_number"] for e in report["examples"]} <= {13, 14, 15, 16}
+    assert all(e["sample_number"] == stored[e["telemetry_id"]] for e in report["examples"])
+    engine = ReplayEngine(compile_envelope({"boundaries": []}))
+    engine.feed([Row(r.id, r.timestamp, r.elapsed_seconds, r.state_vector, False, r.prev_hash)
+                 for r in _rows(8, learning=3)])
+    assert [e["sample_number"] for e in engine.report()["examples"]] == [4, 5, 6, 7, 8]
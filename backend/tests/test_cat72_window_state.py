@@ -0,0 +1,59 @@
+"""CAT-72 sliding window state tests."""
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import CAT72Test, Telemetry, InterlockEvent
+from app.services.envelope_evaluator import aggregate_values, compile_envelope
+from app.services.cat72_window_state import RollingWindow, get_window_state
+
+AGGREGATIONS = ("mean", "median", "sum", "min", "max", "ratio_true", "stddev")
+
+
+def test_rolling_window_matches_full_aggregation():
+    rng = random.Random(7)
+    window = RollingWindow(25)
+    pushed = []
+    for _ in range(400):
+        value = None if rng.random() < 0.2 else rng.choice([rng.uniform(-50, 50), 0.0, 1.0])
+        window.push(value)
+        pushed.append(value)
+        values = [v for v in pushed[-25:] if v is not None]
+        assert window.count == len(values)
+        for agg in AGGREGATIONS:
+            assert window.aggregate(agg) == pytest.approx(aggregate_values(values, agg), abs=1e-9)
+
+
+@pytest.mark.asyncio
+async def test_window_state_rebuilds_then_tracks_incrementally(db_session):
+    envelope = compile_envelope({"boundaries": [
+        {"name": "accuracy", "type": "statistical", "variable": "accuracy", "window_size": 3, "min_value": 0.5},
+    ]})
+    now = datetime.utcnow().replace(microsecond=0)
+    test = CAT72Test(test_id=f"CAT72-{uuid.uuid4().hex[:8]}", state="running", total_samples=4)
+    db_session.add(test)
+    await db_session.flush()
+    for i, acc in enumerate([0.1, 0.9, 0.8, 0.7]):
+        db_session.add(Telemetry(test_id=test.id, timestamp=now - timedelta(seconds=4 - i), state_vector={"accuracy": acc}))
+    db_session.add(InterlockEvent(test_id=test.id, timestamp=now - timedelta(minutes=5)))
+    db_session.add(InterlockEvent(test_id=test.id, timestamp=now - timedelta(hours=2)))
+    await db_session.flush()
+
+    state = await get_window_state(db_session, test, envelope, now)
+    assert state.last_state_vector == {"accuracy": 0.7}
+    assert state.sample_gap(now) == 1.0
+    assert state.recent_violations(now) == 1
+    window = state.windows[("accuracy", 3)]
+    assert window.aggregate("mean") == pytest.approx(0.8)
+
+    state.record({"accuracy": "fail"}, now, violated=True)
+    test.total_samples = state.samples_seen = 5
+    assert await get_window_state(db_session, test, envelope, now) is state
+    assert window.aggregate("min") == 0.0 and window.count == 3
+    assert state.recent_violations(now + timedelta(minutes=58)) == 1
+
+    # another writer moved the counter on: rebuild from the DB
+    test.total_samples = 6
+    assert await get_window_state(db_session, test, envelope, now) is not state
@@ -0,0 +1,120 @@
+"""Certificate PDF artifacts: stored bytes, ETag revalidation and background regeneration."""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select, update
+
+from app.core.security import create_access_token
+from app.models.models import Certificate, ScheduledJob
+from app.services import certificate_artifacts, job_scheduler
+from app.services.certificate_artifacts import REGENERATION_JOB, content_hash, regenerate_certificate_pdfs, render_inputs
+from app.services.job_registry import register_platform_jobs
+from app.services.job_scheduler import JobScheduler
+from tests.conftest import TestSession
+
+
+@pytest_asyncio.fixture
+async def certs(setup_db, monkeypatch):
+    """Returns a function committing n certificates; they are deleted afterwards."""
+    monkeypatch.setattr(certificate_artifacts, "AsyncSessionLocal", TestSession)
+    monkeypatch.setattr(certificate_artifacts, "_pdf_cache", type(certificate_artifacts._pdf_cache)())
+    monkeypatch.setattr(certificate_artifacts, "stats", dict.fromkeys(certificate_artifacts.stats, 0))
+    numbers = []
+
+    async def make(n):
+        async with TestSession() as db:
+            batch = [Certificate(certificate_number=f"ODDC-PDF-{uuid.uuid4().hex[:8]}", organization_name="Org",
+                                 system_name="Sys", state="conformant", issued_at=datetime(2026, 5, 1),
+                                 expires_at=datetime(2026, 5, 1) + timedelta(days=365)) for _ in range(n)]
+            db.add_all(batch)
+            await db.commit()
+        numbers.extend(c.certificate_number for c in batch)
+        return [c.certificate_number for c in batch]
+
+    yield make
+    async with TestSession() as db:
+        await db.execute(delete(Certificate).where(Certificate.certificate_number.in_(numbers)))
+        await db.commit()
+
+
+async def _drop_job():
+    async with TestSession() as db:
+        await db.execute(delete(ScheduledJob).where(ScheduledJob.name == REGENERATION_JOB))
+        await db.commit()
+
+
+async def _stored(number):
+    async with TestSession() as db:
+        return (await db.execute(select(Certificate).where(Certificate.certificate_number == number))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_download_serves_stored_pdf_with_etag(client, certs):
+    [number] = await certs(1)
+    url = f"/api/v1/certificates/{number}/pdf"
+
+    first = await client.get(url)
+    assert first.status_code == 200 and first.content.startswith(b"%PDF")
+    etag = first.headers["etag"]
+    cert = await _stored(number)
+    assert etag == f'"{cert.certificate_pdf_hash}"' and cert.certificate_pdf == first.content
+
+    # revalidation: 304, no body
+    again = await client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+
+    # another process (empty LRU) serves the stored bytes without rendering
+    certificate_artifacts._pdf_cache.clear()
+    assert (await client.get(url)).content == first.content
+    assert certificate_artifacts.stats["renders"] == 1 and certificate_artifacts.stats["stored_hits"] == 1
+
+    # a change to a printed field re-renders under a new ETag
+    async with TestSession() as db:
+        await db.execute(update(Certificate).where(Certificate.certificate_number == number)
+                         .values(organization_name="Renamed Org"))
+        await db.commit()
+    changed = await client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert certificate_artifacts.stats["renders"] == 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_regeneration_renders_missing_and_stale_pdfs(client, certs, monkeypatch):
+    numbers = await certs(3)
+    async with TestSession() as db:
+        await db.execute(update(Certificate).where(Certificate.certificate_number == numbers[0])
+                         .values(certificate_pdf=b"%PDF-old", certificate_pdf_hash="stale"))
+        await db.commit()
+
+    # the run is requested through the certificate_pdfs job's row and runs on
+    # whichever replica claims its lease; any replica reports its status
+    replica = register_platform_jobs(JobScheduler(TestSession, worker_id="pdf-replica"), production=False)
+    monkeypatch.setattr(job_scheduler, "scheduler", JobScheduler(TestSession, worker_id="api-replica"))
+    token = create_access_token({"sub": "1", "role": "admin", "email": "admin@test.example.com"})
+    headers = {"Authorization": f"Bearer {token}"}
+    url = "/api/v1/certificates/regenerate-all-pdfs"
+    await _drop_job()
+    try:
+        resp = await client.post(url, headers=headers)
+        assert resp.status_code == 202 and resp.json()["started"] and resp.json()["state"] == "requested"
+        # a second request while the first is pending doesn't start another run
+        assert (await client.post(url, params={"force": True}, headers=headers)).json()["started"] is False
+
+        assert await replica.run_job(REGENERATION_JOB) == "ok"
+        status = (await client.get(url + "/status", headers=headers)).json()
+        assert status["state"] == "finished" and status["rendered"] >= 3 and status["failed"] == 0
+
+        for number in numbers:
+            cert = await _stored(number)
+            assert cert.certificate_pdf.startswith(b"%PDF-1")
+            assert cert.certificate_pdf_hash == content_hash(render_inputs(cert, None))
+
+        # everything is current now: nothing left to render, unless forced
+        assert (await regenerate_certificate_pdfs(concurrency=2))["rendered"] == 0
+        assert (await client.post(url, params={"force": True}, headers=headers)).json()["started"]
+        assert await replica.run_job(REGENERATION_JOB) == "ok"
+        assert (await client.get(url + "/status", headers=headers)).json()["rendered"] >= 3
+    finally:
+        await _drop_job()
@@ -0,0 +1,64 @@
+"""Signed compliance log: SQL aggregates, capped violation detail, signing and caching."""
+import base64
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import Certificate, EnveloSession, TelemetryRecord, Violation
+from app.services import compliance_log_service
+from app.services.compliance_log_service import _canonical_json, _load_signing_key, generate_compliance_log
+
+
+async def _fleet(db, start):
+    cert = Certificate(certificate_number=f"ODDC-CL-{uuid.uuid4().hex[:8]}", organization_name="Org",
+                       system_name="Sys", state="conformant", expires_at=start + timedelta(days=400))
+    db.add(cert)
+    await db.flush()
+    sessions = [EnveloSession(session_id=f"cl-{uuid.uuid4().hex[:12]}", certificate_id=cert.id, status="active",
+                              session_type="production", started_at=start + timedelta(hours=i), pass_count=7,
+                              block_count=1) for i in range(3)]
+    sessions.append(EnveloSession(session_id=f"cl-demo-{uuid.uuid4().hex[:8]}", certificate_id=cert.id,
+                                  status="active", session_type="demo", started_at=start))
+    db.add_all(sessions)
+    await db.flush()
+    for i, s in enumerate(sessions[:2]):
+        for j in range(4):
+            db.add(TelemetryRecord(session_id=s.id, timestamp=start + timedelta(hours=i, minutes=j),
+                                   action_type="move", result="BLOCK" if j == 0 else "PASS"))
+        db.add(Violation(session_id=s.id, timestamp=start + timedelta(hours=i, minutes=1),
+                         boundary_name=f"speed-{i % 2}", violation_message="x" * 2000))
+    db.add(Violation(session_id=sessions[3].id, timestamp=start, boundary_name="demo-only"))
+    await db.flush()
+    return cert, sessions
+
+
+@pytest.mark.asyncio
+async def test_compliance_log_aggregates_in_sql_and_is_signed_and_cached(db_session, monkeypatch):
+    monkeypatch.setattr(compliance_log_service, "_log_cache", type(compliance_log_service._log_cache)())
+    start = datetime(2026, 3, 1)
+    cert, sessions = await _fleet(db_session, start)
+    period = (start - timedelta(days=1), start + timedelta(days=30))
+
+    payload, signature, pdf = await generate_compliance_log(db_session, cert, *period)
+    assert pdf.startswith(b"%PDF")
+    summary = payload["summary"]
+    assert (summary["total_sessions"], summary["total_checks"], summary["passed"], summary["blocked"]) == (3, 8, 6, 2)
+    assert summary["boundaries_triggered"] == ["speed-0", "speed-1"]  # demo session excluded
+    assert payload["violation_count"] == 2
+    assert [v["session_id"] for v in payload["violations"]] == [sessions[0].session_id, sessions[1].session_id]
+    assert len(payload["violations"][0]["message"]) == compliance_log_service.VIOLATION_MESSAGE_MAX
+
+    # the signature covers the canonical payload
+    sig = base64.urlsafe_b64decode(signature + "=" * (-len(signature) % 4))
+    _load_signing_key().public_key().verify(sig, _canonical_json(payload))
+
+    # same certificate, period and data: the signed document is served from cache
+    again = await generate_compliance_log(db_session, cert, *period)
+    assert again[1] == signature and again[2] is pdf
+
+    # new data in the period: a new document
+    db_session.add(Violation(session_id=sessions[2].id, timestamp=start + timedelta(hours=2), boundary_name="speed-9"))
+    await db_session.flush()
+    changed, changed_sig, _ = await generate_compliance_log(db_session, cert, *period)
+    assert changed["violation_count"] == 3 and changed_sig != signature
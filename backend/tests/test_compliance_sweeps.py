@@ -0,0 +1,161 @@
+"""Set-based compliance, expiry and offline sweeps."""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, select
+
+from app.models.models import APIKey, Application, Certificate, EnveloSession, User
+from app.services import background_tasks, email_service
+from app.services.background_tasks import check_certificate_expiry, enforce_compliance, suspend_offline_certificates
+from tests.conftest import TestSession
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Route the sweeps at the test database and capture their email."""
+    outbox = []
+
+    async def send_email(to, subject, html, from_email=None):
+        outbox.append((to, subject))
+        return True
+
+    async def send_certificate_expiry_warning(to, system_name, cert_number, days_remaining):
+        outbox.append((to, f"expiry warning {cert_number} {days_remaining}d"))
+
+    monkeypatch.setattr(background_tasks, "async_session_maker", TestSession)
+    monkeypatch.setattr(email_service, "send_email", send_email)
+    monkeypatch.setattr(email_service, "send_certificate_expiry_warning", send_certificate_expiry_warning)
+    return outbox
+
+
+class Fleet:
+    def __init__(self):
+        self.tag = uuid.uuid4().hex[:8]
+        self.objects = []
+
+    async def add(self, *objects):
+        async with TestSession() as db:
+            db.add_all(objects)
+            await db.commit()
+        self.objects.extend(objects)
+        return objects[0] if len(objects) == 1 else objects
+
+    async def user(self, name):
+        return await self.add(User(email=f"{name}-{self.tag}@test.example.com", hashed_password="x"))
+
+    async def cert(self, name, **fields):
+        fields.setdefault("state", "conformant")
+        return await self.add(Certificate(certificate_number=f"ODDC-SW-{name}-{self.tag}", organization_name="Org",
+                                          system_name=name, **fields))
+
+    async def session(self, cert, offline_hours=0.0, passed=500, blocked=0, **fields):
+        return await self.add(EnveloSession(
+            session_id=uuid.uuid4().hex[:16], certificate_id=cert.id, status="active", pass_count=passed,
+            block_count=blocked, last_heartbeat_at=datetime.utcnow() - timedelta(hours=offline_hours), **fields))
+
+    async def states(self, *certs):
+        async with TestSession() as db:
+            rows = await db.execute(select(Certificate.id, Certificate.state).where(
+                Certificate.id.in_([c.id for c in certs])))
+        states = dict(rows.all())
+        return [states[c.id] for c in certs]
+
+    async def drop(self):
+        async with TestSession() as db:
+            for model in (EnveloSession, APIKey, Certificate, Application, User):
+                ids = [o.id for o in self.objects if isinstance(o, model)]
+                if ids:
+                    await db.execute(delete(model).where(model.id.in_(ids)))
+            await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_compliance_sweep_acts_only_on_sessions_past_a_threshold(setup_db, sent):
+    fleet = Fleet()
+    owner = await fleet.user("owner")
+    dark, offline, violating, healthy, shared = [
+        await fleet.cert(name) for name in ("dark", "offline", "violating", "healthy", "shared")]
+    suspended = await fleet.cert("suspended", state="suspended")
+    key = await fleet.add(APIKey(key_hash=uuid.uuid4().hex, user_id=owner.id, certificate_id=dark.id))
+    dark_session = await fleet.session(dark, offline_hours=80, api_key_id=key.id)
+    await fleet.session(offline, offline_hours=30)
+    await fleet.session(violating, passed=150, blocked=50)
+    await fleet.session(violating, passed=50, blocked=50)  # <= 100 actions: rate not applied
+    for _ in range(20):
+        await fleet.session(healthy, passed=1000, blocked=100)
+    await fleet.session(suspended, offline_hours=30)
+    await fleet.session(shared, offline_hours=30)
+    await fleet.session(shared, offline_hours=40)
+
+    try:
+        result = await enforce_compliance(chunk_size=2)
+        assert result["revoked"] >= 1 and result["suspended"] >= 3
+        assert await fleet.states(dark, offline, violating, healthy, suspended, shared) == [
+            "revoked", "suspended", "suspended", "conformant", "suspended", "suspended"]
+        # the key owner is notified through the joined user, not a lookup per session
+        assert (owner.email, f"CERTIFICATE REVOKED: {dark.system_name}") in sent
+        async with TestSession() as db:
+            session = await db.get(EnveloSession, dark_session.id)
+            shared_cert = await db.get(Certificate, shared.id)
+        assert session.status == "revoked" and session.ended_at is not None
+        assert [h["action"] for h in shared_cert.history] == ["auto_suspended"]
+
+        # nothing left past a threshold: a second pass does nothing to this fleet
+        sent.clear()
+        await enforce_compliance(chunk_size=2)
+        assert not any(to == owner.email for to, _ in sent)
+        assert await fleet.states(healthy, suspended) == ["conformant", "suspended"]
+    finally:
+        await fleet.drop()
+
+
+@pytest.mark.asyncio
+async def test_expiry_sweep_expires_and_warns_owners_once_per_threshold(setup_db, sent):
+    fleet = Fleet()
+    applicant, issuer = await fleet.user("applicant"), await fleet.user("issuer")
+    app = await fleet.add(Application(organization_name="Org", system_name="Sys", applicant_id=applicant.id))
+    now = datetime.utcnow()
+    past_due = await fleet.cert("past-due", application_id=app.id, issued_by=issuer.id,
+                                expires_at=now - timedelta(hours=1))
+    soon = await fleet.cert("soon", issued_by=issuer.id, expires_at=now + timedelta(days=5, hours=1))
+    later = await fleet.cert("later", issued_by=issuer.id, expires_at=now + timedelta(days=100))
+    demo = await fleet.cert("demo", issued_by=issuer.id, expires_at=now - timedelta(days=1), is_demo=True)
+
+    try:
+        await check_certificate_expiry(now=now, chunk_size=1)
+        assert await fleet.states(past_due, soon, later, demo) == ["expired", "conformant", "conformant", "conformant"]
+        # the applicant owns an application's certificate, the issuer owns the rest
+        assert (applicant.email, f"Certificate Expired: {past_due.certificate_number}") in sent
+        assert (issuer.email, f"expiry warning {soon.certificate_number} 5d") in sent
+
+        # one warning per pass until every threshold it is past has been recorded
+        await check_certificate_expiry(now=now, chunk_size=1)
+        sent.clear()
+        await check_certificate_expiry(now=now, chunk_size=1)
+        assert not any(to in (applicant.email, issuer.email) for to, _ in sent)
+        async with TestSession() as db:
+            history = (await db.get(Certificate, soon.id)).history
+        assert [h["action"] for h in history] == ["expiry_warning_30d", "expiry_warning_7d"]
+    finally:
+        await fleet.drop()
+
+
+@pytest.mark.asyncio
+async def test_offline_sweep_suspends_each_certificate_once(setup_db, sent):
+    fleet = Fleet()
+    shared, demo, live = await fleet.cert("shared"), await fleet.cert("demo", is_demo=True), await fleet.cert("live")
+    await fleet.session(shared, offline_hours=30)
+    await fleet.session(shared, offline_hours=50)
+    await fleet.session(demo, offline_hours=30)
+    await fleet.session(live, offline_hours=1)
+
+    try:
+        assert await suspend_offline_certificates(chunk_size=1) >= 1
+        assert await fleet.states(shared, demo, live) == ["suspended", "conformant", "conformant"]
+        async with TestSession() as db:
+            reasons = (await db.execute(select(EnveloSession.offline_reason).where(
+                EnveloSession.certificate_id == shared.id).order_by(EnveloSession.id))).scalars().all()
+        assert reasons == ["Auto-suspended - offline 24h+", None]
+    finally:
+        await fleet.drop()
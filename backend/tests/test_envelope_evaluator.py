@@ -0,0 +1,71 @@
+"""Compiled CAT-72 envelope evaluator tests."""
+from app.models.models import CAT72Test
+from app.services.envelope_evaluator import compile_envelope, get_compiled_envelope
+
+ENVELOPE = {"boundaries": [
+    {"name": "Speed", "type": "numeric", "min": 0, "max": 20},
+    {"name": "surface", "type": "categorical", "allowed": ["Dry", "wet"]},
+    {"name": "yard", "type": "polygon", "vertices": [[0, 0], [0, 10], [10, 10], [10, 0]]},
+    {"name": "climb", "type": "envelope_curve", "input_variable": "speed", "output_variable": "climb",
+     "points": [[20, 2], [0, 10], [10, 6]]},
+    {"name": "wet speed", "type": "compound", "condition": {"surface": ["WET"]}, "then": {"speed": {"max": 8}}},
+]}
+
+
+def test_compiled_envelope_violations():
+    compiled = compile_envelope(ENVELOPE)
+
+    ok, distance, violations = compiled.evaluate({"speed": 5, "surface": "DRY", "latitude": 5, "longitude": 5, "climb": 7})
+    assert ok and violations == []
+
+    ok, _, violations = compiled.evaluate({"speed": 10, "surface": "wet", "latitude": 5, "longitude": 15, "climb": 7})
+    assert not ok
+    assert [v["bound"] for v in violations] == ["polygon", "conditional_max", "curve_max"]
+    assert violations[2]["threshold"] == 6.0
+
+    ok, _, violations = compiled.evaluate({"speed": 25, "surface": "ice"})
+    assert {(v["var"], v["bound"]) for v in violations} == {("speed", "max"), ("surface", "allowed")}
+    assert violations[1]["threshold"] == ["dry", "wet"]
+
+
+
+def test_malformed_geometry_is_logged_and_skipped(caplog):
+    compiled = compile_envelope({"boundaries": ENVELOPE["boundaries"] + [
+        {"name": "depot", "type": "geographic", "center_lat": "north", "center_lng": 0, "radius_m": 100},
+        {"name": "pen", "type": "polygon", "vertices": [[0, 0], [0, "x"], [1, 1]]},
+        {"name": "runway", "type": "exclusion_zone", "vertices": [[0], [1, 1], [2, 2]]},
+        {"name": "descent", "type": "envelope_curve", "input_variable": "speed", "output_variable": "climb",
+         "points": [[0, 1], [None, 2]]},
+    ]})
+    assert len(compiled.geo) == 0 and [name for name, _ in compiled.polygon] == ["yard"]
+    assert compiled.exclusion_zone == [] and [c[0] for c in compiled.envelope_curve] == ["climb"]
+    assert sum("is malformed and is skipped" in r.message for r in caplog.records) == 4
+
+    # the well-formed boundaries still evaluate as before
+    ok, _, violations = compiled.evaluate({"speed": 10, "surface": "wet", "latitude": 5, "longitude": 15, "climb": 7})
+    assert [v["bound"] for v in violations] == ["polygon", "conditional_max", "curve_max"]
+
+
+def test_compiled_envelope_cache_follows_boundaries():
+    first = get_compiled_envelope("CAT72-T1", ENVELOPE)
+    # metadata outside "boundaries" (e.g. the learning profile) doesn't invalidate
+    assert get_compiled_envelope("CAT72-T1", {**ENVELOPE, "_learning_profile": {"sample_count": 3}}) is first
+    assert get_compiled_envelope("CAT72-T2", ENVELOPE) is not first
+
+    changed = {"boundaries": ENVELOPE["boundaries"][:1]}
+    recompiled = get_compiled_envelope("CAT72-T1", changed)
+    assert recompiled is not first
+    assert recompiled.evaluate({"speed": 10, "surface": "ice"})[0] is True
+
+
+def test_compiled_envelope_cache_keys_on_envelope_version():
+    first = get_compiled_envelope("CAT72-V1", ENVELOPE, 3)
+    # same stored version: a hit without fingerprinting the boundaries
+    assert get_compiled_envelope("CAT72-V1", {"boundaries": []}, 3) is first
+    assert get_compiled_envelope("CAT72-V1", {"boundaries": []}, 4) is not first
+
+    # every envelope_definition assignment bumps the stored version
+    test = CAT72Test(test_id="CAT72-V1", envelope_definition=ENVELOPE)
+    version = test.envelope_version
+    test.envelope_definition = {"boundaries": ENVELOPE["boundaries"][:1]}
+    assert test.envelope_version == version + 1
@@ -0,0 +1,65 @@
+"""Envelope evaluation executor tests."""
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.cat72_window_state import WindowState
+from app.services.envelope_evaluator import get_compiled_envelope
+from app.services.envelope_executor import EvaluationExecutor, loop_lag_monitor, loop_lag_stats
+
+ENVELOPE = {"boundaries": [
+    {"name": "speed", "type": "numeric", "min": 0, "max": 20},
+    {"name": "yard", "type": "polygon", "vertices": [[0, 0], [0, 10], [10, 10], [10, 0]]},
+    {"name": "accuracy", "type": "statistical", "variable": "accuracy", "window_size": 5, "min_value": 0.6},
+]}
+
+
+@pytest.mark.asyncio
+async def test_offloaded_evaluation_matches_inline():
+    compiled = get_compiled_envelope("CAT72-EXEC", ENVELOPE)
+    executor = EvaluationExecutor(workers=2, offload_cost=0)
+    local, remote = WindowState(compiled.window_specs), WindowState(compiled.window_specs)
+    rng = random.Random(3)
+    now = datetime(2026, 10, 18, 12, 0, 0)
+    try:
+        for i in range(60):
+            sv = {"speed": rng.uniform(-5, 25), "accuracy": rng.random(),
+                  "latitude": rng.uniform(-2, 12), "longitude": rng.uniform(-2, 12)}
+            ts = now + timedelta(seconds=i)
+            if i == 20:
+                executor._restart(executor._slot("CAT72-EXEC"))  # worker lost: snapshot resync
+            if i == 40:
+                remote = WindowState(compiled.window_specs)  # window state rebuilt: new generation
+                for value in local.windows[("accuracy", 5)]._ring:
+                    remote.record({"accuracy": value}, ts)
+            expected = compiled.evaluate(sv, windows=local.windows, current_timestamp=ts)
+            got = await executor.evaluate("CAT72-EXEC", compiled, remote, state_vector=sv, current_timestamp=ts)
+            assert got == expected
+            local.record(sv, ts)
+            remote.record(sv, ts)
+    finally:
+        executor.shutdown()
+    assert executor.stats["offloaded"] == 60 and executor.stats["inline"] == 0
+    assert executor.stats["worker_restarts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cheap_envelopes_stay_inline():
+    compiled = get_compiled_envelope("CAT72-CHEAP", {"boundaries": ENVELOPE["boundaries"][:1]})
+    executor = EvaluationExecutor(workers=1, offload_cost=compiled.cost + 1)
+    state = WindowState(compiled.window_specs)
+    assert await executor.evaluate("CAT72-CHEAP", compiled, state, state_vector={"speed": 30}) == compiled.evaluate({"speed": 30})
+    assert executor.stats["inline"] == 1 and executor._pools == [None]
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_sees_blocking_work():
+    monitor = asyncio.create_task(loop_lag_monitor(interval=0.01))
+    await asyncio.sleep(0.05)
+    time.sleep(0.1)  # hold the loop like an inline heavy evaluation would
+    await asyncio.sleep(0.05)
+    monitor.cancel()
+    assert loop_lag_stats()["max_ms"] >= 50
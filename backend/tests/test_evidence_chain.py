@@ -0,0 +1,117 @@
+"""CAT-72 evidence chain, Merkle checkpoint and encoder tests."""
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.models.models import CAT72Test, Telemetry
+from app.services import evidence_chain
+from app.services.evidence_chain import (
+    canonical_json, compute_hash, append_evidence_block, build_checkpoints, merkle_root,
+    merkle_proof, verify_merkle_proof, sample_proof, verify_evidence,
+)
+
+
+def _value(rng, depth=0):
+    kind = rng.randrange(9 if depth < 3 else 6)
+    return [
+        lambda: rng.randint(-10**20, 10**20),
+        lambda: rng.uniform(-1e6, 1e6),
+        lambda: rng.choice([True, False, None, float("nan"), float("inf"), 0.1, -0.0]),
+        lambda: "".join(rng.choice("aZ 09\"\\\n\té€😀") for _ in range(rng.randrange(8))),
+        lambda: datetime(2026, 10, 18) + timedelta(seconds=rng.randrange(10**6)),
+        lambda: rng.choice(["", "ok", "in_envelope"]),
+        lambda: [_value(rng, depth + 1) for _ in range(rng.randrange(4))],
+        lambda: {f"k{rng.randrange(50)}": _value(rng, depth + 1) for _ in range(rng.randrange(5))},
+        lambda: {"state_vector": {"speed": rng.random(), "Mode": "x"}, "elapsed": rng.randrange(1000)},
+    ][kind]()
+
+
+def test_canonical_json_matches_json_dumps():
+    rng = random.Random(11)
+    for _ in range(3000):
+        data = {f"f{i}": _value(rng) for i in range(rng.randrange(1, 6))}
+        assert canonical_json(data) == json.dumps(data, sort_keys=True, default=str)
+
+
+def test_merkle_proofs_verify_every_leaf():
+    for n in (1, 2, 3, 5, 8, 13, 100):
+        hashes = [compute_hash({"i": i}) for i in range(n)]
+        root = merkle_root(hashes)
+        for i in range(n):
+            assert verify_merkle_proof(hashes[i], merkle_proof(hashes, i), root)
+        assert not verify_merkle_proof(compute_hash({"i": -1}), merkle_proof(hashes, 0), root)
+
+
+@pytest.mark.asyncio
+async def test_checkpoints_verify_and_catch_tampering(db_session, monkeypatch):
+    monkeypatch.setattr(evidence_chain, "CHECKPOINT_INTERVAL", 4)
+    test = CAT72Test(test_id=f"CAT72-{uuid.uuid4().hex[:8]}", state="running")
+    db_session.add(test)
+    await db_session.flush()
+    head = await append_evidence_block(db_session, test, "genesis", {"type": "genesis"}, prev_hash="")
+    now = datetime.utcnow()
+    for i in range(10):
+        sample_hash = compute_hash({"i": i}, head)
+        db_session.add(Telemetry(test_id=test.id, timestamp=now + timedelta(seconds=i), sample_number=i + 1,
+                                 sample_hash=sample_hash, prev_hash=head))
+        head = sample_hash
+        await db_session.flush()
+    test.evidence_hash = head
+    assert await build_checkpoints(db_session, test) == 2
+    assert await build_checkpoints(db_session, test, seal=True) == 1
+    await append_evidence_block(db_session, test, "final", {"type": "final"})
+    await db_session.commit()
+
+    report = await verify_evidence(db_session, test)
+    assert report["valid"], report["errors"]
+    assert (report["checkpoints_checked"], report["samples_checked"], report["samples_unchecked"]) == (3, 10, 0)
+
+    proof = await sample_proof(db_session, test, 6)
+    assert proof["checkpoint"] == 1
+    assert verify_merkle_proof(proof["sample_hash"], proof["path"], proof["merkle_root"])
+
+    await db_session.execute(update(Telemetry).where(
+        Telemetry.test_id == test.id, Telemetry.prev_hash == proof["sample_hash"]).values(prev_hash="0" * 64))
+    await db_session.commit()
+    report = await verify_evidence(db_session, test)
+    assert not report["valid"]
+    assert report["errors"] == ["checkpoint 1: chain broken at sample 7"]
+
+
+@pytest.mark.asyncio
+async def test_checkpoints_wait_for_late_samples_and_prove_from_chunks(db_session, monkeypatch):
+    monkeypatch.setattr(evidence_chain, "CHECKPOINT_INTERVAL", 16)
+    monkeypatch.setattr(evidence_chain, "PROOF_CHUNK_LEVEL", 2)
+    test = CAT72Test(test_id=f"CAT72-{uuid.uuid4().hex[:8]}", state="running")
+    db_session.add(test)
+    await db_session.flush()
+    now = datetime.utcnow()
+    hashes = [compute_hash({"i": i}) for i in range(40)]
+
+    def sample(n):
+        return Telemetry(test_id=test.id, timestamp=now + timedelta(seconds=n), sample_number=n,
+                         sample_hash=hashes[n - 1], prev_hash=hashes[n - 2] if n > 1 else "")
+
+    # sample 5 commits after 6..20: the first checkpoint waits for it
+    db_session.add_all([sample(n) for n in range(1, 21) if n != 5])
+    await db_session.flush()
+    assert await build_checkpoints(db_session, test) == 0
+    db_session.add(sample(5))
+    db_session.add_all([sample(n) for n in range(21, 41)])
+    await db_session.flush()
+    assert await build_checkpoints(db_session, test) == 2
+    assert await build_checkpoints(db_session, test, seal=True) == 1
+    await db_session.commit()
+
+    report = await verify_evidence(db_session, test)
+    assert report["valid"], report["errors"]
+    assert (report["checkpoints_checked"], report["samples_checked"]) == (3, 40)
+    for n in range(1, 41):
+        proof = await sample_proof(db_session, test, n)
+        assert proof["sample_hash"] == hashes[n - 1]
+        assert verify_merkle_proof(proof["sample_hash"], proof["path"], proof["merkle_root"])
+        assert proof["path"] == merkle_proof(hashes[(n - 1) // 16 * 16:][:16], (n - 1) % 16)
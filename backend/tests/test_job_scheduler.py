@@ -0,0 +1,178 @@
+"""Job scheduler tests: leases across replicas, isolation, timeouts, metrics."""
+import asyncio
+import uuid
+from datetime import datetime, time, timedelta
+
+import pytest
+from sqlalchemy import delete
+
+from app.models.models import ScheduledJob
+from app.services.job_registry import platform_jobs
+from app.services.job_scheduler import Histogram, Job, JobScheduler
+from tests.conftest import TestSession
+
+
+def _replicas(*jobs, n=2):
+    replicas = [JobScheduler(TestSession, worker_id=f"replica-{i}") for i in range(n)]
+    for r in replicas:
+        for job in jobs:
+            r.register(Job(**job))
+    return replicas
+
+
+async def _drop(*names):
+    async with TestSession() as db:
+        await db.execute(delete(ScheduledJob).where(ScheduledJob.name.in_(names)))
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_cluster_job_runs_on_one_replica_per_interval(setup_db):
+    name, runs = f"sweep-{uuid.uuid4().hex[:6]}", []
+
+    async def sweep():
+        runs.append(1)
+
+    a, b = _replicas(dict(name=name, func=sweep, interval_s=60, max_runtime_s=5, jitter=0.0))
+    now = datetime.utcnow()
+    try:
+        assert await a.run_job(name, now=now) == "ok"
+        assert await b.run_job(name, now=now + timedelta(seconds=1)) is None
+        assert len(runs) == 1 and b.stats[name].skipped == 1
+        # the schedule lives in the row: b waits for the same next run a scheduled
+        async with TestSession() as db:
+            row = await db.get(ScheduledJob, name)
+        assert row.owner == "replica-0" and row.lease_expires_at is None and row.last_status == "ok"
+        assert b._due[name] >= row.next_run_at >= now + timedelta(seconds=59)
+        # once due, whichever replica gets there first runs it
+        assert await b.run_job(name, now=row.next_run_at + timedelta(seconds=1)) == "ok"
+        assert len(runs) == 2
+    finally:
+        await _drop(name)
+
+
+@pytest.mark.asyncio
+async def test_running_lease_blocks_other_replicas_until_it_lapses(setup_db):
+    name, release = f"slow-{uuid.uuid4().hex[:6]}", asyncio.Event()
+
+    async def slow():
+        await release.wait()
+
+    a, b = _replicas(dict(name=name, func=slow, interval_s=60, max_runtime_s=30))
+    now = datetime.utcnow()
+    try:
+        first = asyncio.create_task(a.run_job(name, now=now))
+        await asyncio.sleep(0.2)
+        assert await b.run_job(name, now=now) is None
+        assert b._due[name] >= now + timedelta(seconds=30)  # rechecked when the lease would lapse
+        # an owner that stops renewing (here: a stuck run on a's clock) loses the
+        # lease after max_runtime and another replica takes over
+        second = asyncio.create_task(b.run_job(name, now=now + timedelta(seconds=31)))
+        await asyncio.sleep(0.2)
+        async with TestSession() as db:
+            assert (await db.get(ScheduledJob, name)).owner == "replica-1"
+        release.set()
+        assert await asyncio.gather(first, second) == ["ok", "ok"]
+        # only the current lease holder writes the schedule back
+        async with TestSession() as db:
+            row = await db.get(ScheduledJob, name)
+        assert row.owner == "replica-1" and row.run_count == 1 and row.lease_expires_at is None
+    finally:
+        release.set()
+        await _drop(name)
+
+
+@pytest.mark.asyncio
+async def test_failures_and_timeouts_are_isolated_and_recorded(setup_db):
+    boom, stuck, fine = (f"{p}-{uuid.uuid4().hex[:6]}" for p in ("boom", "stuck", "fine"))
+
+    async def explode():
+        raise RuntimeError("no database")
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def ok():
+        return None
+
+    (s,) = _replicas(
+        dict(name=boom, func=explode, interval_s=60, max_runtime_s=5),
+        dict(name=stuck, func=hang, interval_s=60, max_runtime_s=0.1),
+        dict(name=fine, func=ok, interval_s=60, max_runtime_s=5),
+        n=1,
+    )
+    try:
+        statuses = await asyncio.gather(*(s.run_job(n) for n in (boom, stuck, fine)))
+        assert statuses == ["error", "timeout", "ok"]
+        snap = s.snapshot()["jobs"]
+        assert snap[boom]["failures"] == 1 and "no database" in snap[boom]["last_error"]
+        assert snap[stuck]["timeouts"] == 1 and snap[stuck]["duration"]["count"] == 1
+        assert snap[stuck]["duration"]["max_s"] >= 0.1
+        async with TestSession() as db:
+            row = await db.get(ScheduledJob, stuck)
+        assert row.last_status == "timeout" and row.lease_expires_at is None and row.run_count == 1
+    finally:
+        await _drop(boom, stuck, fine)
+
+
+@pytest.mark.asyncio
+async def test_local_jobs_run_everywhere_and_deadlines_pull_the_next_run_in():
+    deadline = datetime.utcnow() + timedelta(seconds=5)
+    calls = []
+
+    async def refresh():
+        calls.append(1)
+        return deadline
+
+    replicas = _replicas(dict(name="cache", func=refresh, interval_s=3600, max_runtime_s=5, local=True))
+    for r in replicas:
+        assert await r.run_job("cache") == "ok"
+        assert r._due["cache"] == deadline
+    assert len(calls) == 2
+
+    daily = Job("renewals", refresh, interval_s=86400, max_runtime_s=5, daily_at_utc=time(6, 0))
+    assert daily.next_run(datetime(2026, 3, 1, 5, 0)) == datetime(2026, 3, 1, 6, 0)
+    assert daily.next_run(datetime(2026, 3, 1, 6, 0)) == datetime(2026, 3, 2, 6, 0)
+
+
+def test_histogram_and_registry():
+    h = Histogram()
+    for v in [0.002] * 98 + [2.0, 400.0]:
+        h.observe(v)
+    snap = h.snapshot()
+    assert snap["count"] == 100 and snap["p50_s"] == 0.01 and snap["p99_s"] == 5
+    assert snap["buckets"]["le_0.01"] == 98 and snap["buckets"]["le_1800"] == 100 and snap["max_s"] == 400.0
+
+    names = [job.name for job in platform_jobs(production=True)]
+    assert len(names) == len(set(names))
+    assert {"db_backup", "renewal_cron", "cat72_auto_evaluator"} <= set(names)
+    assert "db_backup" not in {job.name for job in platform_jobs(production=False)}
+
+
+@pytest.mark.asyncio
+async def test_triggered_run_waits_for_the_lease_and_takes_its_arguments(setup_db):
+    name, release, calls = f"on-demand-{uuid.uuid4().hex[:6]}", asyncio.Event(), []
+
+    async def rebuild(force=False):
+        calls.append(force)
+        await release.wait()
+        return {"force": force}
+
+    a, b = _replicas(dict(name=name, func=rebuild, interval_s=3600, max_runtime_s=30))
+    try:
+        assert await a.trigger(name, force=True) is True
+        assert await b.trigger(name) is False                     # already requested
+        assert (await b.job_state(name))["state"] == "requested"
+        run = asyncio.create_task(b.run_job(name))
+        await asyncio.sleep(0.2)
+        assert (await a.job_state(name))["state"] == "running"
+        assert await a.trigger(name) is False                     # one run at a time
+        release.set()
+        assert await run == "ok" and calls == [True]
+        state = await a.job_state(name)
+        assert state["state"] == "idle" and state["last_result"] == {"force": True}
+        # the request was consumed: the next scheduled run gets no arguments
+        assert await a.run_job(name, now=datetime.utcnow() + timedelta(hours=2)) == "ok"
+        assert calls == [True, False]
+    finally:
+        await _drop(name)
@@ -0,0 +1,83 @@
+"""Streaming CAT-72 learning profile tests."""
+import random
+import statistics
+import uuid
+
+import pytest
+
+from app.models.models import CAT72Test
+from app.services.learning_profile import (
+    StreamingProfile, TDigest, record_learning_sample, flush_learning_profile, load_learning_profile,
+)
+
+
+def _stream(n, seed):
+    rng = random.Random(seed)
+    return [{"speed": rng.gauss(10, 3), "mode": rng.choice(["Cruise", "cruise", "HOVER", "land"]),
+             "armed": rng.random() < 0.9, "latitude": rng.uniform(45, 46), "longitude": rng.uniform(-75, -74)}
+            for _ in range(n)]
+
+
+def test_streaming_profile_statistics():
+    samples = _stream(5000, 1)
+    profile = StreamingProfile()
+    prev = None
+    for sv in samples:
+        profile.add(sv, prev, 1.0 if prev else None)
+        prev = sv
+
+    legacy = profile.to_legacy()
+    speeds = [sv["speed"] for sv in samples]
+    speed = legacy["variables"]["speed"]
+    assert speed["min"] == min(speeds) and speed["max"] == max(speeds)
+    assert speed["mean"] == pytest.approx(statistics.fmean(speeds))
+    assert speed["stddev"] == pytest.approx(statistics.pstdev(speeds))
+    assert speed["p50"] == pytest.approx(statistics.median(speeds), abs=0.05)
+    assert speed["max_rate"] == pytest.approx(max(abs(a - b) for a, b in zip(speeds[1:], speeds)))
+    assert sorted(v.lower() for v in legacy["variables"]["mode"]["unique_values"]) == ["cruise", "hover", "land"]
+    assert legacy["variables"]["armed"]["true_count"] == sum(sv["armed"] for sv in samples)
+    lats = [p[0] for p in legacy["_positions"]]
+    assert min(lats) == min(sv["latitude"] for sv in samples) and len(legacy["_positions"]) <= 204
+    assert legacy["max_gap_s"] == 1.0 and legacy["gap_count"] == 4999
+
+
+def test_merged_halves_match_single_profile():
+    samples = _stream(2000, 2)
+    whole, left, right = StreamingProfile(), StreamingProfile(), StreamingProfile()
+    for i, sv in enumerate(samples):
+        whole.add(sv)
+        (left if i < 1000 else right).add(sv)
+    left.merge(StreamingProfile.from_dict(right.to_dict()))
+    a, b = whole.to_legacy()["variables"]["speed"], left.to_legacy()["variables"]["speed"]
+    for key in ("min", "max", "mean", "stddev", "count"):
+        assert b[key] == pytest.approx(a[key])
+    assert b["p50"] == pytest.approx(a["p50"], abs=0.1)
+    assert left.positions_seen == 2000 and len(left.positions) == 200
+
+
+def test_digest_stays_bounded():
+    digest = TDigest()
+    for i in range(100000):
+        digest.add(float(i % 1000))
+    assert len(digest.to_dict()["c"]) < 200
+    assert digest.quantile(0.99) == pytest.approx(990, abs=5)
+
+
+@pytest.mark.asyncio
+async def test_store_flushes_and_converts_legacy(db_session):
+    legacy = {"sample_count": 10, "variables": {"speed": {"count": 10, "type": "numeric", "min": 1.0,
+                                                          "max": 9.0, "sum": 50.0, "sum_sq": 330.0}}}
+    test = CAT72Test(test_id=f"CAT72-{uuid.uuid4().hex[:8]}", state="learning",
+                     envelope_definition={"_learning_profile": legacy})
+    db_session.add(test)
+    await db_session.commit()
+
+    for sv in _stream(20, 3):
+        pending = await record_learning_sample(db_session, test, sv, None, None)
+    assert pending.sample_count == 30 and pending.variable_count == 5
+    await flush_learning_profile(test.test_id)
+    assert pending.delta.sample_count == 0
+
+    profile = await load_learning_profile(db_session, test)
+    assert profile.sample_count == 30
+    assert profile.variables["speed"].n == 30 and profile.variables["speed"].min <= 1.0
@@ -0,0 +1,26 @@
+"""Telemetry partition maintenance tests."""
+from datetime import datetime
+
+from app.services.partition_manager import (
+    period_start, next_period, partition_name, create_partition_sql, _overlaps,
+)
+
+
+def test_monthly_periods_roll_over_year():
+    start = period_start(datetime(2026, 12, 18, 13, 5), "monthly")
+    assert start == datetime(2026, 12, 1)
+    assert next_period(start, "monthly") == datetime(2027, 1, 1)
+    assert partition_name("telemetry_records", start, "monthly") == "telemetry_records_p202612"
+
+
+def test_daily_partition_sql():
+    start = period_start(datetime(2026, 10, 18, 23, 59), "daily")
+    sql = create_partition_sql("violations", start, next_period(start, "daily"), "daily")
+    assert "violations_p20261018 PARTITION OF violations" in sql
+    assert "FROM ('2026-10-18 00:00:00') TO ('2026-10-19 00:00:00')" in sql
+
+
+def test_overlap_handles_unbounded_legacy_partition():
+    cutoff = datetime(2026, 11, 1)
+    assert _overlaps(None, cutoff, datetime(2026, 10, 1), cutoff)
+    assert not _overlaps(None, cutoff, cutoff, datetime(2026, 12, 1))
@@ -0,0 +1,107 @@
+"""Shared rate limiter tests."""
+import pytest
+
+from app.services.rate_limiter import (
+    MemoryRateLimitBackend, RateLimit, RateLimiter, RedisRateLimitBackend, TELEMETRY_LIMITS,
+    TELEMETRY_SAMPLE_LIMITS,
+)
+
+
+class FakeRedis:
+    """Just the commands the Redis backend pipelines; expiries are recorded, not enforced."""
+
+    def __init__(self):
+        self.data, self.ttl, self.fail = {}, {}, False
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis, self.ops = redis, []
+
+    def __getattr__(self, name):
+        return lambda *args: self.ops.append((name, args))
+
+    async def execute(self):
+        if self.redis.fail:
+            raise ConnectionError("redis down")
+        out, data = [], self.redis.data
+        for name, args in self.ops:
+            if name in ("incrby", "decrby"):
+                data[args[0]] = int(data.get(args[0], 0)) + (args[1] if name == "incrby" else -args[1])
+                out.append(data[args[0]])
+            elif name == "expire":
+                self.redis.ttl[args[0]] = args[1]
+                out.append(True)
+            else:
+                out.append(None if args[0] not in data else str(data[args[0]]))
+        return out
+
+
+async def _count_allowed(limiter, key, limits, times):
+    return [await limiter.hit(key, limits, now=t) for t in times]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("shared", [False, True])
+async def test_burst_and_minute_limits(shared):
+    limiter = RateLimiter(RedisRateLimitBackend(FakeRedis())) if shared else RateLimiter()
+    t0 = 1_000_020.0  # a minute boundary
+    # 10/second burst: the 11th request in the same second is refused and not counted
+    allowed = await _count_allowed(limiter, "cat72:T1", TELEMETRY_LIMITS, [t0 + i * 0.01 for i in range(11)])
+    assert allowed == [True] * 10 + [False]
+    # 120/minute: spread 8/s, the minute fills up after 120 accepted
+    results = await _count_allowed(limiter, "cat72:T2", TELEMETRY_LIMITS, [t0 + i * 0.125 for i in range(200)])
+    assert sum(results) == 120 and not any(results[120:])
+    # keys are independent
+    assert await limiter.hit("cat72:T3", TELEMETRY_LIMITS, now=t0)
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_weights_previous_window():
+    limiter = RateLimiter()
+    limits = [RateLimit(100, 60)]
+    assert sum(await _count_allowed(limiter, "k", limits, [59.0] * 100)) == 100
+    # a quarter into the next window three quarters of the old count still applies
+    assert sum(await _count_allowed(limiter, "k", limits, [75.0] * 100)) == 25
+    # two windows later nothing remains
+    assert sum(await _count_allowed(limiter, "k", limits, [181.0] * 100)) == 100
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_idle_and_excess_keys():
+    backend = MemoryRateLimitBackend(max_keys=50)
+    limiter = RateLimiter(fallback=backend)
+    limits = [RateLimit(5, 1)]
+    for i in range(200):
+        await limiter.hit(f"ip:{i}", limits, now=10.0)
+    assert len(backend) == 50
+    # keys idle past two windows go as soon as anything else is counted
+    await limiter.hit("ip:new", limits, now=20.0)
+    assert len(backend) == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_failure_falls_back_to_process_counters():
+    redis = FakeRedis()
+    limiter = RateLimiter(RedisRateLimitBackend(redis))
+    limits = [RateLimit(3, 60)]
+    assert await _count_allowed(limiter, "k", limits, [1.0, 1.0]) == [True, True]
+    redis.fail = True
+    assert await _count_allowed(limiter, "k", limits, [1.0] * 4) == [True, True, True, False]
+    assert redis.ttl and all(ttl == 120 for ttl in redis.ttl.values())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("shared", [False, True])
+async def test_cost_charges_samples_not_requests(shared):
+    limiter = RateLimiter(RedisRateLimitBackend(FakeRedis())) if shared else RateLimiter()
+    t0 = 1_000_020.0
+    # a 60 s batch at 50 Hz fits the per-minute sample budget once, not twice
+    assert await limiter.hit("cat72-samples:T1", TELEMETRY_SAMPLE_LIMITS, now=t0, cost=3000)
+    assert not await limiter.hit("cat72-samples:T1", TELEMETRY_SAMPLE_LIMITS, now=t0 + 1, cost=3000)
+    # the rejected batch wasn't counted: the remaining budget is still usable
+    assert await limiter.hit("cat72-samples:T1", TELEMETRY_SAMPLE_LIMITS, now=t0 + 1, cost=600)
+    assert not await limiter.hit("cat72-samples:T1", TELEMETRY_SAMPLE_LIMITS, now=t0 + 1)
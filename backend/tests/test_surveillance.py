@@ -1,5 +1,17 @@
 """Surveillance engine tests."""
+import uuid
+from datetime import datetime, timedelta, timezone
+
 import pytest
+from sqlalchemy import text
+
+from app.models.models import Application, Certificate, User
+from app.services import email_service
+from app.surveillance import (
+    AlertSeverity, AlertStore, AlertType, AlertWriter, SurveillanceAlert, SurveillanceConfig, SurveillanceState,
+    _surveillance_scan, get_surveillance_config, get_surveillance_state, heartbeat_thresholds,
+)
+from tests.conftest import TestSession
 
 
 @pytest.mark.asyncio
@@ -7,3 +19,166 @@ async def test_surveillance_status(client, auth_headers):
     """Surveillance status endpoint responds."""
     resp = await client.get("/api/v1/surveillance/status", headers=auth_headers)
     assert resp.status_code < 500, f"Server error: {resp.status_code}"
+
+
+T0 = datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc)
+THRESHOLDS = (120, 300, 900)
+
+
+def test_heartbeat_deadlines_only_touch_sessions_crossing_a_threshold():
+    state = SurveillanceState()
+    for i in range(1000):
+        state.record_heartbeat(f"S{i}", f"C{i}", {}, now=T0 + timedelta(seconds=i))
+    assert state.next_heartbeat_deadline(THRESHOLDS) == T0 + timedelta(seconds=120)
+    # a fresh heartbeat re-arms S0 behind everyone else
+    state.record_heartbeat("S0", "C0", {}, now=T0 + timedelta(seconds=1000))
+
+    assert state.expire_heartbeats(T0 + timedelta(seconds=120), THRESHOLDS) == {}
+    crossed = state.expire_heartbeats(T0 + timedelta(seconds=125.5), THRESHOLDS)
+    assert crossed == {f"S{i}": 0 for i in range(1, 6)}
+    # a long gap crosses several stages at once; the highest is reported
+    crossed = state.expire_heartbeats(T0 + timedelta(seconds=1000), THRESHOLDS)
+    assert crossed["S1"] == 2 and crossed["S99"] == 2 and crossed["S100"] == 1
+    assert crossed["S699"] == 1 and crossed["S700"] == 0 and "S879" in crossed and "S880" not in crossed
+    assert "S0" not in crossed
+    assert state.next_heartbeat_deadline(THRESHOLDS) == T0 + timedelta(seconds=880 + 120)
+
+
+@pytest.mark.asyncio
+async def test_scan_fires_each_heartbeat_threshold_once(setup_db, monkeypatch):
+    cert_number = f"ODDC-HB-{uuid.uuid4().hex[:8]}"
+    async with TestSession() as db:
+        cert = Certificate(certificate_number=cert_number, state="conformant")
+        db.add(cert)
+        await db.commit()
+    state = get_surveillance_state()
+    monkeypatch.setattr(state.alert_writer, "add", lambda alert: None)
+    state.take_dirty()
+    state.record_heartbeat("S-hb", cert_number, {"pass": 100, "block": 0}, now=T0)
+    thresholds = heartbeat_thresholds(get_surveillance_config())
+
+    def alerts():
+        return [a.alert_type for a in state.alerts if a.certificate_id == cert_number]
+
+    await _surveillance_scan(TestSession, now=T0 + timedelta(seconds=1))
+    assert alerts() == [] and state.scores["S-hb"].status == "healthy"
+    await _surveillance_scan(TestSession, now=T0 + timedelta(seconds=thresholds[0] + 1))
+    await _surveillance_scan(TestSession, now=T0 + timedelta(seconds=thresholds[0] + 2))
+    assert alerts() == [AlertType.HEARTBEAT_STALE] and state.scores["S-hb"].status == "stale"
+    await _surveillance_scan(TestSession, now=T0 + timedelta(seconds=thresholds[2] + 1))
+    assert alerts() == [AlertType.HEARTBEAT_STALE, AlertType.HEARTBEAT_NON_CONFORMANT]
+    assert cert_number in state.suspended_certs and state.scores["S-hb"].status == "suspended"
+
+    async with TestSession() as db:
+        assert (await db.get(Certificate, cert.id)).state == "suspended"
+        await db.delete(await db.get(Certificate, cert.id))
+        await db.commit()
+    state.suspended_certs.discard(cert_number)
+
+
+@pytest.mark.asyncio
+async def test_suspension_email_names_the_certified_system(setup_db, monkeypatch):
+    tag = uuid.uuid4().hex[:8]
+    async with TestSession() as db:
+        user = User(email=f"owner-{tag}@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        app = Application(organization_name=f"Org {tag}", system_name=f"Rover {tag}", applicant_id=user.id)
+        db.add(app)
+        await db.flush()
+        cert = Certificate(certificate_number=f"ODDC-EM-{tag}", state="conformant", application_id=app.id,
+                           organization_name=app.organization_name, system_name=app.system_name)
+        db.add(cert)
+        await db.commit()
+    sent = []
+
+    async def capture(*args):
+        sent.append(args)
+
+    monkeypatch.setattr(email_service, "notify_customer_non_conformant", capture)
+    state = get_surveillance_state()
+    monkeypatch.setattr(state.alert_writer, "add", lambda alert: None)
+    now = datetime.now(timezone.utc)
+    state.record_heartbeat(f"S-em-{tag}", cert.certificate_number, {"pass": 40, "block": 60}, now=now)
+    await _surveillance_scan(TestSession, now=now)
+
+    assert sent == [(user.email, f"Rover {tag}", f"Org {tag}", cert.certificate_number,
+                     "Block rate 60.0% exceeds threshold")]
+    state.suspended_certs.discard(cert.certificate_number)
+
+
+def _alert(i: int, cert: str, severity: AlertSeverity = AlertSeverity.WARN) -> SurveillanceAlert:
+    return SurveillanceAlert(id=f"SA-ALERT-{i:06d}", alert_type=AlertType.VIOLATION_WARN, severity=severity,
+                             certificate_id=cert, session_id=None, message=f"alert {i}")
+
+
+def test_alert_store_is_bounded_and_indexed():
+    store = AlertStore(capacity=100)
+    for i in range(1000):
+        store.append(_alert(i, f"C{i % 3}", AlertSeverity.CRITICAL if i % 10 == 0 else AlertSeverity.WARN))
+    assert len(store) == 100 and store.unacknowledged == 100
+    assert store.get("SA-ALERT-000899") is None and store.get("SA-ALERT-000900") is not None
+
+    assert [a.id for a in store.query(limit=3)] == ["SA-ALERT-000997", "SA-ALERT-000998", "SA-ALERT-000999"]
+    critical = store.query(limit=50, severity="critical")
+    assert [a.id for a in critical] == [f"SA-ALERT-{i:06d}" for i in range(900, 1000, 10)]
+    both = store.query(limit=50, severity="critical", certificate_id="C0")
+    assert [a.id for a in both] == [f"SA-ALERT-{i:06d}" for i in range(900, 1000, 30)]
+
+    assert store.acknowledge("SA-ALERT-000999", "ops").acknowledged_by == "ops"
+    assert store.acknowledge("SA-ALERT-000001", "ops") is None
+    assert store.unacknowledged == 99
+    assert store.query(limit=1, unacknowledged_only=True)[0].id == "SA-ALERT-000998"
+    # evicting an acknowledged alert leaves the unacknowledged count alone
+    for i in range(1000, 1100):
+        store.append(_alert(i, "C9"))
+    assert store.unacknowledged == 100 and list(store._by_cert) == ["C9"]
+
+
+def test_alert_dedup_keys_expire():
+    state = SurveillanceState()
+    state.alert_writer.add = lambda alert: None
+    for i in range(50):
+        state._fire_alert(AlertType.HEARTBEAT_STALE, AlertSeverity.WARN, f"C{i}", None, "stale")
+    assert state._fire_alert(AlertType.HEARTBEAT_STALE, AlertSeverity.WARN, "C0", None, "stale") is None
+    assert len(state._dedup_window) == 50
+    later = datetime.now(timezone.utc) + timedelta(seconds=SurveillanceConfig.ALERT_DEDUP_RETENTION_SECONDS + 1)
+    state._prune_dedup(later)
+    assert len(state._dedup_window) == 0
+
+
+@pytest.mark.asyncio
+async def test_alert_writer_persists_in_batches(setup_db):
+    async with TestSession() as db:
+        await db.execute(text(
+            "CREATE TABLE IF NOT EXISTS surveillance_alerts (id SERIAL PRIMARY KEY, alert_id VARCHAR(50) UNIQUE NOT NULL, "
+            "alert_type VARCHAR(50) NOT NULL, severity VARCHAR(20) NOT NULL, certificate_id VARCHAR(100), "
+            "session_id VARCHAR(100), message TEXT, details JSON DEFAULT '{}', created_at TIMESTAMPTZ DEFAULT NOW(), "
+            "acknowledged BOOLEAN DEFAULT FALSE, acknowledged_at TIMESTAMPTZ, acknowledged_by VARCHAR(100))"))
+        await db.commit()
+
+    cert = f"ODDC-W-{uuid.uuid4().hex[:8]}"
+    sessions = []
+
+    def factory():
+        sessions.append(1)
+        return TestSession()
+
+    writer = AlertWriter(factory)
+    alerts = [_alert(900000 + i, cert) for i in range(250)]
+    alerts = [SurveillanceAlert(**{**a.__dict__, "id": f"{cert}-{i}"}) for i, a in enumerate(alerts)]
+    for a in alerts:
+        writer.add(a)
+    await writer.flush()
+    alerts[7].acknowledged, alerts[7].acknowledged_by = True, "ops"
+    alerts[7].acknowledged_at = datetime.now(timezone.utc)
+    writer.acknowledge(alerts[7])
+    await writer.flush()
+    assert writer.pending == 0 and len(sessions) <= 4
+
+    async with TestSession() as db:
+        rows = (await db.execute(text(
+            "SELECT alert_id, acknowledged_by FROM surveillance_alerts WHERE certificate_id = :c"), {"c": cert})).all()
+        assert len(rows) == 250 and dict(rows)[f"{cert}-7"] == "ops"
+        await db.execute(text("DELETE FROM surveillance_alerts WHERE certificate_id = :c"), {"c": cert})
+        await db.commit()
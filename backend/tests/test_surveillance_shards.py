@@ -0,0 +1,154 @@
+"""Multi-worker surveillance tests: shard leases, state rebuild, suspension lock."""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, select, text, update
+
+from app.models.models import Certificate, EnveloSession, SurveillanceShardLease, SurveillanceWorker
+from app.surveillance import (
+    SurveillanceConfig, SurveillanceState, ShardCoordinator, _suspend_certificate_in_db, session_shard,
+)
+from tests.conftest import TestSession
+
+SHARDS = SurveillanceConfig.SHARD_COUNT
+
+
+async def _reset_leases():
+    async with TestSession() as db:
+        await db.execute(delete(SurveillanceShardLease))
+        await db.execute(delete(SurveillanceWorker))
+        await db.commit()
+
+
+def _workers(n: int):
+    return [ShardCoordinator(TestSession, state=SurveillanceState(), worker_id=f"w{i}") for i in range(n)]
+
+
+async def _rounds(workers, rounds: int = 3):
+    for _ in range(rounds):
+        for w in workers:
+            await w.rebalance()
+            w.state.owned_shards = set(w.owned)
+
+
+def _assert_partition(workers):
+    owned = [w.owned for w in workers]
+    assert set().union(*owned) == set(range(SHARDS))
+    assert sum(len(o) for o in owned) == SHARDS
+
+
+@pytest.mark.asyncio
+async def test_workers_split_shards_and_take_over_from_a_dead_worker(setup_db):
+    await _reset_leases()
+    workers = _workers(3)
+    await _rounds(workers)
+    _assert_partition(workers)
+    assert max(len(w.owned) for w in workers) - min(len(w.owned) for w in workers) <= 2
+
+    # w2 dies: its leases and heartbeat row go stale
+    async with TestSession() as db:
+        await db.execute(text("UPDATE surveillance_shard_leases SET expires_at = expires_at - interval '1 hour' "
+                              "WHERE owner = 'w2'"))
+        await db.execute(text("UPDATE surveillance_workers SET last_seen = last_seen - interval '1 hour' "
+                              "WHERE worker_id = 'w2'"))
+        await db.commit()
+    survivors = workers[:2]
+    await _rounds(survivors, rounds=2)
+    _assert_partition(survivors)
+    assert {len(w.owned) for w in survivors} == {SHARDS // 2}
+
+    # a clean shutdown hands shards back immediately
+    await survivors[1].release()
+    await _rounds(survivors[:1], rounds=1)
+    assert survivors[0].owned == set(range(SHARDS))
+    await _reset_leases()
+
+
+async def _seed_sessions(heartbeat_ages):
+    tag = uuid.uuid4().hex[:8]
+    now = datetime.utcnow()
+    async with TestSession() as db:
+        cert = Certificate(certificate_number=f"ODDC-SH-{tag}", organization_name="Org", system_name="Sys",
+                           state="conformant")
+        db.add(cert)
+        await db.flush()
+        sessions = [EnveloSession(session_id=f"{tag}-{i}", certificate_id=cert.id, status="active",
+                                  pass_count=100, block_count=0, last_heartbeat_at=now - timedelta(seconds=age))
+                    for i, age in enumerate(heartbeat_ages)]
+        db.add_all(sessions)
+        await db.commit()
+    return cert.certificate_number, cert.id, [s.session_id for s in sessions]
+
+
+async def _drop_sessions(cert_pk: int):
+    async with TestSession() as db:
+        await db.execute(delete(EnveloSession).where(EnveloSession.certificate_id == cert_pk))
+        await db.execute(delete(Certificate).where(Certificate.id == cert_pk))
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_owners_rebuild_their_shards_and_see_other_workers_heartbeats(setup_db):
+    await _reset_leases()
+    cert_number, cert_pk, session_ids = await _seed_sessions([10] * 37 + [200, 1500])
+    workers = _workers(2)
+    for _ in range(3):
+        for w in workers:
+            w._next_rebalance = 0  # rebalance on every sync
+            await w.sync()
+    _assert_partition(workers)
+
+    for w in workers:
+        expected = {sid for sid in session_ids if session_shard(sid) in w.owned}
+        assert set(w.state.scores) & set(session_ids) == expected
+        # the state of the other worker's sessions is not kept here
+        other = next(sid for sid in session_ids if sid not in expected)
+        w.state.record_heartbeat(other, cert_number, {})
+        assert other not in w.state.scores
+
+    # restored sessions keep their real heartbeat age: stale already; one dark for longer
+    # than the suspend threshold gets the grace period to reconnect, then is due
+    stale, dark = session_ids[-2], session_ids[-1]
+    stale_owner = next(w for w in workers if stale in w.state.scores)
+    dark_owner = next(w for w in workers if dark in w.state.scores)
+    assert stale_owner.state._hb_stage[stale] == 1
+    thresholds, grace = (120, 300, 900), SurveillanceConfig.GRACE_PERIOD_SECONDS
+    now = datetime.now(timezone.utc)
+    assert dark_owner.state._hb_stage[dark] == 2
+    assert dark_owner.state.last_heartbeats[dark] < now - timedelta(seconds=1400)
+    assert dark not in dark_owner.state.expire_heartbeats(now + timedelta(seconds=grace - 5), thresholds)
+    crossed = dark_owner.state.expire_heartbeats(now + timedelta(seconds=grace + 1), thresholds)
+    assert crossed.get(dark) == 2
+
+    # a heartbeat served by any worker reaches the owner through envelo_sessions
+    async with TestSession() as db:
+        await db.execute(update(EnveloSession).where(EnveloSession.session_id == dark)
+                         .values(last_heartbeat_at=datetime.utcnow(), pass_count=150))
+        await db.commit()
+    await dark_owner.sync()
+    assert dark_owner.state._hb_stage[dark] == 0 and dark_owner.state.scores[dark].pass_count == 150
+
+    await _drop_sessions(cert_pk)
+    await _reset_leases()
+
+
+@pytest.mark.asyncio
+async def test_suspension_is_decided_once_and_rechecks_db_heartbeats(setup_db):
+    dark_number, dark_pk, _ = await _seed_sessions([1500, 1600])
+    live_number, live_pk, _ = await _seed_sessions([1500, 5])
+
+    results = await asyncio.gather(*[
+        _suspend_certificate_in_db(dark_number, TestSession, reason="test", heartbeat_grace_seconds=900)
+        for _ in range(4)
+    ])
+    assert sorted(results) == [False, False, False, True]
+    assert not await _suspend_certificate_in_db(live_number, TestSession, reason="test", heartbeat_grace_seconds=900)
+
+    async with TestSession() as db:
+        states = dict((await db.execute(select(Certificate.id, Certificate.state)
+                                        .where(Certificate.id.in_([dark_pk, live_pk])))).all())
+    assert states == {dark_pk: "suspended", live_pk: "conformant"}
+    await _drop_sessions(dark_pk)
+    await _drop_sessions(live_pk)
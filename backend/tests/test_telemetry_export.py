@@ -0,0 +1,95 @@
+"""Telemetry keyset pagination and streaming export tests."""
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import EnveloSession, TelemetryRecord
+from app.services.telemetry_export import keyset_page, iter_export, encode_cursor, decode_cursor
+
+
+async def _session_with_records(db, n):
+    s = EnveloSession(session_id=uuid.uuid4().hex[:16], status="active")
+    db.add(s)
+    await db.flush()
+    base = datetime.utcnow().replace(microsecond=0)
+    for i in range(n):
+        # pairs share a timestamp so the id tiebreak is exercised
+        db.add(TelemetryRecord(
+            session_id=s.id, timestamp=base - timedelta(seconds=i // 2),
+            action_type="move", result="PASS" if i % 3 else "BLOCK",
+            parameters={"speed": i},
+        ))
+    await db.flush()
+    return s
+
+
+def test_cursor_roundtrip_and_rejects_garbage():
+    ts = datetime(2026, 10, 18, 12, 30, 1, 250)
+    assert decode_cursor(encode_cursor(ts, 42)) == (ts, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_session_once(db_session):
+    s = await _session_with_records(db_session, 11)
+    seen, cursor = [], None
+    while True:
+        rows, cursor = await keyset_page(db_session, "telemetry", s.id, limit=4, cursor=cursor)
+        seen.extend(r["id"] for r in rows)
+        if cursor is None:
+            break
+    assert len(seen) == 11 and len(set(seen)) == 11
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_and_csv(db_session):
+    s = await _session_with_records(db_session, 5)
+
+    lines = "".join([c async for c in iter_export(db_session, "telemetry", s.id, "ndjson")]).splitlines()
+    records = [json.loads(line) for line in lines]
+    assert len(records) == 5
+    assert records[0]["timestamp"] <= records[-1]["timestamp"]
+    assert isinstance(records[0]["parameters"], dict)
+
+    csv_text = "".join([c async for c in iter_export(db_session, "telemetry", s.id, "csv")])
+    header, *rows = csv_text.strip().splitlines()
+    assert header.startswith("id,timestamp,action_id")
+    assert len(rows) == 5
+
+
+@pytest.mark.asyncio
+async def test_key_routes_are_scoped_to_the_callers_sessions(client):
+    from sqlalchemy import delete
+    from app.api.routes.apikeys import hash_key
+    from app.models.models import APIKey
+    from tests.conftest import TestSession
+
+    raw = {name: f"sa_live_{uuid.uuid4().hex}" for name in ("owner", "other")}
+    async with TestSession() as db:
+        keys = {name: APIKey(key_hash=hash_key(k), key_prefix=k[:12], is_active=True) for name, k in raw.items()}
+        db.add_all(keys.values())
+        await db.flush()
+        s = await _session_with_records(db, 9)
+        s.api_key_id = keys["owner"].id
+        await db.commit()
+
+    try:
+        base = f"/api/v1/envelo/sessions/{s.session_id}"
+        for name, expected in (("owner", 200), ("other", 404)):
+            headers = {"Authorization": f"Bearer {raw[name]}"}
+            for path in ("/telemetry", "/violations", "/export"):
+                assert (await client.get(base + path, headers=headers)).status_code == expected, (name, path)
+
+        # a filtered listing reports the filtered total
+        page = (await client.get(base + "/telemetry?result=BLOCK&limit=2",
+                                 headers={"Authorization": f"Bearer {raw['owner']}"})).json()
+        assert page["total"] == 3 and len(page["records"]) == 2
+    finally:
+        async with TestSession() as db:
+            await db.execute(delete(TelemetryRecord).where(TelemetryRecord.session_id == s.id))
+            await db.execute(delete(EnveloSession).where(EnveloSession.id == s.id))
+            await db.execute(delete(APIKey).where(APIKey.key_hash.in_([hash_key(k) for k in raw.values()])))
+            await db.commit()
@@ -0,0 +1,58 @@
+"""JSONB telemetry filter and aggregate tests."""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import EnveloSession, TelemetryRecord
+from app.services.telemetry_export import keyset_page
+from app.services.telemetry_jsonb import (
+    parameter_filter, failed_boundary_filter, parameter_stats, boundary_stats,
+)
+
+
+async def _session(db):
+    s = EnveloSession(session_id=uuid.uuid4().hex[:16], status="active")
+    db.add(s)
+    await db.flush()
+    now = datetime.utcnow()
+    rows = [
+        ("PASS", {"speed": 4, "zone": "a"}, [{"boundary": "speed", "passed": True}]),
+        ("PASS", {"speed": 8, "zone": "b"}, [{"boundary": "speed", "passed": True}]),
+        ("BLOCK", {"speed": 15, "zone": "a"}, [{"boundary": "speed", "passed": False},
+                                               {"boundary": "zone", "passed": True}]),
+        ("BLOCK", {"speed": "n/a"}, "legacy text"),
+    ]
+    for i, (result, params, evals) in enumerate(rows):
+        db.add(TelemetryRecord(session_id=s.id, timestamp=now - timedelta(seconds=i),
+                               result=result, parameters=params, boundary_evaluations=evals))
+    await db.flush()
+    return s
+
+
+@pytest.mark.asyncio
+async def test_parameter_and_boundary_filters(db_session):
+    s = await _session(db_session)
+
+    async def speeds(*filters):
+        rows, _ = await keyset_page(db_session, "telemetry", s.id, 100, filters=filters)
+        return sorted(r["parameters"]["speed"] for r in rows)
+
+    assert await speeds(parameter_filter(TelemetryRecord, "speed", "gt", "5")) == [8, 15]
+    assert await speeds(parameter_filter(TelemetryRecord, "zone", "eq", "a")) == [4, 15]
+    assert await speeds(failed_boundary_filter("speed")) == [15]
+    with pytest.raises(ValueError):
+        parameter_filter(TelemetryRecord, "speed", "gt", "fast")
+
+
+@pytest.mark.asyncio
+async def test_parameter_and_boundary_stats(db_session):
+    s = await _session(db_session)
+
+    stats = await parameter_stats(db_session, s.id, "speed")
+    assert stats["count"] == 3 and stats["min"] == 4 and stats["max"] == 15
+    assert stats["by_result"]["BLOCK"]["count"] == 1
+
+    boundaries = {b["boundary"]: b for b in await boundary_stats(db_session, s.id)}
+    assert boundaries["speed"]["evaluations"] == 3 and boundaries["speed"]["failures"] == 1
+    assert boundaries["zone"]["failures"] == 0
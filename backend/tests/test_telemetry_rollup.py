@@ -0,0 +1,71 @@
+"""Telemetry rollup tests."""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import EnveloSession, TelemetryRecord
+from app.services.telemetry_rollup import record_rollups, read_timeline, rebuild_rollups, rollup_totals
+
+
+async def _session(db):
+    s = EnveloSession(session_id=uuid.uuid4().hex[:16], status="active")
+    db.add(s)
+    await db.flush()
+    return s
+
+
+@pytest.mark.asyncio
+async def test_rollups_accumulate_across_batches(db_session):
+    s = await _session(db_session)
+    hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+    batch = [(hour + timedelta(minutes=1), "PASS"), (hour + timedelta(minutes=2), "BLOCK")]
+    await record_rollups(db_session, s.id, batch, [(hour + timedelta(minutes=2), "speed")])
+    await record_rollups(db_session, s.id, batch[:1])
+
+    timeline = await read_timeline(db_session, s.id, hour)
+    assert len(timeline) == 1
+    assert timeline[0]["pass"] == 2 and timeline[0]["block"] == 1 and timeline[0]["total"] == 3
+    assert timeline[0]["violations"] == {"speed": 1}
+
+    minutes = await read_timeline(db_session, s.id, hour, "minute")
+    assert [m["total"] for m in minutes] == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_matches_raw_telemetry(db_session):
+    s = await _session(db_session)
+    now = datetime.utcnow().replace(microsecond=0)
+    for i, result in enumerate(["PASS", "PASS", "BLOCK"]):
+        db_session.add(TelemetryRecord(session_id=s.id, timestamp=now - timedelta(seconds=i), result=result))
+    await db_session.flush()
+
+    await rebuild_rollups(db_session, now - timedelta(hours=2), session_pk=s.id)
+    timeline = await read_timeline(db_session, s.id, now - timedelta(hours=2))
+    assert sum(b["pass"] for b in timeline) == 2
+    assert sum(b["block"] for b in timeline) == 1
+
+
+@pytest.mark.asyncio
+async def test_fleet_totals_follow_every_write_to_the_hourly_rollups(db_session):
+    now = datetime.utcnow().replace(microsecond=0)
+    base = await rollup_totals(db_session)
+    s = await _session(db_session)
+    await record_rollups(db_session, s.id, [(now, "PASS"), (now, "BLOCK")], [(now, "speed")])
+    assert await rollup_totals(db_session) == (base[0] + 2, base[1] + 1)
+
+    # a sample backfilled into an hour long settled still counts
+    await record_rollups(db_session, s.id, [(now - timedelta(days=3), "PASS")], [(now - timedelta(days=3), "speed")])
+    assert await rollup_totals(db_session) == (base[0] + 3, base[1] + 2)
+
+    # a rebuild from raw telemetry replaces the session's counts
+    db_session.add(TelemetryRecord(session_id=s.id, timestamp=now, result="PASS"))
+    await db_session.flush()
+    await rebuild_rollups(db_session, now - timedelta(days=4), session_pk=s.id)
+    assert await rollup_totals(db_session) == (base[0] + 1, base[1])
+
+    # deleting a session takes its rollups and their counts with it
+    await db_session.delete(s)
+    await db_session.flush()
+    assert await rollup_totals(db_session) == base
+
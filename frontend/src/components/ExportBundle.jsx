@@ -53,6 +53,10 @@ export default function ExportBundle({ app, history = [], comments = [], isAdmin
 
   const setLoad = (key, val) => setLoading(prev => ({ ...prev, [key]: val }));
 
+  // the full log is admin/auditor only; applicants export their own entries
+  const auditLogsUrl = (isAdmin ? '/api/audit/logs' : '/api/audit/my-logs')
+    + '?resource_type=application&resource_id=' + app.id + '&limit=200&offset=0';
+
   const activeCert = certs.find(c => ['conformant','active','issued'].includes(c.state));
 
   const exportJSON = async () => {
@@ -60,7 +64,7 @@ export default function ExportBundle({ app, history = [], comments = [], isAdmin
     try {
       let auditLogs = [];
       try {
-        const res = await api.get('/api/audit/logs?resource_type=application&resource_id=' + app.id + '&limit=200&offset=0');
+        const res = await api.get(auditLogsUrl);
         auditLogs = res.data.logs ?? [];
       } catch {}
 
@@ -99,7 +103,7 @@ export default function ExportBundle({ app, history = [], comments = [], isAdmin
   const exportAuditCSV = async () => {
     setLoad('audit', true);
     try {
-      const res = await api.get('/api/audit/logs?resource_type=application&resource_id=' + app.id + '&limit=200&offset=0');
+      const res = await api.get(auditLogsUrl);
       const logs = res.data.logs ?? [];
       if (!logs.length) { setLoad('audit', false); return; }
       const rows = logs.map(l => ({
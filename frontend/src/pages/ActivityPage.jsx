@@ -209,7 +209,7 @@ function ActivityPage() {
           <input
             value={emailFilter}
             onChange={e => { setEmailFilter(e.target.value); setPage(0); }}
-            placeholder="Filter by email..."
+            placeholder="Filter by exact email..."
             style={{ ...FILTER_INPUT, flex: 1, minWidth: '150px' }}
           />
 
@@ -418,8 +418,8 @@ function MonitoringPage() {
                               </div>
                             ); })()}
                             <div style={{display: 'flex', gap: '8px', marginBottom: '24px', flexWrap: 'wrap'}}>
-                              <button onClick={async () => { try { const isAdmin = user?.role === 'admin'; const base = isAdmin ? '/api/envelo/admin/sessions/' : '/api/envelo/my/sessions/'; const res = await api.get(base + session.session_id + '/telemetry'); const records = res.data.records || []; if (records.length === 0) { toast.show('No telemetry data yet', 'info'); return; } const hdrs = ['timestamp','action_id','action_type','result','execution_time_ms']; const csv = [hdrs.join(','), ...records.map(r2 => hdrs.map(h => JSON.stringify(r2[h] ?? '')).join(','))].join('\n'); const blob = new Blob([csv], {type: 'text/csv'}); const link = document.createElement('a'); link.href = URL.createObjectURL(blob); link.download = 'telemetry-' + session.session_id + '.csv'; link.click(); } catch (e) { toast.show('Failed to download telemetry', 'error'); } }} style={{padding: '8px 16px', background: styles.cardSurface, border: '1px solid ' + styles.borderSubtle, color: styles.purpleBright, cursor: 'pointer', fontFamily: styles.mono, fontSize: '10px', letterSpacing: '1px', textTransform: 'uppercase', display: 'flex', alignItems: 'center', gap: '6px', borderRadius: 4}}>↓ Telemetry CSV</button>
-                              <button onClick={async () => { try { const isAdmin = user?.role === 'admin'; const base = isAdmin ? '/api/envelo/admin/sessions/' : '/api/envelo/my/sessions/'; const res = await api.get(base + session.session_id + '/violations'); const viol = res.data.violations || []; if (viol.length === 0) { toast.show('No violations recorded', 'info'); return; } const hdrs = ['timestamp','boundary_name','violation_message']; const csv = [hdrs.join(','), ...viol.map(v => hdrs.map(h => JSON.stringify(v[h] ?? '')).join(','))].join('\n'); const blob = new Blob([csv], {type: 'text/csv'}); const link = document.createElement('a'); link.href = URL.createObjectURL(blob); link.download = 'violations-' + session.session_id + '.csv'; link.click(); } catch (e) { toast.show('Failed to download violations', 'error'); } }} style={{padding: '8px 16px', background: styles.cardSurface, border: '1px solid ' + styles.borderSubtle, color: styles.accentRed, cursor: 'pointer', fontFamily: styles.mono, fontSize: '10px', letterSpacing: '1px', textTransform: 'uppercase', display: 'flex', alignItems: 'center', gap: '6px', borderRadius: 4}}>↓ Violations CSV</button>
+                              <button onClick={async () => { try { const isAdmin = user?.role === 'admin'; const base = isAdmin ? '/api/envelo/admin/sessions/' : '/api/envelo/my/sessions/'; const res = await api.get(base + session.session_id + '/export?kind=telemetry&format=csv', { responseType: 'blob' }); const blob = new Blob([res.data], {type: 'text/csv'}); const link = document.createElement('a'); link.href = URL.createObjectURL(blob); link.download = 'telemetry-' + session.session_id + '.csv'; link.click(); } catch (e) { toast.show('Failed to download telemetry', 'error'); } }} style={{padding: '8px 16px', background: styles.cardSurface, border: '1px solid ' + styles.borderSubtle, color: styles.purpleBright, cursor: 'pointer', fontFamily: styles.mono, fontSize: '10px', letterSpacing: '1px', textTransform: 'uppercase', display: 'flex', alignItems: 'center', gap: '6px', borderRadius: 4}}>↓ Telemetry CSV</button>
+                              <button onClick={async () => { try { const isAdmin = user?.role === 'admin'; const base = isAdmin ? '/api/envelo/admin/sessions/' : '/api/envelo/my/sessions/'; const res = await api.get(base + session.session_id + '/export?kind=violations&format=csv', { responseType: 'blob' }); const blob = new Blob([res.data], {type: 'text/csv'}); const link = document.createElement('a'); link.href = URL.createObjectURL(blob); link.download = 'violations-' + session.session_id + '.csv'; link.click(); } catch (e) { toast.show('Failed to download violations', 'error'); } }} style={{padding: '8px 16px', background: styles.cardSurface, border: '1px solid ' + styles.borderSubtle, color: styles.accentRed, cursor: 'pointer', fontFamily: styles.mono, fontSize: '10px', letterSpacing: '1px', textTransform: 'uppercase', display: 'flex', alignItems: 'center', gap: '6px', borderRadius: 4}}>↓ Violations CSV</button>
                               <button onClick={async () => { try { const isAdmin = user?.role === 'admin'; const base = isAdmin ? '/api/envelo/admin/sessions/' : '/api/envelo/my/sessions/'; const res = await api.get(base + session.session_id + '/report', { responseType: 'blob' }); const blob = new Blob([res.data], {type: 'application/pdf'}); const link = document.createElement('a'); link.href = URL.createObjectURL(blob); link.download = 'CAT72-Report-' + session.session_id + '.pdf'; link.click(); } catch (e) { toast.show('Failed to download report', 'error'); } }} style={{padding: '8px 16px', background: styles.cardSurface, border: '1px solid ' + styles.borderGlass, color: styles.accentGreen, cursor: 'pointer', fontFamily: styles.mono, fontSize: '10px', letterSpacing: '1px', textTransform: 'uppercase', display: 'flex', alignItems: 'center', gap: '6px', borderRadius: 4}}>↓ CAT-72 Report PDF</button>
                             </div>
                             {timeline.length > 0 && (
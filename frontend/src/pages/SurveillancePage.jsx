@@ -368,8 +368,8 @@ export default function SurveillancePage() {
                     </div>
                   )}
                   <div style={{ display: 'flex', gap: 6, flexWrap: 'wrap' }}>
-                    <button onClick={async (e) => { e.stopPropagation(); try { const base = user?.role === 'admin' ? '/api/envelo/admin/sessions/' : '/api/envelo/my/sessions/'; const res = await api.get(base + sessionDetail.session_id + '/telemetry'); const recs = res.data.records || []; if (recs.length === 0) { toast.show('No telemetry data', 'info'); return; } const h = ['timestamp','action_type','result','execution_time_ms']; const csv = [h.join(','), ...recs.map(r => h.map(k => JSON.stringify(r[k] ?? '')).join(','))].join('\n'); const b = new Blob([csv], {type:'text/csv'}); const l = document.createElement('a'); l.href = URL.createObjectURL(b); l.download = 'telemetry-' + sessionDetail.session_id + '.csv'; l.click(); } catch { toast.show('Failed', 'error'); }}} style={{ padding: '4px 10px', border: '1px solid ' + styles.purplePrimary + '33', background: 'transparent', color: styles.purplePrimary, fontFamily: styles.mono, fontSize: '9px', letterSpacing: '0.5px', cursor: 'pointer', borderRadius: 3, textTransform: 'uppercase' }}>Telemetry CSV</button>
-                    <button onClick={async (e) => { e.stopPropagation(); try { const base = user?.role === 'admin' ? '/api/envelo/admin/sessions/' : '/api/envelo/my/sessions/'; const res = await api.get(base + sessionDetail.session_id + '/violations'); const v = res.data.violations || []; if (v.length === 0) { toast.show('No violations', 'info'); return; } const h = ['timestamp','boundary_name','violation_message']; const csv = [h.join(','), ...v.map(r => h.map(k => JSON.stringify(r[k] ?? '')).join(','))].join('\n'); const b = new Blob([csv], {type:'text/csv'}); const l = document.createElement('a'); l.href = URL.createObjectURL(b); l.download = 'violations-' + sessionDetail.session_id + '.csv'; l.click(); } catch { toast.show('Failed', 'error'); }}} style={{ padding: '4px 10px', border: '1px solid ' + styles.accentRed + '33', background: 'transparent', color: styles.accentRed, fontFamily: styles.mono, fontSize: '9px', letterSpacing: '0.5px', cursor: 'pointer', borderRadius: 3, textTransform: 'uppercase' }}>Violations CSV</button>
+                    <button onClick={async (e) => { e.stopPropagation(); try { const base = user?.role === 'admin' ? '/api/envelo/admin/sessions/' : '/api/envelo/my/sessions/'; const res = await api.get(base + sessionDetail.session_id + '/export?kind=telemetry&format=csv', { responseType: 'blob' }); const b = new Blob([res.data], {type:'text/csv'}); const l = document.createElement('a'); l.href = URL.createObjectURL(b); l.download = 'telemetry-' + sessionDetail.session_id + '.csv'; l.click(); } catch { toast.show('Failed', 'error'); }}} style={{ padding: '4px 10px', border: '1px solid ' + styles.purplePrimary + '33', background: 'transparent', color: styles.purplePrimary, fontFamily: styles.mono, fontSize: '9px', letterSpacing: '0.5px', cursor: 'pointer', borderRadius: 3, textTransform: 'uppercase' }}>Telemetry CSV</button>
+                    <button onClick={async (e) => { e.stopPropagation(); try { const base = user?.role === 'admin' ? '/api/envelo/admin/sessions/' : '/api/envelo/my/sessions/'; const res = await api.get(base + sessionDetail.session_id + '/export?kind=violations&format=csv', { responseType: 'blob' }); const b = new Blob([res.data], {type:'text/csv'}); const l = document.createElement('a'); l.href = URL.createObjectURL(b); l.download = 'violations-' + sessionDetail.session_id + '.csv'; l.click(); } catch { toast.show('Failed', 'error'); }}} style={{ padding: '4px 10px', border: '1px solid ' + styles.accentRed + '33', background: 'transparent', color: styles.accentRed, fontFamily: styles.mono, fontSize: '9px', letterSpacing: '0.5px', cursor: 'pointer', borderRadius: 3, textTransform: 'uppercase' }}>Violations CSV</button>
                     <button onClick={async (e) => { e.stopPropagation(); try { const base = user?.role === 'admin' ? '/api/envelo/admin/sessions/' : '/api/envelo/my/sessions/'; const res = await api.get(base + sessionDetail.session_id + '/report', { responseType: 'blob' }); const b = new Blob([res.data], {type:'application/pdf'}); const l = document.createElement('a'); l.href = URL.createObjectURL(b); l.download = 'CAT72-Report-' + sessionDetail.session_id + '.pdf'; l.click(); } catch { toast.show('Failed', 'error'); }}} style={{ padding: '4px 10px', border: '1px solid ' + styles.accentGreen + '33', background: 'transparent', color: styles.accentGreen, fontFamily: styles.mono, fontSize: '9px', letterSpacing: '0.5px', cursor: 'pointer', borderRadius: 3, textTransform: 'uppercase' }}>CAT-72 Report</button>
                     {s.application_id && <button onClick={(e) => { e.stopPropagation(); navigate('/applications/' + s.application_id); }} style={{ padding: '4px 10px', border: '1px solid ' + styles.textDim + '33', background: 'transparent', color: styles.textSecondary, fontFamily: styles.mono, fontSize: '9px', letterSpacing: '0.5px', cursor: 'pointer', borderRadius: 3, textTransform: 'uppercase' }}>Details →</button>}
                   </div>